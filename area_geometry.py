@@ -0,0 +1,330 @@
+"""
+Open area and area loss geometry for the picture helper
+
+The picture helper measures how much of a pipe's cross section is open:
+the user fits a reference circle to the pipe wall and draws the open area
+as a polygon inside it. The area loss is the share of the circle outside
+the polygon. A polygon is valid when it has at least three distinct
+points, does not cross itself and stays inside the circle.
+
+The whole-polygon functions work on (n, 2) NumPy arrays: the shoelace
+area and the point-in-circle test are vectorized, and the crossing test
+sweeps the edges in x order, comparing each edge only with the edges
+whose x range overlaps it instead of with every other edge.
+
+AreaMeasurement keeps the per-edge shoelace terms and the validity state
+of a polygon, so dragging one vertex updates the area in constant time
+and re-tests only the two edges that moved.
+"""
+import heapq
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+# Fewest distinct points of a valid polygon
+MIN_POINTS = 3
+
+# Problems reported by validate(), also the translation keys of their messages
+TOO_FEW_POINTS = "area_too_few_points"
+SELF_INTERSECTING = "area_self_intersecting"
+OUTSIDE_CIRCLE = "area_outside_circle"
+
+@dataclass(frozen=True, slots=True)
+class Circle:
+    """Reference circle fitted to the inner pipe wall, in image pixels"""
+    x: float
+    y: float
+    radius: float
+
+    @property
+    def area(self) -> float:
+        return float(np.pi * self.radius ** 2)
+
+def as_points(points: Iterable[Sequence[float]]) -> np.ndarray:
+    """Convert polygon vertices to a float64 array of shape (n, 2)"""
+    array = np.asarray(points, dtype=np.float64)
+    return array.reshape(-1, 2)
+
+def polygon_area(points: np.ndarray) -> float:
+    """Area of a polygon with the shoelace formula, whatever its orientation"""
+    if len(points) < 3:
+        return 0.0
+    x, y = points[:, 0], points[:, 1]
+    return abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))) / 2
+
+def distinct_points(points: np.ndarray) -> int:
+    """Number of different vertices"""
+    return len(np.unique(points, axis=0)) if len(points) else 0
+
+def points_in_circle(points: np.ndarray, circle: Circle) -> np.ndarray:
+    """Whether each point lies inside the circle or on it (bool array)"""
+    dx = points[:, 0] - circle.x
+    dy = points[:, 1] - circle.y
+    return dx * dx + dy * dy <= circle.radius * circle.radius * (1 + 1e-12)
+
+def _without_repeats(points: np.ndarray) -> np.ndarray:
+    """Drop vertices equal to the previous one, which add zero-length edges"""
+    if len(points) < 2:
+        return points
+    keep = np.any(points != np.roll(points, 1, axis=0), axis=1)
+    return points[keep] if keep.any() else points[:1]
+
+def _orientation(ax, ay, bx, by, cx, cy) -> float:
+    """Twice the signed area of the triangle a, b, c: > 0 counterclockwise, 0 collinear"""
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+def _on_segment(ax, ay, bx, by, cx, cy) -> bool:
+    """Whether c, collinear with segment ab, lies on it"""
+    return min(ax, bx) <= cx <= max(ax, bx) and min(ay, by) <= cy <= max(ay, by)
+
+def _segments_intersect(ax, ay, bx, by, cx, cy, dx, dy) -> bool:
+    """Whether segments ab and cd cross or touch"""
+    o1 = _orientation(ax, ay, bx, by, cx, cy)
+    o2 = _orientation(ax, ay, bx, by, dx, dy)
+    o3 = _orientation(cx, cy, dx, dy, ax, ay)
+    o4 = _orientation(cx, cy, dx, dy, bx, by)
+    if ((o1 > 0 and o2 < 0) or (o1 < 0 and o2 > 0)) and ((o3 > 0 and o4 < 0) or (o3 < 0 and o4 > 0)):
+        return True
+    return ((o1 == 0 and _on_segment(ax, ay, bx, by, cx, cy)) or (o2 == 0 and _on_segment(ax, ay, bx, by, dx, dy))
+            or (o3 == 0 and _on_segment(cx, cy, dx, dy, ax, ay)) or (o4 == 0 and _on_segment(cx, cy, dx, dy, bx, by)))
+
+def _folds_back(ax, ay, vx, vy, cx, cy) -> bool:
+    """Whether edges a-v and v-c, sharing v, overlap: collinear with c back towards a"""
+    return (_orientation(ax, ay, vx, vy, cx, cy) == 0
+            and (ax - vx) * (cx - vx) + (ay - vy) * (cy - vy) > 0)
+
+def self_intersects(points: np.ndarray) -> bool:
+    """Whether a closed polygon crosses or touches itself
+
+    Edges are swept in order of their left end. An edge is only compared
+    with the edges still active at that x, i.e. whose x range overlaps
+    it; for an outline drawn around an open area a vertical line meets
+    only a few edges, so the sweep does close to linear work instead of
+    testing all n² / 2 pairs. Neighboring edges only count as crossing
+    when the outline folds back over itself.
+    """
+    points = _without_repeats(points)
+    n = len(points)
+    if n < 3:
+        return False
+    xs, ys = points[:, 0].tolist(), points[:, 1].tolist()
+    x_min = np.minimum(points[:, 0], np.roll(points[:, 0], -1))
+    x_max = np.maximum(points[:, 0], np.roll(points[:, 0], -1)).tolist()
+    active = {}
+    expiry = []
+    for edge in np.argsort(x_min, kind="stable").tolist():
+        left = x_min[edge]
+        while expiry and expiry[0][0] < left:
+            active.pop(heapq.heappop(expiry)[1], None)
+        following = (edge + 1) % n
+        ax, ay, bx, by = xs[edge], ys[edge], xs[following], ys[following]
+        low, high = min(ay, by), max(ay, by)
+        for other in active:
+            other_following = (other + 1) % n
+            cx, cy, dx, dy = xs[other], ys[other], xs[other_following], ys[other_following]
+            if max(cy, dy) < low or min(cy, dy) > high:
+                continue
+            if other == following:
+                crossing = _folds_back(ax, ay, bx, by, dx, dy)
+            elif other_following == edge:
+                crossing = _folds_back(cx, cy, ax, ay, bx, by)
+            else:
+                crossing = _segments_intersect(ax, ay, bx, by, cx, cy, dx, dy)
+            if crossing:
+                return True
+        active[edge] = True
+        heapq.heappush(expiry, (x_max[edge], edge))
+    return False
+
+def _edges_cross_any(points: np.ndarray, edges: Sequence[int]) -> bool:
+    """Whether some edges of a polygon without repeated vertices cross any other edge
+
+    Edges whose bounding box overlaps a tested edge's are found vectorized;
+    only those few get the exact test.
+    """
+    n = len(points)
+    x, y = points[:, 0], points[:, 1]
+    next_x, next_y = np.roll(x, -1), np.roll(y, -1)
+    left, right = np.minimum(x, next_x), np.maximum(x, next_x)
+    bottom, top = np.minimum(y, next_y), np.maximum(y, next_y)
+    for edge in edges:
+        following = (edge + 1) % n
+        ax, ay, bx, by = x[edge], y[edge], next_x[edge], next_y[edge]
+        near = (left <= right[edge]) & (right >= left[edge]) & (bottom <= top[edge]) & (top >= bottom[edge])
+        for other in near.nonzero()[0].tolist():
+            if other == edge:
+                continue
+            cx, cy, dx, dy = x[other], y[other], next_x[other], next_y[other]
+            if other == following:
+                crossing = _folds_back(ax, ay, bx, by, dx, dy)
+            elif (other + 1) % n == edge:
+                crossing = _folds_back(cx, cy, ax, ay, bx, by)
+            else:
+                crossing = _segments_intersect(ax, ay, bx, by, cx, cy, dx, dy)
+            if crossing:
+                return True
+    return False
+
+def area_loss(open_area: float, circle: Circle) -> float:
+    """Percentage of the circle outside the open area, between 0 and 100"""
+    if circle.radius <= 0:
+        return 0.0
+    return min(max(100.0 * (1.0 - open_area / circle.area), 0.0), 100.0)
+
+def validate(points: np.ndarray, circle: Circle) -> Optional[str]:
+    """First problem of a polygon as a measurement, None if it is valid"""
+    if distinct_points(points) < MIN_POINTS:
+        return TOO_FEW_POINTS
+    if self_intersects(points):
+        return SELF_INTERSECTING
+    if not points_in_circle(points, circle).all():
+        return OUTSIDE_CIRCLE
+    return None
+
+class AreaMeasurement:
+    """Polygon drawn in a reference circle, kept up to date as it is edited
+
+    Moving a single vertex, the common edit while dragging, updates the area
+    from the two shoelace terms that changed and tests only the two edges
+    next to the vertex for crossings; other edits recompute everything.
+    """
+
+    def __init__(self, circle: Circle, points: Iterable[Sequence[float]] = ()):
+        """Initialize the measurement
+
+        Args:
+            circle: Reference circle
+            points: Vertices of the closed polygon, in drawing order
+        """
+        self.circle = circle
+        self.points = as_points(list(points))
+        self._recompute()
+
+    def _recompute(self):
+        x, y = self.points[:, 0], self.points[:, 1]
+        self._terms = x * np.roll(y, -1) - np.roll(x, -1) * y
+        self._twice_area = float(self._terms.sum())
+        self._outside = ~points_in_circle(self.points, self.circle)
+        self._outside_count = int(self._outside.sum())
+        self._vertices = Counter(map(tuple, self.points.tolist()))
+        self._repeats = int(np.all(self.points == np.roll(self.points, 1, axis=0), axis=1).sum()) \
+            if len(self.points) > 1 else 0
+        self._intersecting = self_intersects(self.points)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    # Results
+
+    @property
+    def area(self) -> float:
+        """Open area in square pixels"""
+        return abs(self._twice_area) / 2 if len(self.points) >= 3 else 0.0
+
+    @property
+    def area_loss(self) -> float:
+        """Percentage of the circle outside the open area"""
+        return area_loss(self.area, self.circle)
+
+    @property
+    def problem(self) -> Optional[str]:
+        """First problem of the polygon, None if it is a valid measurement"""
+        if len(self._vertices) < MIN_POINTS:
+            return TOO_FEW_POINTS
+        if self._intersecting:
+            return SELF_INTERSECTING
+        if self._outside_count:
+            return OUTSIDE_CIRCLE
+        return None
+
+    @property
+    def valid(self) -> bool:
+        return self.problem is None
+
+    # Edits
+
+    def _is_repeat(self, index: int) -> bool:
+        n = len(self.points)
+        return n > 1 and bool(np.all(self.points[index] == self.points[index - 1]))
+
+    def move_point(self, index: int, x: float, y: float):
+        """Move one vertex, e.g. while it is dragged"""
+        n = len(self.points)
+        previous, following = (index - 1) % n, (index + 1) % n
+        old = tuple(self.points[index].tolist())
+        self._repeats -= self._is_repeat(index) + (self._is_repeat(following) if following != index else 0)
+        self.points[index] = (x, y)
+        self._repeats += self._is_repeat(index) + (self._is_repeat(following) if following != index else 0)
+
+        self._vertices[old] -= 1
+        if not self._vertices[old]:
+            del self._vertices[old]
+        self._vertices[(float(x), float(y))] += 1
+
+        # Shoelace terms of the edges into and out of the vertex
+        for edge in {previous, index}:
+            start, end = self.points[edge], self.points[(edge + 1) % n]
+            term = float(start[0] * end[1] - end[0] * start[1])
+            self._twice_area += term - self._terms[edge]
+            self._terms[edge] = term
+
+        dx, dy = x - self.circle.x, y - self.circle.y
+        outside = dx * dx + dy * dy > self.circle.radius * self.circle.radius * (1 + 1e-12)
+        self._outside_count += int(outside) - int(self._outside[index])
+        self._outside[index] = outside
+
+        if self._intersecting or self._repeats or n < 4:
+            # A crossing elsewhere may have been resolved, or repeated
+            # vertices need the full test
+            self._intersecting = self_intersects(self.points)
+        else:
+            # The polygon was simple: only the two moved edges can cross now
+            self._intersecting = _edges_cross_any(self.points, (previous, index))
+
+    def translate(self, dx: float, dy: float):
+        """Move the whole polygon, e.g. while the outline is dragged"""
+        self.points += (dx, dy)
+        self._recompute()
+
+    def add_point(self, x: float, y: float):
+        """Append a vertex while drawing; a click on the last vertex adds nothing"""
+        if len(self.points) and np.all(self.points[-1] == (x, y)):
+            return
+        self.insert_point(len(self.points), x, y)
+
+    def insert_point(self, index: int, x: float, y: float):
+        """Insert a vertex before the given position"""
+        self.points = np.insert(self.points, index, (x, y), axis=0)
+        self._recompute()
+
+    def remove_point(self, index: int):
+        """Remove a vertex"""
+        self.points = np.delete(self.points, index, axis=0)
+        self._recompute()
+
+    def set_points(self, points: Iterable[Sequence[float]]):
+        """Replace the polygon, e.g. when a stored measurement is loaded"""
+        self.points = as_points(list(points))
+        self._recompute()
+
+    def set_circle(self, circle: Circle):
+        """Change the reference circle; the polygon stays where it is"""
+        self.circle = circle
+        self._outside = ~points_in_circle(self.points, circle)
+        self._outside_count = int(self._outside.sum())
+
+    def to_dict(self) -> dict:
+        """Outline data stored with the event"""
+        return {
+            "circle": {"x": self.circle.x, "y": self.circle.y, "radius": self.circle.radius},
+            "points": self.points.tolist(),
+            "area_loss": round(self.area_loss, 2),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AreaMeasurement":
+        """Create a measurement from to_dict() data"""
+        circle = data["circle"]
+        return cls(Circle(circle["x"], circle["y"], circle["radius"]), data.get("points", ()))
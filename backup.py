@@ -0,0 +1,264 @@
+"""
+Online backups and read-only snapshots of the Pipes database
+
+Both copy the database with SQLite's online backup API, a step of pages
+at a time, from inside one read transaction: with the WAL journal the
+copy is of a single consistent moment while other connections keep
+writing, and the GIL is released during each step, so the UI thread is
+never paused by it. Blob files are copied next to a backup once per
+content, so repeated backups only copy new images.
+
+A snapshot is a backup in a temporary file, opened read-only and
+immutable: report and CLI jobs read from it without taking locks on the
+live file, every part of a report sees the same point in time, and long
+reads do not keep the live file's WAL from being checkpointed. The
+shared snapshot is reused by successive jobs, e.g. every Print of the
+project form, and only copied again once something was committed.
+"""
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import blobstore
+import database
+from instrumentation import instrumentation
+
+# Pages copied per backup step, 4 MB with the default 4 KiB pages
+BACKUP_PAGES = 1024
+
+@dataclass
+class BackupResult:
+    """Outcome of a backup"""
+    path: str
+    pages: int = 0
+    blobs_copied: int = 0
+    seconds: float = 0.0
+
+def _copy_blobs(source_file: str, destination: str, conn) -> int:
+    """Copy the blob files a database references that are missing next to the destination"""
+    source = blobstore.BlobStore(blobstore.blob_dir(source_file))
+    target = blobstore.BlobStore(blobstore.blob_dir(destination))
+    copied = 0
+    for (blob_hash,) in conn.execute("SELECT hash FROM blobs"):
+        if os.path.exists(target.path(blob_hash)) or not os.path.exists(source.path(blob_hash)):
+            continue
+        # Content addressed: a file with the hash as name is already the right content
+        with open(source.path(blob_hash), "rb") as blob_file:
+            target.put_stream(blob_file)
+        copied += 1
+    return copied
+
+@instrumentation.timed("backup.database")
+def backup_database(destination: str, source_file: Optional[str] = None, pages: int = BACKUP_PAGES,
+                    progress: Optional[Callable[[int, int], None]] = None, copy_blobs: bool = True,
+                    ) -> Optional[BackupResult]:
+    """Copy the database while it stays in use
+
+    The copy is written to a temporary file and moved over the destination
+    when complete, so an interrupted backup never leaves a partial file.
+
+    Args:
+        destination: Backup file
+        source_file: Database to copy, the current database by default
+        pages: Pages copied per step, -1 copies everything in one step
+        progress: progress(pages_done, pages_total) after every step
+        copy_blobs: Also copy the referenced blob files next to the backup
+
+    Returns:
+        BackupResult, None on error
+    """
+    start = time.perf_counter()
+    source_file = source_file or database.connection_manager.database_file
+    result = BackupResult(destination)
+    temp_path = f"{destination}.part"
+
+    def step(status, remaining, total):
+        result.pages = total
+        if progress:
+            progress(total - remaining, total)
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        source = sqlite3.connect(source_file)
+        target = sqlite3.connect(temp_path)
+        try:
+            # An open read transaction pins the source to one WAL snapshot.
+            # Without it a commit by another connection between two steps
+            # restarts the copy, which never finishes under steady writes.
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            source.backup(target, pages=pages, progress=step)
+            source.rollback()
+            # A single self-contained file, no -wal or -shm needed to read it
+            target.execute("PRAGMA journal_mode = DELETE")
+            if copy_blobs and target.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blobs'").fetchone():
+                result.blobs_copied = _copy_blobs(source_file, destination, target)
+        finally:
+            target.close()
+            source.close()
+        os.replace(temp_path, destination)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error backing up database: {e}")
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        return None
+    result.seconds = time.perf_counter() - start
+    return result
+
+class Snapshot:
+    """Read-only point-in-time copy of the database
+
+    Use as a context manager; the copy is deleted on exit:
+
+        with Snapshot() as snapshot, database.use_connection_manager(snapshot.connections):
+            render_project_report(project_id)
+    """
+
+    def __init__(self, source_file: Optional[str] = None, pages: int = BACKUP_PAGES,
+                 progress: Optional[Callable[[int, int], None]] = None):
+        """Initialize the snapshot; nothing is copied before open()
+
+        Args:
+            source_file: Database to copy, the current database by default
+            pages: Pages copied per backup step
+            progress: progress(pages_done, pages_total) while copying
+        """
+        self.source_file = os.path.abspath(source_file or database.connection_manager.database_file)
+        self.pages = pages
+        self.progress = progress
+        self.path = None
+        self.connections = None
+        self._dir = None
+
+    def open(self) -> "Snapshot":
+        """Copy the database and prepare read-only connections to the copy
+
+        Raises:
+            OSError: If the copy failed
+        """
+        self._dir = tempfile.mkdtemp(prefix="pipes-snapshot-")
+        path = os.path.join(self._dir, os.path.basename(self.source_file))
+        # Rows keep referencing the source's blob store, which only deletes
+        # a blob once nothing has referenced it for BLOB_GRACE_SECONDS
+        if backup_database(path, self.source_file, self.pages, self.progress, copy_blobs=False) is None:
+            self.close()
+            raise OSError(f"Could not snapshot {self.source_file}")
+        self.path = path
+        self.connections = database.ConnectionManager(path, read_only=True, source_file=self.source_file)
+        return self
+
+    def close(self):
+        """Close the connections and delete the copy"""
+        if self.connections is not None:
+            self.connections.close_all()
+            self.connections = None
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+        self.path = None
+
+    def __enter__(self) -> "Snapshot":
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SharedSnapshot:
+    """Snapshot shared by jobs until the database changes
+
+    PRAGMA data_version of a connection kept open for the purpose changes
+    whenever another connection commits, so the copy is only taken again
+    after a write. A replaced copy is deleted once its last job is done.
+
+        with shared_snapshot.use():
+            render_project_report(project_id)
+    """
+
+    def __init__(self, pages: int = BACKUP_PAGES):
+        """Initialize the shared snapshot; nothing is copied before use()
+
+        Args:
+            pages: Pages copied per backup step
+        """
+        self.pages = pages
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._users: Dict[Snapshot, int] = {}
+        self._watch = None
+        self._watch_file = None
+
+    def _data_version(self, source_file: str) -> int:
+        """Change counter of the source file, as seen by the watching connection"""
+        if self._watch_file != source_file:
+            if self._watch is not None:
+                self._watch.close()
+            self._watch = sqlite3.connect(source_file, check_same_thread=False)
+            self._watch_file = source_file
+        return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def _retire(self):
+        """Drop the current copy, deleting it now unless a job still reads it"""
+        snapshot, self._snapshot = self._snapshot, None
+        if snapshot is not None and snapshot not in self._users:
+            snapshot.close()
+
+    def acquire(self) -> Snapshot:
+        """Get a snapshot of the current database, copying it if it changed
+
+        Raises:
+            OSError: If the copy failed
+        """
+        source_file = os.path.abspath(database.connection_manager.database_file)
+        with self._lock:
+            try:
+                # Read before copying: a commit during the copy only makes
+                # the next job copy again
+                version = self._data_version(source_file)
+            except sqlite3.Error as e:
+                raise OSError(f"Could not snapshot {source_file}: {e}")
+            if (self._snapshot is None or self._snapshot.source_file != source_file
+                    or self._version != version):
+                self._retire()
+                self._snapshot = Snapshot(source_file, self.pages).open()
+                self._version = version
+            self._users[self._snapshot] = self._users.get(self._snapshot, 0) + 1
+            return self._snapshot
+
+    def release(self, snapshot: Snapshot):
+        """Return a snapshot from acquire(), deleting it if it was replaced meanwhile"""
+        with self._lock:
+            self._users[snapshot] -= 1
+            if self._users[snapshot] == 0:
+                del self._users[snapshot]
+                if snapshot is not self._snapshot:
+                    snapshot.close()
+
+    @contextmanager
+    def use(self):
+        """Route the calling thread's database calls to the shared snapshot"""
+        snapshot = self.acquire()
+        try:
+            with database.use_connection_manager(snapshot.connections):
+                yield snapshot
+        finally:
+            self.release(snapshot)
+
+    def close(self):
+        """Delete the copy and close the watching connection"""
+        with self._lock:
+            self._retire()
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = self._watch_file = None
+
+shared_snapshot = SharedSnapshot()
@@ -0,0 +1,85 @@
+"""
+Benchmark: picture helper area geometry while a vertex is dragged
+
+Times the self-intersection test as the sweep against testing every pair of
+edges, and a vertex drag updating an AreaMeasurement against recomputing
+the whole polygon. The fast paths are checked against these slow ones in
+tests/test_area_geometry.py.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_area_geometry --vertices 500
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+import area_geometry
+from area_geometry import AreaMeasurement, Circle
+from tests.test_area_geometry import pairwise_intersects
+
+# A frame at 60 fps
+FRAME_MS = 1000 / 60
+
+def outline(rng, vertices, circle):
+    """Irregular outline of an open area: a star-shaped polygon inside the circle"""
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radii = np.full(vertices, 0.75)
+    for wave in range(2, 7):
+        radii += rng.uniform(-0.03, 0.03) * np.cos(wave * angles + rng.uniform(0, 2 * np.pi))
+    radii *= circle.radius
+    return np.column_stack((circle.x + radii * np.cos(angles), circle.y + radii * np.sin(angles)))
+
+def _best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run(vertices, repeat, drags):
+    rng = random.Random(1)
+    circle = Circle(500, 500, 400)
+    points = outline(rng, vertices, circle)
+    print(f"{vertices} vertices")
+    print(f"crossings, every pair   {_best_ms(lambda: pairwise_intersects(points), 1):8.2f} ms")
+    print(f"crossings, sweep        {_best_ms(lambda: area_geometry.self_intersects(points), repeat):8.2f} ms")
+    print(f"validate, full          {_best_ms(lambda: area_geometry.validate(points, circle), repeat):8.2f} ms")
+
+    # Drag a vertex outwards a pixel at a time, as mouse motion events do
+    index = rng.randrange(vertices)
+    x, y = points[index]
+    step = np.array((x - circle.x, y - circle.y)) / np.hypot(x - circle.x, y - circle.y)
+    moves = [(index, x + offset * step[0], y + offset * step[1]) for offset in np.linspace(0, 60, drags)]
+
+    def recompute():
+        dragged = points.copy()
+        for index, x, y in moves:
+            dragged[index] = (x, y)
+            AreaMeasurement(circle, dragged)
+
+    def incremental():
+        measurement = AreaMeasurement(circle, points.copy())
+        for index, x, y in moves:
+            measurement.move_point(index, x, y)
+            measurement.area_loss, measurement.problem
+
+    recompute_ms = _best_ms(recompute, repeat) / drags
+    incremental_ms = _best_ms(incremental, repeat) / drags
+    print(f"drag, full recompute    {recompute_ms:8.3f} ms per move")
+    print(f"drag, incremental       {incremental_ms:8.3f} ms per move "
+          f"({FRAME_MS / max(incremental_ms, 1e-9):.0f} moves per 60 fps frame)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vertices", type=int, default=500)
+    parser.add_argument("--drags", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.vertices, args.repeat, args.drags)
+
+if __name__ == "__main__":
+    main()
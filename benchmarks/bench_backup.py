@@ -0,0 +1,100 @@
+"""
+Benchmark: backing up and snapshotting a database that is being written to
+
+Copies a synthetic database while another thread keeps adding events and
+reports how long the writer's inserts were held up, with the whole copy
+in one backup step and in steps of pages. Then
+times opening a snapshot and writing an archive of projects that share
+images, against the size the images would take without deduplication.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_backup --projects 2000 --events 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+
+import backup
+import database
+import project_archive
+from benchmarks import generate
+
+def _writer_stalls(func):
+    """Run func while a thread inserts events; returns (seconds, worst insert ms, inserts)"""
+    section_id = database.get_connection().execute("SELECT MIN(id) FROM sections").fetchone()[0]
+    stop = threading.Event()
+    latencies = []
+
+    def write():
+        while not stop.is_set():
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                database.add_event(section_id, "BAB", 1.0)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.001)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+    finally:
+        stop.set()
+        writer.join()
+    return seconds, max(latencies, default=0) * 1000, len(latencies)
+
+def run(projects, events, images):
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        live = os.path.join(tmp, "live.db")
+        generate.generate(live, projects, sections=3, events=events)
+        print(f"{projects} projects, {os.path.getsize(live) / 2 ** 20:.1f} MiB")
+
+        for label, pages in (("backup, one step", -1), ("backup, steps of 256", 256),
+                             (f"backup, steps of {backup.BACKUP_PAGES}", backup.BACKUP_PAGES)):
+            target = os.path.join(tmp, f"backup{pages}.db")
+            seconds, worst, inserts = _writer_stalls(lambda: backup.backup_database(target, pages=pages))
+            print(f"{label:28} {seconds * 1000:8.1f} ms, {inserts:5d} inserts meanwhile, worst {worst:6.1f} ms")
+
+        start = time.perf_counter()
+        with backup.Snapshot(live) as snapshot, database.use_connection_manager(snapshot.connections):
+            opened = time.perf_counter() - start
+            count = len(database.get_all_projects())
+        print(f"{'snapshot':28} {opened * 1000:8.1f} ms to open, {count} projects read")
+
+        # Archive: project images and event snapshots drawn from a small set
+        pictures = [b"\xff\xd8\xff" + os.urandom(32 * 1024) for _ in range(images)]
+        project_ids = [project.id for project in database.get_all_projects()[:20]]
+        referenced = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            for project_id in project_ids:
+                database.set_project_image(project_id, rng.choice(pictures))
+                referenced += 1
+                for section in database.get_sections(project_id):
+                    for event in database.get_section_events(section.id)[:5]:
+                        database.set_event_snapshot(event.id, rng.choice(pictures))
+                        referenced += 1
+        path = os.path.join(tmp, f"projects{project_archive.ARCHIVE_EXTENSION}")
+        result = project_archive.export_archive(path, project_ids)
+        print(f"{'archive, 20 projects':28} {result.seconds * 1000:8.1f} ms, {os.path.getsize(path) / 2 ** 20:.2f} MiB "
+              f"({referenced} image references, {result.blobs} stored; "
+              f"{referenced * 32 / 1024:.2f} MiB without deduplication)")
+        database.connection_manager.close_all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--images", type=int, default=10)
+    args = parser.parse_args()
+    run(args.projects, args.events, args.images)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: event snapshots inline in the events table vs. in the blob store
+
+Stores the same synthetic snapshots both ways and times the queries that
+never need the image (the event list of a section, a severity scan over
+all events) plus opening one snapshot.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_blobs --events 10000 --images 1000 --kib 48
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import database
+from models.event import COLUMNS as EVENT_COLUMNS
+
+def _size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) \
+        if os.path.isdir(path) else os.path.getsize(path)
+
+def _time(database_file, sql, parameters=(), repeat=5):
+    """Best time of a query on a fresh connection, i.e. with a cold SQLite page cache"""
+    best = float("inf")
+    for _ in range(repeat):
+        conn = sqlite3.connect(database_file)
+        start = time.perf_counter()
+        conn.execute(sql, parameters).fetchall()
+        best = min(best, time.perf_counter() - start)
+        conn.close()
+    return best * 1000
+
+def run(events, images, kib, sections=100):
+    rng = random.Random(1)
+    snapshots = [os.urandom(kib * 1024) for _ in range(images)]
+    with tempfile.TemporaryDirectory() as tmp:
+        database.connection_manager.set_database_file(os.path.join(tmp, "blobs.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.initialize_database()
+            database.add_event_codes([{"code": "BAB", "category": "structural", "description": "Crack"}])
+            project_id = database.add_project("Blob benchmark", "Haifa")
+            section_ids = [database.add_section(project_id) for _ in range(sections)]
+
+        conn = database.get_connection()
+        # The old layout: the image bytes in a column of the events table
+        conn.execute("CREATE TABLE events_inline AS SELECT * FROM events WHERE 0")
+        conn.execute("ALTER TABLE events_inline ADD COLUMN snapshot BLOB")
+        conn.execute("CREATE INDEX idx_inline_section ON events_inline (section_id, distance, severity)")
+
+        start = time.perf_counter()
+        with conn:
+            for index in range(events):
+                snapshot = snapshots[rng.randrange(images)]
+                conn.execute("INSERT INTO events_inline (section_id, event_code, distance, severity, snapshot) "
+                             "VALUES (?, 'BAB', ?, ?, ?)",
+                             (section_ids[index % sections], index * 0.1, index % 6, snapshot))
+        inline_write = time.perf_counter() - start
+
+        rng.seed(1)
+        start = time.perf_counter()
+        store = database.get_blob_store()
+        with conn:
+            for index in range(events):
+                snapshot = snapshots[rng.randrange(images)]
+                blob_hash = database._store_blob(conn, store, snapshot)
+                conn.execute("INSERT INTO events (section_id, event_code, distance, severity, snapshot_hash) "
+                             "VALUES (?, 'BAB', ?, ?, ?)",
+                             (section_ids[index % sections], index * 0.1, index % 6, blob_hash))
+        store_write = time.perf_counter() - start
+
+        database.connection_manager.close_all()
+        database_file = os.path.join(tmp, "blobs.db")
+        plain = sqlite3.connect(database_file)
+        plain.execute("VACUUM")
+        inline_bytes = plain.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN ('events_inline', 'idx_inline_section')").fetchone()[0] \
+            if _has_dbstat(plain) else None
+        print(f"{events} events, {images} distinct {kib} KiB snapshots")
+        print(f"write          inline {inline_write:7.2f} s   blob store {store_write:7.2f} s")
+        if inline_bytes is not None:
+            store_bytes = plain.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN ('events', 'idx_events_section_distance', 'blobs')"
+            ).fetchone()[0] + _size(store.root)
+            print(f"size           inline {inline_bytes / 2 ** 20:7.1f} MiB  blob store {store_bytes / 2 ** 20:7.1f} MiB")
+
+        columns = EVENT_COLUMNS
+        for label, sql, parameters in (
+            ("section list", f"SELECT {columns} FROM {{table}} WHERE section_id = ? ORDER BY distance",
+             (section_ids[sections // 2],)),
+            ("severity scan", f"SELECT {columns} FROM {{table}} WHERE notes IS NULL AND severity >= 4", ()),
+        ):
+            times = [_time(database_file, sql.format(table=table), parameters) for table in ("events_inline", "events")]
+            print(f"{label:<14} inline {times[0]:7.2f} ms  blob store {times[1]:7.2f} ms")
+
+        blob_hash = plain.execute("SELECT snapshot_hash FROM events LIMIT 1").fetchone()[0]
+        handle = store.handle(blob_hash)
+        start = time.perf_counter()
+        with handle.open() as content:
+            header = content[:8]
+        print(f"open snapshot  {(time.perf_counter() - start) * 1000:.3f} ms ({len(header)} header bytes mapped)")
+        plain.close()
+
+def _has_dbstat(conn):
+    try:
+        conn.execute("SELECT 1 FROM dbstat LIMIT 1")
+        return True
+    except sqlite3.Error:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--images", type=int, default=1000)
+    parser.add_argument("--kib", type=int, default=48)
+    args = parser.parse_args()
+    run(args.events, args.images, args.kib)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: pooled connections vs. opening a connection per call
+
+Run from the repository root:
+
+    python -m benchmarks.bench_connection --rows 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+
+import database
+
+def _open_per_call(database_file):
+    """Open a connection the way database.py did before pooling"""
+    conn = sqlite3.connect(database_file)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def old_add_project(database_file, name, location):
+    conn = _open_per_call(database_file)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO projects (name, location) VALUES (?, ?)", (name, location))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+def old_get_project(database_file, project_id):
+    conn = _open_per_call(database_file)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, location, created_at FROM projects WHERE id = ?", (project_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+def old_update_project(database_file, project_id, name, location):
+    conn = _open_per_call(database_file)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE projects SET name = ?, location = ? WHERE id = ?", (name, location, project_id))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+def _timed(label, rows, func):
+    """Run func(i) for every row and print the per-call cost"""
+    # database.py prints a line per added project, keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(rows):
+            func(i)
+        elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:10.1f} ms  {elapsed / rows * 1e6:8.1f} us/call")
+    return elapsed
+
+def run(rows):
+    """Run both variants against fresh database files"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Open-per-call, default rollback journal
+        old_file = os.path.join(tmp, "old.db")
+        conn = sqlite3.connect(old_file)
+        conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,"
+                     " location TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.close()
+
+        print("open-per-call (rollback journal)")
+        _timed("  add_project", rows, lambda i: old_add_project(old_file, f"Project {i}", "Tel Aviv"))
+        _timed("  get_project", rows, lambda i: old_get_project(old_file, i + 1))
+        _timed("  update_project", rows, lambda i: old_update_project(old_file, i + 1, f"Project {i}", "Haifa"))
+
+        # Pooled connection manager, WAL
+        database.connection_manager.set_database_file(os.path.join(tmp, "pooled.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.initialize_database()
+
+        print("pooled (WAL)")
+        _timed("  add_project", rows, lambda i: database.add_project(f"Project {i}", "Tel Aviv"))
+        _timed("  get_project", rows, lambda i: database.get_project(i + 1))
+        _timed("  update_project", rows, lambda i: database.update_project(i + 1, f"Project {i}", "Haifa"))
+
+        database.connection_manager.close_all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000, help="number of calls per operation")
+    args = parser.parse_args()
+    run(args.rows)
+
+if __name__ == "__main__":
+    main()
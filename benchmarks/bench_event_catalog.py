@@ -0,0 +1,85 @@
+"""
+Benchmark: event code lookups, linear scan vs. the prefix/trigram index
+
+Builds a synthetic catalog with Hebrew, Arabic and English descriptions
+and times picker queries against a casefolded substring scan of every
+code, which is what filtering the list on each keystroke used to cost.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_event_catalog --codes 2000
+"""
+import argparse
+import random
+import string
+import time
+
+import database
+from event_catalog import EventCodeCatalog
+from models.event import EventCode
+
+WORDS = [
+    "crack", "fracture", "roots", "deposits", "surface", "damage", "joint", "connection", "infiltration",
+    "deformation", "longitudinal", "circumferential", "סדק", "שבר", "שורשים", "משקעים", "חיבור", "חדירה",
+    "شق", "كسر", "جذور", "ترسبات", "وصلة", "تسرب",
+]
+CATEGORIES = ("structural", "operational", "connection")
+TRANSLATIONS = {"event_category.structural": "מבני", "event_category.operational": "תפעולי",
+                "event_category.connection": "חיבור"}
+QUERIES = ["B", "BA", "BAB", "crack", "rac", "סדק", "שורש", "جذور", "מבני", "crack joint", "zzz"]
+
+def make_codes(count, seed=1):
+    rng = random.Random(seed)
+    codes = {}
+    while len(codes) < count:
+        code = "B" + "".join(rng.choice(string.ascii_uppercase) for _ in range(2)) + rng.choice(("", "A", "B", "C"))
+        codes[code] = EventCode(code, rng.choice(CATEGORIES), " ".join(rng.sample(WORDS, 3)))
+    return list(codes.values())
+
+def linear_search(codes, query):
+    """Filter by a casefolded substring of every field, as a list filter would"""
+    words = database.normalize_search_text(query).casefold().split()
+    rows = []
+    for code in codes:
+        text = database.normalize_search_text(
+            f"{code.code} {code.category} {TRANSLATIONS.get('event_category.' + code.category, '')} "
+            f"{code.description}"
+        ).casefold()
+        if all(word in text for word in words):
+            rows.append(code)
+    return sorted(rows, key=lambda code: code.code)
+
+def _best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run(count, repeat):
+    codes = make_codes(count)
+    start = time.perf_counter()
+    catalog = EventCodeCatalog(codes, TRANSLATIONS)
+    print(f"Indexed {len(catalog)} codes in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def indexed(query):
+        catalog._results.clear()  # Time the lookup, not the cache of repeated queries
+        return catalog.search(query, limit=None)
+
+    print(f"{'query':<14} {'matches':>8} {'scan':>10} {'index':>10}")
+    for query in QUERIES:
+        matches = len(indexed(query))
+        scan = _best_ms(lambda: linear_search(codes, query), repeat)
+        lookup = _best_ms(lambda: indexed(query), repeat)
+        print(f"{query:<14} {matches:>8} {scan:>8.3f}ms {lookup:>8.3f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--codes", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.codes, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: indexed section and event queries on synthetic inspection data
+
+Run from the repository root:
+
+    python -m benchmarks.bench_events --projects 200 --sections 50 --events 50
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import database
+
+# Query time considered interactive, in milliseconds
+TARGET_MS = 20.0
+
+CODES = [
+    ("BAB", "structural", "Crack"),
+    ("BAC", "structural", "Fracture"),
+    ("BAF", "structural", "Surface damage"),
+    ("BBA", "operational", "Roots"),
+    ("BBB", "operational", "Attached deposits"),
+    ("BBC", "operational", "Settled deposits"),
+    ("BBE", "operational", "Other obstacles"),
+    ("BCA", "connection", "Connection"),
+    ("BDB", "operational", "General photograph"),
+]
+
+def populate(projects, sections, events, seed=1):
+    """Fill the current database with synthetic projects, sections and events"""
+    rng = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.add_event_codes({"code": code, "category": category, "description": description}
+                                 for code, category, description in CODES)
+        project_ids = database.add_projects(
+            {"name": f"Inspection {i}", "location": "Haifa"} for i in range(projects)
+        ).ids
+
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO sections (project_id, section_number, pipe_number, diameter, material, length) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((project_id, number, f"P-{project_id}-{number}", rng.choice((200, 300, 400, 600)),
+              rng.choice(("Concrete", "PVC", "Steel")), rng.uniform(20, 120))
+             for project_id in project_ids for number in range(1, sections + 1))
+        )
+    section_ids = [row[0] for row in conn.execute("SELECT id FROM sections ORDER BY id")]
+
+    def generate():
+        for section_id in section_ids:
+            for _ in range(events):
+                code = rng.choice(CODES)[0]
+                yield {
+                    "section_id": section_id,
+                    "event_code": code,
+                    "distance": round(rng.uniform(0, 120), 2),
+                    "video_time": rng.uniform(0, 1800),
+                    "severity": rng.randint(0, 5),
+                    "clock_start": rng.randint(1, 12),
+                    "blockage_percent": rng.uniform(0, 100) if code.startswith("BB") else None,
+                }
+
+    result = database.add_events(generate(), chunk_size=5000)
+    return project_ids, section_ids, result.succeeded
+
+def _time_ms(func, repeat):
+    """Run func repeat times and return the timings in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+def run(projects, sections, events, repeat):
+    """Build a database of the given size and time typical queries"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database.connection_manager.set_database_file(os.path.join(tmp, "events.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.initialize_database()
+
+        start = time.perf_counter()
+        project_ids, section_ids, count = populate(projects, sections, events)
+        print(f"Inserted {len(project_ids)} projects, {len(section_ids)} sections and {count} events"
+              f" in {time.perf_counter() - start:.1f} s")
+
+        project_id = project_ids[len(project_ids) // 2]
+        section_id = section_ids[len(section_ids) // 2]
+        queries = [
+            ("project events, severity >= 4", lambda: database.get_project_events(project_id, min_severity=4)),
+            ("project events, all", lambda: database.get_project_events(project_id)),
+            ("project events, code BBA", lambda: database.get_project_events(project_id, event_code="BBA")),
+            ("section events, by distance", lambda: database.get_section_events(section_id)),
+            ("section events, severity >= 4", lambda: database.get_section_events(section_id, min_severity=4)),
+            ("project sections", lambda: database.get_sections(project_id)),
+            ("project severity counts", lambda: database.count_project_events(project_id)),
+        ]
+
+        slow = 0
+        print(f"{'query':<32} {'rows':>6} {'p50':>9} {'max':>9}")
+        for label, query in queries:
+            timings, result = _time_ms(query, repeat)
+            p50 = statistics.median(timings)
+            slow += p50 > TARGET_MS
+            print(f"{label:<32} {len(result):>6} {p50:>7.2f}ms {max(timings):>7.2f}ms")
+
+        conn = database.get_connection()
+        print("Plan of the project events query:")
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT e.id FROM sections s JOIN events e ON e.section_id = s.id "
+            "WHERE s.project_id = ? AND e.severity >= ? ORDER BY s.section_number, s.id, e.distance",
+            (project_id, 4)
+        )
+        for row in plan:
+            print(f"  {row[3]}")
+
+        database.connection_manager.close_all()
+        print(f"{slow} of {len(queries)} queries above the {TARGET_MS:.0f} ms target")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=200, help="number of projects")
+    parser.add_argument("--sections", type=int, default=50, help="sections per project")
+    parser.add_argument("--events", type=int, default=50, help="events per section")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    args = parser.parse_args()
+    run(args.projects, args.sections, args.events, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: clicking through events with and without the frame cache
+
+Writes a fixture video, places events along it and times the frame shown
+for every click: seeking the decoder per click, and the frame cache with
+neighbor prefetching. Then times the event thumbnails of a freshly opened
+project, decoded cold and read back from the on-disk store.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_frame_cache --minutes 2 --events 60
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from benchmarks.bench_slope import make_fixture_video
+from video.cache import FrameCache
+from video.frames import open_video
+
+# Time between clicks, while the prefetch thread works
+THINK_SECONDS = 0.15
+
+def _report(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<28} median {statistics.median(latencies) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms")
+
+def click_uncached(video_path, events):
+    """Seek the decoder to every clicked event"""
+    import cv2
+
+    capture = open_video(video_path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    latencies = []
+    for event in events:
+        start = time.perf_counter()
+        capture.set(cv2.CAP_PROP_POS_FRAMES, round(event.video_time * fps))
+        capture.read()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(THINK_SECONDS)
+    capture.release()
+    return latencies
+
+def click_cached(cache, video_path, events):
+    """Show every clicked event through the cache, prefetching its neighbors"""
+    latencies = []
+    for position, event in enumerate(events):
+        start = time.perf_counter()
+        cache.get_frame(video_path, event.video_time)
+        latencies.append(time.perf_counter() - start)
+        cache.prefetch_events(video_path, events, position)
+        time.sleep(THINK_SECONDS)
+    return latencies
+
+def thumbnails(cache, video_path, events):
+    start = time.perf_counter()
+    for event in events:
+        cache.get_thumbnail(video_path, event.video_time)
+    return time.perf_counter() - start
+
+def run(minutes, event_count):
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, "fixture.avi")
+        make_fixture_video(video_path, minutes * 60)
+        spacing = minutes * 60 / (event_count + 1)
+        events = [SimpleNamespace(video_time=round(spacing * (i + 1), 2)) for i in range(event_count)]
+        print(f"{minutes} min video, {event_count} events {spacing:.1f} s apart")
+
+        _report("seek per click", click_uncached(video_path, events))
+        cache = FrameCache(store_dir=os.path.join(tmp, "thumbnails"))
+        _report("cache + prefetch", click_cached(cache, video_path, events))
+        _report("cache, second pass", click_cached(cache, video_path, events[::-1]))
+        print(f"cache: {len(cache)} frames, {cache.size / 2 ** 20:.0f} MiB, {cache.hits} hits, {cache.misses} misses")
+        cache.shutdown()
+
+        cold = thumbnails(FrameCache(store_dir=os.path.join(tmp, "thumbnails-cold")), video_path, events)
+        reopened = FrameCache(store_dir=os.path.join(tmp, "thumbnails-cold"))
+        warm = thumbnails(reopened, video_path, events)
+        print(f"thumbnails, cold             {cold * 1000:7.1f} ms")
+        print(f"thumbnails, reopened project {warm * 1000:7.1f} ms ({cold / warm:.0f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=2)
+    parser.add_argument("--events", type=int, default=60)
+    args = parser.parse_args()
+    run(args.minutes, args.events)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: ingesting a field crew's folder of section videos
+
+Writes a folder tree of short synthetic videos, then times the ingest
+probing in this process against a pool of worker processes, and a rerun
+over the same folder, which skips every video by its manifest
+fingerprint without opening it.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ingest --projects 4 --videos 25
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+
+import numpy as np
+
+import database
+from video import ingest
+
+def write_videos(root, projects, videos, frames):
+    """Write projects x videos MJPEG files with random frames"""
+    import cv2
+
+    rng = np.random.default_rng(1)
+    for project in range(projects):
+        directory = os.path.join(root, f"project-{project + 1}")
+        os.makedirs(directory)
+        for video in range(videos):
+            name = f"CAM_20261017_{8 + video // 60:02d}{video % 60:02d}00.avi"
+            writer = cv2.VideoWriter(os.path.join(directory, name), cv2.VideoWriter_fourcc(*"MJPG"), 25, (320, 240))
+            for _ in range(frames):
+                writer.write(rng.integers(0, 255, (240, 320, 3), dtype=np.uint8))
+            writer.release()
+
+def run(projects, videos, frames, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "crew")
+        write_videos(root, projects, videos, frames)
+        print(f"{projects * videos} videos of {frames} frames")
+        for label, pool in (("probe in process", 0), (f"probe with {workers} workers", workers)):
+            database.connection_manager.set_database_file(os.path.join(tmp, f"ingest-{pool}.db"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                database.initialize_database()
+            result = ingest.ingest_folder(root, workers=pool)
+            print(f"{label:26} {result.seconds * 1000:8.1f} ms, {len(result.sections)} sections")
+        result = ingest.ingest_folder(root, workers=workers)
+        print(f"{'rerun, all ingested':26} {result.seconds * 1000:8.1f} ms, {result.skipped} skipped")
+        database.connection_manager.close_all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=4)
+    parser.add_argument("--videos", type=int, default=25)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run(args.projects, args.videos, args.frames, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: cost of the instrumentation wrappers on database calls
+
+Times database.get_project() unwrapped, wrapped with instrumentation
+disabled (the default) and wrapped with it enabled, and prints the p50/p95
+the diagnostics tab would show.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_instrumentation --calls 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import database
+from instrumentation import instrumentation
+
+def _per_call(func, argument, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(argument)
+    return (time.perf_counter() - start) / calls * 1e6
+
+def run(calls):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.connection_manager.set_database_file(os.path.join(tmp, "instrumentation.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.initialize_database()
+            project_id = database.add_project("Instrumentation benchmark", "Haifa")
+
+        wrapped = database.get_project
+        raw = wrapped.__wrapped__
+        settings = dict(instrumentation.settings)
+        try:
+            instrumentation.configure(enabled=False)
+            print(f"unwrapped     {_per_call(raw, project_id, calls):7.2f} us/call")
+            print(f"disabled      {_per_call(wrapped, project_id, calls):7.2f} us/call")
+            instrumentation.configure(enabled=True, log_file=None)
+            instrumentation.reset()
+            print(f"enabled       {_per_call(wrapped, project_id, calls):7.2f} us/call")
+            for row in instrumentation.snapshot():
+                print(f"{row['name']:<13} count {row['count']}  p50 {row['p50_ms'] * 1000:.2f} us  "
+                      f"p95 {row['p95_ms'] * 1000:.2f} us")
+        finally:
+            instrumentation.reset()
+            instrumentation.configure(**settings)
+            database.connection_manager.close_all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.calls)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: loading project rows as dictionaries vs. slotted Project instances
+
+Run from the repository root:
+
+    python -m benchmarks.bench_model --rows 1000000
+"""
+import argparse
+import gc
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from models.project import Project, COLUMNS
+
+def populate(database_file, rows):
+    """Create a bare projects table with synthetic rows"""
+    conn = sqlite3.connect(database_file)
+    # Migrated columns beyond the original four stay NULL
+    extra_columns = "".join(f", {column} TEXT" for column in COLUMNS.split(", ")[4:])
+    conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,"
+                 f" location TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP{extra_columns})")
+    with conn:
+        conn.executemany(
+            "INSERT INTO projects (name, location, created_at) VALUES (?, ?, ?)",
+            ((f"Project {i}", "Tel Aviv", f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:00:00")
+             for i in range(rows))
+        )
+    conn.close()
+
+def load_dicts(conn):
+    """Load rows the way database.py did before the model: sqlite3.Row -> dict"""
+    conn.row_factory = sqlite3.Row
+    return [dict(row) for row in conn.execute(f"SELECT {COLUMNS} FROM projects")]
+
+def load_models(conn):
+    """Load rows straight into Project instances"""
+    cursor = conn.cursor()
+    cursor.row_factory = Project.row_factory
+    return cursor.execute(f"SELECT {COLUMNS} FROM projects").fetchall()
+
+def measure(label, database_file, loader):
+    """Time a loader and report the peak memory held by its result"""
+    conn = sqlite3.connect(database_file)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = loader(conn)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Loading again without tracing gives the throughput without its overhead
+    del rows
+    gc.collect()
+    start = time.perf_counter()
+    rows = loader(conn)
+    untraced = time.perf_counter() - start
+    conn.close()
+    print(f"{label:<10} {len(rows):>9} rows  {untraced:7.2f} s  {len(rows) / untraced:>11,.0f} rows/s"
+          f"  peak {peak / 2**20:8.1f} MiB  ({peak / len(rows):6.0f} B/row, traced {elapsed:.2f} s)")
+    return peak
+
+def run(rows):
+    """Build a database of the given size and load it both ways"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database_file = os.path.join(tmp, "model.db")
+        start = time.perf_counter()
+        populate(database_file, rows)
+        print(f"Inserted {rows} projects in {time.perf_counter() - start:.1f} s")
+
+        dict_peak = measure("dict", database_file, load_dicts)
+        model_peak = measure("Project", database_file, load_models)
+        print(f"Project uses {model_peak / dict_peak:.0%} of the dictionary memory")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000, help="number of projects")
+    args = parser.parse_args()
+    run(args.rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: pipe graph of a section with many events
+
+Times the PDF pipe graph drawn as a vector line and label per event (the
+old drawing) against the cached layout with clustered markers embedded as
+a raster, and the marker work of a widget redraw and of a selection.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipe_graph --events 5000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from models.event import Event
+from models.section import Section
+import pipe_layout
+from reports import engine
+from reports.project_report import render_pipe_graph
+
+def vector_pipe_graph(pdf, events, length, x, y, width, height=30):
+    """The pipe graph as drawn before layouts: a line per event"""
+    pipe_top = y + height / 2 - 3
+    pdf.rect(x, pipe_top, width, 6, style="DF")
+    pdf.set_font(pdf.report_font, '', 7)
+    previous_label = None
+    for event in events:
+        marker_x = x + min(max(event.distance / length, 0.0), 1.0) * width
+        pdf.set_draw_color(*pipe_layout.SEVERITY_COLORS.get(event.severity, pipe_layout.SEVERITY_COLORS[None]))
+        pdf.set_line_width(0.6)
+        pdf.line(marker_x, pipe_top - 2, marker_x, pipe_top + 8)
+        if previous_label is None or marker_x - previous_label > 8:
+            pdf.set_xy(marker_x - 6, pipe_top - 6)
+            pdf.cell(12, 4, event.event_code, align="C")
+            previous_label = marker_x
+
+def _best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run(events, repeat):
+    rng = random.Random(1)
+    length = 120.0
+    section = Section(project_id=1, section_number=1, length=length, upstream_manhole="MH-1",
+                      downstream_manhole="MH-2", id=1)
+    rows = sorted((Event(section_id=1, event_code=rng.choice(("BAB", "BBA", "BCA")),
+                         distance=rng.uniform(0, length), severity=rng.choice((None, 1, 2, 3, 4, 5)), id=index)
+                   for index in range(events)), key=lambda event: event.distance)
+    engine.IMAGES_DIR = tempfile.mkdtemp(prefix="pipes-bench-images-")
+    engine.subset_font()
+
+    def draw(func):
+        def page():
+            pdf = engine.new_document()
+            pdf.add_page()
+            func(pdf)
+            return bytes(pdf.output())
+        return page
+
+    vector = draw(lambda pdf: vector_pipe_graph(pdf, rows, length, 10, 20, 190))
+    layout = draw(lambda pdf: render_pipe_graph(pdf, section, rows, 10, 20, 190))
+    vector_size, layout_size = len(vector()), len(layout())
+    print(f"{events} events")
+    print(f"PDF, line per event     {_best_ms(vector, repeat):8.2f} ms  {vector_size / 1024:7.1f} KiB")
+    pipe_layout._layouts.clear()
+    engine.IMAGES_DIR = tempfile.mkdtemp(prefix="pipes-bench-images-")
+    print(f"PDF, layout cold        {_best_ms(layout, 1):8.2f} ms")
+    print(f"PDF, layout cached      {_best_ms(layout, repeat):8.2f} ms  {layout_size / 1024:7.1f} KiB")
+
+    pipe_layout._layouts.clear()
+    computed = pipe_layout.layout_for(length, rows)
+    print(f"layout                  {_best_ms(lambda: pipe_layout.compute_layout(length, rows), repeat):8.2f} ms")
+    markers = computed.markers(1000 // 4, label_slots=1000 // 36, label_rows=2)
+    zoomed = [computed.markers(1000 // 4, start, start + 0.05, 1000 // 36, 2) for start in (0.2, 0.5)]
+    print(f"redraw items, 1000 px   {len(markers) + (markers.row >= 0).sum():8d} (was {2 * events})")
+    print(f"zoomed to 5%            {len(zoomed[0]):8d} markers, {int(zoomed[0].count.max())} events at most in one")
+    ids = [int(event_id) for event_id in computed.event_id[:1000]]
+    print(f"selection lookup        {_best_ms(lambda: [computed.index_of(i) for i in ids], repeat) :8.4f} ms "
+          f"per 1000 selections")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.events, args.repeat)
+
+if __name__ == "__main__":
+    main()
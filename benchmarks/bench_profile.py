@@ -0,0 +1,82 @@
+"""
+Benchmark: slope profile aggregation and downsampling
+
+Aggregates synthetic slope readings per distance bin with a per-reading
+Python loop (the straightforward way) and with slope.profile.aggregate(),
+then downsamples the profile and renders it as a PDF page.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_profile --readings 1000000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from reports import engine
+from slope import profile
+
+def make_readings(count, seed=1):
+    """Distances and slopes of a slow crawler with stops and repeated distances"""
+    rng = np.random.default_rng(seed)
+    # Steps of 0-4 cm, a tenth of them standing still
+    steps = rng.uniform(0, 0.04, count) * (rng.random(count) > 0.1)
+    distances = np.round(np.cumsum(steps), 2)
+    slopes = np.round(2.5 * np.sin(distances / 15) + rng.normal(0, 0.3, count), 2)
+    return distances, slopes
+
+def aggregate_python(distances, slopes, bin_size=profile.BIN_SIZE):
+    """Per-reading aggregation into a dict of [sum, min, max, count]"""
+    bins = {}
+    for distance, slope in zip(distances, slopes):
+        key = math.floor(distance / bin_size)
+        entry = bins.get(key)
+        if entry is None:
+            bins[key] = [slope, slope, slope, 1]
+        else:
+            entry[0] += slope
+            entry[1] = min(entry[1], slope)
+            entry[2] = max(entry[2], slope)
+            entry[3] += 1
+    return [((key + 0.5) * bin_size, total / count, low, high, count)
+            for key, (total, low, high, count) in sorted(bins.items())]
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def run(readings, max_points):
+    distances, slopes = make_readings(readings)
+    print(f"{readings} readings over {distances[-1]:.0f} m")
+
+    rows, python_seconds = timed(aggregate_python, distances.tolist(), slopes.tolist())
+    result, numpy_seconds = timed(profile.aggregate, distances, slopes)
+    print(f"python loop   {python_seconds * 1000:9.1f} ms  {len(rows)} bins")
+    print(f"numpy         {numpy_seconds * 1000:9.1f} ms  {len(result)} bins, {result.nbytes / 1024:.0f} KiB"
+          f"  ({python_seconds / numpy_seconds:.0f}x)")
+    expected = np.array(rows)
+    assert np.allclose(expected[:, 1], result.mean, atol=1e-4)
+    assert np.array_equal(expected[:, 4], result.count)
+
+    reduced, seconds = timed(profile.downsample, result, max_points)
+    print(f"downsample    {seconds * 1000:9.1f} ms  {len(result)} -> {len(reduced)} points,"
+          f" band {reduced.minimum.min():.2f}..{reduced.maximum.max():.2f}"
+          f" (full {result.minimum.min():.2f}..{result.maximum.max():.2f})")
+
+    pdf = engine.new_document()
+    _, seconds = timed(engine.render_slope_profile_page, pdf, "Slope profile", result)
+    data = bytes(pdf.output())
+    print(f"pdf page      {seconds * 1000:9.1f} ms  {len(data) / 1024:.0f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readings", type=int, default=1_000_000)
+    parser.add_argument("--max-points", type=int, default=profile.MAX_PLOT_POINTS)
+    args = parser.parse_args()
+    run(args.readings, args.max_points)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: full project report of a synthetic project
+
+Builds a project with many sections, events and event snapshots, then
+renders its full report in a child process per run, so every run reports
+its own peak memory: with a cold and a warm screenshot cache, in one
+process and with worker processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_project_report --sections 500 --events 10 --snapshots 1000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import database
+from benchmarks.bench_events import CODES
+
+def make_snapshot(rng, index, size=(1280, 720)):
+    """A camera-like frame: smooth pipe wall, a dark defect and some noise"""
+    import cv2
+
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width]
+    radius = np.hypot(x - width / 2, y - height / 2)
+    gray = np.clip(200 - radius / 4, 30, 200).astype(np.uint8)
+    frame = cv2.merge((gray, (gray * 0.9).astype(np.uint8), (gray * 0.7).astype(np.uint8)))
+    cv2.ellipse(frame, (rng.randrange(200, width - 200), rng.randrange(150, height - 150)),
+                (rng.randrange(20, 160), rng.randrange(10, 60)), rng.randrange(180), 0, 360, (20, 20, 30), -1)
+    frame = cv2.add(frame, np.random.default_rng(index).integers(0, 12, frame.shape, dtype=np.uint8))
+    cv2.putText(frame, f"{index}", (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+    ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return data.tobytes()
+
+def populate(sections, events, snapshots, seed=1):
+    """Fill the current database with one synthetic project
+
+    Returns:
+        ID of the project
+    """
+    rng = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.add_event_codes({"code": code, "category": category, "description": description}
+                                 for code, category, description in CODES)
+        project_id = database.add_project("Report benchmark", "Haifa")
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO sections (project_id, section_number, pipe_number, diameter, material, length, "
+            "upstream_manhole, downstream_manhole, street, city) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((project_id, number, f"P-{number}", rng.choice((200, 300, 400, 600)),
+              rng.choice(("Concrete", "PVC", "Steel")), round(rng.uniform(20, 120), 1),
+              f"MH-{number}", f"MH-{number + 1}", "Herzl", "Haifa")
+             for number in range(1, sections + 1))
+        )
+    section_ids = [row[0] for row in conn.execute("SELECT id FROM sections WHERE project_id = ?", (project_id,))]
+    database.add_events(
+        {
+            "section_id": section_id,
+            "event_code": rng.choice(CODES)[0],
+            "distance": round(rng.uniform(0, 100), 2),
+            "video_time": round(rng.uniform(0, 600), 1),
+            "severity": rng.randint(0, 5),
+            "notes": rng.choice(("", "Checked on site", "Roots at the joint, recommend cutting")),
+        }
+        for section_id in section_ids for _ in range(events)
+    )
+    event_ids = [row[0] for row in conn.execute("SELECT id FROM events")]
+    store = database.get_blob_store()
+    with conn:
+        for index, event_id in enumerate(rng.sample(event_ids, min(snapshots, len(event_ids)))):
+            blob_hash = database._store_blob(conn, store, make_snapshot(rng, index))
+            conn.execute("UPDATE events SET snapshot_hash = ? WHERE id = ?", (blob_hash, event_id))
+    return project_id
+
+def render_child(database_file, project_id, workers, images_dir, out):
+    """Child mode: render once and print the timing and peak memory as JSON"""
+    from reports import engine, project_report
+
+    engine.IMAGES_DIR = images_dir
+    database.connection_manager.set_database_file(database_file)
+    result = project_report.render_project_report(project_id, out, workers)
+    print(json.dumps({
+        "seconds": result.seconds,
+        "pages": result.pages,
+        "bytes": os.path.getsize(out),
+        # Linux reports kilobytes
+        "peak_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "worker_peak_mib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }))
+
+def _render(database_file, project_id, workers, images_dir, out):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_project_report", "--child", database_file, str(project_id),
+         str(workers), images_dir, out],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(sections, events, snapshots, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_file = os.path.join(tmp, "report.db")
+        database.connection_manager.set_database_file(database_file)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.initialize_database()
+        project_id = populate(sections, events, snapshots)
+        database.connection_manager.close_all()
+        print(f"{sections} sections, {sections * events} events, {snapshots} snapshots"
+              f" (built in {time.perf_counter() - start:.1f} s)")
+
+        images_dir = os.path.join(tmp, "images")
+        out = os.path.join(tmp, "report.pdf")
+        for label, run_workers in (("cold cache, 1 process", 0), ("warm cache, 1 process", 0),
+                                   (f"warm cache, {workers} workers", workers)):
+            result = _render(database_file, project_id, run_workers, images_dir, out)
+            print(f"{label:<24} {result['seconds']:6.2f} s  {result['pages']:>5} pages"
+                  f"  {result['bytes'] / 2 ** 20:6.1f} MiB  peak {result['peak_mib']:6.0f} MiB"
+                  f"  worker peak {result['worker_peak_mib']:5.0f} MiB")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        database_file, project_id, workers, images_dir, out = sys.argv[2:7]
+        render_child(database_file, int(project_id), int(workers), images_dir, out)
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--events", type=int, default=10, help="events per section")
+    parser.add_argument("--snapshots", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    args = parser.parse_args()
+    run(args.sections, args.events, args.snapshots, args.workers)
+
+if __name__ == "__main__":
+    main()
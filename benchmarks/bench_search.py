@@ -0,0 +1,105 @@
+"""
+Benchmark: project search over the FTS5 index
+
+Run from the repository root:
+
+    python -m benchmarks.bench_search --rows 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import database
+from benchmarks.generate import CITIES, NAMES
+
+# Target latency for a single search page
+TARGET_MS = 10.0
+
+QUERIES = [
+    "ביוב", "אביב", "חיפה", "צנרת מים", "الصرف", "حيفا", "المياه",
+    "sewer", "haifa", "inspection", "rehab", "water main", "zzz-no-match",
+    # Terms shorter than a trigram
+    "ב", "בי", "ש", "ح", "12", "a", "zz",
+    # Worst cases: a rare term, common terms that rarely meet, a common
+    # term with a short term
+    "12345", "sewer haifa", "ביוב חיפה", "sewer 12",
+]
+
+# Filtered searches: (label, query, filters)
+FILTERED = [
+    ("filtered", "ביוב", {"location": "חיפה", "created_from": "2020-01-01"}),
+    ("filtered rare", "12345", {"location": "חיפה"}),
+    ("filtered short", "1", {"location": "Haifa", "created_to": "2016-01-01"}),
+    ("filtered none", "sewer", {"location": "nowhere"}),
+]
+
+def populate(rows, seed=1):
+    """Fill the current database with synthetic projects"""
+    rng = random.Random(seed)
+
+    def generate():
+        for i in range(rows):
+            yield {
+                "name": f"{rng.choice(NAMES)} {i}",
+                "location": rng.choice(CITIES),
+                "created_at": f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+                              f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+            }
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.add_projects(generate())
+
+def _time_ms(func, repeat):
+    """Run func repeat times and return the timings in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def run(rows, repeat):
+    """Build a database of the given size and time typical searches"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database.connection_manager.set_database_file(os.path.join(tmp, "search.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.initialize_database()
+
+        start = time.perf_counter()
+        populate(rows)
+        print(f"Inserted {rows} projects with FTS triggers in {time.perf_counter() - start:.1f} s")
+
+        cases = [(query, query, None, None) for query in QUERIES]
+        cases += [(label, query, filters, None) for label, query, filters in FILTERED]
+        # A page deep into the list of a common term
+        deep = database.search_projects("ביוב", limit=5000)[-1]
+        cases.append(("deep page", "ביוב", None, (deep.created_at, deep.id)))
+
+        slow = 0
+        print(f"{'query':<16} {'hits':>7} {'page p50':>10} {'page max':>10} {'count':>10}")
+        for label, query, filters, after in cases:
+            page = _time_ms(lambda: database.get_projects_page(
+                limit=database.PAGE_SIZE, after=after, query=query, filters=filters), repeat)
+            count = _time_ms(lambda: database.count_projects(query, filters), 1)
+            hits = database.count_projects(query, filters)
+            p50 = statistics.median(page)
+            slow += p50 > TARGET_MS
+            print(f"{label:<16} {hits:>7} {p50:>8.2f}ms {max(page):>8.2f}ms {count[0]:>8.2f}ms")
+
+        database.connection_manager.close_all()
+        print(f"{slow} of {len(cases)} searches above the {TARGET_MS:.0f} ms target")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="number of projects")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: slope extraction from a synthetic inspection video
+
+Writes a fixture video with a telemetry overlay (distance and slope in
+the top right corner, drawn in a Hershey font) and extracts its slope
+profile with the template reader: a full run, a run interrupted halfway
+and resumed, and a run on a renamed copy served from the OCR cache.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_slope --minutes 5 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import database
+from slope import extract
+
+FIXTURE_SIZE = (640, 480)
+FIXTURE_FPS = 25
+
+class _Abort(Exception):
+    """Raised from the progress callback to interrupt a run"""
+
+def overlay_values(frame_index, fps=FIXTURE_FPS):
+    """Distance and slope shown on a fixture frame"""
+    seconds = frame_index / fps
+    return round(seconds * 0.15, 2), round(2.5 * math.sin(seconds / 20), 2)
+
+def make_fixture_video(path, seconds, fps=FIXTURE_FPS, size=FIXTURE_SIZE):
+    """Write a video whose overlay shows a known distance and slope on every frame"""
+    import cv2
+
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    rng = np.random.default_rng(1)
+    # Pipe-like background: radial gradient plus sensor noise
+    y, x = np.mgrid[0:height, 0:width]
+    radius = np.hypot(x - width / 2, y - height / 2)
+    background = np.clip(160 - radius / 3, 20, 160).astype(np.uint8)
+    noise = rng.integers(0, 30, (16, height, width), dtype=np.uint8)
+    for frame_index in range(int(seconds * fps)):
+        gray = background + noise[frame_index % len(noise)]
+        frame = cv2.merge((gray, gray, (gray * 0.8).astype(np.uint8)))
+        distance, slope = overlay_values(frame_index, fps)
+        cv2.rectangle(frame, (int(width * 0.56), 0), (width, int(height * 0.11)), (0, 0, 0), -1)
+        cv2.putText(frame, f"{distance:.2f}m {slope:.2f}%", (int(width * 0.57), int(height * 0.08)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+
+def _run(label, section_id, video_path, workers, abort_after=None):
+    """Extract once and print the timing"""
+    def progress(done, total):
+        if abort_after is not None and done >= abort_after:
+            raise _Abort()
+
+    start = time.perf_counter()
+    try:
+        result = extract.extract_slope(section_id, video_path, reader="template", workers=workers, progress=progress)
+    except _Abort:
+        print(f"{label:<24} interrupted after {time.perf_counter() - start:6.2f} s")
+        return None
+    frames = result.readings + len(result.failures)
+    print(f"{label:<24} {result.seconds:6.2f} s  {frames:>6} frames  {result.cached:>6} cached"
+          f"  {frames / result.seconds:8.0f} frames/s  {len(result.failures)} unreadable")
+    return result
+
+def run(minutes, workers):
+    """Build the fixture and time the extraction runs"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, "fixture.avi")
+        start = time.perf_counter()
+        make_fixture_video(video_path, minutes * 60)
+        print(f"Wrote {minutes} min fixture video in {time.perf_counter() - start:.1f} s")
+
+        database.connection_manager.set_database_file(os.path.join(tmp, "slope.db"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.initialize_database()
+            project_id = database.add_project("Slope benchmark", "Haifa")
+            section_id = database.add_section(project_id, video_path=video_path)
+
+        result = _run("cold", section_id, video_path, workers)
+
+        conn = database.get_connection()
+        with conn:
+            conn.execute("DELETE FROM overlay_ocr_cache")
+        _run("interrupted at 50%", section_id, video_path, workers, abort_after=result.readings // 2)
+        _run("resumed", section_id, video_path, workers)
+
+        # Same video under another name: the fingerprint ignores the path
+        copy_path = os.path.join(tmp, "fixture-copy.avi")
+        shutil.copyfile(video_path, copy_path)
+        _run("renamed copy (cached)", section_id, copy_path, workers)
+
+        readings = database.get_slope_readings(section_id)
+        wrong = sum((distance, slope) != overlay_values(frame_index) for frame_index, _, distance, slope in readings)
+        print(f"{len(readings)} stored readings, {wrong} differ from the fixture overlay")
+        database.connection_manager.close_all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=5, help="length of the fixture video")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="decoding and OCR processes")
+    args = parser.parse_args()
+    run(args.minutes, args.workers)
+
+if __name__ == "__main__":
+    main()
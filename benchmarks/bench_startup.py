@@ -0,0 +1,87 @@
+"""
+Benchmark: cold-start import time of the GUI and the CLI
+
+Uses python -X importtime in fresh interpreters. Run from the repository root:
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the headless CLI must never import
+CLI_FORBIDDEN = ("tkinter", "fpdf")
+
+TARGETS = {
+    "gui": "import main",
+    "cli": "import cli",
+}
+
+def import_times(statement):
+    """Import a module in a fresh interpreter and parse -X importtime output
+
+    Returns:
+        (total microseconds, {module: cumulative microseconds} of the modules
+        the target imports directly, set of all imported modules)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    total = 0
+    direct = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # The name column is indented by two spaces per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        modules.add(name)
+        if depth == 0:
+            total += int(cumulative)
+        elif depth == 1:
+            direct[name] = int(cumulative)
+    return total, direct, modules
+
+def wall_time(statement):
+    """Wall-clock seconds to start an interpreter and run statement"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", statement], cwd=REPO_ROOT, check=True)
+    return time.perf_counter() - start
+
+def run(runs, top):
+    """Report import and wall-clock times for every target"""
+    baseline = statistics.median(wall_time("pass") for _ in range(runs))
+    print(f"interpreter startup: {baseline * 1000:.1f} ms")
+
+    for label, statement in TARGETS.items():
+        totals = []
+        for _ in range(runs):
+            total, direct, modules = import_times(statement)
+            totals.append(total)
+        wall = statistics.median(wall_time(statement) for _ in range(runs))
+        print(f"\n{label}: {statement}")
+        print(f"  imports (median of {runs}): {statistics.median(totals) / 1000:.1f} ms,"
+              f" wall clock: {wall * 1000:.1f} ms")
+        for name, cumulative in sorted(direct.items(), key=lambda item: -item[1])[:top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        if label == "cli":
+            leaked = [name for name in modules if name.split(".")[0] in CLI_FORBIDDEN]
+            print(f"  forbidden imports: {', '.join(sorted(leaked)) or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    args = parser.parse_args()
+    run(args.runs, args.top)
+
+if __name__ == "__main__":
+    main()
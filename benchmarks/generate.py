@@ -0,0 +1,172 @@
+"""
+Synthetic pipes.db generator for benchmarks
+
+Builds a database of a given scale with Hebrew, Arabic and English text:
+projects, sections per project, events per section and slope readings per
+section. The same arguments and seed always produce the same content, so
+benchmark runs on different machines or commits compare like with like.
+
+Run from the repository root:
+
+    python -m benchmarks.generate bench.db --projects 10000 --sections 20 --events 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+from typing import Any, Dict, Iterator, List
+
+import database
+
+NAMES = [
+    "שיקום קו ביוב", "צנרת מים ראשית", "בדיקת מאסף", "ניקוי קווים",
+    "إعادة تأهيل خط الصرف", "شبكة المياه الرئيسية", "فحص المجمع",
+    "Sewer rehabilitation", "Main water line", "Collector inspection", "Storm drain survey",
+]
+CITIES = [
+    "תל אביב", "ירושלים", "חיפה", "באר שבע", "נצרת",
+    "الناصرة", "حيفا", "القدس", "Tel Aviv", "Jerusalem", "Haifa",
+]
+STREETS = [
+    "הרצל", "דרך העצמאות", "שדרות בן גוריון", "شارع الجبل", "شارع بولس السادس",
+    "Allenby", "Jaffa Road", "Hanevi'im",
+]
+MATERIALS = ["בטון", "PVC", "פלדה", "خرسانة", "Concrete", "Vitrified clay"]
+NOTES = [
+    "סדק אורכי", "חדירת שורשים", "شق طولي", "ترسبات", "Longitudinal crack", "Roots at joint", None, None,
+]
+EVENT_CODES = [
+    ("BAB", "structural", "סדק"),
+    ("BAC", "structural", "شرخ"),
+    ("BAF", "structural", "Surface damage"),
+    ("BBA", "operational", "שורשים"),
+    ("BBB", "operational", "ترسبات ملتصقة"),
+    ("BBC", "operational", "Settled deposits"),
+    ("BCA", "connection", "חיבור"),
+    ("BDB", "operational", "General photograph"),
+]
+
+def _created_at(rng: random.Random) -> str:
+    return (f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00")
+
+def project_rows(count: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """Synthetic project rows for database.add_projects()"""
+    for index in range(count):
+        yield {"name": f"{rng.choice(NAMES)} {index}", "location": rng.choice(CITIES), "created_at": _created_at(rng)}
+
+def _section_values(project_id: int, number: int, rng: random.Random):
+    upstream = f"{project_id}-{number}"
+    return (project_id, number, f"P-{project_id}-{number}", rng.choice((200, 300, 400, 600)),
+            rng.choice(MATERIALS), rng.choice(STREETS), rng.choice(CITIES), f"MH-{upstream}",
+            f"MH-{project_id}-{number + 1}", round(rng.uniform(20, 120), 2), round(rng.uniform(1, 4), 2),
+            round(rng.uniform(1, 4), 2))
+
+def _event_rows(section_ids: List[int], lengths: Dict[int, float], events: int,
+                rng: random.Random) -> Iterator[Dict[str, Any]]:
+    for section_id in section_ids:
+        for _ in range(events):
+            code = rng.choice(EVENT_CODES)[0]
+            yield {
+                "section_id": section_id,
+                "event_code": code,
+                "distance": round(rng.uniform(0, lengths[section_id]), 2),
+                "video_time": rng.uniform(0, 1800),
+                "severity": rng.randint(0, 5),
+                "clock_start": rng.randint(1, 12),
+                "blockage_percent": rng.uniform(0, 100) if code.startswith("BB") else None,
+                "notes": rng.choice(NOTES),
+            }
+
+def populate(projects: int, sections: int = 0, events: int = 0, readings: int = 0,
+             seed: int = 1) -> Dict[str, int]:
+    """Fill the current database with synthetic data
+
+    Args:
+        projects: Number of projects
+        sections: Sections per project
+        events: Events per section
+        readings: Slope readings per section
+        seed: Random seed, the same seed produces the same content
+
+    Returns:
+        Number of rows added per table
+    """
+    rng = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.add_event_codes({"code": code, "category": category, "description": description}
+                                 for code, category, description in EVENT_CODES)
+        project_ids = database.add_projects(project_rows(projects, rng)).ids
+
+    counts = {"projects": len(project_ids), "sections": 0, "events": 0, "slope_readings": 0}
+    if not sections:
+        return counts
+
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO sections (project_id, section_number, pipe_number, diameter, material, street, city, "
+            "upstream_manhole, downstream_manhole, length, start_depth, end_depth) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (_section_values(project_id, number, rng)
+             for project_id in project_ids for number in range(1, sections + 1))
+        )
+    lengths = dict(conn.execute("SELECT id, length FROM sections ORDER BY id"))
+    section_ids = list(lengths)
+    counts["sections"] = len(section_ids)
+
+    if events:
+        counts["events"] = database.add_events(_event_rows(section_ids, lengths, events, rng),
+                                               chunk_size=5000).succeeded
+    if readings:
+        for section_id in section_ids:
+            step = lengths[section_id] / readings
+            slope = rng.uniform(-2, 2)
+            values = []
+            for frame_index in range(readings):
+                slope += rng.gauss(0, 0.05)
+                values.append((frame_index, frame_index / 25, frame_index * step, round(slope, 3)))
+            database.add_slope_readings(section_id, values)
+        counts["slope_readings"] = len(section_ids) * readings
+    return counts
+
+def generate(path: str, projects: int, sections: int = 0, events: int = 0, readings: int = 0,
+             seed: int = 1) -> Dict[str, int]:
+    """Create a synthetic database file, replacing an existing one
+
+    The generated file becomes the current database of connection_manager.
+
+    Args:
+        path: Database file to create
+        projects, sections, events, readings, seed: See populate()
+
+    Returns:
+        Number of rows added per table
+    """
+    database.connection_manager.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+    database.connection_manager.set_database_file(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.initialize_database()
+    return populate(projects, sections, events, readings, seed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="database file to create")
+    parser.add_argument("--projects", type=int, default=10000, help="number of projects")
+    parser.add_argument("--sections", type=int, default=0, help="sections per project")
+    parser.add_argument("--events", type=int, default=0, help="events per section")
+    parser.add_argument("--readings", type=int, default=0, help="slope readings per section")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = generate(args.path, args.projects, args.sections, args.events, args.readings, args.seed)
+    rows = ", ".join(f"{count} {table}" for table, count in counts.items() if count)
+    print(f"Generated {args.path} with {rows} in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Benchmark suite: core database, UI and report paths with JSON results
+
+Generates a synthetic database (see benchmarks.generate), times the core
+paths and writes the timings as JSON. A run can be compared against a
+stored baseline; cases whose median got slower than the threshold are
+reported and make the run exit with status 1.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --out results.json
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.2
+
+The UI cases need a display. Without one the suite starts Xvfb if it is
+installed and otherwise skips them; skipped cases are listed in the
+results.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import database
+from benchmarks.generate import CITIES, NAMES, generate
+
+RESULTS_VERSION = 1
+
+# Default slowdown of a case's median, relative to the baseline, reported as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below this many milliseconds are noise, whatever the ratio
+MIN_DELTA_MS = 0.5
+
+def _stats(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+    }
+
+def _time_ms(func: Callable[[], Any], repeat: int) -> List[float]:
+    """Run func repeat times and return the timings in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def _time_each_ms(func: Callable[[Any], Any], arguments) -> List[float]:
+    """Call func once per argument and return the timing of every call in milliseconds"""
+    timings = []
+    for argument in arguments:
+        start = time.perf_counter()
+        func(argument)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+# Cases
+
+def database_cases(repeat: int, volume: int, rng: random.Random) -> Dict[str, List[float]]:
+    """Reads and single-row and bulk writes of projects, sections and events"""
+    project_ids = [row[0] for row in database.get_connection().execute("SELECT id FROM projects")]
+    lookups = [rng.choice(project_ids) for _ in range(max(volume, 100))]
+    timings = {
+        "db.get_all_projects": _time_ms(database.get_all_projects, repeat),
+        "db.get_projects_page": _time_ms(database.get_projects_page, repeat * 5),
+        "db.count_projects": _time_ms(database.count_projects, repeat * 5),
+        "db.search_projects": _time_each_ms(lambda query: database.search_projects(query),
+                                            [query for _ in range(repeat) for query in ("חיפה", "حيفا", "sewer")]),
+        "db.get_project": _time_each_ms(database.get_project, lookups),
+    }
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        added = []
+        timings["db.add_project"] = _time_each_ms(
+            lambda index: added.append(database.add_project(f"{rng.choice(NAMES)} +{index}", rng.choice(CITIES))),
+            range(volume)
+        )
+        timings["db.update_project"] = _time_each_ms(
+            lambda project_id: database.update_project(project_id, f"{rng.choice(NAMES)} *", rng.choice(CITIES)),
+            added
+        )
+        timings["db.delete_project"] = _time_each_ms(database.delete_project, added)
+
+        bulk = [{"name": f"{rng.choice(NAMES)} #{index}", "location": rng.choice(CITIES)} for index in range(volume)]
+        timings["db.add_projects_bulk"] = []
+        timings["db.delete_projects_bulk"] = []
+        for _ in range(3):
+            start = time.perf_counter()
+            ids = database.add_projects(bulk).ids
+            timings["db.add_projects_bulk"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            database.delete_projects(ids)
+            timings["db.delete_projects_bulk"].append((time.perf_counter() - start) * 1000)
+
+    section_project = database.get_connection().execute(
+        "SELECT project_id FROM sections ORDER BY project_id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM sections)"
+    ).fetchone()
+    if section_project is not None:
+        project_id = section_project[0]
+        section_id = database.get_sections(project_id)[0].id
+        timings["db.get_sections"] = _time_ms(lambda: database.get_sections(project_id), repeat * 5)
+        timings["db.get_project_events"] = _time_ms(lambda: database.get_project_events(project_id), repeat)
+        timings["db.get_section_events"] = _time_ms(lambda: database.get_section_events(section_id), repeat * 5)
+    return timings
+
+def report_cases(repeat: int, output_dir: str) -> Dict[str, List[float]]:
+    """PDF rendering of the single-project, all-projects and full project reports"""
+    from reports import engine
+    from reports.project_report import render_project_report
+
+    engine.subset_font()  # Built once per install, not part of a print
+    project = database.get_project(database.get_connection().execute("SELECT MIN(id) FROM projects").fetchone()[0])
+    details = engine.project_details(project)
+
+    def render_single():
+        # A fresh directory per run, so the content-hash cache never answers
+        engine.render_report(details, tempfile.mkdtemp(dir=output_dir))
+
+    projects = database.get_all_projects()[:200]
+    timings = {
+        "report.project": _time_ms(render_single, repeat),
+        "report.projects_200": _time_ms(
+            lambda: engine.render_projects_report((engine.project_details(p) for p in projects),
+                                                  os.path.join(output_dir, "projects.pdf")),
+            max(1, repeat // 5)
+        ),
+    }
+
+    section_project = database.get_connection().execute("SELECT MIN(project_id) FROM sections").fetchone()[0]
+    if section_project is not None:
+        timings["report.full"] = _time_ms(
+            lambda: render_project_report(section_project, os.path.join(output_dir, "full.pdf"), workers=0),
+            max(1, repeat // 5)
+        )
+    return timings
+
+def _tk_root() -> Tuple[Any, Optional[str], Optional[subprocess.Popen]]:
+    """Open a Tk root window, starting Xvfb when there is no display
+
+    Returns:
+        (root or None, reason it could not be opened, Xvfb process to stop)
+    """
+    import tkinter as tk
+
+    try:
+        return tk.Tk(), None, None
+    except tk.TclError as e:
+        reason = str(e)
+    if os.environ.get("DISPLAY") or not shutil.which("Xvfb"):
+        return None, reason, None
+
+    display = ":99"
+    xvfb = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            return tk.Tk(), None, xvfb
+        except tk.TclError as e:
+            reason = str(e)
+            time.sleep(0.1)
+    xvfb.terminate()
+    return None, reason, None
+
+def ui_cases(repeat: int) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+    """ProjectsPage.load_projects with the virtual list and with the full list
+
+    The database read and the Treeview update are timed together on the Tk
+    thread, without the hand-off to the job executor, whose polling
+    interval would otherwise dominate the timings.
+    """
+    names = ("ui.load_projects_virtual", "ui.load_projects_full")
+    root, reason, xvfb = _tk_root()
+    if root is None:
+        return {}, {name: f"no display: {reason}" for name in names}
+
+    from ui.projects_page import ProjectsPage
+
+    timings = {}
+    try:
+        for name, virtual in zip(names, (True, False)):
+            page = ProjectsPage(root, virtual=virtual)
+            page.pack(fill="both", expand=True)
+            root.update()
+
+            if virtual:
+                def load(tree=page.virtual_tree):
+                    tree._apply_window(tree._fetch_window(0, True))
+                    root.update_idletasks()
+            else:
+                def load(page=page):
+                    page.show_projects(page.fetch_all_projects(""))
+                    root.update_idletasks()
+
+            timings[name] = _time_ms(load, repeat)
+            page.destroy()
+        root.destroy()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    return timings, {}
+
+# Running and comparing
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(projects: int, sections: int, events: int, repeat: int, volume: int, seed: int = 1,
+        skip: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Generate a database and time every case
+
+    Args:
+        projects, sections, events: Scale of the synthetic database
+        repeat: Runs per case (per-call cases run once per argument)
+        volume: Rows written by the add/update/delete cases
+        seed: Random seed of the data and the lookups
+        skip: Case groups to leave out: "db", "report", "ui"
+
+    Returns:
+        Results with "meta", "cases" (statistics per case) and "skipped" (reason per case)
+    """
+    rng = random.Random(seed)
+    results = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "scale": {"projects": projects, "sections": sections, "events": events, "volume": volume, "seed": seed},
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cases": {},
+        "skipped": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        counts = generate(os.path.join(tmp, "pipes.db"), projects, sections, events, seed=seed)
+        results["meta"]["generate_s"] = time.perf_counter() - start
+        print(f"Generated {', '.join(f'{count} {table}' for table, count in counts.items() if count)}"
+              f" in {results['meta']['generate_s']:.1f} s")
+
+        timings = {}
+        if "db" not in skip:
+            timings.update(database_cases(repeat, volume, rng))
+        if "report" not in skip:
+            timings.update(report_cases(repeat, tmp))
+        if "ui" not in skip:
+            ui_timings, skipped = ui_cases(repeat)
+            timings.update(ui_timings)
+            results["skipped"].update(skipped)
+        database.connection_manager.close_all()
+
+    results["cases"] = {name: _stats(values) for name, values in timings.items() if values}
+    return results
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+            min_delta_ms: float = MIN_DELTA_MS) -> List[Tuple[str, Optional[float], Optional[float], str]]:
+    """Compare the case medians of a run with a baseline run
+
+    Args:
+        results: Results of this run
+        baseline: Stored results to compare with
+        threshold: Relative slowdown reported as a regression, e.g. 0.25 for 25%
+        min_delta_ms: Absolute slowdown below which a case never regresses
+
+    Returns:
+        (case, baseline p50, current p50, status) per case; status is "ok",
+        "regression", "faster", "new" or "missing"
+    """
+    rows = []
+    current_cases = results["cases"]
+    baseline_cases = baseline.get("cases", {})
+    for name in sorted(set(current_cases) | set(baseline_cases)):
+        before = baseline_cases.get(name, {}).get("p50_ms")
+        after = current_cases.get(name, {}).get("p50_ms")
+        if before is None:
+            status = "new"
+        elif after is None:
+            status = "missing"
+        elif after - before > min_delta_ms and after > before * (1 + threshold):
+            status = "regression"
+        elif before - after > min_delta_ms and before > after * (1 + threshold):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, before, after, status))
+    return rows
+
+def print_results(results: Dict[str, Any]):
+    print(f"{'case':<28} {'runs':>6} {'p50':>10} {'p95':>10} {'max':>10}")
+    for name, stats in sorted(results["cases"].items()):
+        print(f"{name:<28} {stats['runs']:>6} {stats['p50_ms']:>8.3f}ms {stats['p95_ms']:>8.3f}ms"
+              f" {stats['max_ms']:>8.3f}ms")
+    for name, reason in sorted(results["skipped"].items()):
+        print(f"{name:<28} skipped ({reason})")
+
+def print_comparison(rows, threshold: float):
+    print(f"{'case':<28} {'baseline':>10} {'current':>10} {'change':>8}  status (threshold {threshold:.0%})")
+    for name, before, after, status in rows:
+        change = f"{after / before - 1:+.0%}" if before and after is not None else ""
+        print(f"{name:<28} {'' if before is None else f'{before:.3f}':>10} "
+              f"{'' if after is None else f'{after:.3f}':>10} {change:>8}  {status}")
+
+def _write_json(path: str, data: Dict[str, Any]):
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file, ensure_ascii=False, indent=2)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=10000, help="number of projects")
+    parser.add_argument("--sections", type=int, default=10, help="sections per project")
+    parser.add_argument("--events", type=int, default=10, help="events per section")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per case")
+    parser.add_argument("--volume", type=int, default=500, help="rows written by the write cases")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip", action="append", default=[], choices=("db", "report", "ui"),
+                        help="leave out a group of cases, may be repeated")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with the results stored in this file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown of a median reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.projects, args.sections, args.events, args.repeat, args.volume, args.seed, tuple(args.skip))
+    print_results(results)
+    for path in (args.out, args.save_baseline):
+        if path:
+            _write_json(path, results)
+            print(f"Results written to {path}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("meta", {}).get("scale") != results["meta"]["scale"]:
+        print(f"Warning: the baseline was measured at scale {baseline.get('meta', {}).get('scale')}")
+    rows = compare(results, baseline, args.threshold)
+    print_comparison(rows, args.threshold)
+    regressions = [name for name, _, _, status in rows if status == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
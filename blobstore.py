@@ -0,0 +1,160 @@
+"""
+Content-addressed file store for images kept outside the database rows
+
+Event snapshots, project images and logos are files named by the SHA-256
+of their content under a directory next to the database file; rows only
+hold the hash. Storing the same image twice writes it once, and reading a
+row never loads image bytes: callers get a BlobHandle and map the file
+into memory when they actually need the content.
+
+The database keeps a reference count per blob (see database.add_blob), so
+unreferenced files can be removed.
+"""
+import os
+import mmap
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional, Union
+
+# Bytes hashed and copied per read when storing a file
+COPY_CHUNK_SIZE = 1 << 20
+
+def blob_dir(database_file: str) -> str:
+    """Directory of the blob store of a database file, next to it"""
+    database_file = os.path.abspath(database_file)
+    name = os.path.splitext(os.path.basename(database_file))[0]
+    return os.path.join(os.path.dirname(database_file), f"{name}-blobs")
+
+@dataclass(frozen=True, slots=True)
+class BlobHandle:
+    """Reference to a stored blob; the content is only read on demand"""
+    hash: str
+    path: str
+
+    @property
+    def size(self) -> int:
+        """Size of the content in bytes"""
+        return os.path.getsize(self.path)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @contextmanager
+    def open(self) -> Iterator[Union[mmap.mmap, bytes]]:
+        """Map the content read-only into memory
+
+        Pages are read by the OS as they are touched, so slicing a header or
+        handing the buffer to a decoder never copies the whole file.
+
+        Yields:
+            Read-only mmap (bytes for an empty blob, which cannot be mapped)
+
+        Raises:
+            OSError: If the blob file is missing
+        """
+        with open(self.path, "rb") as blob_file:
+            if os.fstat(blob_file.fileno()).st_size == 0:
+                yield b""
+                return
+            mapped = mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+
+    def read(self) -> bytes:
+        """Get the whole content as bytes"""
+        with self.open() as content:
+            return bytes(content)
+
+class BlobStore:
+    """Files named by the SHA-256 of their content, sharded by the first two hex digits"""
+
+    def __init__(self, root: str):
+        """Initialize the store
+
+        Args:
+            root: Directory of the blob files, created on the first write
+        """
+        self.root = root
+
+    def path(self, blob_hash: str) -> str:
+        """Path of a blob file"""
+        return os.path.join(self.root, blob_hash[:2], blob_hash)
+
+    def handle(self, blob_hash: Optional[str]) -> Optional[BlobHandle]:
+        """Get a lazy handle of a blob, None for a missing hash"""
+        return BlobHandle(blob_hash, self.path(blob_hash)) if blob_hash else None
+
+    def _temp_file(self):
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, suffix=".part")
+
+    def _commit(self, temp_path: str, blob_hash: str):
+        """Move a written temp file into place unless the blob already exists"""
+        path = self.path(blob_hash)
+        if os.path.exists(path):
+            os.unlink(temp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+
+    def put(self, data: bytes) -> str:
+        """Store content, writing nothing if it is already stored
+
+        Returns:
+            SHA-256 hex digest of the content
+        """
+        blob_hash = hashlib.sha256(data).hexdigest()
+        if os.path.exists(self.path(blob_hash)):
+            return blob_hash
+        fd, temp_path = self._temp_file()
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+            self._commit(temp_path, blob_hash)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return blob_hash
+
+    def put_stream(self, source: BinaryIO) -> str:
+        """Store content read from a binary file object, hashing it while copying
+
+        Returns:
+            SHA-256 hex digest of the content
+        """
+        digest = hashlib.sha256()
+        fd, temp_path = self._temp_file()
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            blob_hash = digest.hexdigest()
+            self._commit(temp_path, blob_hash)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return blob_hash
+
+    def put_file(self, file_path: str) -> str:
+        """Store a copy of a file, e.g. an image picked by the user"""
+        with open(file_path, "rb") as source:
+            return self.put_stream(source)
+
+    def delete(self, blob_hash: str) -> bool:
+        """Remove a blob file
+
+        Returns:
+            True if the file existed
+        """
+        try:
+            os.unlink(self.path(blob_hash))
+            return True
+        except FileNotFoundError:
+            return False
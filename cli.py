@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Pipes Project - Headless command line interface
+
+Works without a display: tkinter is never imported, and fpdf is only
+imported by the report command.
+
+    python cli.py list --query ביוב
+    python cli.py add "Sewer rehabilitation" "Haifa"
+    python cli.py update 12 --location "Tel Aviv"
+    python cli.py delete 12 13
+    python cli.py export projects.ndjson
+    python cli.py import projects.csv
+    python cli.py report --merged september.pdf
+    python cli.py migrate --dry-run
+    python cli.py backup backups/pipes-2026-10-18.db
+    python cli.py archive haifa.pipes 12 13
+    python cli.py unarchive haifa.pipes
+    python cli.py ingest /media/crew-3/2026-10-17 --location Haifa
+    python cli.py --snapshot report --merged september.pdf
+"""
+import sys
+import json
+import argparse
+import contextlib
+
+import backup
+import database
+import migrations
+import project_archive
+import project_io
+
+# Commands that only read, and can run on a snapshot with --snapshot
+READ_COMMANDS = ("list", "export", "report", "archive")
+
+def cmd_list(args, out):
+    """List projects, newest first"""
+    filters = {"location": args.location} if args.location else None
+    projects = database.search_projects(args.query, filters, limit=args.limit)
+    if args.format == "json":
+        json.dump([project.to_dict() for project in projects], out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    elif args.format == "ndjson":
+        project_io.write_projects(out, projects, "ndjson")
+    else:
+        for project in projects:
+            out.write(f"{project.id}\t{project.created_at}\t{project.name}\t{project.location}\n")
+    return 0
+
+def cmd_add(args, out):
+    """Add a project"""
+    project_id = database.add_project(args.name, args.location)
+    if not project_id:
+        return 1
+    out.write(f"{project_id}\n")
+    return 0
+
+def cmd_update(args, out):
+    """Update a project's name and/or location"""
+    project = database.get_project(args.id)
+    if not project:
+        print(f"Project {args.id} not found")
+        return 1
+    name = args.name if args.name is not None else project.name
+    location = args.location if args.location is not None else project.location
+    return 0 if database.update_project(args.id, name, location) else 1
+
+def cmd_delete(args, out):
+    """Delete one or more projects"""
+    result = database.delete_projects(args.ids)
+    for index, message in result.errors:
+        print(message)
+    return 1 if result.errors else 0
+
+def cmd_export(args, out):
+    """Export all projects to a file, or to stdout with '-'"""
+    if args.path == "-":
+        count = project_io.write_projects(out, database.iter_projects(), args.format or "ndjson")
+    else:
+        count = project_io.export_projects(args.path, args.format)
+    print(f"Exported {count} projects")
+    return 0
+
+def cmd_import(args, out):
+    """Import projects from a file in one transaction"""
+    result = project_io.import_projects(args.path, args.format)
+    for index, message in result.errors:
+        print(f"Row {index}: {message}")
+    return 1 if result.errors else 0
+
+def cmd_report(args, out):
+    """Render PDF reports for the selected projects"""
+    # fpdf is only needed here
+    from reports import batch
+
+    projects = None
+    if args.query or args.location:
+        projects = database.search_projects(args.query, {"location": args.location}, limit=-1)
+    result = batch.generate_reports(projects, output_dir=args.out, merged_path=args.merged, workers=args.workers)
+    for report in result.failures:
+        print(f"Project {report.project_id}: {report.error}")
+    out.write(f"{len(result.reports)} projects, {len(result.failures)} failed, {result.seconds:.2f} s\n")
+    return 1 if result.failures else 0
+
+def cmd_migrate(args, out):
+    """Apply pending schema migrations, or time them on a copy with --dry-run"""
+    conn = database.get_connection()
+    if not conn:
+        return 1
+    print(f"Schema version {migrations.get_version(conn)}, latest {migrations.SCHEMA_VERSION}")
+    reports = migrations.migrate(conn, target=args.target, dry_run=args.dry_run,
+                                 batch_size=args.batch_size, progress=print)
+    out.write(migrations.format_report(reports) + "\n")
+    return 0
+
+def cmd_backup(args, out):
+    """Copy the database and its blobs while it stays in use"""
+    def progress(done, total):
+        print(f"Backup: {done} / {total} pages")
+    result = backup.backup_database(args.path, pages=args.pages, progress=progress if args.verbose else None)
+    if result is None:
+        return 1
+    out.write(f"{result.path}: {result.pages} pages, {result.blobs_copied} blobs copied, {result.seconds:.2f} s\n")
+    return 0
+
+def cmd_archive(args, out):
+    """Write projects and their media to a compressed archive"""
+    try:
+        result = project_archive.export_archive(args.path, args.ids, include_videos=not args.no_videos)
+    except (ValueError, OSError) as e:
+        print(e)
+        return 1
+    out.write(f"{result.path}: {len(result.projects)} projects, {result.blobs} images, {result.media} videos, "
+              f"{result.seconds:.2f} s\n")
+    return 0
+
+def cmd_unarchive(args, out):
+    """Add the projects of an archive"""
+    try:
+        result = project_archive.import_archive(args.path)
+    except (ValueError, OSError) as e:
+        print(e)
+        return 1
+    for project_id in result.projects:
+        out.write(f"{project_id}\n")
+    print(f"Added {len(result.projects)} projects, {result.blobs} new images, {result.media} new videos")
+    return 0
+
+def cmd_ingest(args, out):
+    """Add a section for every new video under a folder"""
+    # OpenCV is only needed here
+    from video import ingest
+
+    def progress(done, total, phase):
+        print(f"{phase}: {done} / {total}")
+    result = ingest.ingest_folder(args.root, args.location, args.workers, progress=progress if args.verbose else None)
+    for path, reason in result.failures:
+        print(f"{path}: {reason}")
+    for section_id in result.sections:
+        out.write(f"{section_id}\n")
+    print(f"{result.found} videos, {len(result.sections)} sections added, {result.skipped} already ingested, "
+          f"{len(result.failures)} failed, {result.seconds:.1f} s")
+    return 1 if result.failures else 0
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(description="Pipes project management (headless)")
+    parser.add_argument("--db", default=database.DATABASE_FILE, help="database file (default: %(default)s)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help=f"read from a point-in-time copy of the database ({', '.join(READ_COMMANDS)})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list projects")
+    list_parser.add_argument("--query", help="search text")
+    list_parser.add_argument("--location", help="exact location")
+    list_parser.add_argument("--limit", type=int, default=-1, help="maximum number of projects")
+    list_parser.add_argument("--format", choices=("text", "json", "ndjson"), default="text")
+    list_parser.set_defaults(func=cmd_list)
+
+    add_parser = commands.add_parser("add", help="add a project")
+    add_parser.add_argument("name")
+    add_parser.add_argument("location")
+    add_parser.set_defaults(func=cmd_add)
+
+    update_parser = commands.add_parser("update", help="update a project")
+    update_parser.add_argument("id", type=int)
+    update_parser.add_argument("--name")
+    update_parser.add_argument("--location")
+    update_parser.set_defaults(func=cmd_update)
+
+    delete_parser = commands.add_parser("delete", help="delete projects")
+    delete_parser.add_argument("ids", type=int, nargs="+")
+    delete_parser.set_defaults(func=cmd_delete)
+
+    export_parser = commands.add_parser("export", help="export projects")
+    export_parser.add_argument("path", help="output file, '-' for stdout")
+    export_parser.add_argument("--format", choices=project_io.FORMATS)
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = commands.add_parser("import", help="import projects")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=project_io.FORMATS)
+    import_parser.set_defaults(func=cmd_import)
+
+    report_parser = commands.add_parser("report", help="render PDF reports")
+    target = report_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="directory for one PDF per project")
+    target.add_argument("--merged", help="single merged PDF file")
+    report_parser.add_argument("--query", help="search text")
+    report_parser.add_argument("--location", help="exact location")
+    report_parser.add_argument("--workers", type=int, help="worker processes")
+    report_parser.set_defaults(func=cmd_report)
+
+    migrate_parser = commands.add_parser("migrate", help="apply schema migrations")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="time the migrations on an in-memory copy")
+    migrate_parser.add_argument("--target", type=int, help="schema version to migrate to (latest by default)")
+    migrate_parser.add_argument("--batch-size", type=int, default=migrations.MIGRATION_BATCH_SIZE,
+                                help="rows per backfill transaction")
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    backup_parser = commands.add_parser("backup", help="back up the database while it is in use")
+    backup_parser.add_argument("path", help="backup file")
+    backup_parser.add_argument("--pages", type=int, default=backup.BACKUP_PAGES, help="pages copied per step")
+    backup_parser.add_argument("--verbose", action="store_true", help="print progress")
+    backup_parser.set_defaults(func=cmd_backup)
+
+    archive_parser = commands.add_parser("archive", help="write projects and their media to an archive")
+    archive_parser.add_argument("path", help=f"archive file, e.g. projects{project_archive.ARCHIVE_EXTENSION}")
+    archive_parser.add_argument("ids", type=int, nargs="+")
+    archive_parser.add_argument("--no-videos", action="store_true", help="leave the section videos out")
+    archive_parser.set_defaults(func=cmd_archive)
+
+    unarchive_parser = commands.add_parser("unarchive", help="add the projects of an archive")
+    unarchive_parser.add_argument("path")
+    unarchive_parser.set_defaults(func=cmd_unarchive)
+
+    ingest_parser = commands.add_parser("ingest", help="add a section for every new video under a folder")
+    ingest_parser.add_argument("root", help="folder of section videos, one subfolder per project")
+    ingest_parser.add_argument("--location", help="location of new projects (default: the folder name)")
+    ingest_parser.add_argument("--workers", type=int, help="probing processes (default: CPU count, 0: none)")
+    ingest_parser.add_argument("--verbose", action="store_true", help="print progress")
+    ingest_parser.set_defaults(func=cmd_ingest)
+
+    return parser
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    out = sys.stdout
+    if args.snapshot and args.command not in READ_COMMANDS:
+        parser.error(f"--snapshot only works with {', '.join(READ_COMMANDS)}")
+
+    # Diagnostics printed by the database layer go to stderr, so stdout
+    # stays machine-readable
+    with contextlib.redirect_stdout(sys.stderr):
+        database.connection_manager.set_database_file(args.db)
+        # The migrate command applies (or dry-runs) migrations itself
+        database.initialize_database(apply_migrations=args.command != "migrate")
+        if not args.snapshot:
+            return args.func(args, out)
+        try:
+            snapshot = backup.Snapshot(args.db).open()
+        except OSError as e:
+            print(e)
+            return 1
+        try:
+            # Report workers follow the main connection manager
+            database.connection_manager.set_database_file(snapshot.path, read_only=True, source_file=args.db)
+            return args.func(args, out)
+        finally:
+            database.connection_manager.close_all()
+            snapshot.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,24 +2,293 @@
 Database operations for the Pipes application
 """
 import os
+import sys
+import json
+import atexit
+import pathlib
 import sqlite3
+import threading
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import islice
 from sqlite3 import Error
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Optional, Iterable, Iterator, Set, Tuple, Union
+from models.project import Project, COLUMNS as PROJECT_COLUMNS
+from models.section import Section, COLUMNS as SECTION_COLUMNS
+from models.event import Event, EventCode, COLUMNS as EVENT_COLUMNS, CODE_COLUMNS as EVENT_CODE_COLUMNS
+import migrations
+from instrumentation import instrumentation
+import blobstore
+from blobstore import BlobHandle, BlobStore
 
 DATABASE_FILE = "pipes.db"
 
+# Number of prepared statements sqlite3 keeps per connection
+STATEMENT_CACHE_SIZE = 256
+
+# Pragmas applied to every connection opened by the connection manager
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # WAL is still crash-safe with NORMAL
+    "PRAGMA cache_size = -16000",  # 16 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",  # Deleting a project deletes its sections and events
+)
+
+# Pragmas of read-only connections, which never write a journal
+READ_ONLY_PRAGMAS = (
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Rows per executemany() call in the bulk APIs
+BULK_CHUNK_SIZE = 500
+
+# Rows per page for keyset pagination of the projects list
+PAGE_SIZE = 100
+
+# Search pages sort the matches of terms with at most this many matches,
+# more common terms walk the list order (see _search_page())
+SEARCH_SORT_MAX = 1000
+
+# Rows a search page walks before it sorts the remaining matches, fewer
+# when the walk joins project_search for every row
+SEARCH_WALK_ROWS = 8000
+SEARCH_JOIN_WALK_ROWS = 1500
+
+# Seconds an unreferenced blob is kept, so a blob stored for a row that is
+# not saved yet is not collected under it
+BLOB_GRACE_SECONDS = 3600
+
+class _ThreadConnection:
+    """Connection of one thread, closed when the thread exits
+
+    Held only by the manager's thread-local storage, which Python frees
+    when its thread ends, e.g. a job executor worker after shutdown.
+    """
+    __slots__ = ("manager", "connection", "generation")
+
+    def __init__(self, manager, connection, generation):
+        self.manager = manager
+        self.connection = connection
+        self.generation = generation
+
+    def __del__(self):
+        try:
+            self.manager._discard(self.connection)
+        except Exception:
+            pass  # Interpreter shutdown
+
+def configure_connection(conn: sqlite3.Connection, read_only: bool = False) -> sqlite3.Connection:
+    """Apply the row factory and pragmas every database connection uses
+
+    Args:
+        conn: Newly opened connection
+        read_only: Use the pragmas of read-only connections
+
+    Returns:
+        The same connection
+    """
+    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    for pragma in READ_ONLY_PRAGMAS if read_only else CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+class ConnectionManager:
+    """Keeps one long-lived SQLite connection per thread
+
+    Connections stay open between calls so the prepared statement cache
+    and the page cache survive across database operations. A thread's
+    connection is closed when the thread exits.
+    """
+
+    def __init__(self, database_file=DATABASE_FILE, read_only=False, source_file=None):
+        """Initialize the connection manager
+
+        Args:
+            database_file: Path of the SQLite database file
+            read_only: Open the file read-only and immutable, e.g. a snapshot
+                nothing writes to any more
+            source_file: Database file whose blob store and thumbnails the
+                rows belong to, database_file by default; a snapshot shares
+                the stores of the file it was copied from
+        """
+        self.database_file = database_file
+        self.read_only = read_only
+        self.source_file = source_file or database_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._generation = 0
+
+    def get_connection(self):
+        """Get the connection of the calling thread, opening it on first use
+
+        Returns:
+            sqlite3.Connection
+        """
+        held = getattr(self._local, "held", None)
+        if held is not None and held.generation == self._generation:
+            return held.connection
+
+        conn = self._open()
+        with self._lock:
+            self._connections.append(conn)
+            self._local.held = _ThreadConnection(self, conn, self._generation)
+        return conn
+
+    def _open(self):
+        """Open and configure a new connection"""
+        # The manager closes connections from the main thread on shutdown,
+        # each connection is otherwise only used by the thread that opened it
+        if self.read_only:
+            # immutable=1 skips locking and change detection altogether
+            uri = f"{pathlib.Path(self.database_file).absolute().as_uri()}?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(
+                self.database_file,
+                cached_statements=STATEMENT_CACHE_SIZE,
+                check_same_thread=False,
+            )
+        return configure_connection(conn, self.read_only)
+
+    def _discard(self, conn):
+        """Close a connection unless close_all() already did"""
+        with self._lock:
+            if conn not in self._connections:
+                return
+            self._connections.remove(conn)
+        try:
+            conn.close()
+        except Error as e:
+            print(f"Error closing database connection: {e}")
+
+    def close_thread(self):
+        """Close the connection of the calling thread, if it has one"""
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            del self._local.held
+            self._discard(held.connection)
+
+    def close_all(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except Error as e:
+                print(f"Error closing database connection: {e}")
+
+    def set_database_file(self, database_file, read_only=False, source_file=None):
+        """Point the manager at another database file
+
+        Args:
+            database_file: Path of the SQLite database file
+            read_only: Open the file read-only and immutable
+            source_file: Database file whose blob store and thumbnails the rows belong to
+        """
+        self.close_all()
+        self.database_file = database_file
+        self.read_only = read_only
+        self.source_file = source_file or database_file
+        # The file may have been replaced, e.g. by a restored backup
+        _event_codes_changed(database_file)
+
+# Singleton instance of ConnectionManager
+connection_manager = ConnectionManager()
+atexit.register(connection_manager.close_all)
+
+# Connection manager the calling thread reads through instead of the singleton
+_thread_manager = threading.local()
+
+def active_connection_manager() -> ConnectionManager:
+    """Get the connection manager database calls of the calling thread use"""
+    return getattr(_thread_manager, "manager", None) or connection_manager
+
+@contextmanager
+def use_connection_manager(manager: ConnectionManager):
+    """Route the calling thread's database calls through another manager
+
+    A report job reads from a snapshot this way while the UI thread and
+    other jobs keep using the live file.
+    """
+    previous = getattr(_thread_manager, "manager", None)
+    _thread_manager.manager = manager
+    try:
+        yield manager
+    finally:
+        _thread_manager.manager = previous
+
+# Change notification actions passed to change listeners
+CHANGE_ADDED = "added"
+CHANGE_UPDATED = "updated"
+CHANGE_DELETED = "deleted"
+CHANGE_BULK = "bulk"  # Many rows changed, listeners should reload
+
+_change_listeners = []
+
+def add_change_listener(callback):
+    """Register a callback notified after projects change
+
+    Args:
+        callback: callback(action, project_id, project) where project is the
+            affected Project (None for deletes and bulk changes)
+    """
+    _change_listeners.append(callback)
+
+def remove_change_listener(callback):
+    """Unregister a callback added with add_change_listener"""
+    if callback in _change_listeners:
+        _change_listeners.remove(callback)
+
+def _notify_change(action, project_id=None, project=None):
+    """Call every change listener, a failing listener does not affect the others"""
+    for callback in list(_change_listeners):
+        try:
+            callback(action, project_id, project)
+        except Exception as e:
+            print(f"Error in change listener: {e}")
+
+def _event_codes_changed(database_file: Optional[str] = None):
+    """Drop the event code catalog loaded from a database file
+
+    Args:
+        database_file: Database file, the active one by default
+    """
+    # event_catalog imports this module
+    import event_catalog
+    event_catalog.reload(database_file or active_connection_manager().database_file)
+
 def get_connection():
-    """Get a connection to the database"""
+    """Get the pooled connection of the calling thread"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        return conn
+        return active_connection_manager().get_connection()
     except Error as e:
         print(f"Error connecting to database: {e}")
         return None
 
-def initialize_database():
-    """Initialize the database with required tables"""
+def _project_cursor(conn):
+    """Get a cursor whose rows are Project instances, built without intermediate dicts"""
+    return _model_cursor(conn, Project.row_factory)
+
+def _model_cursor(conn, row_factory):
+    """Get a cursor whose rows are built by a model's row factory"""
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor
+
+def initialize_database(apply_migrations=True):
+    """Initialize the database with required tables
+    
+    Args:
+        apply_migrations: Bring the schema up to migrations.SCHEMA_VERSION
+    """
     # SQL statements
     create_projects_table = """
     CREATE TABLE IF NOT EXISTS projects (
@@ -29,42 +298,487 @@ def initialize_database():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
     """
+    # Serves the (created_at, id) list order, id is the implicit rowid suffix
+    create_created_at_index = """
+    CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at);
+    """
+    # Serves the location filter in list order
+    create_location_index = """
+    CREATE INDEX IF NOT EXISTS idx_projects_location_created_at ON projects (location, created_at);
+    """
     
     # Execute SQL
     conn = get_connection()
     if conn:
         try:
-            cursor = conn.cursor()
-            cursor.execute(create_projects_table)
-            conn.commit()
+            with conn:
+                conn.execute(create_projects_table)
+                conn.execute(create_created_at_index)
+                conn.execute("DROP INDEX IF EXISTS idx_projects_location")
+                conn.execute(create_location_index)
+                _create_search_index(conn)
+            if apply_migrations:
+                for report in migrations.migrate(conn):
+                    print(f"Applied migration {report.version} ({report.description}) in {report.seconds:.2f} s")
             print("Database initialized successfully")
         except Error as e:
             print(f"Error initializing database: {e}")
-        finally:
-            conn.close()
 
-def get_all_projects() -> List[Dict[str, Any]]:
+# Full-text index over project name and location. The trigram tokenizer
+# matches substrings, so Hebrew and Arabic words with attached prefixes
+# (e.g. "בתל אביב") are found, and it needs no word segmentation rules.
+# SQLite builds older than 3.34 fall back to unicode61 prefix matching.
+FTS_TOKENIZERS = ("trigram", "unicode61 remove_diacritics 2")
+
+# The text is searched folded like search input by normalize_search_text(),
+# and no tokenizer strips niqqud or harakat. project_search holds that
+# folded copy of every project's name and location, with created_at for
+# walking the list order (see _search_page()), and projects_fts indexes
+# it. The triggers are plain SQL that works on any connection (the sqlite3
+# shell, repair scripts): they copy the raw text, and the database layer
+# then rewrites the rows whose folded text differs (see _fold_search_rows()).
+# The copy ends in two spaces, so every substring of one or two characters
+# starts a trigram and short terms can be looked up in the index too.
+SEARCH_PADDING = "  "
+
+FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS project_search_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO project_search (id, name, location, created_at)
+        VALUES (new.id, new.name || '  ', new.location || '  ', new.created_at);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS project_search_delete AFTER DELETE ON projects BEGIN
+        DELETE FROM project_search WHERE id = old.id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS project_search_update AFTER UPDATE OF name, location, created_at ON projects BEGIN
+        UPDATE project_search SET
+            name = CASE WHEN new.name IS old.name THEN name ELSE new.name || '  ' END,
+            location = CASE WHEN new.location IS old.location THEN location ELSE new.location || '  ' END,
+            created_at = new.created_at
+        WHERE id = new.id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_fts_insert AFTER INSERT ON project_search BEGIN
+        INSERT INTO projects_fts (rowid, name, location) VALUES (new.id, new.name, new.location);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON project_search BEGIN
+        INSERT INTO projects_fts (projects_fts, rowid, name, location) VALUES ('delete', old.id, old.name, old.location);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_fts_update AFTER UPDATE OF name, location ON project_search BEGIN
+        INSERT INTO projects_fts (projects_fts, rowid, name, location) VALUES ('delete', old.id, old.name, old.location);
+        INSERT INTO projects_fts (rowid, name, location) VALUES (new.id, new.name, new.location);
+    END;
+    """,
+)
+
+# Names of the triggers in FTS_TRIGGERS
+FTS_TRIGGER_NAMES = (
+    "project_search_insert", "project_search_delete", "project_search_update",
+    "projects_fts_insert", "projects_fts_delete", "projects_fts_update",
+)
+
+# Tokenizer of projects_fts per database file
+_fts_tokenizers = {}
+
+def _create_search_index(conn):
+    """Create the search tables and the triggers that keep them in sync"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'project_search'"
+    ).fetchone()
+    if not exists:
+        # Older versions indexed the projects table directly
+        for name in FTS_TRIGGER_NAMES:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE IF EXISTS projects_fts_vocab")
+        conn.execute("DROP TABLE IF EXISTS projects_fts")
+        _fts_tokenizers.clear()
+
+        conn.execute(
+            "CREATE TABLE project_search (id INTEGER PRIMARY KEY, name TEXT, location TEXT, created_at TIMESTAMP)"
+        )
+        conn.execute(
+            "INSERT INTO project_search (id, name, location, created_at) "
+            "SELECT id, name || ?, location || ?, created_at FROM projects", (SEARCH_PADDING, SEARCH_PADDING)
+        )
+        cursor = conn.execute("SELECT id, name, location FROM projects")
+        while True:
+            rows = cursor.fetchmany(BULK_CHUNK_SIZE)
+            if not rows:
+                break
+            _fold_search_rows(conn, rows)
+        for tokenizer in FTS_TOKENIZERS:
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE projects_fts USING fts5("
+                    f"name, location, content='project_search', content_rowid='id', tokenize='{tokenizer}')"
+                )
+                break
+            except Error as e:
+                print(f"FTS tokenizer '{tokenizer}' unavailable: {e}")
+        # Index the rows that existed before the search index
+        conn.execute("INSERT INTO projects_fts (projects_fts) VALUES ('rebuild')")
+
+    # Covers the list order walk of common search terms (see _search_page())
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_project_search_order ON project_search (created_at, id, name, location)"
+    )
+    # Indexed trigrams, expands short terms (see _match_expression())
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts_vocab USING fts5vocab(projects_fts, 'row')")
+    for trigger in FTS_TRIGGERS:
+        conn.execute(trigger)
+
+def _fold_search_rows(conn, rows: Iterable[Tuple[int, str, str]]):
+    """Store the folded text of projects written in the caller's transaction
+
+    The triggers copy the raw text; only rows whose folded text differs,
+    e.g. names written with niqqud, are written again.
+
+    Args:
+        conn: Connection of the transaction that wrote the rows
+        rows: (project ID, name, location) of the written projects
+    """
+    folded = []
+    for project_id, name, location in rows:
+        name, location = name or "", location or ""
+        search_name, search_location = normalize_search_text(name), normalize_search_text(location)
+        if search_name != name or search_location != location:
+            folded.append((search_name + SEARCH_PADDING, search_location + SEARCH_PADDING, project_id))
+    if folded:
+        conn.executemany("UPDATE project_search SET name = ?, location = ? WHERE id = ?", folded)
+
+def _search_tokenizer(conn) -> str:
+    """Get the tokenizer the projects_fts table was created with"""
+    database_file = active_connection_manager().database_file
+    if database_file not in _fts_tokenizers:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'projects_fts'").fetchone()
+        _fts_tokenizers[database_file] = "trigram" if row and "trigram" in row[0] else "unicode61"
+    return _fts_tokenizers[database_file]
+
+def normalize_search_text(text: str) -> str:
+    """Fold search input for matching
+
+    Strips Hebrew niqqud, Arabic harakat and other combining marks, and
+    the Arabic tatweel, which users type inconsistently.
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(
+        char for char in decomposed
+        if unicodedata.category(char) != "Mn" and char != "\u0640"
+    )
+
+def _phrase(text: str) -> str:
+    """Quote text as an FTS5 phrase"""
+    return '"' + text.replace('"', '""') + '"'
+
+def _match_expression(conn, terms: List[str], trigram: bool) -> Optional[str]:
+    """Build the projects_fts MATCH expression requiring every term
+
+    Trigrams need three characters, so with the trigram tokenizer a shorter
+    term matches any of the indexed trigrams it starts (see SEARCH_PADDING).
+
+    Args:
+        conn: Connection used to look up the indexed trigrams
+        terms: Folded search terms
+        trigram: projects_fts uses the trigram tokenizer
+
+    Returns:
+        MATCH expression, or None if a term matches no project
+    """
+    phrases = []
+    for term in terms:
+        if trigram and len(term) < 3:
+            prefix = term.lower()
+            rows = conn.execute(
+                "SELECT term FROM projects_fts_vocab WHERE term >= ? AND term < ?",
+                (prefix, prefix + "\U0010ffff")
+            ).fetchall()
+            if not rows:
+                return None
+            phrases.append("(" + " OR ".join(_phrase(row[0]) for row in rows) + ")")
+        else:
+            phrases.append(_phrase(term) if trigram else _phrase(term) + "*")
+    return " AND ".join(phrases)
+
+def _like_conditions(terms: List[str], table: str) -> Tuple[List[str], List[Any]]:
+    """Build LIKE conditions requiring every term in a project_search row
+
+    Args:
+        terms: Folded search terms
+        table: Name or alias of project_search in the query
+
+    Returns:
+        (SQL conditions, parameters)
+    """
+    conditions = []
+    params = []
+    for term in terms:
+        if any(char in term for char in "%_\\"):
+            pattern = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            like = "LIKE ? ESCAPE '\\'"
+        else:
+            pattern, like = term, "LIKE ?"
+        conditions.append(f"({table}.name {like} OR {table}.location {like})")
+        params.extend([f"%{pattern}%", f"%{pattern}%"])
+    return conditions, params
+
+def _search_clause(conn, query: Optional[str], filters: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """Build the WHERE clause shared by the search, count and page queries
+
+    Args:
+        conn: Connection used to look up the search tokenizer
+        query: Free text matched against name and location
+        filters: Optional location, created_from and created_to values
+
+    Returns:
+        (SQL condition or empty string, parameters)
+    """
+    conditions = []
+    params = []
+
+    terms = normalize_search_text(query).split() if query else []
+    if terms:
+        expression = _match_expression(conn, terms, _search_tokenizer(conn) == "trigram")
+        if expression is None:
+            conditions.append("0")
+        else:
+            conditions.append("id IN (SELECT rowid FROM projects_fts WHERE projects_fts MATCH ?)")
+            params.append(expression)
+
+    filters = filters or {}
+    if filters.get("location"):
+        conditions.append("location = ?")
+        params.append(filters["location"])
+    if filters.get("created_from"):
+        conditions.append("created_at >= ?")
+        params.append(filters["created_from"])
+    if filters.get("created_to"):
+        conditions.append("created_at <= ?")
+        params.append(filters["created_to"])
+
+    return " AND ".join(conditions), params
+
+def _key_condition(table: str, operator: str) -> str:
+    """Compare (created_at, id) of a row with a key
+
+    Spelled out instead of a row value, which costs more per walked row.
+    Takes the parameters (created_at, created_at, id) of the key.
+    """
+    return (f"{table}.created_at {operator[0]}= ? AND "
+            f"({table}.created_at {operator[0]} ? OR {table}.id {operator} ?)")
+
+def _sorted_page(conn, where: str, params: List[Any], limit: int, key: Optional[Tuple[str, int]] = None,
+                 ascending: bool = False, offset: int = 0) -> List[Project]:
+    """Get the projects matching where in list order
+
+    Args:
+        conn: Connection to query
+        where: SQL condition on projects, empty for all projects
+        params: Parameters of where
+        limit: Maximum number of projects to return
+        key: (created_at, id) to start after, in the direction of ascending
+        ascending: Oldest first instead of list order
+        offset: Number of projects to skip
+
+    Returns:
+        List of projects
+    """
+    direction = "" if ascending else " DESC"
+    sql = f"SELECT {PROJECT_COLUMNS} FROM projects WHERE " + (where or "1")
+    if key is not None:
+        sql += f" AND (created_at, id) {'>' if ascending else '<'} (?, ?)"
+        params = [*params, *key]
+    sql += f" ORDER BY created_at{direction}, id{direction} LIMIT ? OFFSET ?"
+    cursor = _project_cursor(conn)
+    cursor.execute(sql, (*params, limit, offset))
+    return cursor.fetchall()
+
+def _search_page(conn, query: str, filters: Optional[Dict[str, Any]], limit: int,
+                 key: Optional[Tuple[str, int]] = None, ascending: bool = False) -> List[Project]:
+    """Get one page of search results from the trigram index
+
+    Sorting the matches into list order costs a lookup per match, so only
+    searches with up to SEARCH_SORT_MAX matches are sorted. Common terms
+    walk the list order instead and test the folded text of each row, which
+    finds a page after a few hundred rows. The walk stops after a window of
+    rows, and the matches past the window are sorted.
+
+    Args:
+        conn: Connection to query
+        query: Free text, every word must appear in the name or location
+        filters: Optional location, created_from and created_to values
+        limit: Maximum number of projects to return
+        key: (created_at, id) to start after, in the direction of ascending
+        ascending: Oldest first instead of list order
+
+    Returns:
+        List of projects
+    """
+    terms = normalize_search_text(query).split()
+    filters = filters or {}
+    filter_where, filter_params = _search_clause(conn, None, filters)
+
+    # Single characters are in most projects, other terms are looked up
+    indexed = [term for term in terms if len(term) > 1]
+    if indexed:
+        expression = _match_expression(conn, indexed, True)
+        if expression is None:
+            return []
+        ids = [row[0] for row in conn.execute(
+            "SELECT rowid FROM projects_fts WHERE projects_fts MATCH ? LIMIT ?", (expression, SEARCH_SORT_MAX + 1)
+        )]
+        if len(ids) <= SEARCH_SORT_MAX:
+            conditions = ["id IN (SELECT value FROM json_each(?))"]
+            params = [json.dumps(ids)]
+            single, single_params = _like_conditions([term for term in terms if len(term) == 1], "s")
+            if single:
+                conditions.append(
+                    "EXISTS (SELECT 1 FROM project_search s WHERE s.id = projects.id AND " + " AND ".join(single) + ")"
+                )
+                params.extend(single_params)
+            if filter_where:
+                conditions.append(filter_where)
+                params.extend(filter_params)
+            return _sorted_page(conn, " AND ".join(conditions), params, limit, key, ascending)
+
+    # Walk the location filter's rows, or the covering index of project_search
+    if filters.get("location"):
+        source, table, window = "projects p INDEXED BY idx_projects_location_created_at", "p", SEARCH_JOIN_WALK_ROWS
+        conditions, params = ["p.location = ?"], [filters["location"]]
+    else:
+        source, table, window = "project_search s INDEXED BY idx_project_search_order", "s", SEARCH_WALK_ROWS
+        conditions, params = [], []
+    if filters.get("created_from"):
+        conditions.append(f"{table}.created_at >= ?")
+        params.append(filters["created_from"])
+    if filters.get("created_to"):
+        conditions.append(f"{table}.created_at <= ?")
+        params.append(filters["created_to"])
+    if key is not None:
+        conditions.append(_key_condition(table, ">" if ascending else "<"))
+        params.extend([key[0], key[0], key[1]])
+    direction = "" if ascending else " DESC"
+    order = f"ORDER BY {table}.created_at{direction}, {table}.id{direction}"
+
+    boundary = conn.execute(
+        f"SELECT {table}.created_at, {table}.id FROM {source} WHERE {' AND '.join(conditions) or '1'} "
+        f"{order} LIMIT 1 OFFSET ?", (*params, window - 1)
+    ).fetchone()
+    if boundary is not None:
+        conditions.append(_key_condition(table, "<=" if ascending else ">="))
+        params.extend([boundary[0], boundary[0], boundary[1]])
+    like, like_params = _like_conditions(terms, "s")
+    join = " JOIN project_search s ON s.id = p.id" if table == "p" else ""
+    ids = [row[0] for row in conn.execute(
+        f"SELECT s.id FROM {source}{join} WHERE {' AND '.join(conditions + like)} {order} LIMIT ?",
+        (*params, *like_params, limit)
+    )]
+    projects = _sorted_page(conn, "id IN (SELECT value FROM json_each(?))", [json.dumps(ids)], limit,
+                            ascending=ascending)
+
+    if boundary is not None and len(projects) < limit:
+        # Few matches in the window, sort the ones past it
+        where, params = _search_clause(conn, query, filters)
+        projects.extend(_sorted_page(conn, where, params, limit - len(projects), tuple(boundary), ascending))
+    return projects
+
+def search_projects(query: Optional[str] = None, filters: Optional[Dict[str, Any]] = None,
+                    limit: int = PAGE_SIZE, offset: int = 0) -> List[Project]:
+    """Search projects by name and location
+
+    Args:
+        query: Free text, every word must appear in the name or location
+        filters: Optional dict with location (exact), created_from and created_to
+        limit: Maximum number of projects to return (-1 for no limit)
+        offset: Number of matching projects to skip
+
+    Returns:
+        List of matching projects, newest first
+    """
+    return get_projects_page(limit=limit, offset=offset, query=query, filters=filters)
+
+def get_all_projects() -> List[Project]:
     """Get all projects from the database"""
     conn = get_connection()
     projects = []
     
     if conn:
         try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name, location, created_at FROM projects ORDER BY created_at DESC")
-            rows = cursor.fetchall()
-            
-            # Convert to list of dictionaries
-            for row in rows:
-                projects.append(dict(row))
+            cursor = _project_cursor(conn)
+            cursor.execute(f"SELECT {PROJECT_COLUMNS} FROM projects ORDER BY created_at DESC")
+            projects = cursor.fetchall()
                 
         except Error as e:
             print(f"Error querying projects: {e}")
-        finally:
-            conn.close()
             
     return projects
 
+def count_projects(query: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> int:
+    """Get the number of projects in the database
+
+    Args:
+        query: Only count projects matching this search text
+        filters: Only count projects matching these filters (see search_projects)
+    """
+    conn = get_connection()
+    count = 0
+
+    if conn:
+        try:
+            where, params = _search_clause(conn, query, filters)
+            sql = "SELECT COUNT(*) FROM projects" + (f" WHERE {where}" if where else "")
+            count = conn.execute(sql, params).fetchone()[0]
+        except Error as e:
+            print(f"Error counting projects: {e}")
+
+    return count
+
+def get_projects_page(limit: int = PAGE_SIZE, after: Optional[Tuple[str, int]] = None,
+                      before: Optional[Tuple[str, int]] = None, offset: int = 0,
+                      query: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> List[Project]:
+    """Get one page of projects in list order (newest first)
+
+    Pages are addressed by keyset on (created_at, id), so fetching the
+    next page costs the same no matter how deep into the list it is.
+
+    Args:
+        limit: Maximum number of projects to return
+        after: (created_at, id) of the last row already shown, returns the rows below it
+        before: (created_at, id) of the first row already shown, returns the rows above it
+        offset: Start position when no key is given, used to jump to a scroll position
+        query: Only return projects matching this search text
+        filters: Only return projects matching these filters (see search_projects)
+
+    Returns:
+        List of projects in list order
+    """
+    conn = get_connection()
+    projects = []
+
+    if conn:
+        try:
+            key = after if after is not None else before
+            ascending = after is None and before is not None
+            if query and query.split() and limit >= 0 and offset == 0 and _search_tokenizer(conn) == "trigram":
+                projects = _search_page(conn, query, filters, limit, key, ascending)
+            else:
+                where, params = _search_clause(conn, query, filters)
+                projects = _sorted_page(conn, where, params, limit, key, ascending, 0 if key else offset)
+            if ascending:
+                projects.reverse()
+        except Error as e:
+            print(f"Error querying projects page: {e}")
+
+    return projects
+
 def add_project(name: str, location: str) -> Optional[int]:
     """Add a new project to the database"""
     conn = get_connection()
@@ -72,18 +786,19 @@ def add_project(name: str, location: str) -> Optional[int]:
     
     if conn:
         try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO projects (name, location) VALUES (?, ?)",
-                (name, location)
-            )
-            conn.commit()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO projects (name, location) VALUES (?, ?)",
+                    (name, location)
+                )
+                _fold_search_rows(conn, [(cursor.lastrowid, name, location)])
             project_id = cursor.lastrowid
             print(f"Project added with ID: {project_id}")
         except Error as e:
             print(f"Error adding project: {e}")
-        finally:
-            conn.close()
+
+    if project_id:
+        _notify_change(CHANGE_ADDED, project_id, get_project(project_id))
             
     return project_id
 
@@ -94,17 +809,18 @@ def update_project(project_id: int, name: str, location: str) -> bool:
     
     if conn:
         try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE projects SET name = ?, location = ? WHERE id = ?",
-                (name, location, project_id)
-            )
-            conn.commit()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE projects SET name = ?, location = ? WHERE id = ?",
+                    (name, location, project_id)
+                )
+                _fold_search_rows(conn, [(project_id, name, location)])
             success = cursor.rowcount > 0
         except Error as e:
             print(f"Error updating project: {e}")
-        finally:
-            conn.close()
+
+    if success:
+        _notify_change(CHANGE_UPDATED, project_id, get_project(project_id))
             
     return success
 
@@ -115,37 +831,1148 @@ def delete_project(project_id: int) -> bool:
     
     if conn:
         try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-            conn.commit()
+            with conn:
+                cursor = conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
             success = cursor.rowcount > 0
         except Error as e:
             print(f"Error deleting project: {e}")
-        finally:
-            conn.close()
+
+    if success:
+        _notify_change(CHANGE_DELETED, project_id)
             
     return success
 
-def get_project(project_id: int) -> Optional[Dict[str, Any]]:
+def get_project(project_id: int) -> Optional[Project]:
     """Get a specific project by ID"""
     conn = get_connection()
     project = None
     
     if conn:
         try:
-            cursor = conn.cursor()
+            cursor = _project_cursor(conn)
             cursor.execute(
-                "SELECT id, name, location, created_at FROM projects WHERE id = ?", 
+                f"SELECT {PROJECT_COLUMNS} FROM projects WHERE id = ?", 
                 (project_id,)
             )
-            row = cursor.fetchone()
-            
-            if row:
-                project = dict(row)
+            project = cursor.fetchone()
                 
         except Error as e:
             print(f"Error getting project: {e}")
-        finally:
-            conn.close()
             
-    return project
\ No newline at end of file
+    return project
+
+@dataclass
+class BulkResult:
+    """Outcome of a bulk operation
+
+    ids is aligned with the input rows: the affected row ID, or None
+    for rows that failed. errors holds (row index, message) pairs.
+    """
+    ids: List[Optional[int]] = field(default_factory=list)
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> int:
+        """Number of rows that were written"""
+        return sum(1 for row_id in self.ids if row_id is not None)
+
+def _chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split an iterable into lists of at most size items without materializing it
+
+    If reading the iterable fails, the items read before the error are
+    still yielded and the error is raised after them, so the caller knows
+    the index it happened at.
+    """
+    iterator = iter(rows)
+    while True:
+        chunk = []
+        try:
+            for row in islice(iterator, size):
+                chunk.append(row)
+        except Exception:
+            if chunk:
+                yield chunk
+            raise
+        if not chunk:
+            return
+        yield chunk
+
+def _project_values(row) -> Tuple[str, str, Optional[str]]:
+    """Validate an input row and return (name, location, created_at)
+
+    Raises:
+        ValueError: If the row is malformed or required fields are missing
+    """
+    if isinstance(row, Exception):
+        # Readers pass through records they could not parse
+        raise ValueError(str(row))
+    if not isinstance(row, dict):
+        raise ValueError(f"Expected a mapping, got {type(row).__name__}")
+    name = str(row.get("name") or "").strip()
+    location = str(row.get("location") or "").strip()
+    if not name:
+        raise ValueError("Project name is required")
+    if not location:
+        raise ValueError("Location is required")
+    return name, location, row.get("created_at") or None
+
+def add_projects(rows: Iterable[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE) -> BulkResult:
+    """Add many projects in a single transaction
+
+    Rows are consumed lazily in chunks and written with executemany().
+    A chunk that fails is retried row by row, so one bad row is reported
+    in the result instead of aborting the whole batch.
+
+    Args:
+        rows: Iterable of dicts with name, location and optional created_at
+        chunk_size: Rows per executemany() call
+
+    Returns:
+        BulkResult with the new project IDs and per-row errors
+    """
+    sql = "INSERT INTO projects (name, location, created_at) VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))"
+    result = BulkResult()
+    conn = get_connection()
+    if not conn:
+        return result
+
+    try:
+        with conn:
+            conn.execute("BEGIN")
+            index = 0
+            for chunk in _chunks(rows, chunk_size):
+                values = []
+                positions = []
+                for row in chunk:
+                    result.ids.append(None)
+                    try:
+                        values.append(_project_values(row))
+                        positions.append(index)
+                    except ValueError as e:
+                        result.errors.append((index, str(e)))
+                    index += 1
+
+                if values:
+                    _insert_chunk(conn, sql, values, positions, result)
+    except (Error, ValueError) as e:
+        # ValueError comes from reading the rows, e.g. a cut-off JSON file;
+        # either way nothing of the batch is kept
+        print(f"Error adding projects: {e}")
+        result.errors.append((len(result.ids), str(e)))
+        result.ids = [None] * len(result.ids)
+
+    print(f"Projects added: {result.succeeded}, failed: {len(result.errors)}")
+    if result.succeeded:
+        _notify_change(CHANGE_BULK)
+    return result
+
+def _insert_chunk(conn, sql, values, positions, result):
+    """Insert one chunk inside a savepoint, falling back to row-by-row on error"""
+    conn.execute("SAVEPOINT bulk_chunk")
+    try:
+        conn.executemany(sql, values)
+        # The transaction is held for the whole batch, so AUTOINCREMENT
+        # assigns consecutive IDs that end at last_insert_rowid()
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        first_id = last_id - len(values) + 1
+        for offset, position in enumerate(positions):
+            result.ids[position] = first_id + offset
+        _fold_search_rows(conn, ((first_id + offset, value[0], value[1]) for offset, value in enumerate(values)))
+        conn.execute("RELEASE bulk_chunk")
+        return
+    except Error:
+        conn.execute("ROLLBACK TO bulk_chunk")
+
+    for value, position in zip(values, positions):
+        try:
+            cursor = conn.execute(sql, value)
+            result.ids[position] = cursor.lastrowid
+            _fold_search_rows(conn, [(cursor.lastrowid, value[0], value[1])])
+        except Error as e:
+            result.errors.append((position, str(e)))
+    conn.execute("RELEASE bulk_chunk")
+
+def _existing_ids(conn, project_ids: List[int]) -> set:
+    """Return which of the given project IDs exist"""
+    placeholders = ",".join("?" * len(project_ids))
+    cursor = conn.execute(f"SELECT id FROM projects WHERE id IN ({placeholders})", project_ids)
+    return {row[0] for row in cursor}
+
+def _update_chunk(conn, values, positions, result):
+    """Update one chunk inside a savepoint, falling back to row-by-row on error"""
+    sql = "UPDATE projects SET name = ?, location = ? WHERE id = ?"
+    conn.execute("SAVEPOINT bulk_chunk")
+    try:
+        conn.executemany(sql, values)
+        for value, position in zip(values, positions):
+            result.ids[position] = value[2]
+        _fold_search_rows(conn, ((project_id, name, location) for name, location, project_id in values))
+        conn.execute("RELEASE bulk_chunk")
+        return
+    except Error:
+        conn.execute("ROLLBACK TO bulk_chunk")
+
+    for value, position in zip(values, positions):
+        try:
+            conn.execute(sql, value)
+            _fold_search_rows(conn, [(value[2], value[0], value[1])])
+            result.ids[position] = value[2]
+        except Error as e:
+            result.errors.append((position, str(e)))
+    conn.execute("RELEASE bulk_chunk")
+
+def update_projects(rows: Iterable[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE) -> BulkResult:
+    """Update many projects in a single transaction
+
+    Args:
+        rows: Iterable of dicts with id, name and location
+        chunk_size: Rows per executemany() call
+
+    Returns:
+        BulkResult with the updated project IDs and per-row errors
+    """
+    result = BulkResult()
+    conn = get_connection()
+    if not conn:
+        return result
+
+    try:
+        with conn:
+            conn.execute("BEGIN")
+            index = 0
+            for chunk in _chunks(rows, chunk_size):
+                pending = []
+                for row in chunk:
+                    result.ids.append(None)
+                    try:
+                        name, location, _ = _project_values(row)
+                        pending.append((index, int(row["id"]), name, location))
+                    except (ValueError, KeyError, TypeError) as e:
+                        message = "Project id is required" if isinstance(e, KeyError) else str(e)
+                        result.errors.append((index, message))
+                    index += 1
+
+                if not pending:
+                    continue
+                existing = _existing_ids(conn, [project_id for _, project_id, _, _ in pending])
+                values = []
+                positions = []
+                for position, project_id, name, location in pending:
+                    if project_id in existing:
+                        values.append((name, location, project_id))
+                        positions.append(position)
+                    else:
+                        result.errors.append((position, f"Project {project_id} not found"))
+                if values:
+                    _update_chunk(conn, values, positions, result)
+    except (Error, ValueError) as e:
+        print(f"Error updating projects: {e}")
+        result.errors.append((len(result.ids), str(e)))
+        result.ids = [None] * len(result.ids)
+
+    if result.succeeded:
+        _notify_change(CHANGE_BULK)
+    return result
+
+def delete_projects(project_ids: Iterable[int], chunk_size: int = BULK_CHUNK_SIZE) -> BulkResult:
+    """Delete many projects in a single transaction
+
+    Args:
+        project_ids: Iterable of project IDs
+        chunk_size: Rows per executemany() call
+
+    Returns:
+        BulkResult with the deleted project IDs and per-row errors
+    """
+    result = BulkResult()
+    conn = get_connection()
+    if not conn:
+        return result
+
+    try:
+        with conn:
+            conn.execute("BEGIN")
+            index = 0
+            for chunk in _chunks(project_ids, chunk_size):
+                existing = _existing_ids(conn, chunk)
+                values = []
+                for project_id in chunk:
+                    if project_id in existing:
+                        values.append((project_id,))
+                        result.ids.append(project_id)
+                    else:
+                        result.ids.append(None)
+                        result.errors.append((index, f"Project {project_id} not found"))
+                    index += 1
+                conn.executemany("DELETE FROM projects WHERE id = ?", values)
+    except Error as e:
+        print(f"Error deleting projects: {e}")
+        result.errors.append((len(result.ids), str(e)))
+        result.ids = [None] * len(result.ids)
+
+    if result.succeeded:
+        _notify_change(CHANGE_BULK)
+    return result
+
+def iter_projects(batch_size: int = BULK_CHUNK_SIZE) -> Iterator[Project]:
+    """Stream all projects without loading the whole table
+
+    Args:
+        batch_size: Rows fetched from SQLite at a time
+
+    Yields:
+        Projects ordered by ID
+    """
+    conn = get_connection()
+    if not conn:
+        return
+
+    try:
+        cursor = _project_cursor(conn)
+        cursor.execute(f"SELECT {PROJECT_COLUMNS} FROM projects ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    except Error as e:
+        print(f"Error exporting projects: {e}")
+
+# Writable columns of sections and events, in COLUMNS order
+SECTION_FIELDS = tuple(SECTION_COLUMNS.split(", ")[1:])
+EVENT_FIELDS = tuple(EVENT_COLUMNS.split(", ")[1:])
+
+def _checked_fields(details: Dict[str, Any], allowed: Tuple[str, ...]) -> Dict[str, Any]:
+    """Return details after checking every key is a writable column
+
+    Raises:
+        ValueError: If a key is not in allowed
+    """
+    unknown = set(details) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return details
+
+def _insert_row(conn, table: str, details: Dict[str, Any]) -> int:
+    """Insert one row from a column/value mapping and return its ID"""
+    columns = ", ".join(details)
+    placeholders = ", ".join("?" * len(details))
+    cursor = conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", tuple(details.values()))
+    return cursor.lastrowid
+
+def _update_row(table: str, row_id: int, details: Dict[str, Any], allowed: Tuple[str, ...]) -> bool:
+    """Update the given columns of one row
+
+    Returns:
+        True if the row exists and was updated
+    """
+    conn = get_connection()
+    if not conn or not details:
+        return False
+    try:
+        _checked_fields(details, allowed)
+        assignments = ", ".join(f"{column} = ?" for column in details)
+        with conn:
+            cursor = conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*details.values(), row_id))
+        return cursor.rowcount > 0
+    except (Error, ValueError) as e:
+        print(f"Error updating {table}: {e}")
+        return False
+
+def _delete_row(table: str, row_id: int) -> bool:
+    """Delete one row by ID, cascading to its children"""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn:
+            cursor = conn.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+        return cursor.rowcount > 0
+    except Error as e:
+        print(f"Error deleting from {table}: {e}")
+        return False
+
+def add_section(project_id: int, **details) -> Optional[int]:
+    """Add a pipe section to a project
+
+    The section number defaults to the next free number in the project.
+
+    Args:
+        project_id: ID of the project
+        details: Section fields, see models.section.Section
+
+    Returns:
+        ID of the new section, None on error
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        details = dict(_checked_fields(details, SECTION_FIELDS), project_id=project_id)
+        with conn:
+            if details.get("section_number") is None:
+                details["section_number"] = conn.execute(
+                    "SELECT COALESCE(MAX(section_number), 0) + 1 FROM sections WHERE project_id = ?",
+                    (project_id,)
+                ).fetchone()[0]
+            return _insert_row(conn, "sections", details)
+    except (Error, ValueError) as e:
+        print(f"Error adding section: {e}")
+        return None
+
+def update_section(section_id: int, **details) -> bool:
+    """Update fields of a pipe section
+
+    Args:
+        section_id: ID of the section
+        details: Section fields to change
+    """
+    return _update_row("sections", section_id, details, SECTION_FIELDS)
+
+def delete_section(section_id: int) -> bool:
+    """Delete a pipe section and its events"""
+    return _delete_row("sections", section_id)
+
+def get_section(section_id: int) -> Optional[Section]:
+    """Get a specific pipe section by ID"""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        cursor = _model_cursor(conn, Section.row_factory)
+        return cursor.execute(f"SELECT {SECTION_COLUMNS} FROM sections WHERE id = ?", (section_id,)).fetchone()
+    except Error as e:
+        print(f"Error getting section: {e}")
+        return None
+
+def get_sections(project_id: int) -> List[Section]:
+    """Get the sections of a project in section order"""
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        cursor = _model_cursor(conn, Section.row_factory)
+        cursor.execute(
+            f"SELECT {SECTION_COLUMNS} FROM sections WHERE project_id = ? ORDER BY section_number, id",
+            (project_id,)
+        )
+        return cursor.fetchall()
+    except Error as e:
+        print(f"Error getting sections: {e}")
+        return []
+
+def _event_values(row) -> Tuple[Any, ...]:
+    """Validate an input event and return its values in EVENT_FIELDS order
+
+    Raises:
+        ValueError: If the row is malformed or required fields are missing
+    """
+    if isinstance(row, Event):
+        row = row.to_dict()
+    if not isinstance(row, dict):
+        raise ValueError(f"Expected a mapping, got {type(row).__name__}")
+    for required in ("section_id", "event_code", "distance"):
+        if row.get(required) is None:
+            raise ValueError(f"Event {required} is required")
+    return tuple(row.get(column) for column in EVENT_FIELDS)
+
+def add_event(section_id: int, event_code: str, distance: float, **details) -> Optional[int]:
+    """Record an inspection event on a section
+
+    Args:
+        section_id: ID of the section
+        event_code: Code from the event_codes table
+        distance: Meters from the start of the section
+        details: Other event fields, see models.event.Event
+
+    Returns:
+        ID of the new event, None on error
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        details = dict(_checked_fields(details, EVENT_FIELDS),
+                       section_id=section_id, event_code=event_code, distance=distance)
+        with conn:
+            return _insert_row(conn, "events", details)
+    except (Error, ValueError) as e:
+        print(f"Error adding event: {e}")
+        return None
+
+def add_events(rows: Iterable[Any], chunk_size: int = BULK_CHUNK_SIZE) -> BulkResult:
+    """Add many events in a single transaction
+
+    Args:
+        rows: Iterable of Event instances or event dicts
+        chunk_size: Rows per executemany() call
+
+    Returns:
+        BulkResult with the new event IDs and per-row errors
+    """
+    sql = f"INSERT INTO events ({', '.join(EVENT_FIELDS)}) VALUES ({', '.join('?' * len(EVENT_FIELDS))})"
+    result = BulkResult()
+    conn = get_connection()
+    if not conn:
+        return result
+
+    try:
+        with conn:
+            conn.execute("BEGIN")
+            index = 0
+            for chunk in _chunks(rows, chunk_size):
+                values = []
+                positions = []
+                for row in chunk:
+                    result.ids.append(None)
+                    try:
+                        values.append(_event_values(row))
+                        positions.append(index)
+                    except ValueError as e:
+                        result.errors.append((index, str(e)))
+                    index += 1
+
+                if values:
+                    _insert_chunk(conn, sql, values, positions, result)
+    except Error as e:
+        print(f"Error adding events: {e}")
+        result.errors.append((len(result.ids), str(e)))
+        result.ids = [None] * len(result.ids)
+    return result
+
+def update_event(event_id: int, **details) -> bool:
+    """Update fields of an inspection event
+
+    Args:
+        event_id: ID of the event
+        details: Event fields to change
+    """
+    return _update_row("events", event_id, details, EVENT_FIELDS)
+
+def delete_event(event_id: int) -> bool:
+    """Delete an inspection event"""
+    return _delete_row("events", event_id)
+
+def get_event(event_id: int) -> Optional[Event]:
+    """Get a specific inspection event by ID"""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        cursor = _model_cursor(conn, Event.row_factory)
+        return cursor.execute(f"SELECT {EVENT_COLUMNS} FROM events WHERE id = ?", (event_id,)).fetchone()
+    except Error as e:
+        print(f"Error getting event: {e}")
+        return None
+
+def get_section_events(section_id: int, min_severity: Optional[int] = None) -> List[Event]:
+    """Get the events of a section ordered by distance
+
+    Args:
+        section_id: ID of the section
+        min_severity: Only events with at least this severity
+    """
+    conn = get_connection()
+    if not conn:
+        return []
+    sql = f"SELECT {EVENT_COLUMNS} FROM events WHERE section_id = ?"
+    params = [section_id]
+    if min_severity is not None:
+        sql += " AND severity >= ?"
+        params.append(min_severity)
+    try:
+        cursor = _model_cursor(conn, Event.row_factory)
+        return cursor.execute(sql + " ORDER BY distance", params).fetchall()
+    except Error as e:
+        print(f"Error getting section events: {e}")
+        return []
+
+def get_project_events(project_id: int, min_severity: Optional[int] = None, event_code: Optional[str] = None,
+                       limit: int = -1, offset: int = 0) -> List[Event]:
+    """Get the events of a project, section by section and by distance within a section
+
+    Sections are walked through idx_sections_project in section order and
+    each section's events through idx_events_section_distance, so the
+    result comes out of the indexes already sorted, without a sort step.
+
+    Args:
+        project_id: ID of the project
+        min_severity: Only events with at least this severity
+        event_code: Only events with this code
+        limit: Maximum number of events, -1 for all
+        offset: Number of events to skip
+
+    Returns:
+        List of events
+    """
+    conn = get_connection()
+    if not conn:
+        return []
+    columns = ", ".join(f"e.{column}" for column in EVENT_COLUMNS.split(", "))
+    sql = (f"SELECT {columns} FROM sections s JOIN events e ON e.section_id = s.id "
+           "WHERE s.project_id = ?")
+    params: List[Any] = [project_id]
+    if min_severity is not None:
+        sql += " AND e.severity >= ?"
+        params.append(min_severity)
+    if event_code is not None:
+        # Unary + keeps the planner on the project's sections instead of
+        # walking idx_events_code across every project
+        sql += " AND +e.event_code = ?"
+        params.append(event_code)
+    sql += " ORDER BY s.section_number, s.id, e.distance LIMIT ? OFFSET ?"
+    params += [limit, offset]
+    try:
+        cursor = _model_cursor(conn, Event.row_factory)
+        return cursor.execute(sql, params).fetchall()
+    except Error as e:
+        print(f"Error getting project events: {e}")
+        return []
+
+def count_project_events(project_id: int) -> Dict[int, int]:
+    """Count the events of a project per severity
+
+    Returns:
+        Mapping of severity to number of events (None for ungraded events)
+    """
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        cursor = conn.execute(
+            "SELECT e.severity, COUNT(*) FROM sections s JOIN events e ON e.section_id = s.id "
+            "WHERE s.project_id = ? GROUP BY e.severity",
+            (project_id,)
+        )
+        return {severity: count for severity, count in cursor}
+    except Error as e:
+        print(f"Error counting project events: {e}")
+        return {}
+
+def count_section_events(project_id: int, min_severity: Optional[int] = None) -> Dict[int, int]:
+    """Count the events of every section of a project
+
+    Args:
+        project_id: ID of the project
+        min_severity: Only count events with at least this severity
+
+    Returns:
+        Mapping of section ID to number of events, sections without events are left out
+    """
+    conn = get_connection()
+    if not conn:
+        return {}
+    sql = ("SELECT s.id, COUNT(*) FROM sections s JOIN events e ON e.section_id = s.id "
+           "WHERE s.project_id = ?")
+    params: List[Any] = [project_id]
+    if min_severity is not None:
+        sql += " AND e.severity >= ?"
+        params.append(min_severity)
+    try:
+        cursor = conn.execute(sql + " GROUP BY s.id", params)
+        return {section_id: count for section_id, count in cursor}
+    except Error as e:
+        print(f"Error counting section events: {e}")
+        return {}
+
+def add_event_codes(codes: Iterable[Any]) -> int:
+    """Add or replace entries of the event code catalog
+
+    Args:
+        codes: Iterable of EventCode instances or dicts with code, category and description
+
+    Returns:
+        Number of codes written
+    """
+    conn = get_connection()
+    if not conn:
+        return 0
+    values = []
+    for code in codes:
+        if isinstance(code, EventCode):
+            code = code.to_dict()
+        values.append((code["code"], code.get("category"), code.get("description")))
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO event_codes (code, category, description) VALUES (?, ?, ?) "
+                "ON CONFLICT (code) DO UPDATE SET category = excluded.category, description = excluded.description",
+                values
+            )
+        _event_codes_changed()
+        return len(values)
+    except Error as e:
+        print(f"Error adding event codes: {e}")
+        return 0
+
+def get_event_codes(category: Optional[str] = None) -> List[EventCode]:
+    """Get the event code catalog sorted by code
+
+    Args:
+        category: Only codes of this category
+    """
+    conn = get_connection()
+    if not conn:
+        return []
+    sql = f"SELECT {EVENT_CODE_COLUMNS} FROM event_codes"
+    params = []
+    if category is not None:
+        sql += " WHERE category = ?"
+        params.append(category)
+    try:
+        cursor = _model_cursor(conn, EventCode.row_factory)
+        return cursor.execute(sql + " ORDER BY code", params).fetchall()
+    except Error as e:
+        print(f"Error getting event codes: {e}")
+        return []
+
+def get_overlay_ocr_cache(video_hash: str) -> Dict[int, Optional[str]]:
+    """Get the overlay texts already read from a video
+
+    Args:
+        video_hash: Fingerprint of the video content
+
+    Returns:
+        Mapping of frame index to overlay text (None if nothing was read)
+    """
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        cursor = conn.execute(
+            "SELECT frame_index, text FROM overlay_ocr_cache WHERE video_hash = ?", (video_hash,)
+        )
+        return {frame_index: text for frame_index, text in cursor}
+    except Error as e:
+        print(f"Error reading overlay OCR cache: {e}")
+        return {}
+
+def add_overlay_ocr_cache(video_hash: str, texts: Iterable[Tuple[int, Optional[str]]]) -> bool:
+    """Store overlay texts read from a video in one transaction
+
+    Args:
+        video_hash: Fingerprint of the video content
+        texts: (frame index, text) pairs
+    """
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO overlay_ocr_cache (video_hash, frame_index, text) VALUES (?, ?, ?)",
+                ((video_hash, frame_index, text) for frame_index, text in texts)
+            )
+        return True
+    except Error as e:
+        print(f"Error writing overlay OCR cache: {e}")
+        return False
+
+def add_slope_readings(section_id: int, readings: Iterable[Tuple[int, float, float, float]]) -> bool:
+    """Store slope readings of a section in one transaction
+
+    Readings of a frame that was already stored are replaced.
+
+    Args:
+        section_id: ID of the section
+        readings: (frame index, video time, distance, slope) tuples
+    """
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO slope_readings (section_id, frame_index, video_time, distance, slope) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((section_id, *reading) for reading in readings)
+            )
+        return True
+    except Error as e:
+        print(f"Error adding slope readings: {e}")
+        return False
+
+def get_slope_readings(section_id: int) -> List[Tuple[int, float, float, float]]:
+    """Get the slope readings of a section in frame order
+
+    Returns:
+        List of (frame index, video time, distance, slope) tuples
+    """
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            "SELECT frame_index, video_time, distance, slope FROM slope_readings "
+            "WHERE section_id = ? ORDER BY frame_index",
+            (section_id,)
+        )
+        return cursor.fetchall()
+    except Error as e:
+        print(f"Error getting slope readings: {e}")
+        return []
+
+def delete_slope_readings(section_id: int) -> bool:
+    """Delete the slope readings of a section
+
+    Returns:
+        True if readings were deleted
+    """
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn:
+            cursor = conn.execute("DELETE FROM slope_readings WHERE section_id = ?", (section_id,))
+        return cursor.rowcount > 0
+    except Error as e:
+        print(f"Error deleting slope readings: {e}")
+        return False
+
+def get_ingested_fingerprints() -> Set[str]:
+    """Get the fingerprints of every video already ingested into a section"""
+    conn = get_connection()
+    if not conn:
+        return set()
+    try:
+        return {row[0] for row in conn.execute("SELECT fingerprint FROM ingested_videos")}
+    except Error as e:
+        print(f"Error getting ingested videos: {e}")
+        return set()
+
+def add_ingested_videos(videos: Iterable[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE) -> BulkResult:
+    """Add a section per ingested video, with its manifest row, a transaction per chunk
+
+    Projects are found by name and created when missing. Sections are
+    numbered after the project's last section in input order. Every chunk
+    is committed on its own, so an interrupted ingest keeps the chunks it
+    finished and a rerun skips their videos by fingerprint.
+
+    Args:
+        videos: Iterable of dicts with project, location, fingerprint, path
+            and optional started_at, duration, width and height
+        chunk_size: Videos per transaction
+
+    Returns:
+        BulkResult with the new section IDs and per-video errors
+    """
+    result = BulkResult()
+    conn = get_connection()
+    if not conn:
+        return result
+    projects: Dict[str, int] = {}
+    next_numbers: Dict[int, int] = {}
+    for chunk in _chunks(videos, chunk_size):
+        chunk_start = index = len(result.ids)
+        # Lookups made by rolled back rows or chunks are dropped with them
+        saved = (dict(projects), dict(next_numbers))
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                for video in chunk:
+                    result.ids.append(None)
+                    conn.execute("SAVEPOINT ingest_video")
+                    new_project = new_numbers = None
+                    try:
+                        if conn.execute("SELECT 1 FROM ingested_videos WHERE fingerprint = ?",
+                                        (video["fingerprint"],)).fetchone():
+                            raise ValueError("Video already ingested")
+                        name = video["project"]
+                        project_id = projects.get(name)
+                        if project_id is None:
+                            row = conn.execute("SELECT id FROM projects WHERE name = ? ORDER BY id LIMIT 1",
+                                               (name,)).fetchone()
+                            if row:
+                                project_id = row[0]
+                            else:
+                                project_id = _insert_row(conn, "projects", {"name": name, "location": video["location"]})
+                                _fold_search_rows(conn, [(project_id, name, video["location"])])
+                            projects[name] = new_project = project_id
+                        if project_id not in next_numbers:
+                            new_numbers = project_id
+                            next_numbers[project_id] = conn.execute(
+                                "SELECT COALESCE(MAX(section_number), 0) + 1 FROM sections WHERE project_id = ?",
+                                (project_id,)
+                            ).fetchone()[0]
+                        section_id = _insert_row(conn, "sections", {
+                            "project_id": project_id,
+                            "section_number": next_numbers[project_id],
+                            "started_at": video.get("started_at"),
+                            "video_path": video["path"],
+                        })
+                        conn.execute(
+                            "INSERT INTO ingested_videos (fingerprint, section_id, path, duration, width, height) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (video["fingerprint"], section_id, video["path"], video.get("duration"),
+                             video.get("width"), video.get("height"))
+                        )
+                        conn.execute("RELEASE ingest_video")
+                        next_numbers[project_id] += 1
+                        result.ids[index] = section_id
+                    except (Error, KeyError, ValueError) as e:
+                        conn.execute("ROLLBACK TO ingest_video")
+                        conn.execute("RELEASE ingest_video")
+                        if new_project is not None:
+                            del projects[video["project"]]
+                        if new_numbers is not None:
+                            next_numbers.pop(new_numbers, None)
+                        result.errors.append((index, str(e)))
+                    index += 1
+        except Error as e:
+            print(f"Error adding ingested videos: {e}")
+            # The whole chunk was rolled back, including projects created for it
+            result.ids[chunk_start:] = [None] * len(chunk)
+            result.errors = [error for error in result.errors if error[0] < chunk_start]
+            result.errors += [(position, str(e)) for position in range(chunk_start, chunk_start + len(chunk))]
+            projects.clear()
+            projects.update(saved[0])
+            next_numbers.clear()
+            next_numbers.update(saved[1])
+    if result.succeeded:
+        _notify_change(CHANGE_BULK)
+    return result
+
+def get_blob_store() -> BlobStore:
+    """Get the blob store of the current database file"""
+    return BlobStore(blobstore.blob_dir(active_connection_manager().source_file))
+
+def _store_blob(conn, store: BlobStore, content: Union[bytes, str]) -> str:
+    """Store content in the blob store and register it, inside the caller's transaction
+
+    The row is written before the file is checked, so a concurrent
+    delete_unreferenced_blobs() either sees the refreshed row or has already
+    removed the file, which is then written again.
+    """
+    if isinstance(content, str):
+        put, size = store.put_file, os.path.getsize(content)
+    else:
+        put, size = store.put, len(content)
+    blob_hash = put(content)
+    conn.execute(
+        "INSERT INTO blobs (hash, size) VALUES (?, ?) "
+        "ON CONFLICT (hash) DO UPDATE SET created_at = CURRENT_TIMESTAMP",
+        (blob_hash, size)
+    )
+    if not os.path.exists(store.path(blob_hash)):
+        put(content)
+    return blob_hash
+
+def add_blob(content: Union[bytes, str]) -> Optional[str]:
+    """Store an image or other file in the blob store
+
+    Identical content is stored once. The blob is unreferenced until a row
+    points at it and is collected after BLOB_GRACE_SECONDS if none does.
+
+    Args:
+        content: Bytes, or the path of a file to copy
+
+    Returns:
+        SHA-256 hex digest of the content, None on error
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn:
+            return _store_blob(conn, get_blob_store(), content)
+    except (Error, OSError) as e:
+        print(f"Error storing blob: {e}")
+        return None
+
+def get_blob(blob_hash: Optional[str]) -> Optional[BlobHandle]:
+    """Get a lazy handle of a stored blob, None for a missing hash
+
+    Nothing is read until the handle is opened.
+    """
+    return get_blob_store().handle(blob_hash)
+
+def _set_blob_column(table: str, column: str, row_id: int, content: Union[bytes, str, None]) -> bool:
+    """Store content and point a row's blob column at it in one transaction"""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn:
+            blob_hash = _store_blob(conn, get_blob_store(), content) if content is not None else None
+            cursor = conn.execute(f"UPDATE {table} SET {column} = ? WHERE id = ?", (blob_hash, row_id))
+        return cursor.rowcount > 0
+    except (Error, OSError) as e:
+        print(f"Error setting {table} {column}: {e}")
+        return False
+
+def set_project_image(project_id: int, content: Union[bytes, str, None]) -> bool:
+    """Set or remove the image of a project
+
+    Args:
+        project_id: ID of the project
+        content: Image bytes, the path of an image file, or None to remove it
+
+    Returns:
+        True if the project exists and was updated
+    """
+    success = _set_blob_column("projects", "image_hash", project_id, content)
+    if success:
+        _notify_change(CHANGE_UPDATED, project_id, get_project(project_id))
+    return success
+
+def set_event_snapshot(event_id: int, content: Union[bytes, str, None]) -> bool:
+    """Set or remove the snapshot image of an event
+
+    Args:
+        event_id: ID of the event
+        content: Image bytes, the path of an image file, or None to remove it
+
+    Returns:
+        True if the event exists and was updated
+    """
+    return _set_blob_column("events", "snapshot_hash", event_id, content)
+
+def delete_unreferenced_blobs(grace_seconds: int = BLOB_GRACE_SECONDS) -> int:
+    """Delete blobs no row has referenced for grace_seconds
+
+    Files are removed while the transaction holds the write lock, so a
+    blob stored again concurrently is written back by _store_blob().
+
+    Returns:
+        Number of deleted blobs
+    """
+    conn = get_connection()
+    if not conn:
+        return 0
+    store = get_blob_store()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            hashes = [row[0] for row in conn.execute(
+                "SELECT hash FROM blobs WHERE refcount <= 0 AND created_at <= datetime('now', ?)",
+                (f"-{int(grace_seconds)} seconds",)
+            )]
+            conn.executemany("DELETE FROM blobs WHERE hash = ?", ((blob_hash,) for blob_hash in hashes))
+            for blob_hash in hashes:
+                store.delete(blob_hash)
+        return len(hashes)
+    except (Error, OSError) as e:
+        print(f"Error deleting unreferenced blobs: {e}")
+        return 0
+
+# Tables of a project's rows, parents first, with the columns copied between databases
+PROJECT_ROW_COLUMNS = {
+    "projects": tuple(PROJECT_COLUMNS.split(", ")),
+    "sections": tuple(SECTION_COLUMNS.split(", ")),
+    "events": tuple(EVENT_COLUMNS.split(", ")),
+    "slope_readings": ("section_id", "frame_index", "video_time", "distance", "slope"),
+}
+
+def get_project_rows(project_id: int) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """Get every row of a project in one read transaction, e.g. to archive it
+
+    Returns:
+        Rows by table (PROJECT_ROW_COLUMNS tables plus the event_codes the
+        events use) as column/value dicts, None if the project does not
+        exist or on error
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    queries = {
+        "projects": "SELECT {} FROM projects WHERE id = ?",
+        "sections": "SELECT {} FROM sections WHERE project_id = ? ORDER BY section_number, id",
+        "events": "SELECT {} FROM events WHERE section_id IN (SELECT id FROM sections WHERE project_id = ?) "
+                  "ORDER BY section_id, distance, id",
+        "slope_readings": "SELECT {} FROM slope_readings "
+                          "WHERE section_id IN (SELECT id FROM sections WHERE project_id = ?) "
+                          "ORDER BY section_id, frame_index",
+    }
+    try:
+        rows = {}
+        # One transaction, so the rows of all tables are from the same moment
+        with conn:
+            conn.execute("BEGIN")
+            for table, query in queries.items():
+                cursor = conn.execute(query.format(", ".join(PROJECT_ROW_COLUMNS[table])), (project_id,))
+                rows[table] = [dict(row) for row in cursor]
+            rows["event_codes"] = [dict(row) for row in conn.execute(
+                f"SELECT {EVENT_CODE_COLUMNS} FROM event_codes WHERE code IN ("
+                "SELECT DISTINCT event_code FROM events "
+                "WHERE section_id IN (SELECT id FROM sections WHERE project_id = ?)) ORDER BY code",
+                (project_id,)
+            )]
+        return rows if rows["projects"] else None
+    except Error as e:
+        print(f"Error reading project rows: {e}")
+        return None
+
+def add_project_rows(rows: Dict[str, List[Dict[str, Any]]],
+                     blob_content: Callable[[str], Optional[bytes]]) -> Optional[int]:
+    """Add a project read by get_project_rows(), e.g. from another database, in one transaction
+
+    Rows get new IDs and references between them are remapped. Event codes
+    missing from the catalog are added, existing ones are left as they are.
+
+    Args:
+        rows: Rows by table as returned by get_project_rows()
+        blob_content: blob_content(hash) returns the content of a referenced
+            blob, None if it is not available (the reference is dropped)
+
+    Returns:
+        ID of the new project, None on error
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    store = get_blob_store()
+    blobs = {}
+
+    def blob(blob_hash):
+        if not blob_hash:
+            return None
+        if blob_hash not in blobs:
+            content = blob_content(blob_hash)
+            blobs[blob_hash] = _store_blob(conn, store, content) if content is not None else None
+        return blobs[blob_hash]
+
+    def values(table, row, **changes):
+        details = {column: row.get(column) for column in PROJECT_ROW_COLUMNS[table][1:] if column in row}
+        details.update(changes)
+        return details
+
+    try:
+        project, = rows["projects"]
+        with conn:
+            conn.executemany(
+                "INSERT INTO event_codes (code, category, description) VALUES (?, ?, ?) ON CONFLICT (code) DO NOTHING",
+                ((code["code"], code.get("category"), code.get("description")) for code in rows.get("event_codes", ()))
+            )
+            project_id = _insert_row(conn, "projects", values("projects", project,
+                                                               image_hash=blob(project.get("image_hash"))))
+            _fold_search_rows(conn, [(project_id, project.get("name"), project.get("location"))])
+            section_ids = {}
+            for section in rows.get("sections", ()):
+                section_ids[section["id"]] = _insert_row(conn, "sections",
+                                                         values("sections", section, project_id=project_id))
+            for event in rows.get("events", ()):
+                _insert_row(conn, "events", values("events", event, section_id=section_ids[event["section_id"]],
+                                                   snapshot_hash=blob(event.get("snapshot_hash"))))
+            columns = PROJECT_ROW_COLUMNS["slope_readings"]
+            conn.executemany(
+                f"INSERT INTO slope_readings ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                ((section_ids[reading["section_id"]], *(reading[column] for column in columns[1:]))
+                 for reading in rows.get("slope_readings", ()))
+            )
+    except (Error, OSError, KeyError, ValueError) as e:
+        print(f"Error adding project rows: {e}")
+        return None
+    if rows.get("event_codes"):
+        _event_codes_changed()
+    _notify_change(CHANGE_ADDED, project_id, get_project(project_id))
+    return project_id
+
+# Time every database call while instrumentation is enabled; helpers that
+# are called many times per operation and do no I/O are left out
+instrumentation.instrument_module(
+    sys.modules[__name__], "db.",
+    exclude=("get_connection", "active_connection_manager", "use_connection_manager", "add_change_listener", "remove_change_listener", "normalize_search_text",
+             "get_blob_store", "get_blob")
+)
@@ -0,0 +1,230 @@
+"""
+Event code catalog with an in-memory search index for the event picker
+
+The catalog is read from the active database once and indexed for the
+current language, until event codes are written again: every code, category and description is folded
+with database.normalize_search_text() and split into words. A prefix
+trie over the words answers "starts with" lookups in the length of the
+typed word, and a trigram index finds words that contain the typed text
+anywhere, so each keystroke in the picker only touches the matching
+words instead of scanning the whole catalog.
+
+Descriptions and categories are shown in the current language when the
+language catalog has a translation (keys "event_code.<code>" and
+"event_category.<category>"); the stored description stays searchable
+either way.
+
+Results are ranked: exact code, code prefix, word prefix, then substring,
+and by code within a rank.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import database
+from languages import language_manager
+from models.event import EventCode
+
+# Results returned by a search unless a limit is given
+MAX_RESULTS = 200
+
+# Recent queries whose results are kept per catalog
+RESULT_CACHE_SIZE = 64
+
+# Ranks of a word match, lower is better
+RANK_EXACT_CODE = 0
+RANK_CODE_PREFIX = 1
+RANK_WORD_PREFIX = 2
+RANK_SUBSTRING = 3
+
+@dataclass(slots=True)
+class CatalogEntry:
+    """Event code as shown by the picker"""
+    code: str
+    category: Optional[str]
+    category_text: str  # Category in the current language
+    description: str  # Description in the current language
+
+    def to_event_code(self) -> EventCode:
+        return EventCode(self.code, self.category, self.description)
+
+def _fold(text: Optional[str]) -> str:
+    return database.normalize_search_text(text or "").casefold()
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+class EventCodeCatalog:
+    """Event codes indexed for prefix and substring search
+
+    Words of all entries form a vocabulary. The prefix trie and the trigram
+    index are built over the vocabulary, and each word has a posting list of
+    the entries it occurs in, so a lookup only touches matching words.
+    """
+
+    def __init__(self, codes: Iterable[EventCode], translations: Optional[Dict[str, str]] = None):
+        """Build the index
+
+        Args:
+            codes: Event codes, e.g. from database.get_event_codes()
+            translations: Translation catalog, language_manager.translations by default
+        """
+        translations = language_manager.translations if translations is None else translations
+        self.entries: List[CatalogEntry] = []
+        self._by_code: Dict[str, int] = {}
+        self._folded_codes: List[str] = []
+        # Entries of every word, with the rank of a prefix match on it
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._results = OrderedDict()
+
+        for code in sorted(codes, key=lambda code: code.code):
+            index = len(self.entries)
+            entry = CatalogEntry(
+                code.code, code.category,
+                translations.get(f"event_category.{code.category}", code.category or ""),
+                translations.get(f"event_code.{code.code}", code.description or ""),
+            )
+            self.entries.append(entry)
+            self._by_code[code.code] = index
+            folded_code = _fold(code.code)
+            self._folded_codes.append(folded_code)
+
+            self._postings.setdefault(folded_code, {})[index] = RANK_CODE_PREFIX
+            for field in (entry.category_text, entry.description, code.category, code.description):
+                for word in _fold(field).split():
+                    self._postings.setdefault(word, {}).setdefault(index, RANK_WORD_PREFIX)
+
+        # Trie node: (children by character, words of the vocabulary below the node)
+        self._trie = ({}, [])
+        self._trigrams: Dict[str, List[str]] = {}
+        for word in self._postings:
+            node = self._trie
+            for char in word:
+                node = node[0].setdefault(char, ({}, []))
+                node[1].append(word)
+            for trigram in _trigrams(word):
+                self._trigrams.setdefault(trigram, []).append(word)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, code: str) -> Optional[CatalogEntry]:
+        """Get the entry of a code, None if the catalog has no such code"""
+        index = self._by_code.get(code)
+        return None if index is None else self.entries[index]
+
+    def _words_with_prefix(self, prefix: str) -> List[str]:
+        node = self._trie
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return []
+        return node[1]
+
+    def _words_containing(self, text: str) -> List[str]:
+        """Vocabulary words containing a text of at least three characters"""
+        postings = sorted((self._trigrams.get(trigram, ()) for trigram in _trigrams(text)), key=len)
+        if not postings[0]:
+            return []
+        return [word for word in postings[0] if text in word]
+
+    def _match_word(self, word: str) -> Dict[int, int]:
+        """Entries matching one query word, with the rank of the match"""
+        matches: Dict[int, int] = {}
+        for prefixed in self._words_with_prefix(word):
+            for index, rank in self._postings[prefixed].items():
+                if rank < matches.get(index, RANK_SUBSTRING + 1):
+                    matches[index] = rank
+        if len(word) >= 3:
+            for containing in self._words_containing(word):
+                for index in self._postings[containing]:
+                    matches.setdefault(index, RANK_SUBSTRING)
+        exact = self._postings.get(word, {})
+        for index, rank in exact.items():
+            if rank == RANK_CODE_PREFIX and self._folded_codes[index] == word:
+                matches[index] = RANK_EXACT_CODE
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = MAX_RESULTS) -> List[CatalogEntry]:
+        """Find the codes matching every word of a query, best matches first
+
+        Args:
+            query: Search text, an empty query lists the catalog in code order
+            limit: Most results returned, None for all
+
+        Returns:
+            Matching entries ranked by the sum of their word ranks, then by code
+        """
+        words = tuple(sorted(set(_fold(query).split()), key=len, reverse=True))
+        if not words:
+            return self.entries[:limit]
+        key = (words, limit)
+        results = self._results.get(key)
+        if results is not None:
+            # Typing back over a query, e.g. with backspace, repeats it
+            self._results.move_to_end(key)
+            return results
+
+        scores = None
+        for word in words:
+            matches = self._match_word(word)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {index: score + matches[index] for index, score in scores.items() if index in matches}
+            if not scores:
+                break
+        # Entry indexes follow code order, so they break ties by code
+        ranked = sorted((score, index) for index, score in scores.items())
+        results = [self.entries[index] for _, index in ranked[:limit]]
+
+        self._results[key] = results
+        while len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return results
+
+# Codes per database file, and their catalogs per (database file, language)
+_codes: Dict[str, List[EventCode]] = {}
+_catalogs: Dict[Tuple[str, str], EventCodeCatalog] = {}
+_lock = threading.Lock()
+
+def _catalog_key() -> Tuple[str, str]:
+    """Active database file and current language"""
+    return database.active_connection_manager().database_file, language_manager.current_language
+
+def get_catalog() -> EventCodeCatalog:
+    """Get the catalog of the active database indexed for the current language
+
+    The codes are read from the database on the first call and each
+    language is indexed once; safe to call from a worker thread.
+    """
+    key = _catalog_key()
+    database_file = key[0]
+    with _lock:
+        catalog = _catalogs.get(key)
+        if catalog is not None:
+            return catalog
+        if database_file not in _codes:
+            _codes[database_file] = database.get_event_codes()
+        catalog = _catalogs[key] = EventCodeCatalog(_codes[database_file], language_manager.translations)
+        return catalog
+
+def cached_catalog() -> Optional[EventCodeCatalog]:
+    """Get the catalog of the current language if it was already built, without loading it"""
+    return _catalogs.get(_catalog_key())
+
+def reload(database_file: Optional[str] = None):
+    """Drop the loaded codes and indexes, e.g. after writing event codes
+
+    Args:
+        database_file: Only drop what was loaded from this database file
+    """
+    with _lock:
+        if database_file is None:
+            _codes.clear()
+            _catalogs.clear()
+            return
+        _codes.pop(database_file, None)
+        for key in [key for key in _catalogs if key[0] == database_file]:
+            del _catalogs[key]
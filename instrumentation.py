@@ -0,0 +1,339 @@
+"""
+Performance instrumentation for field diagnostics
+
+Timers record how long database calls, report renders, Treeview reloads
+and Tk event handlers take; counters count events. Each timer keeps its
+call count, total and maximum plus a window of recent durations for the
+p50/p95 shown in the diagnostics tab. Calls slower than slow_ms and a
+periodic summary go to a rotating log file.
+
+Disabled by default. Enable it in config.json:
+
+    "instrumentation": {"enabled": true}
+
+or from the diagnostics tab. While disabled a timed call costs one
+attribute check.
+"""
+import json
+import time
+import atexit
+import logging
+import inspect
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+CONFIG_FILE = "config.json"
+CONFIG_KEY = "instrumentation"
+
+# Settings used for keys missing from config.json
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "log_file": "pipes-perf.log",
+    "log_max_bytes": 1024 * 1024,
+    "log_backups": 3,
+    "slow_ms": 200,  # Calls at least this slow are logged individually
+    "summary_seconds": 300,  # Interval of the summary written to the log
+}
+
+# Recent durations kept per timer for the percentiles
+SAMPLE_WINDOW = 1000
+
+# Interval of the event loop heartbeat measuring how late Tk runs callbacks
+EVENT_LOOP_INTERVAL_MS = 250
+
+logger = logging.getLogger("pipes.perf")
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+class TimerStats:
+    """Durations recorded for one timer"""
+
+    __slots__ = ("name", "count", "total", "max", "samples")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Duration below which the given fraction of the recent calls finished, in seconds"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "max_ms": self.max * 1000,
+            "total_s": self.total,
+        }
+
+class Instrumentation:
+    """Process-wide timers and counters"""
+
+    def __init__(self):
+        self.enabled = False
+        self.settings = dict(DEFAULT_SETTINGS)
+        self._timers: Dict[str, TimerStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._handler = None
+        self._last_summary = time.monotonic()
+
+    # Configuration
+
+    def load_config(self):
+        """Apply the instrumentation settings of the configuration file"""
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as config_file:
+                settings = json.load(config_file).get(CONFIG_KEY, {})
+        except (FileNotFoundError, ValueError, AttributeError):
+            settings = {}
+        self.configure(**settings)
+
+    def configure(self, **settings):
+        """Change settings and open or close the log file accordingly
+
+        Args:
+            settings: Keys of DEFAULT_SETTINGS
+        """
+        unknown = set(settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            print(f"Unknown instrumentation settings: {', '.join(sorted(unknown))}")
+        self.settings.update((key, value) for key, value in settings.items() if key in DEFAULT_SETTINGS)
+        self.enabled = bool(self.settings["enabled"])
+        self._close_log()
+        if self.enabled and self.settings["log_file"]:
+            try:
+                self._handler = RotatingFileHandler(
+                    self.settings["log_file"], maxBytes=int(self.settings["log_max_bytes"]),
+                    backupCount=int(self.settings["log_backups"]), encoding="utf-8"
+                )
+                self._handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(self._handler)
+            except OSError as e:
+                print(f"Error opening instrumentation log: {e}")
+
+    def set_enabled(self, enabled: bool, save: bool = True):
+        """Turn instrumentation on or off
+
+        Args:
+            enabled: New state
+            save: Also store the state in the configuration file
+        """
+        if not enabled:
+            self.log_summary()
+        self.configure(enabled=enabled)
+        if save:
+            self.save_config()
+
+    def save_config(self):
+        """Store the enabled flag in the configuration file, keeping other settings"""
+        config = {}
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as config_file:
+                config = json.load(config_file)
+        except (FileNotFoundError, ValueError):
+            pass
+        config.setdefault(CONFIG_KEY, {})["enabled"] = self.enabled
+        try:
+            with open(CONFIG_FILE, "w", encoding="utf-8") as config_file:
+                json.dump(config, config_file, ensure_ascii=False, indent=4)
+        except OSError as e:
+            print(f"Error saving instrumentation settings: {e}")
+
+    def _close_log(self):
+        if self._handler is not None:
+            logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+    # Recording
+
+    def record(self, name: str, seconds: float):
+        """Add a duration to a timer"""
+        with self._lock:
+            stats = self._timers.get(name)
+            if stats is None:
+                stats = self._timers[name] = TimerStats(name)
+            stats.add(seconds)
+        if self._handler is None:
+            return
+        if seconds * 1000 >= self.settings["slow_ms"]:
+            logger.info("slow %s %.1f ms", name, seconds * 1000)
+        if time.monotonic() - self._last_summary >= self.settings["summary_seconds"]:
+            self.log_summary()
+
+    def count(self, name: str, amount: int = 1):
+        """Increase a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the body of a with statement"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Decorator timing every call of a function
+
+        Generator functions are timed over their whole iteration, counting
+        only the time spent producing items, not the consumer's.
+
+        Args:
+            name: Timer name, module.function by default
+        """
+        def decorate(func):
+            label = name or f"{func.__module__}.{func.__qualname__}"
+            if inspect.isgeneratorfunction(func):
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return (yield from func(*args, **kwargs))
+                    generator = func(*args, **kwargs)
+                    elapsed = 0.0
+                    try:
+                        while True:
+                            start = time.perf_counter()
+                            try:
+                                item = next(generator)
+                            except StopIteration as stop:
+                                return stop.value
+                            finally:
+                                elapsed += time.perf_counter() - start
+                            yield item
+                    finally:
+                        generator.close()
+                        self.record(label, elapsed)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        self.record(label, time.perf_counter() - start)
+            wrapper.timer_name = label
+            return wrapper
+        return decorate
+
+    def instrument_module(self, module, prefix: str, exclude: Iterable[str] = ()):
+        """Time every public function defined in a module
+
+        Calls between the module's own functions go through the module
+        globals, so they are timed too.
+
+        Args:
+            module: Module whose functions are replaced by timed wrappers
+            prefix: Timer name prefix, e.g. "db."
+            exclude: Function names to leave alone, e.g. trivial hot helpers
+        """
+        for name, value in list(vars(module).items()):
+            if (inspect.isfunction(value) and value.__module__ == module.__name__ and not name.startswith("_")
+                    and name not in exclude and not hasattr(value, "timer_name")):
+                setattr(module, name, self.timed(prefix + name)(value))
+
+    def ui_handler(self, name: str) -> Callable:
+        """Decorator for Tk event handlers (methods of widgets)
+
+        Records the time from the start of the handler until Tk is idle
+        again, which includes the redraws the handler caused: after_idle
+        callbacks run after the idle work queued before them.
+        """
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(widget, *args, **kwargs):
+                if not self.enabled:
+                    return func(widget, *args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(widget, *args, **kwargs)
+                finally:
+                    handled = time.perf_counter()
+                    self.record(name, handled - start)
+                    try:
+                        widget.after_idle(lambda: self.record(name + ".idle", time.perf_counter() - start))
+                    except Exception:
+                        pass  # The handler destroyed its widget
+            return wrapper
+        return decorate
+
+    def watch_event_loop(self, widget, interval_ms: int = EVENT_LOOP_INTERVAL_MS):
+        """Measure how late the Tk event loop runs timer callbacks
+
+        A heartbeat scheduled every interval_ms records its delay as
+        ui.event_loop_lag; long delays mean a handler blocked the loop.
+        """
+        def tick(expected):
+            now = time.perf_counter()
+            if self.enabled:
+                self.record("ui.event_loop_lag", max(0.0, now - expected))
+            try:
+                widget.after(interval_ms, tick, time.perf_counter() + interval_ms / 1000)
+            except Exception:
+                pass  # The window was destroyed
+        widget.after(interval_ms, tick, time.perf_counter() + interval_ms / 1000)
+
+    # Reading
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current statistics of every timer, sorted by name"""
+        with self._lock:
+            timers = [stats.to_dict() for stats in self._timers.values()]
+            counters = dict(self._counters)
+        for name, value in counters.items():
+            timers.append({"name": name, "count": value, "p50_ms": None, "p95_ms": None, "max_ms": None,
+                           "total_s": None})
+        return sorted(timers, key=lambda row: row["name"])
+
+    def reset(self):
+        """Drop every recorded timer and counter"""
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def log_summary(self):
+        """Write the statistics of every timer to the log"""
+        self._last_summary = time.monotonic()
+        if self._handler is None:
+            return
+        for row in self.snapshot():
+            if row["p50_ms"] is None:
+                logger.info("summary %s count=%d", row["name"], row["count"])
+            else:
+                logger.info("summary %s count=%d p50=%.2fms p95=%.2fms max=%.2fms total=%.3fs",
+                            row["name"], row["count"], row["p50_ms"], row["p95_ms"], row["max_ms"],
+                            row["total_s"])
+
+# Singleton instance of Instrumentation
+instrumentation = Instrumentation()
+instrumentation.load_config()
+atexit.register(instrumentation.log_summary)
@@ -2,20 +2,33 @@
 Language manager for multi-language support
 """
 import os
+import sys
 import json
+import marshal
 import configparser
 
 LANGUAGES_DIR = "languages"
 DEFAULT_LANGUAGE = "en"
 CONFIG_FILE = "config.json"
+RTL_LANGUAGES = ("he", "ar")  # Add RTL languages here
+
+# Compiled catalogs, stored next to the JSON files like .pyc files
+CATALOG_CACHE_DIR = os.path.join(LANGUAGES_DIR, "__pycache__")
 
 class LanguageManager:
-    """Manages application language and translations"""
+    """Manages application language and translations
+
+    Widgets register their translated options with bind(), so set_language()
+    can retranslate the running UI in one pass instead of rebuilding windows.
+    """
 
     def __init__(self):
         self.current_language = DEFAULT_LANGUAGE
         self.translations = {}
         self.is_rtl = False
+        self._catalogs = {}
+        self._bindings = {}
+        self._listeners = []
         self.load_language_from_config()
 
     def load_language_from_config(self):
@@ -29,21 +42,151 @@ class LanguageManager:
             print("Config file not found. Falling back to default language.")
             self.load_language(DEFAULT_LANGUAGE)
 
+    def available_languages(self):
+        """Get the codes of all languages with a catalog file
+
+        Returns:
+            Sorted list of language codes
+        """
+        try:
+            return sorted(name[:-5] for name in os.listdir(LANGUAGES_DIR) if name.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def fallback_chain(self, language_code):
+        """Get the languages searched for a key, most specific first
+
+        'pt-BR' falls back to 'pt' and then to DEFAULT_LANGUAGE.
+
+        Args:
+            language_code: Language code (e.g., 'en', 'ar')
+
+        Returns:
+            List of language codes
+        """
+        chain = [language_code]
+        base = language_code.replace("_", "-").split("-")[0]
+        for code in (base, DEFAULT_LANGUAGE):
+            if code not in chain:
+                chain.append(code)
+        return chain
+
+    def load_catalog(self, language_code):
+        """Load the translations of a single language
+
+        Catalogs are parsed once per process and compiled to a marshal
+        sidecar keyed by the JSON file's mtime and size, so later starts skip
+        JSON parsing.
+
+        Args:
+            language_code: Language code (e.g., 'en', 'ar')
+
+        Returns:
+            Dictionary of translations
+
+        Raises:
+            FileNotFoundError: If the language has no catalog file
+        """
+        file_path = os.path.join(LANGUAGES_DIR, f"{language_code}.json")
+        stat = os.stat(file_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._catalogs.get(language_code)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        cache_path = os.path.join(CATALOG_CACHE_DIR, f"{language_code}.{sys.implementation.cache_tag}.marshal")
+        catalog = None
+        try:
+            with open(cache_path, "rb") as cache_file:
+                cached_key, cached_catalog = marshal.load(cache_file)
+            if tuple(cached_key) == key:
+                catalog = cached_catalog
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        if catalog is None:
+            with open(file_path, "r", encoding="utf-8") as file:
+                catalog = json.load(file)
+            self._write_catalog_cache(cache_path, key, catalog)
+
+        self._catalogs[language_code] = (key, catalog)
+        return catalog
+
+    def _write_catalog_cache(self, cache_path, key, catalog):
+        """Write a compiled catalog, silently skipped on read-only installs"""
+        try:
+            os.makedirs(CATALOG_CACHE_DIR, exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as cache_file:
+                marshal.dump((key, catalog), cache_file)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+
     def load_language(self, language_code):
         """Load translations for the specified language
 
+        Keys missing from the language are taken from its fallback chain.
+
         Args:
             language_code: Language code (e.g., 'en', 'ar')
         """
         try:
-            file_path = os.path.join(LANGUAGES_DIR, f"{language_code}.json")
-            with open(file_path, "r", encoding="utf-8") as file:
-                self.translations = json.load(file)
-            self.current_language = language_code
-            self.is_rtl = language_code in ["he", "ar"]  # Add RTL languages here
+            primary = self.load_catalog(language_code)
         except FileNotFoundError:
             print(f"Language file for '{language_code}' not found. Falling back to default language.")
-            self.load_language(DEFAULT_LANGUAGE)
+            if language_code != DEFAULT_LANGUAGE:
+                self.load_language(DEFAULT_LANGUAGE)
+            return
+
+        # Merge once so translate() stays a single dictionary lookup
+        translations = {}
+        for code in reversed(self.fallback_chain(language_code)[1:]):
+            try:
+                translations.update(self.load_catalog(code))
+            except FileNotFoundError:
+                pass
+        translations.update(primary)
+
+        self.translations = translations
+        self.current_language = language_code
+        self.is_rtl = language_code in RTL_LANGUAGES
+
+    def set_language(self, language_code, save=True):
+        """Switch the language of the running application
+
+        Bound widgets are retranslated and direction listeners are called
+        with the new is_rtl flag.
+
+        Args:
+            language_code: Language code (e.g., 'en', 'ar')
+            save: Store the choice in the configuration file
+        """
+        self.load_language(language_code)
+        if save:
+            self.save_language_to_config()
+        self.retranslate()
+        for listener in list(self._listeners):
+            try:
+                listener(self.is_rtl)
+            except Exception as e:
+                print(f"Error applying language direction: {e}")
+
+    def save_language_to_config(self):
+        """Store the current language in the configuration file, keeping other settings"""
+        config = {}
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as config_file:
+                config = json.load(config_file)
+        except (FileNotFoundError, ValueError):
+            pass
+        config["app_language"] = self.current_language
+        try:
+            with open(CONFIG_FILE, "w", encoding="utf-8") as config_file:
+                json.dump(config, config_file, ensure_ascii=False, indent=4)
+        except OSError as e:
+            print(f"Error saving language to config: {e}")
 
     def translate(self, key):
         """Translate a key to the current language
@@ -56,5 +199,48 @@ class LanguageManager:
         """
         return self.translations.get(key, key)
 
+    def bind(self, widget, key, option="text", setter=None):
+        """Translate a widget option now and whenever the language changes
+
+        Args:
+            widget: Tk widget that owns the text
+            key: Translation key
+            option: Widget option to set with configure(); with a setter it
+                only names the binding, e.g. "heading:name"
+            setter: setter(text) for texts that are not a widget option,
+                such as Treeview headings, notebook tabs or window titles
+
+        Returns:
+            Translated string
+        """
+        if setter is None:
+            setter = lambda text: widget.configure(**{option: text})
+        # Re-binding the same option replaces the earlier binding
+        self._bindings[(str(widget), option)] = (widget, key, setter)
+        text = self.translate(key)
+        setter(text)
+        return text
+
+    def retranslate(self):
+        """Apply the current language to every bound widget that still exists"""
+        for binding_key, (widget, key, setter) in list(self._bindings.items()):
+            try:
+                if not widget.winfo_exists():
+                    del self._bindings[binding_key]
+                    continue
+                setter(self.translate(key))
+            except Exception:
+                # The widget was destroyed together with its Tk interpreter
+                del self._bindings[binding_key]
+
+    def add_listener(self, callback):
+        """Register callback(is_rtl), called after every set_language()"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Unregister a callback added with add_listener()"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
 # Singleton instance of LanguageManager
 language_manager = LanguageManager()
@@ -0,0 +1,363 @@
+"""
+Versioned schema migrations for the Pipes database
+
+The schema version is stored in PRAGMA user_version. Each migration has
+schema steps, run together in one transaction with the version bump, and optional backfills
+that update large tables in batches of rows, each batch committed on its
+own so other connections can read and write in between. Every step is
+idempotent, so a migration interrupted halfway is simply run again.
+"""
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple, Union
+
+# Rows updated per transaction by backfills
+MIGRATION_BATCH_SIZE = 5000
+
+def add_column(table: str, column: str, declaration: str) -> Callable[[sqlite3.Connection], None]:
+    """Schema step adding a column unless it already exists
+
+    ADD COLUMN only changes the table definition, it does not rewrite rows,
+    so it is instant on large tables.
+
+    Args:
+        table: Table name
+        column: New column name
+        declaration: Column type and constraints
+    """
+    def step(conn):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    step.__doc__ = f"ALTER TABLE {table} ADD COLUMN {column} {declaration}"
+    return step
+
+@dataclass
+class Backfill:
+    """Batched UPDATE over a table in rowid order
+
+    sql receives the first and last rowid of the batch as its two
+    parameters and must skip rows that are already done, so it can be
+    resumed.
+    """
+    table: str
+    sql: str
+
+@dataclass
+class Migration:
+    """One schema version"""
+    version: int
+    description: str
+    schema: Tuple[Union[str, Callable[[sqlite3.Connection], None]], ...] = ()
+    backfills: Tuple[Backfill, ...] = ()
+
+@dataclass
+class MigrationReport:
+    """Timing of one applied (or dry-run) migration"""
+    version: int
+    description: str
+    seconds: float = 0.0
+    rows: int = 0
+    batches: int = 0
+    dry_run: bool = False
+
+MIGRATIONS = (
+    Migration(
+        1, "Project details from the user guide",
+        schema=(
+            add_column("projects", "project_number", "TEXT"),
+            add_column("projects", "description", "TEXT"),
+            add_column("projects", "start_date", "DATE"),
+            add_column("projects", "end_date", "DATE"),
+            add_column("projects", "city", "TEXT"),
+            add_column("projects", "site", "TEXT"),
+            "CREATE INDEX IF NOT EXISTS idx_projects_project_number ON projects (project_number)",
+        ),
+        backfills=(
+            # Existing projects only have a free-text location, keep it as the city
+            Backfill("projects", "UPDATE projects SET city = location WHERE id BETWEEN ? AND ? AND city IS NULL"),
+        ),
+    ),
+    Migration(
+        2, "Pipe sections, inspection events and event codes",
+        schema=(
+            """
+            CREATE TABLE IF NOT EXISTS event_codes (
+                code TEXT PRIMARY KEY,
+                category TEXT,
+                description TEXT
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+                section_number INTEGER,
+                pipe_number TEXT,
+                started_at TIMESTAMP,
+                shape TEXT,
+                diameter INTEGER,
+                material TEXT,
+                usage TEXT,
+                upstream_manhole TEXT,
+                downstream_manhole TEXT,
+                length REAL,
+                video_path TEXT,
+                street TEXT,
+                city TEXT,
+                start_depth REAL,
+                end_depth REAL,
+                flow_direction TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                section_id INTEGER NOT NULL REFERENCES sections (id) ON DELETE CASCADE,
+                event_code TEXT NOT NULL REFERENCES event_codes (code),
+                distance REAL NOT NULL,
+                video_time REAL,
+                severity INTEGER CHECK (severity BETWEEN 0 AND 5),
+                clock_start INTEGER CHECK (clock_start BETWEEN 1 AND 12),
+                clock_end INTEGER CHECK (clock_end BETWEEN 1 AND 12),
+                defect_length REAL,
+                defect_width REAL,
+                blockage_percent REAL CHECK (blockage_percent BETWEEN 0 AND 100),
+                notes TEXT
+            )
+            """,
+            # Sections of a project in section order; also serves the project_id foreign key
+            "CREATE INDEX IF NOT EXISTS idx_sections_project ON sections (project_id, section_number)",
+            # Events of a section along the pipe; severity makes severity filters index-only
+            "CREATE INDEX IF NOT EXISTS idx_events_section_distance ON events (section_id, distance, severity)",
+            # Events by code; also serves the event_code foreign key
+            "CREATE INDEX IF NOT EXISTS idx_events_code ON events (event_code)",
+        ),
+    ),
+    Migration(
+        3, "Slope readings and the overlay OCR cache",
+        schema=(
+            """
+            CREATE TABLE IF NOT EXISTS slope_readings (
+                section_id INTEGER NOT NULL REFERENCES sections (id) ON DELETE CASCADE,
+                frame_index INTEGER NOT NULL,
+                video_time REAL NOT NULL,
+                distance REAL NOT NULL,
+                slope REAL NOT NULL,
+                PRIMARY KEY (section_id, frame_index)
+            ) WITHOUT ROWID
+            """,
+            # Raw overlay text per video content and frame, so extraction
+            # reruns skip frames that were already read
+            """
+            CREATE TABLE IF NOT EXISTS overlay_ocr_cache (
+                video_hash TEXT NOT NULL,
+                frame_index INTEGER NOT NULL,
+                text TEXT,
+                PRIMARY KEY (video_hash, frame_index)
+            ) WITHOUT ROWID
+            """,
+        ),
+    ),
+    Migration(
+        4, "Blob store references for project images and event snapshots",
+        schema=(
+            # One row per file of the blob store (see blobstore.py); rows
+            # reference blobs by hash and the triggers below count them
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+            """,
+            add_column("projects", "image_hash", "TEXT REFERENCES blobs (hash)"),
+            add_column("events", "snapshot_hash", "TEXT REFERENCES blobs (hash)"),
+            # Unreferenced blobs are found without scanning the table
+            "CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs (refcount) WHERE refcount <= 0",
+            *(
+                statement
+                for table, column in (("projects", "image_hash"), ("events", "snapshot_hash"))
+                for statement in (
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_{column}_insert AFTER INSERT ON {table}
+                    WHEN NEW.{column} IS NOT NULL
+                    BEGIN
+                        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.{column};
+                    END
+                    """,
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_{column}_update AFTER UPDATE OF {column} ON {table}
+                    WHEN OLD.{column} IS NOT NEW.{column}
+                    BEGIN
+                        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.{column};
+                        UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.{column};
+                    END
+                    """,
+                    # Also fires for rows deleted by ON DELETE CASCADE
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_{column}_delete AFTER DELETE ON {table}
+                    WHEN OLD.{column} IS NOT NULL
+                    BEGIN
+                        UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.{column};
+                    END
+                    """,
+                )
+            ),
+        ),
+    ),
+    Migration(
+        5, "Manifest of videos ingested from field crew folders",
+        schema=(
+            # One row per video content (video.frames.video_fingerprint), so
+            # an interrupted or repeated ingest skips videos already added;
+            # deleting the section forgets the video
+            """
+            CREATE TABLE IF NOT EXISTS ingested_videos (
+                fingerprint TEXT PRIMARY KEY,
+                section_id INTEGER NOT NULL REFERENCES sections (id) ON DELETE CASCADE,
+                path TEXT NOT NULL,
+                duration REAL,
+                width INTEGER,
+                height INTEGER,
+                ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+            """,
+            # Serves the section_id foreign key
+            "CREATE INDEX IF NOT EXISTS idx_ingested_videos_section ON ingested_videos (section_id)",
+        ),
+    ),
+)
+
+# Version of a database with every migration applied
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Get the schema version of a database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def pending_migrations(conn: sqlite3.Connection, target: Optional[int] = None) -> List[Migration]:
+    """Get the migrations not applied yet, in order
+
+    Args:
+        conn: Database connection
+        target: Last version to include (latest by default)
+    """
+    version = get_version(conn)
+    target = SCHEMA_VERSION if target is None else target
+    return [migration for migration in MIGRATIONS if version < migration.version <= target]
+
+def _run_backfill(conn, backfill: Backfill, batch_size: int, report: MigrationReport,
+                  progress: Optional[Callable[[str], None]]):
+    """Run a backfill in rowid batches, committing after every batch
+
+    Each batch takes the next batch_size rows after the previous one from
+    the rowid order, so gaps in the rowids cost nothing.
+    """
+    low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {backfill.table}").fetchone()
+    if low is None:
+        return
+    next_batch = (f"SELECT MAX(rowid) FROM (SELECT rowid FROM {backfill.table} "
+                  f"WHERE rowid > ? ORDER BY rowid LIMIT ?)")
+    shown = None
+    end = low - 1
+    while end < high:
+        start = end + 1
+        end = conn.execute(next_batch, (end, batch_size)).fetchone()[0]
+        if end is None:
+            # The remaining rows were deleted meanwhile
+            break
+        with conn:
+            report.rows += conn.execute(backfill.sql, (start, end)).rowcount
+        report.batches += 1
+        percent = f"{(end - low + 1) / (high - low + 1):.0%}"
+        if progress and percent != shown:
+            shown = percent
+            progress(f"Migration {report.version}: {percent}")
+
+def apply_migration(conn: sqlite3.Connection, migration: Migration, batch_size: int = MIGRATION_BATCH_SIZE,
+                    progress: Optional[Callable[[str], None]] = None) -> MigrationReport:
+    """Apply a single migration and record its version
+
+    Args:
+        conn: Database connection
+        migration: Migration to apply
+        batch_size: Rows per backfill transaction
+        progress: progress(message) after every backfill batch
+
+    Returns:
+        MigrationReport with the time taken and rows updated
+    """
+    report = MigrationReport(migration.version, migration.description)
+    start = time.perf_counter()
+
+    # sqlite3 does not open a transaction for DDL by itself, so BEGIN
+    # explicitly: a failing step then rolls back every step before it
+    with conn:
+        conn.execute("BEGIN")
+        for step in migration.schema:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+        if not migration.backfills:
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+
+    if migration.backfills:
+        for backfill in migration.backfills:
+            _run_backfill(conn, backfill, batch_size, report, progress)
+        # The version only moves once every batch is done; the schema steps
+        # are idempotent, so an interrupted backfill simply runs again
+        with conn:
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None, dry_run: bool = False,
+            batch_size: int = MIGRATION_BATCH_SIZE,
+            progress: Optional[Callable[[str], None]] = None) -> List[MigrationReport]:
+    """Bring a database up to a schema version
+
+    Args:
+        conn: Database connection
+        target: Version to migrate to (latest by default)
+        dry_run: Apply the migrations to an in-memory copy of the database
+            instead, to see what would run and how long it takes
+        batch_size: Rows per backfill transaction
+        progress: progress(message) after every backfill batch
+
+    Returns:
+        One MigrationReport per applied migration
+    """
+    if conn.in_transaction:
+        conn.commit()
+    if dry_run:
+        # Imported here, database imports this module
+        import database
+        # The copy gets the pragmas of the live database, e.g. temp_store,
+        # so the timings carry over
+        copy = database.configure_connection(sqlite3.connect(":memory:"))
+        try:
+            conn.backup(copy)
+            reports = migrate(copy, target, batch_size=batch_size, progress=progress)
+        finally:
+            copy.close()
+        for report in reports:
+            report.dry_run = True
+        return reports
+
+    return [apply_migration(conn, migration, batch_size, progress) for migration in pending_migrations(conn, target)]
+
+def format_report(reports: List[MigrationReport]) -> str:
+    """Format migration reports as a table for the console"""
+    if not reports:
+        return "Database schema is up to date"
+    lines = [f"{'version':>7}  {'seconds':>8}  {'rows':>9}  {'batches':>7}  description"]
+    for report in reports:
+        lines.append(f"{report.version:>7}  {report.seconds:>8.2f}  {report.rows:>9}  {report.batches:>7}  {report.description}")
+    total = sum(report.seconds for report in reports)
+    lines.append(f"{'total':>7}  {total:>8.2f}" + ("  (dry run, nothing was changed)" if reports[0].dry_run else ""))
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+"""
+Inspection event and event code models for Pipes application
+"""
+from dataclasses import dataclass, fields
+from typing import Optional
+
+# Column order expected by Event.row_factory
+COLUMNS = ("id, section_id, event_code, distance, video_time, severity, clock_start, clock_end, "
+           "defect_length, defect_width, blockage_percent, notes, snapshot_hash")
+
+# Column order expected by EventCode.row_factory
+CODE_COLUMNS = "code, category, description"
+
+# Event code categories, they decide which extra fields an event has
+CATEGORY_STRUCTURAL = "structural"  # Cracks, fractures: clock range, defect length and width
+CATEGORY_OPERATIONAL = "operational"  # Operation and maintenance: defect length, blockage percent
+CATEGORY_CONNECTION = "connection"  # Junctions: clock position, width
+
+# Highest severity grade
+MAX_SEVERITY = 5
+
+@dataclass(slots=True)
+class Event:
+    """Defect or observation recorded at a distance along a section"""
+    section_id: int
+    event_code: str
+    distance: float  # Meters from the start of the section
+    video_time: Optional[float] = None  # Seconds into the section video
+    severity: Optional[int] = None  # 0 to MAX_SEVERITY
+    clock_start: Optional[int] = None  # Clock position 1-12
+    clock_end: Optional[int] = None
+    defect_length: Optional[float] = None
+    defect_width: Optional[float] = None
+    blockage_percent: Optional[float] = None
+    notes: Optional[str] = None
+    snapshot_hash: Optional[str] = None  # Snapshot image in the blob store
+    id: Optional[int] = None
+
+    @staticmethod
+    def row_factory(cursor, row):
+        """sqlite3 row factory building an Event straight from the row tuple
+
+        The query must select COLUMNS in that order.
+
+        Args:
+            cursor: sqlite3 cursor (unused)
+            row: Row tuple
+
+        Returns:
+            Event instance
+        """
+        return Event(*row[1:], row[0])
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create an Event instance from a dictionary
+
+        Args:
+            data: Dictionary containing event data
+
+        Returns:
+            Event instance
+        """
+        return cls(**{field.name: data.get(field.name) for field in fields(cls)})
+
+    def to_dict(self):
+        """Convert event to dictionary
+
+        Returns:
+            Dictionary representation of event
+        """
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+@dataclass(slots=True)
+class EventCode:
+    """Entry of the event code catalog"""
+    code: str
+    category: Optional[str] = None
+    description: Optional[str] = None
+
+    @staticmethod
+    def row_factory(cursor, row):
+        """sqlite3 row factory building an EventCode from a CODE_COLUMNS row"""
+        return EventCode(*row)
+
+    def to_dict(self):
+        """Convert event code to dictionary
+
+        Returns:
+            Dictionary representation of event code
+        """
+        return {"code": self.code, "category": self.category, "description": self.description}
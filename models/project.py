@@ -5,13 +5,48 @@ from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime
 
-@dataclass
+# Column order expected by Project.row_factory
+COLUMNS = "id, name, location, created_at, project_number, description, start_date, end_date, city, site, image_hash"
+
+@dataclass(slots=True)
 class Project:
     """Project data model"""
     name: str
     location: str
     id: Optional[int] = None
     created_at: Optional[str] = None
+    project_number: Optional[str] = None
+    description: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    city: Optional[str] = None
+    site: Optional[str] = None
+    image_hash: Optional[str] = None  # Project image in the blob store
+    
+    @staticmethod
+    def row_factory(cursor, row):
+        """sqlite3 row factory building a Project straight from the row tuple
+        
+        The query must select COLUMNS in that order.
+        
+        Args:
+            cursor: sqlite3 cursor (unused)
+            row: Row tuple
+            
+        Returns:
+            Project instance
+        """
+        return Project(row[1], row[2], row[0], *row[3:])
+    
+    @property
+    def created_datetime(self) -> Optional[datetime]:
+        """created_at parsed as a datetime, None if missing or malformed"""
+        if not self.created_at:
+            return None
+        try:
+            return datetime.fromisoformat(self.created_at)
+        except (TypeError, ValueError):
+            return None
     
     @classmethod
     def from_dict(cls, data):
@@ -27,7 +62,14 @@ class Project:
             id=data.get("id"),
             name=data.get("name"),
             location=data.get("location"),
-            created_at=data.get("created_at")
+            created_at=data.get("created_at"),
+            project_number=data.get("project_number"),
+            description=data.get("description"),
+            start_date=data.get("start_date"),
+            end_date=data.get("end_date"),
+            city=data.get("city"),
+            site=data.get("site"),
+            image_hash=data.get("image_hash")
         )
     
     def to_dict(self):
@@ -40,5 +82,12 @@ class Project:
             "id": self.id,
             "name": self.name,
             "location": self.location,
-            "created_at": self.created_at
+            "created_at": self.created_at,
+            "project_number": self.project_number,
+            "description": self.description,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "city": self.city,
+            "site": self.site,
+            "image_hash": self.image_hash
         }
\ No newline at end of file
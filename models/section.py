@@ -0,0 +1,67 @@
+"""
+Pipe section model for Pipes application
+"""
+from dataclasses import dataclass, fields
+from typing import Optional
+
+# Column order expected by Section.row_factory
+COLUMNS = ("id, project_id, section_number, pipe_number, started_at, shape, diameter, material, usage, "
+           "upstream_manhole, downstream_manhole, length, video_path, street, city, start_depth, end_depth, "
+           "flow_direction")
+
+@dataclass(slots=True)
+class Section:
+    """Inspected pipe section between two manholes"""
+    project_id: int
+    section_number: Optional[int] = None
+    pipe_number: Optional[str] = None
+    started_at: Optional[str] = None
+    shape: Optional[str] = None
+    diameter: Optional[int] = None  # Millimeters
+    material: Optional[str] = None
+    usage: Optional[str] = None  # Water or sewer
+    upstream_manhole: Optional[str] = None
+    downstream_manhole: Optional[str] = None
+    length: Optional[float] = None  # Meters, estimated
+    video_path: Optional[str] = None
+    street: Optional[str] = None
+    city: Optional[str] = None
+    start_depth: Optional[float] = None
+    end_depth: Optional[float] = None
+    flow_direction: Optional[str] = None
+    id: Optional[int] = None
+
+    @staticmethod
+    def row_factory(cursor, row):
+        """sqlite3 row factory building a Section straight from the row tuple
+
+        The query must select COLUMNS in that order.
+
+        Args:
+            cursor: sqlite3 cursor (unused)
+            row: Row tuple
+
+        Returns:
+            Section instance
+        """
+        return Section(*row[1:], row[0])
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a Section instance from a dictionary
+
+        Args:
+            data: Dictionary containing section data
+
+        Returns:
+            Section instance
+        """
+        return cls(**{field.name: data.get(field.name) for field in fields(cls)})
+
+    def to_dict(self):
+        """Convert section to dictionary
+
+        Returns:
+            Dictionary representation of section
+        """
+        return {field.name: getattr(self, field.name) for field in fields(self)}
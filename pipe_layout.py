@@ -0,0 +1,268 @@
+"""
+Pipe graph layout: event marker positions, clustering and label placement
+
+The pipe graph draws a section as a pipe with a marker per event. With
+thousands of events per section, placing markers and labels on every
+redraw is the expensive part, so it is done once per section content:
+layout_for() sorts the events along the pipe into NumPy arrays and keeps
+the result in a small LRU shared by the sections screen widget and the
+PDF report.
+
+Markers are clustered for a resolution: events closer than one marker
+slot share a marker colored by their highest severity, so zoomed out a
+section never draws more markers than it has slots, and zoomed in every
+event gets its own marker again. Labels are placed greedily into rows,
+leaving out labels that would overlap in every row.
+
+rasterize() draws the pipe and the markers of a layout into an image, so
+the PDF report embeds the graph of a large section as one picture
+instead of thousands of vector lines.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Marker colors of the pipe graph by severity as RGB (ungraded events are gray)
+SEVERITY_COLORS = {
+    None: (150, 150, 150),
+    0: (60, 150, 60),
+    1: (60, 150, 60),
+    2: (200, 170, 0),
+    3: (230, 120, 0),
+    4: (210, 40, 40),
+    5: (140, 0, 0),
+}
+
+# Severity stored for ungraded events, ranks below every grade
+UNGRADED = -1
+
+# Section layouts kept in memory
+LAYOUT_CACHE_SIZE = 32
+
+# Marker sets per layout kept for recent widths and zoom ranges
+MARKER_CACHE_SIZE = 8
+
+PIPE_COLOR = (235, 235, 235)
+OUTLINE_COLOR = (0, 0, 0)
+
+@dataclass(slots=True)
+class Markers:
+    """Markers of a layout at one resolution, in position order"""
+    position: np.ndarray  # Fraction of the pipe length of the first event, float64
+    count: np.ndarray  # Events in the marker, int64
+    severity: np.ndarray  # Highest severity in the marker, int8 (UNGRADED if none)
+    first: np.ndarray  # Layout index of the first event in the marker, int64
+    row: np.ndarray  # Label row, -1 for markers without a label, int8
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+@dataclass(slots=True)
+class PipeLayout:
+    """Events of a section sorted along the pipe"""
+    key: str  # Digest of the section length and the events it was computed from
+    length: float  # Meters drawn from end to end
+    position: np.ndarray  # Fraction of the length per event, sorted, float64
+    event_id: np.ndarray  # int64, -1 for unsaved events
+    severity: np.ndarray  # int8, UNGRADED if not graded
+    code: List[str]
+    _markers: "OrderedDict" = field(default_factory=OrderedDict, repr=False)
+    _index: Optional[Dict[int, int]] = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    def index_of(self, event_id: int) -> Optional[int]:
+        """Layout index of an event, None if the section has no such event"""
+        if self._index is None:
+            self._index = {int(event_id): index for index, event_id in enumerate(self.event_id.tolist())}
+        return self._index.get(event_id)
+
+    def nearest(self, fraction: float, tolerance: float) -> Optional[int]:
+        """Layout index of the event closest to a position within a tolerance
+
+        Args:
+            fraction: Position as a fraction of the pipe length
+            tolerance: Largest distance accepted, as a fraction of the length
+        """
+        if not len(self.position):
+            return None
+        right = int(np.searchsorted(self.position, fraction))
+        candidates = [index for index in (right - 1, right) if 0 <= index < len(self.position)]
+        best = min(candidates, key=lambda index: abs(self.position[index] - fraction))
+        return best if abs(self.position[best] - fraction) <= tolerance else None
+
+    def markers(self, slots: int, start: float = 0.0, end: float = 1.0, label_slots: int = 0,
+                label_rows: int = 1) -> Markers:
+        """Cluster the events between two positions into at most slots markers
+
+        The range is divided into slots equal bins; the events of a bin share
+        one marker. Results are cached per arguments, so redrawing at the same
+        size and zoom, or printing after viewing, reuses them.
+
+        Args:
+            slots: Marker bins across the range, e.g. the width in pixels
+                divided by the smallest marker spacing
+            start, end: Visible range as fractions of the length
+            label_slots: Labels that fit side by side in one row, 0 for no labels
+            label_rows: Rows labels are stacked into
+
+        Returns:
+            Markers of the events inside the range
+        """
+        key = (slots, round(start, 9), round(end, 9), label_slots, label_rows)
+        markers = self._markers.get(key)
+        if markers is not None:
+            self._markers.move_to_end(key)
+            return markers
+
+        low = int(np.searchsorted(self.position, start, side="left"))
+        high = int(np.searchsorted(self.position, end, side="right"))
+        position = self.position[low:high]
+        span = max(end - start, 1e-12)
+        bins = np.minimum(((position - start) / span * slots).astype(np.int64), slots - 1)
+        if len(bins):
+            boundaries = np.flatnonzero(np.diff(bins)) + 1
+            starts = np.concatenate(([0], boundaries))
+            count = np.diff(np.concatenate((starts, [len(bins)])))
+            severity = np.maximum.reduceat(self.severity[low:high], starts)
+            markers = Markers(position[starts], count, severity.astype(np.int8), starts + low,
+                              np.full(len(starts), -1, np.int8))
+        else:
+            markers = Markers(np.empty(0), np.empty(0, np.int64), np.empty(0, np.int8), np.empty(0, np.int64),
+                              np.empty(0, np.int8))
+        if label_slots:
+            markers.row = place_labels((markers.position - start) / span, 1.0 / label_slots, label_rows)
+
+        self._markers[key] = markers
+        while len(self._markers) > MARKER_CACHE_SIZE:
+            self._markers.popitem(last=False)
+        return markers
+
+    def label(self, markers: Markers, index: int) -> str:
+        """Text of a marker's label: the event code, or the event count of a cluster"""
+        count = int(markers.count[index])
+        return self.code[int(markers.first[index])] if count == 1 else f"×{count}"
+
+def place_labels(position: np.ndarray, width: float, rows: int = 1) -> np.ndarray:
+    """Place labels centered on sorted positions into rows without overlaps
+
+    Each label goes into the first row where it clears the previous label;
+    labels that fit in no row are left out.
+
+    Args:
+        position: Label centers, sorted
+        width: Label width in the same unit as position
+        rows: Rows to stack labels into
+
+    Returns:
+        Row per label, -1 for labels left out (int8)
+    """
+    row_of = np.full(len(position), -1, np.int8)
+    row_end = [-np.inf] * rows
+    for index, center in enumerate(position.tolist()):
+        left = center - width / 2
+        for row in range(rows):
+            if left >= row_end[row]:
+                row_of[index] = row
+                row_end[row] = center + width / 2
+                break
+    return row_of
+
+def _event_arrays(events: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Distances, IDs, severities and codes of events in list order"""
+    count = len(events)
+    distance = np.fromiter((event.distance for event in events), np.float64, count)
+    event_id = np.fromiter((-1 if event.id is None else event.id for event in events), np.int64, count)
+    severity = np.fromiter((UNGRADED if event.severity is None else event.severity for event in events),
+                           np.int8, count)
+    return distance, event_id, severity, [event.event_code for event in events]
+
+def _layout_key(length: float, arrays) -> str:
+    distance, event_id, severity, code = arrays
+    digest = hashlib.sha1(repr(length).encode())
+    for array in (distance, event_id, severity):
+        digest.update(array.tobytes())
+    digest.update("\0".join(code).encode())
+    return digest.hexdigest()
+
+def compute_layout(length: float, events: Sequence, arrays=None, key: Optional[str] = None) -> PipeLayout:
+    """Sort events along a pipe of a given length
+
+    Args:
+        length: Length of the drawn pipe in meters
+        events: Events with id, distance, severity and event_code
+        arrays, key: Results of _event_arrays() and _layout_key(), computed if omitted
+    """
+    distance, event_id, severity, code = arrays = arrays or _event_arrays(events)
+    key = key or _layout_key(length, arrays)
+    order = np.argsort(distance, kind="stable")
+    position = np.clip(distance[order] / length, 0.0, 1.0)
+    return PipeLayout(key, length, position, event_id[order], severity[order],
+                      [code[index] for index in order.tolist()])
+
+_layouts = OrderedDict()
+_layouts_lock = threading.Lock()
+
+def layout_for(length: float, events: Sequence) -> PipeLayout:
+    """Get the layout of a section's events, computing it on first use
+
+    Layouts are cached by content, so an edited event gives a new layout
+    while reselecting or printing an unchanged section reuses the old one.
+
+    Args:
+        length: Length of the drawn pipe in meters
+        events: Events of the section
+    """
+    arrays = _event_arrays(events)
+    key = _layout_key(length, arrays)
+    with _layouts_lock:
+        layout = _layouts.get(key)
+        if layout is not None:
+            _layouts.move_to_end(key)
+            return layout
+    layout = compute_layout(length, events, arrays, key)
+    with _layouts_lock:
+        _layouts[key] = layout
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return layout
+
+def severity_color(severity: int) -> Tuple[int, int, int]:
+    """RGB marker color of a severity as stored in a layout"""
+    return SEVERITY_COLORS.get(None if severity == UNGRADED else int(severity), SEVERITY_COLORS[None])
+
+def rasterize(layout: PipeLayout, width: int, height: int, marker_spacing: int = 3) -> np.ndarray:
+    """Draw the pipe and its markers into an image, without text
+
+    Args:
+        layout: Layout of the section
+        width, height: Image size in pixels; the pipe is drawn across the
+            full width, a fifth of the height thick, centered vertically
+        marker_spacing: Smallest distance between markers in pixels
+
+    Returns:
+        BGR image (uint8)
+    """
+    import cv2
+
+    image = np.full((height, width, 3), 255, np.uint8)
+    pipe_height = max(2, height // 5)
+    pipe_top = (height - pipe_height) // 2
+    cv2.rectangle(image, (0, pipe_top), (width - 1, pipe_top + pipe_height), PIPE_COLOR[::-1], cv2.FILLED)
+    cv2.rectangle(image, (0, pipe_top), (width - 1, pipe_top + pipe_height), OUTLINE_COLOR[::-1], 1)
+
+    markers = layout.markers(max(1, width // marker_spacing))
+    thickness = max(1, marker_spacing - 1)
+    overhang = pipe_height // 2
+    x = np.minimum((markers.position * (width - 1)).round().astype(np.int64), width - 1)
+    for marker_x, severity, count in zip(x.tolist(), markers.severity.tolist(), markers.count.tolist()):
+        # Clusters stand out above the pipe a bit further than single events
+        top = pipe_top - overhang - (overhang // 2 if count > 1 else 0)
+        cv2.line(image, (marker_x, top), (marker_x, pipe_top + pipe_height + overhang),
+                 severity_color(severity)[::-1], thickness)
+    return image
@@ -0,0 +1,251 @@
+"""
+Compressed project archives for moving whole projects between machines
+
+An archive is a ZIP file holding, per project, its rows (project,
+sections, events, slope readings and the event codes used) as JSON, and
+the media they reference: blob store images and section videos. Media
+are stored once per content however many rows or projects reference
+them, and on import they are only written if the target machine does
+not have them yet. Rows are deflated; images and videos, which are
+already compressed, are stored as they are.
+
+    manifest.json              format, version, schema version, projects
+    projects/<id>.json         rows, and the archive member of each section video
+    blobs/<sha256>             blob store content
+    media/<fingerprint><ext>   section videos
+"""
+import os
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional
+
+import database
+import migrations
+from instrumentation import instrumentation
+from video.frames import video_fingerprint
+
+ARCHIVE_FORMAT = "pipes-project-archive"
+ARCHIVE_VERSION = 1
+ARCHIVE_EXTENSION = ".pipes"
+MANIFEST = "manifest.json"
+
+# zlib level of the row members
+COMPRESS_LEVEL = 6
+
+# Leading bytes of content that is already compressed and is stored as is
+COMPRESSED_SIGNATURES = (
+    b"\xff\xd8\xff",  # JPEG
+    b"\x89PNG",
+    b"GIF8",
+    b"RIFF",  # WebP, AVI
+    b"PK\x03\x04",
+    b"%PDF",
+)
+
+@dataclass
+class ArchiveResult:
+    """Outcome of writing or reading an archive"""
+    path: str
+    projects: List[int] = field(default_factory=list)  # IDs in the source, or the new IDs after import
+    blobs: int = 0  # Distinct blob files written
+    media: int = 0  # Distinct videos written
+    seconds: float = 0.0
+
+def media_dir(database_file: Optional[str] = None) -> str:
+    """Directory of the videos imported from archives, next to the database file"""
+    database_file = os.path.abspath(database_file or database.active_connection_manager().source_file)
+    name = os.path.splitext(os.path.basename(database_file))[0]
+    return os.path.join(os.path.dirname(database_file), f"{name}-media")
+
+def _compress_type(path: str) -> int:
+    """ZIP_STORED for content that is already compressed, ZIP_DEFLATED otherwise"""
+    with open(path, "rb") as source:
+        header = source.read(8)
+    return zipfile.ZIP_STORED if header.startswith(COMPRESSED_SIGNATURES) else zipfile.ZIP_DEFLATED
+
+@instrumentation.timed("archive.export")
+def export_archive(path: str, project_ids: Iterable[int], include_videos: bool = True,
+                   progress: Optional[Callable[[int, int], None]] = None) -> ArchiveResult:
+    """Write projects and their media to an archive
+
+    The archive is written to a temporary file and moved into place when
+    complete.
+
+    Args:
+        path: Archive file
+        project_ids: Projects to include
+        include_videos: Include the section videos, the largest part by far
+        progress: progress(projects_done, projects_total) after every project
+
+    Returns:
+        ArchiveResult
+
+    Raises:
+        ValueError: If a project does not exist
+    """
+    start = time.perf_counter()
+    project_ids = list(project_ids)
+    result = ArchiveResult(path)
+    written_blobs = set()
+    written_media = {}  # Video fingerprint to archive member
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as archive:
+            projects = []
+            for done, project_id in enumerate(project_ids, 1):
+                rows = database.get_project_rows(project_id)
+                if rows is None:
+                    raise ValueError(f"Project {project_id} not found")
+
+                hashes = [rows["projects"][0].get("image_hash")] + [event.get("snapshot_hash")
+                                                                     for event in rows["events"]]
+                for blob_hash in hashes:
+                    if not blob_hash or blob_hash in written_blobs:
+                        continue
+                    handle = database.get_blob(blob_hash)
+                    if not handle.exists():
+                        print(f"Blob {blob_hash} is missing, the archive will not include it")
+                        continue
+                    archive.write(handle.path, f"blobs/{blob_hash}", compress_type=_compress_type(handle.path))
+                    written_blobs.add(blob_hash)
+
+                videos = {}
+                for section in rows["sections"] if include_videos else ():
+                    video_path = section.get("video_path")
+                    if not video_path or not os.path.isfile(video_path):
+                        continue
+                    fingerprint = video_fingerprint(video_path)
+                    if fingerprint not in written_media:
+                        member = f"media/{fingerprint}{os.path.splitext(video_path)[1].lower()}"
+                        archive.write(video_path, member, compress_type=zipfile.ZIP_STORED)
+                        written_media[fingerprint] = member
+                    videos[str(section["id"])] = written_media[fingerprint]
+
+                archive.writestr(f"projects/{project_id}.json",
+                                 json.dumps({"rows": rows, "videos": videos}, ensure_ascii=False))
+                project = rows["projects"][0]
+                projects.append({"id": project_id, "name": project["name"], "sections": len(rows["sections"]),
+                                 "events": len(rows["events"])})
+                result.projects.append(project_id)
+                if progress:
+                    progress(done, len(project_ids))
+
+            archive.writestr(MANIFEST, json.dumps({
+                "format": ARCHIVE_FORMAT,
+                "version": ARCHIVE_VERSION,
+                "schema_version": migrations.SCHEMA_VERSION,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "projects": projects,
+            }, ensure_ascii=False, indent=2))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    result.blobs = len(written_blobs)
+    result.media = len(written_media)
+    result.seconds = time.perf_counter() - start
+    return result
+
+def read_manifest(path: str) -> dict:
+    """Read the manifest of an archive
+
+    Raises:
+        ValueError: If the file is not a project archive of a supported version
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            manifest = json.loads(archive.read(MANIFEST))
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        raise ValueError(f"Not a project archive: {path} ({e})")
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"Not a project archive: {path}")
+    if manifest.get("version", 0) > ARCHIVE_VERSION:
+        raise ValueError(f"Archive version {manifest['version']} is newer than this version of Pipes")
+    return manifest
+
+def _extract_media(archive: zipfile.ZipFile, member: str, directory: str) -> str:
+    """Extract a video to a temporary file in the media directory; returns its path"""
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as temp_file, archive.open(member) as source:
+            shutil.copyfileobj(source, temp_file, 1 << 20)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+@instrumentation.timed("archive.import")
+def import_archive(path: str, progress: Optional[Callable[[int, int], None]] = None) -> ArchiveResult:
+    """Add the projects of an archive to the current database
+
+    Every project is added in its own transaction with new IDs. Images
+    already in the blob store and videos already extracted are not
+    written again.
+
+    Args:
+        path: Archive file
+        progress: progress(projects_done, projects_total) after every project
+
+    Returns:
+        ArchiveResult with the IDs of the added projects
+
+    Raises:
+        ValueError: If the file is not a supported archive or a project could not be added
+    """
+    start = time.perf_counter()
+    manifest = read_manifest(path)
+    result = ArchiveResult(path)
+    directory = media_dir()
+    store = database.get_blob_store()
+    with zipfile.ZipFile(path) as archive:
+        members = set(archive.namelist())
+
+        def blob_content(blob_hash):
+            member = f"blobs/{blob_hash}"
+            if member not in members:
+                return None
+            if not os.path.exists(store.path(blob_hash)):
+                result.blobs += 1
+            return archive.read(member)
+
+        total = len(manifest["projects"])
+        for done, project in enumerate(manifest["projects"], 1):
+            data = json.loads(archive.read(f"projects/{project['id']}.json"))
+            rows = data["rows"]
+            # Videos are only moved into place once the rows are committed,
+            # a project that fails to import leaves no files behind
+            extracted = {}  # Target path to temporary file
+            try:
+                for section in rows["sections"]:
+                    member = data["videos"].get(str(section["id"]))
+                    if not member:
+                        continue
+                    target = os.path.join(directory, os.path.basename(member))
+                    if not os.path.exists(target) and target not in extracted:
+                        extracted[target] = _extract_media(archive, member, directory)
+                    section["video_path"] = target
+                project_id = database.add_project_rows(rows, blob_content)
+                if project_id is None:
+                    raise ValueError(f"Could not add project {project['id']} ({project['name']})")
+                for target, temp_path in list(extracted.items()):
+                    if not os.path.exists(target):
+                        os.replace(temp_path, target)
+                        result.media += 1
+                        del extracted[target]
+            finally:
+                for temp_path in extracted.values():
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+            result.projects.append(project_id)
+            if progress:
+                progress(done, total)
+    result.seconds = time.perf_counter() - start
+    return result
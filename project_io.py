@@ -0,0 +1,251 @@
+"""
+Streaming import and export of projects in CSV, JSON and NDJSON formats
+"""
+import os
+import csv
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Union
+
+import database
+from models.project import Project
+
+FORMATS = ("csv", "json", "ndjson")
+EXPORT_FIELDS = ("id", "name", "location", "created_at")
+
+# Characters read at a time when parsing a JSON array
+JSON_READ_SIZE = 64 * 1024
+
+# Characters that matter when looking for the end of a JSON array item,
+# outside and inside strings
+JSON_STRUCTURE = re.compile(r'["\[\]{},]')
+JSON_STRING_END = re.compile(r'["\\]')
+
+def detect_format(path: str) -> str:
+    """Guess the file format from its extension
+
+    Args:
+        path: File path
+
+    Returns:
+        One of FORMATS
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("jsonl", "ndjson"):
+        return "ndjson"
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f"Unsupported file format: {path}")
+
+def read_csv(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """Yield projects from a CSV file with a header row"""
+    for row in csv.DictReader(stream):
+        yield row
+
+def read_ndjson(stream: TextIO) -> Iterator[Any]:
+    """Yield projects from newline-delimited JSON
+
+    Lines that are not valid JSON are yielded as ValueError instances so
+    database.add_projects() reports them as per-row errors.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Line {line_number}: {e}")
+
+def _scan_item(text: str, position: int, depth: int, in_string: bool):
+    """Scan a JSON array item for the separator that ends it
+
+    Args:
+        text: Buffered input starting with the item
+        position: Index to resume scanning from
+        depth: Nesting depth at position
+        in_string: Whether position is inside a string
+
+    Returns:
+        (end, position, depth, in_string) where end is the index of the "," or
+        "]" after the item, or None with the state to resume from once more
+        input is read
+    """
+    while True:
+        if in_string:
+            match = JSON_STRING_END.search(text, position)
+            if not match:
+                return None, len(text), depth, True
+            if match.group() == "\\":
+                if match.end() == len(text):
+                    # The escaped character is in the next read
+                    return None, match.start(), depth, True
+                position = match.end() + 1
+                continue
+            in_string = False
+            position = match.end()
+            continue
+
+        match = JSON_STRUCTURE.search(text, position)
+        if not match:
+            return None, len(text), depth, False
+        char = match.group()
+        position = match.end()
+        if char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif depth == 0 and char in ",]":
+            return match.start(), position, depth, False
+        elif char in "]}":
+            depth = max(depth - 1, 0)
+
+def read_json(stream: TextIO) -> Iterator[Any]:
+    """Yield projects from a JSON array without loading the whole document
+
+    An item that is not valid JSON is yielded as a ValueError instance, like
+    in read_ndjson(), and reading resumes after it. A document cut off
+    before the array ends raises ValueError.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators, reading more input as needed
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer, position = buffer[position:] + stream.read(JSON_READ_SIZE), 0
+            eof = position == len(buffer)
+
+        if position >= len(buffer):
+            if started:
+                raise ValueError("Unexpected end of JSON array")
+            return
+
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("Expected a JSON array of projects")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            pass
+        else:
+            # An item ending with the buffer, e.g. a number, may go on
+            if end < len(buffer) or eof:
+                yield item
+                position = end
+                continue
+
+        # The item is split across reads or malformed: find where it ends,
+        # reading only as far as that, and decode it on its own
+        buffer, position = buffer[position:], 0
+        end, scan, depth, in_string = _scan_item(buffer, 0, 0, False)
+        while end is None and not eof:
+            chunk = stream.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            end, scan, depth, in_string = _scan_item(buffer, scan, depth, in_string)
+        if end is None:
+            raise ValueError("Unexpected end of JSON array")
+
+        try:
+            yield json.loads(buffer[:end])
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON item: {e.msg}")
+        position = end
+
+READERS = {
+    "csv": read_csv,
+    "json": read_json,
+    "ndjson": read_ndjson,
+}
+
+def read_projects(stream: TextIO, file_format: str) -> Iterator[Any]:
+    """Yield projects from a stream in the given format
+
+    Args:
+        stream: Text stream to read from
+        file_format: One of FORMATS
+    """
+    try:
+        reader = READERS[file_format]
+    except KeyError:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    return reader(stream)
+
+def import_projects(path: str, file_format: Optional[str] = None,
+                    chunk_size: int = database.BULK_CHUNK_SIZE) -> database.BulkResult:
+    """Import projects from a file in a single transaction
+
+    Args:
+        path: File to import
+        file_format: One of FORMATS, detected from the extension if omitted
+        chunk_size: Rows per executemany() call
+
+    Returns:
+        BulkResult with the new project IDs and per-row errors
+    """
+    file_format = file_format or detect_format(path)
+    with open(path, "r", encoding="utf-8", newline="") as stream:
+        return database.add_projects(read_projects(stream, file_format), chunk_size)
+
+def write_projects(stream: TextIO, projects: Iterable[Union[Project, Dict[str, Any]]], file_format: str) -> int:
+    """Write projects to a stream one row at a time
+
+    Args:
+        stream: Text stream to write to
+        projects: Iterable of Project instances or project dictionaries
+        file_format: One of FORMATS
+
+    Returns:
+        Number of projects written
+    """
+    projects = (project.to_dict() if isinstance(project, Project) else project for project in projects)
+    count = 0
+    if file_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for project in projects:
+            writer.writerow(project)
+            count += 1
+    elif file_format == "ndjson":
+        for project in projects:
+            stream.write(json.dumps(project, ensure_ascii=False))
+            stream.write("\n")
+            count += 1
+    elif file_format == "json":
+        stream.write("[")
+        for project in projects:
+            stream.write(",\n  " if count else "\n  ")
+            stream.write(json.dumps(project, ensure_ascii=False))
+            count += 1
+        stream.write("\n]\n" if count else "]\n")
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    return count
+
+def export_projects(path: str, file_format: Optional[str] = None) -> int:
+    """Export all projects to a file without loading the table into memory
+
+    Args:
+        path: Destination file
+        file_format: One of FORMATS, detected from the extension if omitted
+
+    Returns:
+        Number of projects exported
+    """
+    file_format = file_format or detect_format(path)
+    with open(path, "w", encoding="utf-8", newline="") as stream:
+        return write_projects(stream, database.iter_projects(), file_format)
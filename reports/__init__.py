@@ -0,0 +1,3 @@
+"""
+Reports package for Pipes application
+"""
@@ -0,0 +1,206 @@
+"""
+Headless batch report generation fanned out over a process pool
+
+Run from the repository root:
+
+    python -m reports.batch --out reports_2025_09
+    python -m reports.batch --merged september.pdf --query ביוב
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Optional
+
+import database
+from instrumentation import instrumentation
+from blobstore import BlobStore
+from models.project import Project
+from reports import engine
+
+@dataclass
+class ProjectReport:
+    """Outcome of rendering one project"""
+    project_id: Any
+    seconds: float
+    path: Optional[str] = None
+    error: Optional[str] = None
+
+@dataclass
+class BatchResult:
+    """Outcome of a batch run"""
+    reports: List[ProjectReport] = field(default_factory=list)
+    seconds: float = 0.0
+    merged_path: Optional[str] = None
+
+    @property
+    def failures(self) -> List[ProjectReport]:
+        """Reports that failed to render"""
+        return [report for report in self.reports if report.error]
+
+def _init_worker():
+    """Load the subset font the parent built into the worker's font cache"""
+    engine.subset_font()
+
+def report_file_name(project: Project) -> str:
+    """Name of a project's PDF in an output directory: its ID and name"""
+    name = re.sub(r"[^\w]+", "-", project.name or "").strip("-")[:60]
+    return f"project-{project.id}-{name}.pdf" if name else f"project-{project.id}.pdf"
+
+def _render_files(projects: List[Project], output_dir: str, blobs: BlobStore) -> List[ProjectReport]:
+    """Worker: render every project of a chunk to its own PDF"""
+    results = []
+    for project in projects:
+        start = time.perf_counter()
+        try:
+            pdf = engine.new_document()
+            engine.render_project_page(pdf, engine.project_details(project), blobs.handle(project.image_hash))
+            path = os.path.join(output_dir, report_file_name(project))
+            engine._atomic_write(path, bytes(pdf.output()))
+            results.append(ProjectReport(project.id, time.perf_counter() - start, path))
+        except Exception as e:
+            results.append(ProjectReport(project.id, time.perf_counter() - start, error=str(e)))
+    return results
+
+def _render_chunk(projects: List[Project], path: str, blobs: BlobStore) -> List[ProjectReport]:
+    """Worker: render a chunk of projects into one document"""
+    results = []
+    pdf = engine.new_document()
+    for project in projects:
+        start = time.perf_counter()
+        try:
+            engine.render_project_page(pdf, engine.project_details(project), blobs.handle(project.image_hash))
+            results.append(ProjectReport(project.id, time.perf_counter() - start, path))
+        except Exception as e:
+            results.append(ProjectReport(project.id, time.perf_counter() - start, error=str(e)))
+    if any(not report.error for report in results):
+        engine._atomic_write(path, bytes(pdf.output()))
+    return results
+
+def _chunks(projects: List[Project], size: int):
+    """Split the projects into lists of at most size items"""
+    for start in range(0, len(projects), size):
+        yield projects[start:start + size]
+
+@instrumentation.timed("report.batch")
+def generate_reports(projects: Optional[Iterable[Project]] = None, output_dir: Optional[str] = None,
+                     merged_path: Optional[str] = None, workers: Optional[int] = None,
+                     chunk_size: Optional[int] = None, progress=None) -> BatchResult:
+    """Render reports for many projects in parallel worker processes
+
+    Either output_dir (one PDF per project) or merged_path (a single PDF)
+    must be given. For a merged report every worker renders its chunk into
+    one FPDF document and the chunks are concatenated with pypdf; without
+    pypdf the merged report is rendered in this process.
+
+    Args:
+        projects: Projects, all projects if omitted
+        output_dir: Directory for one PDF per project, named by report_file_name()
+        merged_path: File for a single merged PDF
+        workers: Worker processes, os.cpu_count() by default
+        chunk_size: Projects per task, picked from the project count if omitted
+        progress: progress(done, total) after every finished chunk
+
+    Returns:
+        BatchResult with per-project timings and failures
+    """
+    if not output_dir and not merged_path:
+        raise ValueError("Either output_dir or merged_path is required")
+
+    start = time.perf_counter()
+    projects = list(database.iter_projects() if projects is None else projects)
+    result = BatchResult()
+    if not projects:
+        return result
+
+    # Workers resolve project images against the store of this process's database
+    blobs = database.get_blob_store()
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, min(200, -(-len(projects) // (workers * 4))))
+    chunks = list(_chunks(projects, chunk_size))
+
+    if merged_path:
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            print("pypdf is not installed, rendering the merged report in one process")
+            result.reports = _render_chunk(projects, merged_path, blobs)
+            result.merged_path = merged_path
+            result.seconds = time.perf_counter() - start
+            return result
+
+    # Build the subset font once, the workers only load it
+    engine.subset_font()
+    parts_dir = tempfile.mkdtemp(prefix="pipes-batch-") if merged_path else None
+    part_paths = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {}
+        for index, chunk in enumerate(chunks):
+            if merged_path:
+                part_paths[index] = os.path.join(parts_dir, f"part-{index:05d}.pdf")
+                future = pool.submit(_render_chunk, chunk, part_paths[index], blobs)
+            else:
+                future = pool.submit(_render_files, chunk, output_dir, blobs)
+            futures[future] = (index, chunk)
+
+        by_chunk = {}
+        done = 0
+        for future in as_completed(futures):
+            index, chunk = futures[future]
+            try:
+                by_chunk[index] = future.result()
+            except Exception as e:
+                # The worker died, every project of the chunk failed
+                by_chunk[index] = [ProjectReport(project.id, 0.0, error=str(e)) for project in chunk]
+            done += len(chunk)
+            if progress:
+                progress(done, len(projects))
+
+    for index in range(len(chunks)):
+        result.reports.extend(by_chunk[index])
+
+    if merged_path:
+        written = [part_paths[index] for index in range(len(chunks)) if os.path.exists(part_paths[index])]
+        if written:
+            engine.merge_documents(written, merged_path)
+            result.merged_path = merged_path
+            for report in result.reports:
+                if not report.error:
+                    report.path = merged_path
+        for part_path in written:
+            os.unlink(part_path)
+        os.rmdir(parts_dir)
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render PDF reports for many projects")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="directory for one PDF per project")
+    target.add_argument("--merged", help="single merged PDF file")
+    parser.add_argument("--query", help="only projects matching this search text")
+    parser.add_argument("--location", help="only projects at this location")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    database.initialize_database()
+    projects = None
+    if args.query or args.location:
+        projects = database.search_projects(args.query, {"location": args.location}, limit=-1)
+
+    result = generate_reports(projects, output_dir=args.out, merged_path=args.merged, workers=args.workers)
+    for report in result.reports:
+        status = f"FAILED: {report.error}" if report.error else report.path
+        print(f"{report.project_id}\t{report.seconds * 1000:.1f} ms\t{status}")
+    print(f"{len(result.reports)} projects, {len(result.failures)} failed, {result.seconds:.2f} s")
+    return 1 if result.failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
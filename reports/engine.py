@@ -0,0 +1,448 @@
+"""
+PDF report engine with a process-wide font cache and content-addressed report cache
+"""
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fpdf import FPDF, FPDF_VERSION
+from fpdf.enums import XPos, YPos
+
+from blobstore import BlobHandle
+from instrumentation import instrumentation
+from models.project import Project
+from pipe_layout import PipeLayout, rasterize
+
+# The font ships at the repository root, next to the top-level modules
+FONT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DejaVuSans.ttf")
+FONT_FAMILY = "DejaVu"
+FALLBACK_FONT = "Arial"
+
+# Where subset fonts and rendered reports are kept between runs
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "pipes-cache")
+REPORTS_DIR = os.path.join(CACHE_DIR, "reports")
+IMAGES_DIR = os.path.join(CACHE_DIR, "images")
+
+# Part of the report cache key; bump it when the layout of the project
+# page changes, so earlier renders are not returned for unchanged content
+REPORT_LAYOUT_VERSION = 1
+
+# Reports kept in REPORTS_DIR: the newest REPORTS_MAX_FILES, none older than REPORTS_MAX_AGE seconds
+REPORTS_MAX_FILES = 200
+REPORTS_MAX_AGE = 14 * 24 * 3600
+
+# Longest side and JPEG quality of images embedded in reports; a 150 dpi
+# print of a full-width image needs about 1000 pixels
+REPORT_IMAGE_SIZE = 1000
+REPORT_IMAGE_QUALITY = 80
+
+# Width of the project image on the details page, in millimeters
+PROJECT_IMAGE_WIDTH = 80
+
+# Resolution of rasterized pipe graphs and the smallest marker spacing in them, in pixels
+PIPE_GRAPH_DPI = 200
+PIPE_GRAPH_MARKER_SPACING = 3
+
+# Code points kept in the subset font: Latin, Hebrew, Arabic and punctuation
+FONT_UNICODE_RANGES = (
+    (0x0020, 0x024F),  # Basic Latin to Latin Extended-B
+    (0x0590, 0x06FF),  # Hebrew, Arabic
+    (0x2000, 0x206F),  # General punctuation
+    (0x20AA, 0x20AC),  # Shekel and euro signs
+    (0xFB1D, 0xFB4F),  # Hebrew presentation forms
+    (0xFE70, 0xFEFF),  # Arabic presentation forms-B
+)
+
+_font_lock = threading.Lock()
+
+def _atomic_write(path: str, data: bytes):
+    """Write a file so readers never see it half-written"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+@lru_cache(maxsize=None)
+def subset_font(font_file: str = FONT_FILE) -> Optional[str]:
+    """Get a font file reduced to the scripts the reports use
+
+    The subset is built once and kept in CACHE_DIR, keyed by the size and
+    modification time of the source font; it parses several times faster
+    than the full font on every new document.
+
+    Args:
+        font_file: TrueType font to subset
+
+    Returns:
+        Path of the subset font, the original font if it cannot be subset,
+        or None if the font file does not exist
+    """
+    try:
+        stat = os.stat(font_file)
+    except OSError:
+        return None
+
+    name = os.path.splitext(os.path.basename(font_file))[0]
+    subset_path = os.path.join(CACHE_DIR, f"{name}-{stat.st_size}-{stat.st_mtime_ns}.ttf")
+    with _font_lock:
+        if os.path.exists(subset_path):
+            return subset_path
+        try:
+            from fontTools import subset
+            from fontTools.ttLib import TTFont
+
+            options = subset.Options()
+            options.notdef_outline = True
+            options.recommended_glyphs = True
+            options.layout_features = ["*"]
+            options.drop_tables += ["FFTM"]  # Font forge timestamps, not needed in PDFs
+            font = TTFont(font_file)
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(unicodes=[
+                code for first, last in FONT_UNICODE_RANGES for code in range(first, last + 1)
+            ])
+            subsetter.subset(font)
+
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".part")
+            os.close(fd)
+            font.save(temp_path)
+            os.replace(temp_path, subset_path)
+            return subset_path
+        except Exception as e:
+            print(f"Error subsetting font {font_file}: {e}")
+            return font_file
+
+def report_image(image: BlobHandle, max_size: int = REPORT_IMAGE_SIZE, quality: int = REPORT_IMAGE_QUALITY) -> str:
+    """Get a downscaled JPEG copy of a stored image for embedding in reports
+
+    Snapshots are often full video frames or camera photos; embedding them
+    as they are makes reports huge and every render re-reads them. The copy
+    is made once and kept in IMAGES_DIR under the image's content hash, so
+    later reports and parallel workers embed the cached file directly.
+
+    Args:
+        image: Stored image
+        max_size: Longest side in pixels
+        quality: JPEG quality
+
+    Returns:
+        Path of the cached copy, or of the original if it cannot be decoded
+    """
+    path = os.path.join(IMAGES_DIR, f"{image.hash}-{max_size}-{quality}.jpg")
+    if os.path.exists(path):
+        return path
+    try:
+        import cv2
+        import numpy as np
+
+        with image.open() as content:
+            data = np.frombuffer(content, np.uint8)
+            frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            del data  # The mapping cannot close while an array views it
+    except ImportError:
+        return image.path
+    if frame is None:
+        return image.path
+
+    height, width = frame.shape[:2]
+    scale = max_size / max(height, width)
+    if scale < 1:
+        frame = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return image.path
+    _atomic_write(path, encoded.tobytes())
+    return path
+
+def pipe_graph_slots(width: float, dpi: int = PIPE_GRAPH_DPI) -> int:
+    """Marker slots of a pipe graph of a width in millimeters, as pipe_graph_image() draws it"""
+    return max(1, max(1, round(width / 25.4 * dpi)) // PIPE_GRAPH_MARKER_SPACING)
+
+def pipe_graph_image(layout: PipeLayout, width: float, height: float, dpi: int = PIPE_GRAPH_DPI) -> Optional[str]:
+    """Get the pipe and event markers of a section as a cached PNG
+
+    The image is kept in IMAGES_DIR under the layout's content key, so a
+    section is rasterized once and later reports, or other workers
+    printing the same section, embed the cached file.
+
+    Args:
+        layout: Layout of the section, see pipe_layout.layout_for()
+        width, height: Size on the page in millimeters
+        dpi: Resolution of the image
+
+    Returns:
+        Path of the PNG, None if OpenCV is not installed
+    """
+    size = (max(1, round(width / 25.4 * dpi)), max(1, round(height / 25.4 * dpi)))
+    path = os.path.join(IMAGES_DIR, f"pipe-{layout.key}-{size[0]}x{size[1]}.png")
+    if os.path.exists(path):
+        return path
+    try:
+        import cv2
+    except ImportError:
+        return None
+    ok, encoded = cv2.imencode(".png", rasterize(layout, *size, marker_spacing=PIPE_GRAPH_MARKER_SPACING))
+    if not ok:
+        return None
+    _atomic_write(path, encoded.tobytes())
+    return path
+
+@lru_cache(maxsize=None)
+def _report_missing_font(font_file: str):
+    """Print once per process that the report font is missing"""
+    print(f"Error: report font {font_file} not found, reports fall back to {FALLBACK_FONT} "
+          "and cannot show Hebrew or Arabic text")
+
+class ReportDocument(FPDF):
+    """FPDF document with the report font registered"""
+
+    def __init__(self):
+        super().__init__()
+        self.report_font = FALLBACK_FONT
+        font_path = subset_font(FONT_FILE)
+        if font_path is None:
+            _report_missing_font(FONT_FILE)
+        else:
+            try:
+                # DejaVu covers Hebrew and Arabic, the core fonts are Latin-1 only
+                self.add_font(FONT_FAMILY, '', font_path)
+                self.report_font = FONT_FAMILY
+            except Exception as e:
+                print(f"Error loading font {font_path}: {e}")
+
+def new_document() -> ReportDocument:
+    """Create a PDF document with the report font registered"""
+    return ReportDocument()
+
+def project_details(project: Project) -> Dict[str, Any]:
+    """Get the key/value pairs printed for a project row
+
+    Args:
+        project: Project as returned by the database module
+    """
+    return {
+        "Name": project.name or "",
+        "Date": project.created_at or "",
+        "Location": project.location or "",
+        "ID": project.id if project.id is not None else ""
+    }
+
+def content_hash(project_details: Dict[str, Any]) -> str:
+    """Hash the printed content of a project
+
+    Args:
+        project_details: Key/value pairs printed in the report
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(project_details, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def prune_reports(directory: str = REPORTS_DIR, max_files: int = REPORTS_MAX_FILES,
+                  max_age: float = REPORTS_MAX_AGE) -> int:
+    """Delete the oldest reports from the report cache
+
+    Only meant for REPORTS_DIR; reports written to a folder the user chose
+    are theirs to keep.
+
+    Args:
+        directory: Report cache directory
+        max_files: Number of newest reports kept
+        max_age: Reports not written or reused for this many seconds are deleted
+
+    Returns:
+        Number of deleted reports
+    """
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith(".pdf") and entry.is_file()]
+    except OSError:
+        return 0
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age
+    deleted = 0
+    for rank, entry in enumerate(entries):
+        if rank >= max_files or entry.stat().st_mtime < cutoff:
+            try:
+                os.unlink(entry.path)
+                deleted += 1
+            except OSError:
+                pass  # Deleted by another process, or open in a viewer on Windows
+    return deleted
+
+def render_project_page(pdf: ReportDocument, project_details: Dict[str, Any], image: Optional[BlobHandle] = None):
+    """Add one project details page to a document
+
+    Args:
+        pdf: Document created by new_document()
+        project_details: Key/value pairs to print
+        image: Project image, read from the blob store only here
+    """
+    pdf.add_page()
+    pdf.set_font(pdf.report_font, '', 16)
+    pdf.cell(0, 10, "Project Details", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(pdf.report_font, '', 12)
+    for key, value in project_details.items():
+        pdf.cell(0, 10, f"{key}: {value}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    if image is not None and image.exists():
+        pdf.ln(5)
+        pdf.image(report_image(image), w=PROJECT_IMAGE_WIDTH)
+
+def render_slope_profile_page(pdf: ReportDocument, title: str, profile):
+    """Add a slope profile page: mean slope over distance with the min-max band
+
+    The profile is downsampled first, so the page holds at most
+    slope.profile.MAX_PLOT_POINTS points however many readings it has.
+
+    Args:
+        pdf: Document created by new_document()
+        title: Page heading, e.g. the section's pipe number
+        profile: slope.profile.SlopeProfile
+    """
+    from slope.profile import downsample
+
+    pdf.add_page()
+    pdf.set_font(pdf.report_font, '', 16)
+    pdf.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(pdf.report_font, '', 9)
+    if not len(profile):
+        pdf.cell(0, 10, "No slope readings", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        return
+
+    profile = downsample(profile)
+    left, top = pdf.l_margin + 10, pdf.get_y() + 5
+    width, height = pdf.epw - 10, 90
+    low = min(float(profile.minimum.min()), 0.0)
+    high = max(float(profile.maximum.max()), 0.0)
+    span = (high - low) or 1.0
+    start, end = float(profile.distance[0]), float(profile.distance[-1])
+    length = (end - start) or 1.0
+
+    x = left + (profile.distance - start) * (width / length)
+
+    def to_y(values):
+        return top + (high - values.astype("float64")) * (height / span)
+
+    # Axes, the zero slope line and the scale
+    pdf.set_draw_color(0, 0, 0)
+    pdf.rect(left, top, width, height)
+    pdf.set_draw_color(160, 160, 160)
+    zero = top + high * (height / span)
+    pdf.line(left, zero, left + width, zero)
+    for value, y in ((high, top), (0.0, zero), (low, top + height)):
+        pdf.set_xy(pdf.l_margin, y - 2)
+        pdf.cell(9, 4, f"{value:.1f}%", align="R")
+    for value, x_label in ((start, left), (end, left + width - 20)):
+        pdf.set_xy(x_label, top + height + 1)
+        pdf.cell(20, 4, f"{value:.1f} m", align="L" if x_label == left else "R")
+
+    band = list(zip(x.tolist(), to_y(profile.maximum).tolist()))
+    band += list(zip(x[::-1].tolist(), to_y(profile.minimum[::-1]).tolist()))
+    pdf.set_fill_color(200, 215, 235)
+    pdf.polygon(band, style="F")
+    pdf.set_draw_color(20, 60, 140)
+    pdf.polyline(list(zip(x.tolist(), to_y(profile.mean).tolist())))
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_xy(pdf.l_margin, top + height + 6)
+
+@instrumentation.timed("report.project")
+def render_report(project_details: Dict[str, Any], output_dir: str = REPORTS_DIR,
+                  image: Optional[BlobHandle] = None) -> str:
+    """Render a single project report, reusing an earlier render of the same content
+
+    Reports are named after their content hash and REPORT_LAYOUT_VERSION,
+    so concurrent prints of different projects never share a file, and
+    printing an unchanged project again returns the existing file without
+    rendering. The report cache is pruned after every new render.
+
+    Args:
+        project_details: Key/value pairs to print
+        output_dir: Directory for rendered reports
+        image: Project image; blobs are content-addressed, so its hash
+            stands for the image in the content hash
+
+    Returns:
+        Path of the PDF
+    """
+    content = dict(project_details, image=image.hash) if image is not None else project_details
+    key = content_hash({"content": content, "layout": REPORT_LAYOUT_VERSION, "fpdf": FPDF_VERSION})
+    path = os.path.join(output_dir, f"project-{key[:32]}.pdf")
+    if os.path.exists(path):
+        try:
+            # Reused reports count as new for pruning
+            os.utime(path)
+            return path
+        except OSError:
+            pass  # Pruned meanwhile, render it again
+
+    pdf = new_document()
+    render_project_page(pdf, project_details, image)
+    _atomic_write(path, bytes(pdf.output()))
+    if os.path.abspath(output_dir) == os.path.abspath(REPORTS_DIR):
+        prune_reports(output_dir)
+    return path
+
+@instrumentation.timed("report.projects")
+def render_projects_report(projects: Iterable[Dict[str, Any]], path: Optional[str] = None,
+                           progress: Optional[Callable[[int], None]] = None) -> str:
+    """Render one report with a page per project
+
+    Projects are consumed lazily, one page at a time, so they can come
+    straight from a database cursor (e.g. database.iter_projects()); only
+    the finished pages are held until the file is written.
+
+    Args:
+        projects: Iterable of project details dictionaries
+        path: Output file, a unique file in REPORTS_DIR if omitted
+        progress: progress(pages_done) after every page; may raise to abort
+
+    Returns:
+        Path of the PDF
+    """
+    if path is None:
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=REPORTS_DIR, prefix="projects-", suffix=".pdf")
+        os.close(fd)
+        prune_reports()
+
+    pdf = new_document()
+    pages = 0
+    for project_details in projects:
+        render_project_page(pdf, project_details)
+        pages += 1
+        if progress:
+            progress(pages)
+
+    _atomic_write(path, bytes(pdf.output()))
+    return path
+
+def merge_documents(part_paths: List[str], path: str):
+    """Concatenate PDF documents into one file with pypdf
+
+    Raises:
+        ImportError: If pypdf is not installed
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for part_path in part_paths:
+        writer.append(part_path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    with os.fdopen(fd, "wb") as merged_file:
+        writer.write(merged_file)
+    os.replace(temp_path, path)
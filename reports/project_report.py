@@ -0,0 +1,442 @@
+"""
+Full project report: cover, line profile, section pages, events table and screenshots
+
+The report is split into parts rendered by a pool of worker processes:
+the cover and line profile summary, chunks of section pages, the full
+events table and chunks of screenshots. Every worker opens the database
+itself and walks its sections one at a time, so neither the workers nor
+this process hold all events or images of a project. The parts are
+merged with pypdf in report order; without pypdf everything is rendered
+into one document in this process.
+
+Screenshots are embedded from engine.report_image(), which downscales and
+recompresses each stored image once and keeps the copy for later reports.
+
+Run from the repository root:
+
+    python -m reports.project_report 12 --out report.pdf
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fpdf.enums import XPos, YPos
+
+import database
+from instrumentation import instrumentation
+from models.event import Event
+from models.section import Section
+from pipe_layout import layout_for, severity_color
+from reports import engine
+
+# Sections per worker task
+SECTIONS_PER_PART = 25
+
+# Sections whose screenshots go into one worker task
+SCREENSHOT_SECTIONS_PER_PART = 50
+
+# Screenshots per page and their height in millimeters
+SCREENSHOTS_PER_PAGE = 2
+SCREENSHOT_HEIGHT = 110
+
+# Events with at least this severity are counted as severe in the summaries
+SEVERE_SEVERITY = 4
+
+# Label width and spacing on the pipe graph, in millimeters
+PIPE_LABEL_WIDTH = 12
+PIPE_LABEL_SPACING = 8
+
+# Pipe graphs with more markers than this are embedded as a raster, fewer are cheaper as lines
+PIPE_RASTER_MIN_MARKERS = 300
+
+# Columns of the events tables: (heading, width in millimeters)
+EVENT_TABLE_COLUMNS = (
+    ("Distance", 20), ("Code", 16), ("Description", 50), ("Severity", 18), ("Clock", 18), ("Notes", 68),
+)
+FULL_EVENT_TABLE_COLUMNS = (
+    ("Section", 16), ("Distance", 18), ("Code", 14), ("Description", 44), ("Severity", 16), ("Clock", 14),
+    ("Notes", 54), ("Video (s)", 14),
+)
+
+@dataclass
+class ProjectReportResult:
+    """Outcome of rendering a full project report"""
+    path: str
+    pages: int = 0
+    parts: int = 0
+    seconds: float = 0.0
+
+# Parts
+
+def _init_worker(database_file: str, read_only: bool = False, source_file: Optional[str] = None):
+    """Point the worker at the report's database and load the report font"""
+    database.connection_manager.set_database_file(database_file, read_only, source_file)
+    engine.subset_font()
+
+@lru_cache(maxsize=1)
+def _code_descriptions() -> Dict[str, str]:
+    """Event code descriptions, read once per process"""
+    return {code.code: code.description or "" for code in database.get_event_codes()}
+
+def _text(value, digits: int = 2) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+def _clock(event: Event) -> str:
+    if event.clock_start is None:
+        return ""
+    if event.clock_end is None or event.clock_end == event.clock_start:
+        return str(event.clock_start)
+    return f"{event.clock_start}-{event.clock_end}"
+
+def _event_cells(event: Event) -> List[str]:
+    return [
+        _text(event.distance), event.event_code, _code_descriptions().get(event.event_code, ""),
+        _text(event.severity), _clock(event), event.notes or "",
+    ]
+
+def _table_header(pdf: engine.ReportDocument, columns: Sequence[Tuple[str, float]]):
+    pdf.set_font(pdf.report_font, '', 9)
+    pdf.set_fill_color(225, 230, 240)
+    for heading, width in columns:
+        pdf.cell(width, 7, heading, border=1, fill=True)
+    pdf.ln()
+
+def _table(pdf: engine.ReportDocument, columns: Sequence[Tuple[str, float]], rows, row_height: float = 6):
+    """Draw a table, repeating the header on every page it continues on"""
+    _table_header(pdf, columns)
+    pdf.set_font(pdf.report_font, '', 8)
+    for row in rows:
+        if pdf.will_page_break(row_height):
+            pdf.add_page()
+            _table_header(pdf, columns)
+            pdf.set_font(pdf.report_font, '', 8)
+        for (_, width), value in zip(columns, row):
+            # Cut long notes to the cell instead of wrapping, rows stay one line high
+            text = str(value)
+            while text and pdf.get_string_width(text) > width - 2:
+                text = text[:-1]
+            pdf.cell(width, row_height, text, border=1)
+        pdf.ln()
+
+def _section_title(section: Section) -> str:
+    title = f"Section {section.section_number}"
+    if section.pipe_number:
+        title += f" - pipe {section.pipe_number}"
+    return title
+
+def _section_length(section: Section, events: List[Event]) -> float:
+    """Length drawn on the pipe graph, the recorded length or the farthest event"""
+    farthest = max((event.distance for event in events), default=0.0)
+    return max(section.length or 0.0, farthest) or 1.0
+
+def render_pipe_graph(pdf: engine.ReportDocument, section: Section, events: List[Event],
+                      x: float, y: float, width: float, height: float = 30):
+    """Draw a section as a pipe between its manholes with a marker per event
+
+    Events closer than a marker apart share a marker, labelled with their
+    count. Sections with many markers embed the pipe and markers as the
+    section's cached raster (see engine.pipe_graph_image()).
+
+    Args:
+        pdf: Document to draw on
+        section: Section to draw
+        events: Events of the section
+        x, y: Top left corner in millimeters
+        width, height: Size in millimeters
+    """
+    length = _section_length(section, events)
+    layout = layout_for(length, events)
+    markers = layout.markers(engine.pipe_graph_slots(width), label_slots=int(width // PIPE_LABEL_SPACING))
+    pipe_top = y + height / 2 - 3
+    image = engine.pipe_graph_image(layout, width, 12) if len(markers) > PIPE_RASTER_MIN_MARKERS else None
+    if image:
+        pdf.image(image, x=x, y=pipe_top - 3, w=width, h=12)
+    else:
+        pdf.set_draw_color(0, 0, 0)
+        pdf.set_fill_color(235, 235, 235)
+        pdf.rect(x, pipe_top, width, 6, style="DF")
+        pdf.set_line_width(0.6)
+        for position, severity in zip(markers.position.tolist(), markers.severity.tolist()):
+            pdf.set_draw_color(*severity_color(severity))
+            pdf.line(x + position * width, pipe_top - 2, x + position * width, pipe_top + 8)
+        pdf.set_line_width(0.2)
+        pdf.set_draw_color(0, 0, 0)
+
+    pdf.set_font(pdf.report_font, '', 7)
+    for label, label_x, align in ((section.upstream_manhole, x, "L"), (section.downstream_manhole, x + width - 30, "R")):
+        pdf.set_xy(label_x, pipe_top + 7)
+        pdf.cell(30, 4, label or "", align=align)
+    pdf.set_xy(x + width / 2 - 15, pipe_top + 7)
+    pdf.cell(30, 4, f"{length:.1f} m", align="C")
+    # Labels that would overlap the previous one are left out
+    for index in (markers.row >= 0).nonzero()[0].tolist():
+        pdf.set_xy(x + markers.position[index] * width - PIPE_LABEL_WIDTH / 2, pipe_top - 7)
+        pdf.cell(PIPE_LABEL_WIDTH, 4, layout.label(markers, index), align="C")
+    pdf.set_xy(pdf.l_margin, y + height)
+
+def render_section_page(pdf: engine.ReportDocument, section: Section, events: List[Event]):
+    """Add the page of one section: details, pipe graph and events table"""
+    pdf.add_page()
+    pdf.set_font(pdf.report_font, '', 14)
+    pdf.cell(0, 9, _section_title(section), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(pdf.report_font, '', 9)
+    details = (
+        ("Street", section.street), ("City", section.city), ("Started", section.started_at),
+        ("Upstream manhole", section.upstream_manhole), ("Downstream manhole", section.downstream_manhole),
+        ("Flow direction", section.flow_direction), ("Diameter (mm)", section.diameter),
+        ("Shape", section.shape), ("Material", section.material), ("Usage", section.usage),
+        ("Length (m)", section.length), ("Start depth (m)", section.start_depth),
+        ("End depth (m)", section.end_depth), ("Events", len(events)),
+    )
+    half = pdf.epw / 2
+    for index, (label, value) in enumerate(details):
+        # Two columns, the second ends the line
+        second = index % 2 == 1
+        pdf.cell(half, 5, f"{label}: {_text(value)}",
+                 new_x=XPos.LMARGIN if second else XPos.RIGHT, new_y=YPos.NEXT if second else YPos.TOP)
+    pdf.ln(8)
+    render_pipe_graph(pdf, section, events, pdf.l_margin, pdf.get_y(), pdf.epw)
+    pdf.ln(4)
+    if events:
+        _table(pdf, EVENT_TABLE_COLUMNS, (_event_cells(event) for event in events))
+
+def _render_sections(pdf: engine.ReportDocument, section_ids: Sequence[int]):
+    """Section pages, plus the slope profile of sections that have one"""
+    for section_id in section_ids:
+        section = database.get_section(section_id)
+        if section is None:
+            continue
+        events = database.get_section_events(section_id)
+        render_section_page(pdf, section, events)
+        if database.get_slope_readings(section_id):
+            from slope.profile import load_profile
+
+            engine.render_slope_profile_page(pdf, f"{_section_title(section)} - slope profile",
+                                             load_profile(section_id))
+
+def _render_events_table(pdf: engine.ReportDocument, section_ids: Sequence[int]):
+    """Every event of the project, section by section"""
+    pdf.add_page()
+    pdf.set_font(pdf.report_font, '', 16)
+    pdf.cell(0, 10, "Events", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    def rows():
+        for section_id in section_ids:
+            section = database.get_section(section_id)
+            for event in database.get_section_events(section_id):
+                yield [_text(section.section_number)] + _event_cells(event) + [_text(event.video_time, 1)]
+
+    _table(pdf, FULL_EVENT_TABLE_COLUMNS, rows())
+
+def _render_screenshots(pdf: engine.ReportDocument, section_ids: Sequence[int], heading: bool):
+    """Snapshots of the events of some sections, SCREENSHOTS_PER_PAGE per page"""
+    placed = 0
+    for section_id in section_ids:
+        section = None
+        for event in database.get_section_events(section_id):
+            if not event.snapshot_hash:
+                continue
+            image = database.get_blob(event.snapshot_hash)
+            if not image.exists():
+                continue
+            section = section or database.get_section(section_id)
+            if placed % SCREENSHOTS_PER_PAGE == 0:
+                pdf.add_page()
+                if heading and placed == 0:
+                    pdf.set_font(pdf.report_font, '', 16)
+                    pdf.cell(0, 10, "Screenshots", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pdf.set_font(pdf.report_font, '', 9)
+            pdf.cell(0, 6, f"{_section_title(section)}, {event.distance:.2f} m, {event.event_code}"
+                           f" {_code_descriptions().get(event.event_code, '')}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pdf.image(engine.report_image(image), h=SCREENSHOT_HEIGHT, keep_aspect_ratio=True,
+                      w=pdf.epw)
+            pdf.ln(4)
+            placed += 1
+
+def render_cover(pdf: engine.ReportDocument, project_id: int, sections: List[Section]):
+    """Cover page with the project details, and the line profile summary per diameter"""
+    project = database.get_project(project_id)
+    details = engine.project_details(project)
+    details.update({
+        "Project number": project.project_number or "",
+        "City": project.city or "",
+        "Site": project.site or "",
+        "Start date": project.start_date or "",
+        "End date": project.end_date or "",
+    })
+    engine.render_project_page(pdf, details, database.get_blob(project.image_hash))
+
+    counts = database.count_section_events(project_id)
+    severe = database.count_section_events(project_id, SEVERE_SEVERITY)
+    pdf.ln(4)
+    pdf.set_font(pdf.report_font, '', 12)
+    pdf.cell(0, 8, f"Sections: {len(sections)}   Events: {sum(counts.values())}"
+                   f"   Severity {SEVERE_SEVERITY}+: {sum(severe.values())}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.add_page()
+    pdf.set_font(pdf.report_font, '', 16)
+    pdf.cell(0, 10, "Line profile", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    summary = {}
+    for section in sections:
+        row = summary.setdefault(section.diameter, [0, 0.0, 0, 0])
+        row[0] += 1
+        row[1] += section.length or 0.0
+        row[2] += counts.get(section.id, 0)
+        row[3] += severe.get(section.id, 0)
+    columns = (("Diameter (mm)", 36), ("Sections", 30), ("Length (m)", 36), ("Events", 30),
+               (f"Severity {SEVERE_SEVERITY}+", 36))
+    _table(pdf, columns, (
+        [_text(diameter) or "-", count, f"{length:.1f}", events, severe_events]
+        for diameter, (count, length, events, severe_events)
+        in sorted(summary.items(), key=lambda item: (item[0] is None, item[0] or 0))
+    ))
+
+def _render_into(pdf: engine.ReportDocument, kind: str, section_ids: Sequence[int], first: bool):
+    """Render one part of the report into a document"""
+    if kind == "sections":
+        _render_sections(pdf, section_ids)
+    elif kind == "events":
+        _render_events_table(pdf, section_ids)
+    elif kind == "screenshots":
+        _render_screenshots(pdf, section_ids, heading=first)
+    else:
+        raise ValueError(f"Unknown report part: {kind}")
+
+def _render_part(kind: str, section_ids: Sequence[int], path: str, first: bool) -> int:
+    """Worker: render one part of the report to its own file
+
+    Returns:
+        Number of pages, 0 if the part is empty and no file was written
+    """
+    pdf = engine.new_document()
+    _render_into(pdf, kind, section_ids, first)
+    if pdf.page == 0:
+        return 0
+    engine._atomic_write(path, bytes(pdf.output()))
+    return pdf.page
+
+def _chunks(items: List[int], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _plan(section_ids: List[int]) -> List[Tuple[str, List[int], bool]]:
+    """(kind, section IDs, first part of its kind) for every part after the cover, in report order"""
+    parts = [("sections", chunk, index == 0) for index, chunk in enumerate(_chunks(section_ids, SECTIONS_PER_PART))]
+    parts.append(("events", section_ids, True))
+    parts += [("screenshots", chunk, index == 0)
+              for index, chunk in enumerate(_chunks(section_ids, SCREENSHOT_SECTIONS_PER_PART))]
+    return parts
+
+@instrumentation.timed("report.full")
+def render_project_report(project_id: int, path: Optional[str] = None, workers: Optional[int] = None,
+                          progress: Optional[Callable[[int, int], None]] = None) -> ProjectReportResult:
+    """Render the full report of a project
+
+    Args:
+        project_id: ID of the project
+        path: Output file, a unique file in engine.REPORTS_DIR if omitted
+        workers: Worker processes, os.cpu_count() by default; 0 renders in this process
+        progress: progress(parts_done, parts_total) after every finished part
+
+    Returns:
+        ProjectReportResult with the path and page count
+
+    Raises:
+        ValueError: If the project does not exist
+    """
+    start = time.perf_counter()
+    if database.get_project(project_id) is None:
+        raise ValueError(f"Project {project_id} not found")
+    if path is None:
+        os.makedirs(engine.REPORTS_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=engine.REPORTS_DIR, prefix=f"project-{project_id}-", suffix=".pdf")
+        os.close(fd)
+        engine.prune_reports()
+
+    sections = database.get_sections(project_id)
+    section_ids = [section.id for section in sections]
+    plan = _plan(section_ids)
+    total = len(plan) + 1
+    result = ProjectReportResult(path, parts=total)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        print("pypdf is not installed, rendering the report in one process")
+        workers = 0
+
+    if workers == 0:
+        pdf = engine.new_document()
+        render_cover(pdf, project_id, sections)
+        if progress:
+            progress(1, total)
+        for done, (kind, ids, first) in enumerate(plan, 2):
+            _render_into(pdf, kind, ids, first)
+            if progress:
+                progress(done, total)
+        engine._atomic_write(path, bytes(pdf.output()))
+        result.pages = pdf.page
+        result.seconds = time.perf_counter() - start
+        return result
+
+    # The cover is rendered here while the workers render the rest
+    engine.subset_font()
+    parts_dir = tempfile.mkdtemp(prefix="pipes-report-")
+    try:
+        part_paths = [os.path.join(parts_dir, f"part-{index:05d}.pdf") for index in range(total)]
+        # Workers read the same file as this thread, e.g. a snapshot
+        manager = database.active_connection_manager()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(os.path.abspath(manager.database_file), manager.read_only,
+                                           os.path.abspath(manager.source_file))) as pool:
+            futures = [pool.submit(_render_part, kind, ids, part_paths[index], first)
+                       for index, (kind, ids, first) in enumerate(plan, 1)]
+            pdf = engine.new_document()
+            render_cover(pdf, project_id, sections)
+            engine._atomic_write(part_paths[0], bytes(pdf.output()))
+            result.pages = pdf.page
+            del pdf
+            done = 1
+            if progress:
+                progress(done, total)
+            # Waiting in plan order keeps the progress monotonic; a failed
+            # part raises here and the report is not written
+            for future in futures:
+                result.pages += future.result()
+                done += 1
+                if progress:
+                    progress(done, total)
+        engine.merge_documents([part for part in part_paths if os.path.exists(part)], path)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    result.seconds = time.perf_counter() - start
+    return result
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render the full PDF report of a project")
+    parser.add_argument("project_id", type=int)
+    parser.add_argument("--out", help="output file")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count, 0: none)")
+    args = parser.parse_args(argv)
+
+    database.initialize_database()
+    result = render_project_report(args.project_id, args.out, args.workers)
+    print(f"{result.path}: {result.pages} pages in {result.parts} parts, {result.seconds:.2f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
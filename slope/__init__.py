@@ -0,0 +1,3 @@
+"""
+Slope profile package for Pipes application
+"""
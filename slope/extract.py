@@ -0,0 +1,246 @@
+"""
+Slope profile extraction from the telemetry overlay of section videos
+
+The video is split into segments that a pool of worker processes handle
+independently: each worker seeks to its segment, decodes it as a
+generator that only converts every step-th frame, crops the overlay
+right away and reads it. Decoding is the expensive part for long videos,
+so it is parallelized along with the OCR, and only the overlay texts
+travel back to this process.
+
+Overlay texts are cached per (video fingerprint, frame index) and both the
+cache and the readings are written in batches, so an interrupted run
+loses at most one batch and a rerun only decodes the frames still missing.
+
+Run from the repository root:
+
+    python -m slope.extract 12 inspection.mp4 --reader template
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import database
+from slope import ocr
+from video.frames import iter_frames, video_fingerprint, video_info
+
+# Seconds of video between sampled frames
+SAMPLE_INTERVAL = 0.5
+
+# Sampled frames per worker task (a segment of the video)
+SAMPLES_PER_TASK = 64
+
+# Tasks queued per worker; bounds the results held in memory
+MAX_PENDING_PER_WORKER = 2
+
+# Cache entries and readings written per transaction
+DB_BATCH_SIZE = 500
+
+@dataclass
+class SlopeExtraction:
+    """Outcome of a slope extraction run"""
+    section_id: int
+    readings: int = 0
+    cached: int = 0  # Frames whose overlay text came from the cache
+    failures: List[Tuple[int, float, str]] = field(default_factory=list)  # (frame, time, reason)
+    seconds: float = 0.0
+
+    def failure_summary(self, limit: int = 10) -> str:
+        """Describe the unreadable frames for an error message"""
+        lines = [f"frame {frame_index} ({video_time:.1f} s): {reason}"
+                 for frame_index, video_time, reason in self.failures[:limit]]
+        if len(self.failures) > limit:
+            lines.append(f"... and {len(self.failures) - limit} more")
+        return "\n".join(lines)
+
+# Overlay reader of a worker process
+_reader = None
+
+def _init_worker(reader_name: str, reader_options: Dict[str, Any]):
+    """Create the worker's overlay reader once instead of per task"""
+    global _reader
+    _reader = ocr.create_reader(reader_name, **reader_options)
+
+def _read_segment(video_path: str, step: int, start: int, end: Optional[int], skip: Set[int],
+                  region: Tuple[float, float, float, float]) -> List[Tuple[int, float, Optional[str], Optional[str]]]:
+    """Worker: decode a segment of the video and read the overlay of its sampled frames
+
+    Returns:
+        (frame index, video time, text or None, error or None) tuples
+    """
+    results = []
+    for frame_index, video_time, frame in iter_frames(video_path, step, start, end, skip=skip):
+        try:
+            text = ocr.read_overlay(_reader, ocr.crop_overlay(frame, region))
+            results.append((frame_index, video_time, text, None))
+        except Exception as e:
+            results.append((frame_index, video_time, None, str(e)))
+    return results
+
+class _Writer:
+    """Buffers cache entries and readings and writes them in batches"""
+
+    def __init__(self, section_id: int, video_hash: str, result: SlopeExtraction):
+        self.section_id = section_id
+        self.video_hash = video_hash
+        self.result = result
+        self.texts = []
+        self.readings = []
+
+    def add(self, frame_index: int, video_time: float, text: Optional[str], error: Optional[str] = None,
+            cached: bool = False):
+        """Record the overlay text of one frame"""
+        if text is None:
+            self.result.failures.append((frame_index, video_time, error or "No overlay text"))
+            return
+        if not cached:
+            # Unreadable frames are not cached, a rerun tries them again
+            self.texts.append((frame_index, text))
+        try:
+            distance, slope = ocr.parse_overlay(text)
+        except ValueError as e:
+            self.result.failures.append((frame_index, video_time, str(e)))
+        else:
+            self.readings.append((frame_index, video_time, distance, slope))
+            self.result.readings += 1
+        if len(self.texts) >= DB_BATCH_SIZE or len(self.readings) >= DB_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows"""
+        if self.texts:
+            database.add_overlay_ocr_cache(self.video_hash, self.texts)
+            self.texts = []
+        if self.readings:
+            database.add_slope_readings(self.section_id, self.readings)
+            self.readings = []
+
+def _segments(first: int, frame_count: int, step: int):
+    """Split the sampled frame range into (start, end) segments, end None if the length is unknown"""
+    if not frame_count:
+        yield first, None
+        return
+    length = step * SAMPLES_PER_TASK
+    for start in range(first, frame_count, length):
+        yield start, min(start + length, frame_count)
+
+def extract_slope(section_id: int, video_path: str, start_time: float = 0.0,
+                  sample_interval: float = SAMPLE_INTERVAL, reader: str = "tesseract",
+                  reader_options: Optional[Dict[str, Any]] = None,
+                  region: Tuple[float, float, float, float] = ocr.OVERLAY_REGION,
+                  workers: Optional[int] = None,
+                  progress: Optional[Callable[[int, int], None]] = None) -> SlopeExtraction:
+    """Read the slope profile of a section from its video
+
+    Previous readings of the section are replaced.
+
+    Args:
+        section_id: ID of the section the readings belong to
+        video_path: Section video
+        start_time: Second of the video to start at
+        sample_interval: Seconds of video between sampled frames
+        reader: Overlay reader name, see slope.ocr.READERS
+        reader_options: Options of the overlay reader
+        region: Overlay region as fractions of the frame
+        workers: Decoding and OCR processes (CPU count by default)
+        progress: progress(done, total) after every finished segment;
+            may raise to abort, the frames read so far stay cached
+
+    Returns:
+        SlopeExtraction with the number of readings and the unreadable frames
+    """
+    start = time.perf_counter()
+    result = SlopeExtraction(section_id)
+    info = video_info(video_path)
+    fps = info.fps or 25.0
+    step = max(1, round(fps * sample_interval))
+    first = int(start_time * fps)
+    total = max(0, (info.frame_count - first + step - 1) // step) if info.frame_count else 0
+
+    video_hash = video_fingerprint(video_path)
+    cached = {
+        frame_index: text for frame_index, text in database.get_overlay_ocr_cache(video_hash).items()
+        if frame_index >= first and (frame_index - first) % step == 0
+    }
+    database.delete_slope_readings(section_id)
+    writer = _Writer(section_id, video_hash, result)
+
+    try:
+        for frame_index in sorted(cached):
+            writer.add(frame_index, frame_index / fps, cached[frame_index], cached=True)
+        result.cached = done = len(cached)
+        if progress and done:
+            progress(done, total)
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(reader, reader_options or {})) as pool:
+            segments = {}
+            pending = set()
+
+            def handle(futures):
+                nonlocal done
+                for future in futures:
+                    segment_start, segment_end, skip = segments.pop(future)
+                    results = future.result()
+                    for frame_index, video_time, text, error in results:
+                        writer.add(frame_index, video_time, text, error)
+                    done += len(results)
+                    if segment_end is not None:
+                        # Frames the decoder did not deliver, e.g. a truncated file
+                        read = skip.union(frame_index for frame_index, _, _, _ in results)
+                        for frame_index in range(segment_start, segment_end, step):
+                            if frame_index not in read:
+                                writer.add(frame_index, frame_index / fps, None, "Frame could not be decoded")
+                                done += 1
+                if progress:
+                    progress(done, max(total, done))
+
+            try:
+                for segment_start, segment_end in _segments(first, info.frame_count, step):
+                    skip = {frame_index for frame_index in cached
+                            if segment_start <= frame_index and (segment_end is None or frame_index < segment_end)}
+                    if segment_end is not None and len(skip) == len(range(segment_start, segment_end, step)):
+                        continue
+                    if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        handle(finished)
+                    future = pool.submit(_read_segment, video_path, step, segment_start, segment_end, skip, region)
+                    segments[future] = (segment_start, segment_end, skip)
+                    pending.add(future)
+                handle(wait(pending).done)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+    finally:
+        writer.flush()
+        result.seconds = time.perf_counter() - start
+
+    return result
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Extract the slope profile of a section from its video")
+    parser.add_argument("section_id", type=int)
+    parser.add_argument("video")
+    parser.add_argument("--start", type=float, default=0.0, help="second of the video to start at")
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL, help="seconds between sampled frames")
+    parser.add_argument("--reader", choices=sorted(ocr.READERS), default="tesseract")
+    parser.add_argument("--workers", type=int, help="decoding and OCR processes")
+    args = parser.parse_args(argv)
+
+    database.initialize_database()
+    result = extract_slope(args.section_id, args.video, args.start, args.interval, args.reader, workers=args.workers)
+    print(f"{result.readings} readings ({result.cached} from cache), {len(result.failures)} unreadable frames,"
+          f" {result.seconds:.1f} s")
+    if result.failures:
+        print(result.failure_summary())
+    return 0 if result.readings else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Reading the telemetry overlay of inspection videos
+
+Two readers are available:
+
+- "tesseract": pytesseract with a digits-only whitelist, for any overlay font
+- "template": matches glyphs against templates rendered in one of OpenCV's
+  Hershey fonts, for crawler overlays drawn with a fixed font; it needs no
+  external program and is much faster
+
+Both take the grayscale overlay crop made by crop_overlay() and return
+the overlay text.
+"""
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Overlay region as fractions of the frame (left, top, right, bottom); the
+# distance and slope are shown in the top right corner
+OVERLAY_REGION = (0.55, 0.0, 1.0, 0.12)
+
+# Characters that can appear in the overlay
+OVERLAY_CHARS = "0123456789.-%m"
+
+TESSERACT_CONFIG = f"--psm 7 -c tessedit_char_whitelist={OVERLAY_CHARS}"
+
+_DISTANCE_PATTERN = re.compile(r"(-?\d+(?:\.\d+)?)\s*m")
+_SLOPE_PATTERN = re.compile(r"(-?\d+(?:\.\d+)?)\s*%")
+
+def crop_overlay(frame: np.ndarray, region: Tuple[float, float, float, float] = OVERLAY_REGION) -> np.ndarray:
+    """Cut the overlay out of a frame as a small grayscale image
+
+    Done before frames leave the decoding process, so workers receive a
+    few kilobytes per frame instead of a full-resolution image.
+
+    Args:
+        frame: BGR or grayscale frame
+        region: Overlay region as fractions of the frame
+
+    Returns:
+        Grayscale crop
+    """
+    height, width = frame.shape[:2]
+    left, top, right, bottom = region
+    crop = frame[int(top * height):int(bottom * height), int(left * width):int(right * width)]
+    if crop.ndim == 3:
+        # ITU-R BT.601 luma, matches cv2.cvtColor(..., COLOR_BGR2GRAY)
+        crop = (crop[..., 0] * 0.114 + crop[..., 1] * 0.587 + crop[..., 2] * 0.299).astype(np.uint8)
+    return np.ascontiguousarray(crop)
+
+def parse_overlay(text: str) -> Tuple[float, float]:
+    """Parse the distance and slope from overlay text
+
+    Args:
+        text: Overlay text, e.g. "12.40m -1.25%"
+
+    Returns:
+        (distance in meters, slope in percent)
+
+    Raises:
+        ValueError: If the distance or the slope (with its % sign) is missing
+    """
+    distance = _DISTANCE_PATTERN.search(text or "")
+    slope = _SLOPE_PATTERN.search(text or "")
+    if not distance:
+        raise ValueError(f"No distance in overlay text {text!r}")
+    if not slope:
+        raise ValueError(f"No slope percentage in overlay text {text!r}")
+    return float(distance.group(1)), float(slope.group(1))
+
+def _binarize(image: np.ndarray) -> np.ndarray:
+    """Separate the light overlay text from the background
+
+    Otsu's threshold alone splits a dark banner from the video behind it
+    when both are in the crop; overlay text is the brightest class, so the
+    threshold is at least 60% of the brightest pixel.
+    """
+    import cv2
+
+    otsu, _ = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return image > max(otsu, 0.6 * int(image.max()))
+
+class TemplateReader:
+    """Reads fixed-font overlay text by matching glyphs against templates
+
+    Glyphs are separated by empty columns, scaled to a fixed cell and
+    compared with the template of every overlay character; wider gaps
+    become spaces.
+    """
+
+    CELL = (24, 16)  # Rows, columns every glyph is scaled to
+
+    def __init__(self, font_face: int = 0, font_scale: float = 1.0, thickness: int = 2):
+        """Render the glyph templates
+
+        Args:
+            font_face: OpenCV Hershey font of the overlay
+            font_scale: Font scale the overlay is drawn with
+            thickness: Stroke thickness the overlay is drawn with
+        """
+        import cv2
+
+        self.cv2 = cv2
+        self.chars = []
+        templates = []
+        for char in OVERLAY_CHARS:
+            # Rendered next to a digit so the glyph keeps its place in the line
+            canvas = np.zeros((int(60 * font_scale), int(120 * font_scale)), np.uint8)
+            cv2.putText(canvas, "8" + char, (4, int(42 * font_scale)), font_face, font_scale, 255, thickness)
+            glyphs = self._segment(canvas >= 128)
+            if len(glyphs) == 2:
+                self.chars.append(char)
+                templates.append(glyphs[1][2])
+        self.templates = np.stack(templates).reshape(len(templates), -1)
+
+        # Gaps wider than halfway between a letter gap and a space are spaces
+        gaps = []
+        for sample in ("88", "8 8"):
+            canvas = np.zeros((int(60 * font_scale), int(160 * font_scale)), np.uint8)
+            cv2.putText(canvas, sample, (4, int(42 * font_scale)), font_face, font_scale, 255, thickness)
+            first, second = self._segment(canvas >= 128)[:2]
+            gaps.append(second[0] - first[1])
+        self.space_gap = sum(gaps) / 2
+
+    def _segment(self, ink: np.ndarray):
+        """Split a binary text line into (left column, right column, glyph cell) tuples"""
+        rows = np.flatnonzero(ink.any(axis=1))
+        if not len(rows):
+            return []
+        band = ink[rows[0]:rows[-1] + 1]
+        columns = band.any(axis=0).astype(np.int8)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], columns, [0]))))
+        glyphs = []
+        for left, right in zip(edges[::2], edges[1::2]):
+            glyph = band[:, left:right].astype(np.float32)
+            cell = self.cv2.resize(glyph, self.CELL[::-1], interpolation=self.cv2.INTER_AREA)
+            # Keep the aspect ratio visible to the matcher, '.' and '-' are narrow or flat
+            cell[:, 0] = min(1.0, (right - left) / band.shape[0])
+            glyphs.append((left, right, cell))
+        return glyphs
+
+    def read(self, image: np.ndarray) -> str:
+        """Read the text of a grayscale overlay crop"""
+        glyphs = self._segment(_binarize(image))
+        if not glyphs:
+            return ""
+        cells = np.stack([cell for _, _, cell in glyphs]).reshape(len(glyphs), -1)
+        # Sum of absolute differences against every template at once
+        best = np.abs(cells[:, None, :] - self.templates[None, :, :]).sum(axis=2).argmin(axis=1)
+
+        text = []
+        previous_right = None
+        for (left, right, _), index in zip(glyphs, best):
+            if previous_right is not None and left - previous_right > self.space_gap:
+                text.append(" ")
+            text.append(self.chars[index])
+            previous_right = right
+        return "".join(text)
+
+class TesseractReader:
+    """Reads overlay text with the Tesseract OCR engine"""
+
+    def __init__(self):
+        import pytesseract
+
+        self.pytesseract = pytesseract
+
+    def read(self, image: np.ndarray) -> str:
+        """Read the text of a grayscale overlay crop"""
+        # Tesseract expects dark text on a light background
+        ink = _binarize(image)
+        return self.pytesseract.image_to_string(np.where(ink, 0, 255).astype(np.uint8), config=TESSERACT_CONFIG).strip()
+
+READERS = {
+    "template": TemplateReader,
+    "tesseract": TesseractReader,
+}
+
+def create_reader(name: str = "tesseract", **options):
+    """Create an overlay reader by name
+
+    Args:
+        name: One of READERS
+        options: Reader options, e.g. the font of the template reader
+
+    Raises:
+        ValueError: If the reader is unknown
+        ImportError: If the reader's library is not installed
+    """
+    if name not in READERS:
+        raise ValueError(f"Unknown overlay reader: {name}")
+    return READERS[name](**options)
+
+def read_overlay(reader, image: np.ndarray) -> Optional[str]:
+    """Read an overlay crop, None if the reader produced no text"""
+    text = reader.read(image)
+    return text or None
@@ -0,0 +1,179 @@
+"""
+Slope profiles: readings aggregated by distance along a section
+
+A section sampled every half second yields many readings per meter when
+the crawler stops or crawls slowly, and some distances are read twice.
+The slope graph shows the mean slope per distance bin with a min-max band,
+computed here for all bins at once with NumPy instead of per reading.
+
+downsample() reduces a profile to a number of points a plot or a PDF page
+can draw, picking the visually significant points with the
+Largest-Triangle-Three-Buckets algorithm while keeping the band's extremes.
+"""
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+import database
+
+# Width of a distance bin in meters
+BIN_SIZE = 0.1
+
+# Most points the slope graph and the PDF slope profile draw
+MAX_PLOT_POINTS = 2000
+
+@dataclass(slots=True)
+class SlopeProfile:
+    """Slope per distance bin, one array element per bin in distance order"""
+    distance: np.ndarray  # Bin center in meters, float64
+    mean: np.ndarray  # Percent, float32
+    minimum: np.ndarray  # Percent, float32
+    maximum: np.ndarray  # Percent, float32
+    count: np.ndarray  # Readings in the bin, uint32
+
+    def __len__(self) -> int:
+        return len(self.distance)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays"""
+        return sum(array.nbytes for array in (self.distance, self.mean, self.minimum, self.maximum, self.count))
+
+    @property
+    def readings(self) -> int:
+        """Number of readings the profile was built from"""
+        return int(self.count.sum())
+
+    def take(self, indices: np.ndarray) -> "SlopeProfile":
+        """Profile of the bins at the given positions"""
+        return SlopeProfile(self.distance[indices], self.mean[indices], self.minimum[indices],
+                            self.maximum[indices], self.count[indices])
+
+    @classmethod
+    def empty(cls) -> "SlopeProfile":
+        return cls(np.empty(0), np.empty(0, np.float32), np.empty(0, np.float32),
+                   np.empty(0, np.float32), np.empty(0, np.uint32))
+
+def aggregate(distances: Sequence[float], slopes: Sequence[float], bin_size: float = BIN_SIZE) -> SlopeProfile:
+    """Group readings into distance bins
+
+    Readings are sorted by bin once, then the sum, minimum and maximum of
+    every bin come from a single reduceat over the sorted slopes each.
+
+    Args:
+        distances: Distance of every reading in meters
+        slopes: Slope of every reading in percent
+        bin_size: Width of a bin in meters
+
+    Returns:
+        SlopeProfile with one element per non-empty bin
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    slopes = np.asarray(slopes, dtype=np.float64)
+    if distances.shape != slopes.shape:
+        raise ValueError("distances and slopes differ in length")
+    if not len(distances):
+        return SlopeProfile.empty()
+    if bin_size <= 0:
+        raise ValueError(f"Invalid bin size: {bin_size}")
+
+    bins = np.floor(distances / bin_size).astype(np.int64)
+    # Readings come in frame order, which is nearly sorted by distance
+    order = np.argsort(bins, kind="stable")
+    bins = bins[order]
+    slopes = slopes[order]
+
+    starts = np.flatnonzero(np.concatenate(([True], bins[1:] != bins[:-1])))
+    count = np.diff(np.append(starts, len(bins)))
+    return SlopeProfile(
+        (bins[starts] + 0.5) * bin_size,
+        (np.add.reduceat(slopes, starts) / count).astype(np.float32),
+        np.minimum.reduceat(slopes, starts).astype(np.float32),
+        np.maximum.reduceat(slopes, starts).astype(np.float32),
+        count.astype(np.uint32),
+    )
+
+def aggregate_readings(readings: Iterable[Tuple[int, float, float, float]], bin_size: float = BIN_SIZE) -> SlopeProfile:
+    """Aggregate (frame index, video time, distance, slope) tuples as stored in the database"""
+    table = np.array(readings, dtype=np.float64).reshape(-1, 4)
+    return aggregate(table[:, 2], table[:, 3], bin_size)
+
+def load_profile(section_id: int, bin_size: float = BIN_SIZE) -> SlopeProfile:
+    """Aggregate the stored slope readings of a section"""
+    return aggregate_readings(database.get_slope_readings(section_id), bin_size)
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Pick the points of a series that keep its shape (Largest-Triangle-Three-Buckets)
+
+    The first and last points are kept; the points in between are split
+    into threshold - 2 buckets and from each bucket the point forming the
+    largest triangle with the point kept from the previous bucket and the
+    average of the next bucket is kept. Each bucket is one vectorized step.
+
+    Args:
+        x: Increasing x values
+        y: y values
+        threshold: Number of points to keep
+
+    Returns:
+        Indices of the kept points, increasing
+    """
+    length = len(x)
+    if threshold >= length:
+        return np.arange(length)
+    if threshold < 3:
+        raise ValueError(f"LTTB needs at least 3 points, got {threshold}")
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    # Averages of every bucket, the "third point" of the triangles
+    sums_x = np.add.reduceat(x[1:length - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:length - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    average_x = np.append(sums_x / sizes, x[-1])
+    average_y = np.append(sums_y / sizes, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+        # Twice the triangle area, the constant factor does not change the maximum
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+def downsample(profile: SlopeProfile, max_points: int = MAX_PLOT_POINTS) -> SlopeProfile:
+    """Reduce a profile to at most max_points bins for drawing
+
+    The mean line keeps the points LTTB selects; the band of every kept
+    point widens to the extremes of all bins up to the next kept point, so
+    a spike never disappears from the band.
+
+    Args:
+        profile: Profile to reduce
+        max_points: Number of points to draw at most
+
+    Returns:
+        The profile itself if it is small enough, otherwise a reduced copy
+    """
+    if len(profile) <= max_points:
+        return profile
+    indices = lttb(profile.distance, profile.mean, max_points)
+    reduced = profile.take(indices)
+    reduced.minimum = np.minimum.reduceat(profile.minimum, indices)
+    reduced.maximum = np.maximum.reduceat(profile.maximum, indices)
+    reduced.count = np.add.reduceat(profile.count, indices).astype(np.uint32)
+    return reduced
+
+def plot_profile(section_id: int, bin_size: float = BIN_SIZE,
+                 max_points: Optional[int] = MAX_PLOT_POINTS) -> SlopeProfile:
+    """Load a section's profile ready for drawing"""
+    profile = load_profile(section_id, bin_size)
+    return downsample(profile, max_points) if max_points else profile
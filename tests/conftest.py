@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, not in an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+@pytest.fixture
+def db(tmp_path):
+    """Point the database layer at a new, initialized database file"""
+    manager = database.connection_manager
+    previous = (manager.database_file, manager.read_only, manager.source_file)
+    manager.set_database_file(str(tmp_path / "pipes.db"))
+    database.initialize_database()
+    yield manager
+    manager.set_database_file(*previous)
@@ -0,0 +1,64 @@
+"""
+Randomized checks of the area geometry fast paths against slow references
+
+Polygons are drawn on a small integer grid, which gives plenty of
+touching and collinear edges. The generator is seeded so a failure
+reproduces; the failing points are in the assertion message.
+"""
+import random
+
+import numpy as np
+import pytest
+
+import area_geometry
+from area_geometry import AreaMeasurement, Circle
+
+def pairwise_intersects(points):
+    """Self-intersection test over every pair of edges"""
+    points = area_geometry._without_repeats(points)
+    n = len(points)
+    if n < area_geometry.MIN_POINTS:
+        return False
+    for i in range(n):
+        a, b = points[i], points[(i + 1) % n]
+        for j in range(i + 1, n):
+            c, d = points[j], points[(j + 1) % n]
+            if j == i + 1:
+                crossing = area_geometry._folds_back(*a, *b, *d)
+            elif (j + 1) % n == i:
+                crossing = area_geometry._folds_back(*c, *d, *b)
+            else:
+                crossing = area_geometry._segments_intersect(*a, *b, *c, *d)
+            if crossing:
+                return True
+    return False
+
+def _random_polygon(rng):
+    return np.array([[rng.randint(0, 12), rng.randint(0, 12)] for _ in range(rng.randint(3, 14))], float)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_sweep_matches_every_pair(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        points = _random_polygon(rng)
+        assert area_geometry.self_intersects(points) == pairwise_intersects(points), points.tolist()
+
+@pytest.mark.parametrize("seed", range(4))
+def test_moving_a_point_matches_full_recompute(seed):
+    rng = random.Random(seed)
+    circle = Circle(6, 6, 6)
+    for _ in range(100):
+        measurement = AreaMeasurement(circle, _random_polygon(rng))
+        for _ in range(10):
+            measurement.move_point(rng.randrange(len(measurement)), rng.randint(0, 12), rng.randint(0, 12))
+            full = AreaMeasurement(circle, measurement.points.copy())
+            assert measurement.problem == full.problem, measurement.points.tolist()
+            assert abs(measurement.area - full.area) < 1e-6, measurement.points.tolist()
+
+def test_validate():
+    circle = Circle(0, 0, 10)
+    square = np.array([[-5, -5], [5, -5], [5, 5], [-5, 5]], float)
+    assert area_geometry.validate(square, circle) is None
+    assert area_geometry.validate(square[:2], circle) == area_geometry.TOO_FEW_POINTS
+    assert area_geometry.validate(square[[0, 2, 1, 3]], circle) == area_geometry.SELF_INTERSECTING
+    assert area_geometry.validate(square * 3, circle) == area_geometry.OUTSIDE_CIRCLE
@@ -0,0 +1,47 @@
+import os
+
+import backup
+import database
+
+def test_snapshot_sees_one_moment(db):
+    project_id = database.add_project("Herzl", "Haifa")
+    with backup.Snapshot() as snapshot, database.use_connection_manager(snapshot.connections):
+        with database.use_connection_manager(database.connection_manager):
+            database.add_project("Later", "Haifa")
+        assert database.get_project(project_id).name == "Herzl"
+        assert [project.name for project in database.search_projects("Later")] == []
+    assert not os.path.exists(snapshot._dir or "")
+
+def test_shared_snapshot_is_reused_until_a_commit(db):
+    shared = backup.SharedSnapshot()
+    try:
+        project_id = database.add_project("Herzl", "Haifa")
+        with shared.use() as first:
+            assert database.get_project(project_id).name == "Herzl"
+        with shared.use() as second:
+            pass
+        assert second is first and os.path.exists(first.path)
+
+        database.add_project("Weizmann", "Haifa")
+        with shared.use() as third:
+            assert third is not first
+            assert len(database.search_projects("Weizmann")) == 1
+        assert first.path is None
+    finally:
+        shared.close()
+
+def test_replaced_snapshot_lives_until_released(db):
+    shared = backup.SharedSnapshot()
+    try:
+        database.add_project("Herzl", "Haifa")
+        old = shared.acquire()
+        database.add_project("Weizmann", "Haifa")
+        new = shared.acquire()
+        assert new is not old and os.path.exists(old.path)
+        shared.release(old)
+        assert old.path is None
+        shared.release(new)
+        assert os.path.exists(new.path)
+    finally:
+        shared.close()
+    assert new.path is None
@@ -0,0 +1,42 @@
+import gc
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+def _is_closed(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+def test_connection_is_closed_when_its_thread_exits(db):
+    opened = []
+    thread = threading.Thread(target=lambda: opened.append(db.get_connection()))
+    thread.start()
+    thread.join()
+    gc.collect()
+    assert _is_closed(opened[0])
+    assert opened[0] not in db._connections
+
+def test_pool_worker_connections_are_closed_on_shutdown(db):
+    pool = ThreadPoolExecutor(max_workers=2)
+    opened = [pool.submit(db.get_connection).result() for _ in range(4)]
+    assert all(not _is_closed(conn) for conn in opened)
+    pool.shutdown(wait=True)
+    gc.collect()
+    assert all(_is_closed(conn) for conn in opened)
+
+def test_close_thread(db):
+    conn = db.get_connection()
+    db.close_thread()
+    assert _is_closed(conn)
+    assert db.get_connection() is not conn
+
+def test_close_all_reopens_on_next_use(db):
+    conn = db.get_connection()
+    db.close_all()
+    assert _is_closed(conn)
+    assert not _is_closed(db.get_connection())
@@ -0,0 +1,20 @@
+import database
+import event_catalog
+
+def _codes():
+    return [entry.code for entry in event_catalog.get_catalog().search("ZZ")]
+
+def test_catalog_follows_event_code_writes(db):
+    assert _codes() == []
+    database.add_event_codes([{"code": "ZZA", "category": "Test", "description": "First"}])
+    assert _codes() == ["ZZA"]
+
+def test_catalog_is_loaded_per_database_file(db, tmp_path):
+    database.add_event_codes([{"code": "ZZA", "category": "Test", "description": "First"}])
+    assert _codes() == ["ZZA"]
+    first = db.database_file
+    db.set_database_file(str(tmp_path / "other.db"))
+    database.initialize_database()
+    assert _codes() == []
+    db.set_database_file(first)
+    assert _codes() == ["ZZA"]
@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+import pytest
+
+from video.cache import FrameCache
+
+FPS = 10
+SECONDS = 4
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "short.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (32, 32))
+    for index in range(FPS * SECONDS):
+        writer.write(np.full((32, 32, 3), index * 6, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_frames_are_read_after_reading_past_the_end(video):
+    cache = FrameCache()
+    assert cache.get_frame(video, 10.0) is None
+    assert cache.get_frame(video, 0.5) is not None
+
+def test_frames_are_read_after_a_failed_grab(video):
+    cache = FrameCache()
+    assert cache.get_frame(video, SECONDS - 0.5) is not None
+    # Close enough to grab towards, but past the last frame
+    assert cache.get_frame(video, SECONDS + 0.5) is None
+    assert cache.get_frame(video, SECONDS - 0.2) is not None
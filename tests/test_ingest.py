@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import database
+
+def _video(project, fingerprint, **fields):
+    return dict({"project": project, "location": "Haifa", "fingerprint": fingerprint,
+                 "path": f"/videos/{fingerprint}.mp4"}, **fields)
+
+def _sections(project_name):
+    conn = database.get_connection()
+    return [tuple(row) for row in conn.execute(
+        "SELECT s.section_number, s.video_path FROM sections s JOIN projects p ON p.id = s.project_id "
+        "WHERE p.name = ? ORDER BY s.section_number", (project_name,))]
+
+def test_sections_are_numbered_per_project(db):
+    result = database.add_ingested_videos([_video("A", "a1"), _video("B", "b1"), _video("A", "a2")])
+    assert result.errors == [] and result.succeeded == 3
+    assert _sections("A") == [(1, "/videos/a1.mp4"), (2, "/videos/a2.mp4")]
+    again = database.add_ingested_videos([_video("A", "a1"), _video("A", "a3")])
+    assert [index for index, _ in again.errors] == [0]
+    assert _sections("A")[-1] == (3, "/videos/a3.mp4")
+
+def test_failed_row_does_not_leave_its_project_behind(db):
+    videos = [_video("New", "n1"), _video("New", "n2"), _video("New", "n3")]
+    del videos[0]["path"]  # Fails after the project was created for it
+    result = database.add_ingested_videos(videos)
+    assert [index for index, _ in result.errors] == [0]
+    assert result.succeeded == 2
+    assert _sections("New") == [(1, "/videos/n2.mp4"), (2, "/videos/n3.mp4")]
+
+def test_failed_chunk_does_not_leave_its_projects_behind(db):
+    conn = database.get_connection()
+    with conn:
+        # A deferred foreign key fails the commit of the first chunk, after its rows were written
+        conn.execute("CREATE TABLE audit (project_id INTEGER REFERENCES projects (id) DEFERRABLE INITIALLY DEFERRED)")
+        conn.execute("CREATE TRIGGER audit_x2 AFTER INSERT ON ingested_videos WHEN NEW.fingerprint = 'x2' "
+                     "BEGIN INSERT INTO audit VALUES (-1); END")
+    videos = [_video("X", "x1"), _video("X", "x2"), _video("X", "x3"), _video("X", "x4")]
+    result = database.add_ingested_videos(videos, chunk_size=2)
+    assert [index for index, _ in result.errors] == [0, 1]
+    assert result.succeeded == 2
+    assert _sections("X") == [(1, "/videos/x3.mp4"), (2, "/videos/x4.mp4")]
+
+def _write_video(path, shade):
+    import cv2
+    import numpy as np
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 32))
+    for _ in range(10):
+        writer.write(np.full((32, 32, 3), shade, dtype=np.uint8))
+    writer.release()
+
+def test_projects_are_written_as_soon_as_they_are_probed(db, tmp_path):
+    from video import ingest
+
+    root = tmp_path / "crew"
+    for shade, name in enumerate(["A/a1.avi", "A/a2.avi", "B/b1.avi"]):
+        _write_video(str(root / name), 40 * (shade + 1))
+
+    def progress(done, total, phase):
+        if phase == "write":
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        ingest.ingest_folder(str(root), workers=0, progress=progress)
+    assert [number for number, _ in _sections("A")] == [1, 2]
+    assert _sections("B") == []
+    result = ingest.ingest_folder(str(root), workers=0)
+    assert result.skipped == 2 and len(result.sections) == 1
+    assert [path for _, path in _sections("B")] == [str(root / "B" / "b1.avi")]
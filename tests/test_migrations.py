@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from migrations import Backfill, Migration, add_column, apply_migration, get_version
+
+def _schema(conn):
+    return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master"))
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "pipes.db")
+    with conn:
+        conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO projects (name) VALUES (?)", [(f"p{i}",) for i in range(10)])
+        conn.execute("PRAGMA user_version = 1")
+    yield conn
+    conn.close()
+
+def test_failing_step_rolls_back_schema_and_version(conn):
+    before = _schema(conn)
+    migration = Migration(2, "broken", schema=(
+        "CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY)",
+        add_column("projects", "notes", "TEXT"),
+        "CREATE INDEX idx_missing ON no_such_table(id)",
+    ))
+    with pytest.raises(sqlite3.Error):
+        apply_migration(conn, migration)
+    assert _schema(conn) == before
+    assert get_version(conn) == 1
+
+def test_failing_backfill_keeps_version(conn):
+    migration = Migration(2, "backfill", schema=(add_column("projects", "upper_name", "TEXT"),),
+                          backfills=(Backfill("projects", "UPDATE no_such_table SET x = 1 WHERE id BETWEEN ? AND ?"),))
+    with pytest.raises(sqlite3.Error):
+        apply_migration(conn, migration, batch_size=3)
+    assert get_version(conn) == 1
+
+def test_migration_sets_version(conn):
+    migration = Migration(2, "notes", schema=(add_column("projects", "notes", "TEXT"),),
+                          backfills=(Backfill("projects", "UPDATE projects SET notes = name "
+                                                          "WHERE id BETWEEN ? AND ? AND notes IS NULL"),))
+    report = apply_migration(conn, migration, batch_size=3)
+    assert get_version(conn) == 2
+    assert report.rows == 10
+    assert conn.execute("SELECT COUNT(*) FROM projects WHERE notes = name").fetchone()[0] == 10
+
+def test_backfill_batches_skip_rowid_gaps(conn):
+    with conn:
+        conn.execute("INSERT INTO projects (id, name) VALUES (10000000, 'far')")
+    migration = Migration(2, "notes", schema=(add_column("projects", "notes", "TEXT"),),
+                          backfills=(Backfill("projects", "UPDATE projects SET notes = name "
+                                                          "WHERE id BETWEEN ? AND ? AND notes IS NULL"),))
+    report = apply_migration(conn, migration, batch_size=3)
+    assert report.rows == 11
+    assert report.batches == 4
+
+def test_dry_run_copy_uses_the_connection_pragmas(conn, monkeypatch):
+    temp_stores = []
+    migration = Migration(2, "temp store", schema=(
+        lambda copy: temp_stores.append(copy.execute("PRAGMA temp_store").fetchone()[0]),))
+    monkeypatch.setattr(migrations, "MIGRATIONS", (migration,))
+    reports = migrations.migrate(conn, target=2, dry_run=True)
+    assert [report.dry_run for report in reports] == [True]
+    assert temp_stores == [2]  # MEMORY
+    assert get_version(conn) == 1
+
+def test_initialized_database_is_at_latest_version(db):
+    assert get_version(db.get_connection()) == migrations.SCHEMA_VERSION
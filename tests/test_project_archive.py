@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+import database
+import project_archive
+
+@pytest.fixture
+def archive(db, tmp_path):
+    """Archive of one project whose two sections share a video"""
+    video = tmp_path / "crew" / "section.mp4"
+    video.parent.mkdir()
+    video.write_bytes(os.urandom(4096))
+    project_id = database.add_project("Herzl", "Haifa")
+    database.add_section(project_id, video_path=str(video))
+    database.add_section(project_id, video_path=str(video))
+    path = str(tmp_path / "herzl.pipes")
+    result = project_archive.export_archive(path, [project_id])
+    assert result.media == 1
+    return path
+
+def _media_files():
+    directory = project_archive.media_dir()
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+def test_import_moves_videos_into_place(archive):
+    result = project_archive.import_archive(archive)
+    assert result.media == 1 and len(result.projects) == 1
+    paths = {section.video_path for section in database.get_sections(result.projects[0])}
+    assert len(paths) == 1 and os.path.isfile(paths.pop())
+    assert [name for name in _media_files() if name.endswith(".part")] == []
+
+    again = project_archive.import_archive(archive)
+    assert again.media == 0 and len(_media_files()) == 1
+
+def test_failed_import_leaves_no_videos(archive, monkeypatch):
+    monkeypatch.setattr(database, "add_project_rows", lambda rows, blob_content: None)
+    with pytest.raises(ValueError):
+        project_archive.import_archive(archive)
+    assert _media_files() == []
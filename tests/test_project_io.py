@@ -0,0 +1,59 @@
+import pytest
+
+import database
+import project_io
+
+def _count():
+    return database.get_connection().execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_import_json(db, tmp_path):
+    path = _write(tmp_path, "projects.json", '[{"name": "Herzl", "location": "Haifa"}, {"name": "Jaffa", "location": "Tel Aviv"}]')
+    result = project_io.import_projects(path)
+    assert result.errors == [] and result.succeeded == 2
+    assert _count() == 2
+
+def test_cut_off_json_is_a_row_error(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(project_io, "JSON_READ_SIZE", 16)
+    path = _write(tmp_path, "projects.json", '[{"name": "Herzl", "location": "Haifa"}, {"name": "Jaffa", "loc')
+    result = project_io.import_projects(path, chunk_size=1)
+    assert [index for index, _ in result.errors] == [1]
+    assert result.succeeded == 0
+    assert _count() == 0
+
+def test_malformed_json_is_a_row_error(db, tmp_path):
+    path = _write(tmp_path, "projects.json", '[{"name": "Herzl", "location": "Haifa"}, {"name": Jaffa}, '
+                                             '{"name": "Acre", "location": "Acre"}]')
+    result = project_io.import_projects(path)
+    assert [index for index, _ in result.errors] == [1]
+    assert result.succeeded == 2
+    assert _count() == 2
+
+@pytest.mark.parametrize("read_size", [1, 7, 64 * 1024])
+def test_json_reading_resumes_after_malformed_items(tmp_path, monkeypatch, read_size):
+    monkeypatch.setattr(project_io, "JSON_READ_SIZE", read_size)
+    text = ('[{"name": "a, \\"b]}\\\\", "tags": [1, {"x": "]"}]}, {"name": 1 2}, '
+            '{"name": [1, x]}, 17, {"name": "c"}\n]')
+    with open(_write(tmp_path, "projects.json", text), encoding="utf-8") as stream:
+        items = list(project_io.read_json(stream))
+    assert items[0] == {"name": 'a, "b]}\\', "tags": [1, {"x": "]"}]}
+    assert [type(item) for item in items[1:3]] == [ValueError, ValueError]
+    assert items[3:] == [17, {"name": "c"}]
+
+def test_update_falls_back_to_single_rows(db):
+    ids = database.add_projects([{"name": f"p{i}", "location": "Haifa"} for i in range(5)]).ids
+    conn = database.get_connection()
+    with conn:
+        conn.execute("CREATE TRIGGER reject BEFORE UPDATE ON projects WHEN NEW.name = 'bad' "
+                     "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    rows = [{"id": project_id, "name": "bad" if i == 2 else f"q{i}", "location": "Acre"}
+            for i, project_id in enumerate(ids)]
+    result = database.update_projects(rows, chunk_size=5)
+    assert [index for index, _ in result.errors] == [2]
+    assert result.ids == ids[:2] + [None] + ids[3:]
+    names = [row[0] for row in conn.execute("SELECT name FROM projects ORDER BY id")]
+    assert names == ["q0", "q1", "p2", "q3", "q4"]
@@ -0,0 +1,15 @@
+import os
+import warnings
+
+import database
+from reports import project_report
+
+def test_project_report_renders_without_deprecated_fpdf_calls(db, tmp_path):
+    project_id = database.add_project("קו ביוב", "חיפה")
+    section_id = database.add_section(project_id, street="הרצל", diameter=300, length=42.0)
+    database.add_event(section_id, "BAB", 12.5)
+    path = str(tmp_path / "report.pdf")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        result = project_report.render_project_report(project_id, path, workers=0)
+    assert result.path == path and os.path.getsize(path) > 0
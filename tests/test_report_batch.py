@@ -0,0 +1,12 @@
+import os
+
+import database
+from reports import batch
+
+def test_output_files_are_named_by_project(db, tmp_path):
+    herzl = database.add_project("Herzl", "Haifa")
+    sewer = database.add_project("קו ביוב / שלב 2", "Haifa")
+    out = tmp_path / "reports"
+    result = batch.generate_reports(output_dir=str(out), workers=1)
+    assert result.failures == []
+    assert sorted(os.listdir(out)) == sorted([f"project-{herzl}-Herzl.pdf", f"project-{sewer}-קו-ביוב-שלב-2.pdf"])
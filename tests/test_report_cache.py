@@ -0,0 +1,66 @@
+import os
+import time
+
+import pytest
+
+from reports import engine
+
+DETAILS = {"Name": "Herzl", "Date": "2026-10-17", "Location": "Haifa", "ID": 1}
+
+@pytest.fixture
+def reports_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "reports")
+    monkeypatch.setattr(engine, "REPORTS_DIR", directory)
+    return directory
+
+def test_unchanged_content_reuses_the_report(reports_dir):
+    path = engine.render_report(DETAILS, reports_dir)
+    written = os.stat(path).st_mtime_ns
+    assert engine.render_report(dict(DETAILS), reports_dir) == path
+    assert os.stat(path).st_mtime_ns >= written
+    assert engine.render_report(dict(DETAILS, Name="Jaffa"), reports_dir) != path
+
+def test_layout_version_is_part_of_the_key(reports_dir, monkeypatch):
+    path = engine.render_report(DETAILS, reports_dir)
+    monkeypatch.setattr(engine, "REPORT_LAYOUT_VERSION", engine.REPORT_LAYOUT_VERSION + 1)
+    assert engine.render_report(DETAILS, reports_dir) != path
+
+def _touch(directory, name, age):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as report:
+        report.write(b"%PDF")
+    moment = time.time() - age
+    os.utime(path, (moment, moment))
+    return path
+
+def test_prune_keeps_the_newest_reports(tmp_path):
+    directory = str(tmp_path)
+    paths = [_touch(directory, f"project-{i}.pdf", age=i * 60) for i in range(5)]
+    kept = _touch(directory, "notes.txt", age=10 ** 7)
+    assert engine.prune_reports(directory, max_files=3, max_age=3600) == 2
+    assert [os.path.exists(path) for path in paths] == [True, True, True, False, False]
+    assert os.path.exists(kept)
+
+def test_prune_drops_old_reports(tmp_path):
+    directory = str(tmp_path)
+    fresh = _touch(directory, "fresh.pdf", age=0)
+    old = _touch(directory, "old.pdf", age=7200)
+    assert engine.prune_reports(directory, max_files=10, max_age=3600) == 1
+    assert os.path.exists(fresh) and not os.path.exists(old)
+
+def test_only_the_cache_is_pruned(reports_dir, tmp_path, monkeypatch):
+    pruned = []
+    monkeypatch.setattr(engine, "prune_reports", lambda directory=None: pruned.append(directory))
+    engine.render_report(DETAILS, str(tmp_path / "chosen"))
+    assert pruned == []
+    engine.render_report(DETAILS, reports_dir)
+    assert pruned == [reports_dir]
+
+def test_report_font_is_found_from_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert engine.new_document().report_font == engine.FONT_FAMILY
+
+def test_missing_report_font_is_reported(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(engine, "FONT_FILE", str(tmp_path / "missing.ttf"))
+    assert engine.new_document().report_font == engine.FALLBACK_FONT
+    assert "missing.ttf not found" in capsys.readouterr().out
@@ -0,0 +1,132 @@
+import random
+import sqlite3
+
+import pytest
+
+import backup
+import database
+
+POINTED = "שָׁלוֹם עֲלֵיכֶם"  # Shalom Aleichem with niqqud
+
+def _names(query):
+    return sorted(project.name for project in database.search_projects(query))
+
+def _integrity_check():
+    conn = database.get_connection()
+    with conn:
+        conn.execute("INSERT INTO projects_fts (projects_fts, rank) VALUES ('integrity-check', 0)")
+
+def test_pointed_name_is_found_by_plain_and_pointed_search(db):
+    database.add_project(POINTED, "חֵיפָה")
+    database.add_project("Herzl", "Haifa")
+    assert _names("שלום") == [POINTED]
+    assert _names("שָׁלוֹם") == [POINTED]
+    assert _names("עליכם חיפה") == [POINTED]
+    # Short terms are matched with LIKE, also against the folded text
+    assert _names("של") == [POINTED]
+
+def test_index_follows_updates_and_deletes(db):
+    project_id = database.add_project(POINTED, "Haifa")
+    database.update_project(project_id, "בְּרֵאשִׁית", "Haifa")
+    assert _names("שלום") == []
+    assert len(_names("בראשית")) == 1
+    _integrity_check()
+    database.delete_project(project_id)
+    assert _names("בראשית") == []
+    _integrity_check()
+
+# Search indexes of older versions: over the projects table (external
+# content) and holding its own folded copy of the text
+OLDER_INDEXES = (
+    "CREATE VIRTUAL TABLE projects_fts USING fts5("
+    "name, location, content='projects', content_rowid='id', tokenize='trigram')",
+    "CREATE VIRTUAL TABLE projects_fts USING fts5(name, location, tokenize='trigram')",
+)
+
+@pytest.mark.parametrize("create_index", OLDER_INDEXES)
+def test_index_of_older_versions_is_rebuilt(db, create_index):
+    conn = database.get_connection()
+    with conn:
+        for name in database.FTS_TRIGGER_NAMES:
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("DROP TABLE projects_fts_vocab")
+        conn.execute("DROP TABLE projects_fts")
+        conn.execute("DROP TABLE project_search")
+        conn.execute(create_index)
+        conn.execute("INSERT INTO projects (name, location) VALUES (?, 'Haifa')", (POINTED,))
+        conn.execute("INSERT INTO projects_fts (rowid, name, location) SELECT id, name, location FROM projects")
+    database.initialize_database()
+    assert _names("שלום") == [POINTED]
+    assert _names("של") == [POINTED]
+    _integrity_check()
+
+def test_other_connections_can_write_projects(db):
+    # The schema needs nothing this module registers on its connections
+    conn = sqlite3.connect(db.database_file)
+    try:
+        with conn:
+            conn.execute("INSERT INTO projects (name, location) VALUES ('Herzl', 'Haifa')")
+            conn.execute("UPDATE projects SET name = 'Herzliya' WHERE name = 'Herzl'")
+            conn.execute("INSERT INTO projects (name, location) VALUES ('Jaffa', 'Tel Aviv')")
+            conn.execute("DELETE FROM projects WHERE name = 'Jaffa'")
+    finally:
+        conn.close()
+    assert _names("Herzliya") == ["Herzliya"]
+    assert _names("Jaffa") == []
+    _integrity_check()
+
+def test_bulk_writes_index_folded_text(db):
+    ids = database.add_projects([{"name": POINTED, "location": "Haifa"}, {"name": "Herzl", "location": "Haifa"}]).ids
+    assert _names("שלום") == [POINTED]
+    database.update_projects([{"id": ids[1], "name": "בְּרֵאשִׁית", "location": "Haifa"}])
+    assert _names("בראשית") == ["בְּרֵאשִׁית"]
+    _integrity_check()
+
+def test_tokenizer_is_looked_up_per_active_database(db):
+    database.add_project(POINTED, "Haifa")
+    with backup.Snapshot() as snapshot, database.use_connection_manager(snapshot.connections):
+        assert _names("שלום") == [POINTED]
+        assert snapshot.path in database._fts_tokenizers
+
+def _matches(projects, query, filters):
+    """Search results computed in Python, in list order"""
+    terms = database.normalize_search_text(query).lower().split()
+    found = []
+    for project in projects:
+        text = database.normalize_search_text(f"{project.name} {project.location}").lower()
+        if all(term in text for term in terms) and all(
+                getattr(project, name) == value for name, value in filters.items()):
+            found.append(project)
+    return sorted(found, key=lambda project: (project.created_at, project.id), reverse=True)
+
+def _pages(query, filters):
+    """Page through all results of a search"""
+    pages = [database.get_projects_page(limit=7, query=query, filters=filters)]
+    while pages[-1]:
+        last = pages[-1][-1]
+        pages.append(database.get_projects_page(
+            limit=7, after=(last.created_at, last.id), query=query, filters=filters))
+    return [project for page in pages for project in page]
+
+@pytest.mark.parametrize("sort_max, walk_rows", [(1000, 20000), (0, 20000), (0, 30)])
+def test_search_plans_return_the_same_pages(db, monkeypatch, sort_max, walk_rows):
+    # Sorted matches, the list order walk, and a walk past its window
+    monkeypatch.setattr(database, "SEARCH_SORT_MAX", sort_max)
+    monkeypatch.setattr(database, "SEARCH_WALK_ROWS", walk_rows)
+    monkeypatch.setattr(database, "SEARCH_JOIN_WALK_ROWS", walk_rows)
+    rng = random.Random(3)
+    database.add_projects({
+        "name": rng.choice([POINTED, "Sewer 10%", "קו ביוב", "Main_line"]) + f" {i}",
+        "location": rng.choice(["Haifa", "חֵיפָה", "Tel Aviv"]),
+        "created_at": f"2024-01-{rng.randint(1, 28):02d} 10:00:00",
+    } for i in range(200))
+    projects = database.get_all_projects()
+    for query in ["שלום", "ש", "של 1", "sewer", "ewer 1", "0%", "n_l", "חיפה ביוב", "x", "zzz"]:
+        for filters in [{}, {"location": "Haifa"}]:
+            expected = _matches(projects, query, filters)
+            assert _pages(query, filters) == expected, (query, filters)
+            assert database.count_projects(query, filters) == len(expected)
+            assert database.search_projects(query, filters, limit=-1) == expected
+    newest = database.get_projects_page(limit=7, query="ש")
+    above = database.get_projects_page(limit=3, before=(newest[-1].created_at, newest[-1].id), query="ש")
+    assert above == newest[3:6]
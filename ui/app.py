@@ -1,10 +1,17 @@
 """
 Main application window for Pipes
 """
+import os
 import tkinter as tk
-from tkinter import ttk
+from datetime import date
+from tkinter import ttk, filedialog, messagebox
+import backup
+import database
 from ui.projects_page import ProjectsPage
+from ui.diagnostics_page import DiagnosticsPage
+from ui.jobs import JobExecutor
 from languages import language_manager
+from instrumentation import instrumentation
 
 class Application:
     """Main application class handling UI components"""
@@ -15,32 +22,185 @@ class Application:
         Args:
             root: Tkinter root window
         """
-        root.title(language_manager.translate("app_title"))
         self.root = root
+        language_manager.bind(root, "app_title", option="title", setter=root.title)
         self.setup_ui()
+        language_manager.add_listener(self.apply_direction)
+        self.apply_direction(language_manager.is_rtl)
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def setup_ui(self):
         """Set up the UI components"""
+        # Language menu, switches the running UI without a restart
+        self.menu_bar = tk.Menu(self.root, tearoff=0)
+        self.language_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.language_var = tk.StringVar(value=language_manager.current_language)
+        for language_code in language_manager.available_languages():
+            self.language_menu.add_radiobutton(
+                label=language_manager.load_catalog(language_code).get("language_name", language_code),
+                value=language_code, variable=self.language_var,
+                command=lambda code=language_code: self.change_language(code)
+            )
+        self.menu_bar.add_cascade(menu=self.language_menu)
+        language_manager.bind(self.menu_bar, "language", option="menu:language",
+                              setter=lambda text: self.menu_bar.entryconfigure(0, label=text))
+        
+        # Database menu, backups run on a worker while the database stays in use
+        self.database_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.database_menu.add_command(command=self.on_backup)
+        language_manager.bind(self.database_menu, "backup_database", option="menu:backup_database",
+                              setter=lambda text: self.database_menu.entryconfigure(0, label=text))
+        self.database_menu.add_command(command=self.on_import_videos)
+        language_manager.bind(self.database_menu, "import_videos", option="menu:import_videos",
+                              setter=lambda text: self.database_menu.entryconfigure(1, label=text))
+        self.menu_bar.add_cascade(menu=self.database_menu)
+        language_manager.bind(self.menu_bar, "database", option="menu:database",
+                              setter=lambda text: self.menu_bar.entryconfigure(1, label=text))
+        self.root.config(menu=self.menu_bar)
+        
+        # Status bar, created first so background jobs can report into it
+        self.status_bar = tk.Frame(self.root, height=25)
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.status_label = tk.Label(self.status_bar, bd=1, relief=tk.SUNKEN, anchor=tk.W)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X)
+        self.status_message = None
+        
+        # Busy indicator, shown while background jobs run
+        self.busy_indicator = ttk.Progressbar(self.status_bar, mode="indeterminate", length=100)
+        
+        # Background jobs for database and report work
+        self.executor = JobExecutor(self.root, status_callback=self.update_status, busy_callback=self.set_busy)
+        
         # Create notebook (tabbed interface)
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
         
         # Projects page
-        self.projects_page = ProjectsPage(self.notebook)
-        self.notebook.add(self.projects_page, text="Projects")
+        self.projects_page = ProjectsPage(self.notebook, executor=self.executor)
+        self.notebook.add(self.projects_page)
+        language_manager.bind(self.notebook, "projects", option="tab:projects",
+                              setter=lambda text: self.notebook.tab(self.projects_page, text=text))
         
-        # Status bar
-        self.status_bar = tk.Frame(self.root, height=25)
-        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        # Diagnostics page, live timings while instrumentation is enabled
+        self.diagnostics_page = DiagnosticsPage(self.notebook)
+        self.notebook.add(self.diagnostics_page)
+        language_manager.bind(self.notebook, "diagnostics", option="tab:diagnostics",
+                              setter=lambda text: self.notebook.tab(self.diagnostics_page, text=text))
         
-        self.status_label = tk.Label(self.status_bar, text="Ready", bd=1, relief=tk.SUNKEN, anchor=tk.W)
-        self.status_label.pack(side=tk.LEFT, fill=tk.X)
+        # Records how long the event loop is blocked between callbacks
+        instrumentation.watch_event_loop(self.root)
         
+        # Shows the ready message in the current language
+        self.update_status(None)
+        
+    def on_backup(self):
+        """Ask for a backup file and copy the database to it in the background"""
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title=language_manager.translate("backup_database"),
+            defaultextension=".db", initialfile=f"pipes-{date.today().isoformat()}.db",
+            filetypes=[("SQLite", "*.db"), ("*", "*")]
+        )
+        if not path:
+            return
+        self.executor.submit(self._backup, path, with_job=True, on_success=self.on_backup_done,
+                             description=language_manager.translate("backing_up"))
+
+    @staticmethod
+    def _backup(job, path):
+        """Worker: copy the database a step at a time, reporting progress"""
+        result = backup.backup_database(path, progress=lambda done, total: job.report_progress(done / max(total, 1)))
+        if result is None:
+            raise OSError(f"Could not back up the database to {path}")
+        return result
+
+    def on_backup_done(self, result):
+        """Confirm a finished backup"""
+        messagebox.showinfo(language_manager.translate("backup_database"),
+                            f"{language_manager.translate('backup_saved')}\n{os.path.abspath(result.path)}")
+
+    def on_import_videos(self):
+        """Ask for a field crew's folder and ingest its videos in the background"""
+        root = filedialog.askdirectory(parent=self.root, title=language_manager.translate("import_videos"),
+                                       mustexist=True)
+        if not root:
+            return
+        self.executor.submit(self._import_videos, root, with_job=True, on_success=self.on_import_videos_done,
+                             description=language_manager.translate("importing_videos"))
+
+    @staticmethod
+    def _import_videos(job, root):
+        """Worker: ingest a folder, reporting progress and stopping when cancelled"""
+        from video import ingest
+
+        def progress(done, total, phase):
+            job.check_cancelled()
+            # Each project is written as soon as it is probed, probing tracks the whole run
+            if phase == "probe":
+                job.report_progress(done / max(total, 1), f"{done} / {total}")
+        return ingest.ingest_folder(root, progress=progress)
+
+    def on_import_videos_done(self, result):
+        """Summarize a finished ingest; the projects list reloads through its change listener"""
+        lines = [f"{language_manager.translate('sections_added')} {len(result.sections)}",
+                 f"{language_manager.translate('already_imported')} {result.skipped}"]
+        if result.failures:
+            lines.append(f"{language_manager.translate('failed')} {len(result.failures)}")
+            lines += [f"{os.path.basename(path)}: {reason}" for path, reason in result.failures[:10]]
+        messagebox.showinfo(language_manager.translate("import_videos"), "\n".join(lines))
+
     def update_status(self, message):
         """Update status bar message
         
         Args:
-            message: Message to display
+            message: Message to display, None to show the ready message
         """
+        self.status_message = message
+        if message is None:
+            message = language_manager.translate("status_ready")
         self.status_label.config(text=message)
-        self.root.update_idletasks()
\ No newline at end of file
+        self.root.update_idletasks()
+        
+    def change_language(self, language_code):
+        """Switch the UI language in place
+        
+        Args:
+            language_code: Language code chosen in the menu
+        """
+        language_manager.set_language(language_code)
+        self.language_var.set(language_manager.current_language)
+        if self.status_message is None:
+            self.update_status(None)
+            
+    def apply_direction(self, is_rtl):
+        """Lay the main window out for the reading direction, in place
+        
+        Args:
+            is_rtl: Whether the current language is right-to-left
+        """
+        self.root.tk.call("set", "rtl", "1" if is_rtl else "0")
+        self.status_label.config(anchor=tk.E if is_rtl else tk.W)
+        self.status_label.pack_configure(side=tk.RIGHT if is_rtl else tk.LEFT)
+        
+    def set_busy(self, busy):
+        """Show or hide the busy indicator
+        
+        Args:
+            busy: Whether background jobs are running
+        """
+        if busy:
+            self.busy_indicator.pack(side=tk.LEFT if language_manager.is_rtl else tk.RIGHT, padx=5)
+            self.busy_indicator.start(10)
+            self.root.config(cursor="watch")
+        else:
+            self.busy_indicator.stop()
+            self.busy_indicator.pack_forget()
+            self.root.config(cursor="")
+            
+    def on_close(self):
+        """Stop background jobs and close the window"""
+        self.executor.shutdown()
+        backup.shared_snapshot.close()
+        database.connection_manager.close_all()
+        language_manager.remove_listener(self.apply_direction)
+        self.root.destroy()
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Diagnostics page showing live performance statistics
+"""
+import tkinter as tk
+from tkinter import ttk
+from languages import language_manager
+from instrumentation import instrumentation
+
+# How often the statistics are refreshed while the page is visible
+REFRESH_MS = 1000
+
+COLUMNS = ("name", "count", "p50_ms", "p95_ms", "max_ms", "total_s")
+
+class DiagnosticsPage(tk.Frame):
+    """Timers and counters of the instrumentation module with p50/p95 per timer"""
+
+    def __init__(self, parent):
+        """Initialize the diagnostics page
+
+        Args:
+            parent: Parent widget
+        """
+        super().__init__(parent)
+        self.parent = parent
+        self._refresh_after_id = None
+        self.setup_ui()
+        language_manager.add_listener(self.apply_direction)
+        self.bind("<Map>", self.on_map)
+        self.bind("<Unmap>", self.on_unmap)
+        self.bind("<Destroy>", self.on_destroy)
+
+    def setup_ui(self):
+        """Set up the UI components"""
+        # Button frame
+        self.button_frame = tk.Frame(self)
+        self.button_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        # Enables instrumentation and stores the choice in config.json
+        self.enabled_var = tk.BooleanVar(value=instrumentation.enabled)
+        enabled_check = ttk.Checkbutton(self.button_frame, variable=self.enabled_var, command=self.on_toggle)
+        language_manager.bind(enabled_check, "enable_instrumentation")
+
+        reset_button = ttk.Button(self.button_frame, command=self.on_reset)
+        language_manager.bind(reset_button, "reset")
+
+        # Where slow calls and summaries are logged
+        self.log_label = ttk.Label(self.button_frame)
+
+        self.leading_widgets = (enabled_check, reset_button)
+        self.trailing_widgets = (self.log_label,)
+
+        # Statistics treeview
+        self.tree_frame = tk.Frame(self)
+        self.tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        self.scrollbar = ttk.Scrollbar(self.tree_frame)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(self.tree_frame, columns=COLUMNS, show="headings",
+                                 yscrollcommand=self.scrollbar.set)
+        self.scrollbar.config(command=self.tree.yview)
+        for column, key, width in (("name", "timer", 260), ("count", "calls", 80), ("p50_ms", "p50_ms", 90),
+                                   ("p95_ms", "p95_ms", 90), ("max_ms", "max_ms", 90), ("total_s", "total_s", 90)):
+            language_manager.bind(self.tree, key, option=f"heading:{column}",
+                                  setter=lambda text, column=column: self.tree.heading(column, text=text))
+            self.tree.column(column, width=width, anchor=tk.W if column == "name" else tk.E)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.update_log_label()
+        self.apply_direction(language_manager.is_rtl)
+
+    def apply_direction(self, is_rtl):
+        """Lay the page out for the reading direction, in place
+
+        Args:
+            is_rtl: Whether the current language is right-to-left
+        """
+        leading, trailing = (tk.RIGHT, tk.LEFT) if is_rtl else (tk.LEFT, tk.RIGHT)
+        for widget in self.leading_widgets + self.trailing_widgets:
+            widget.pack_forget()
+        for widget in self.leading_widgets:
+            widget.pack(side=leading, padx=5, pady=5)
+        for widget in self.trailing_widgets:
+            widget.pack(side=trailing, padx=5, pady=5)
+        self.tree.configure(displaycolumns=COLUMNS[::-1] if is_rtl else COLUMNS)
+        self.scrollbar.pack_configure(side=trailing)
+        self.tree.pack_configure(side=leading)
+
+    def update_log_label(self):
+        """Show the log file while instrumentation is enabled"""
+        log_file = instrumentation.settings["log_file"]
+        self.log_label.config(text=log_file if instrumentation.enabled and log_file else "")
+
+    def refresh(self):
+        """Show the current statistics, rows are updated in place"""
+        self._refresh_after_id = None
+        rows = instrumentation.snapshot()
+        names = set()
+        for index, row in enumerate(rows):
+            names.add(row["name"])
+            values = (
+                row["name"], row["count"],
+                *("" if row[key] is None else f"{row[key]:.2f}" for key in ("p50_ms", "p95_ms", "max_ms")),
+                "" if row["total_s"] is None else f"{row['total_s']:.3f}",
+            )
+            if self.tree.exists(row["name"]):
+                self.tree.item(row["name"], values=values)
+            else:
+                self.tree.insert("", index, iid=row["name"], values=values)
+        stale = [iid for iid in self.tree.get_children() if iid not in names]
+        if stale:
+            self.tree.delete(*stale)
+        self._refresh_after_id = self.after(REFRESH_MS, self.refresh)
+
+    def on_toggle(self):
+        """Enable or disable instrumentation from the checkbox"""
+        instrumentation.set_enabled(self.enabled_var.get())
+        self.update_log_label()
+
+    def on_reset(self):
+        """Drop the recorded statistics"""
+        instrumentation.reset()
+        self.tree.delete(*self.tree.get_children())
+
+    def on_map(self, event):
+        """Start refreshing when the tab is shown
+
+        Args:
+            event: Event data
+        """
+        if event.widget is self and self._refresh_after_id is None:
+            self.enabled_var.set(instrumentation.enabled)
+            self.refresh()
+
+    def on_unmap(self, event):
+        """Stop refreshing while the tab is hidden
+
+        Args:
+            event: Event data
+        """
+        if event.widget is self and self._refresh_after_id is not None:
+            self.after_cancel(self._refresh_after_id)
+            self._refresh_after_id = None
+
+    def on_destroy(self, event):
+        """Stop listening for language changes when the page is destroyed
+
+        Args:
+            event: Event data
+        """
+        if event.widget is self:
+            language_manager.remove_listener(self.apply_direction)
@@ -0,0 +1,166 @@
+"""
+Event code picker for the add-event dialog
+"""
+import tkinter as tk
+from tkinter import ttk
+import event_catalog
+from languages import language_manager
+from instrumentation import instrumentation
+
+# Rows inserted right away for a query, and per idle callback after that
+FIRST_BATCH = 40
+BATCH = 200
+
+class EventCodePicker(tk.Toplevel):
+    """Searchable list of the event code catalog
+
+    Every keystroke searches the in-memory catalog index; the first rows are
+    shown at once and the rest are added in batches while Tk is idle, so a
+    broad query never blocks typing.
+    """
+
+    def __init__(self, parent, on_select, executor=None):
+        """Initialize the picker
+
+        Args:
+            parent: Parent widget
+            on_select: on_select(CatalogEntry) when the user picks a code
+            executor: JobExecutor that loads the catalog, defaults to the parent's
+        """
+        super().__init__(parent)
+        self.parent = parent
+        self.on_select = on_select
+        self.executor = executor or parent.executor
+        self.catalog = None
+        self.results = []
+        self._fill_after_id = None
+
+        self.geometry("520x420")
+        self.transient(parent)
+        self.grab_set()
+
+        self.setup_ui()
+        language_manager.add_listener(self.apply_direction)
+        self.bind("<Destroy>", self.on_destroy)
+        self.load_catalog()
+
+    def setup_ui(self):
+        """Set up the UI components"""
+        language_manager.bind(self, "event_code", option="title", setter=self.title)
+
+        # Search box, filtered as you type
+        self.search_frame = ttk.Frame(self, padding="10 10 10 0")
+        self.search_frame.pack(fill=tk.X)
+        self.search_label = ttk.Label(self.search_frame)
+        language_manager.bind(self.search_label, "search")
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self.on_search_changed)
+        self.search_entry = ttk.Entry(self.search_frame, textvariable=self.search_var)
+
+        # Results list
+        self.list_frame = ttk.Frame(self, padding=10)
+        self.list_frame.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(self.list_frame)
+        self.listbox = tk.Listbox(self.list_frame, activestyle="dotbox", yscrollcommand=self.scrollbar.set)
+        self.scrollbar.config(command=self.listbox.yview)
+        self.listbox.bind("<Double-Button-1>", self.on_choose)
+        self.listbox.bind("<Return>", self.on_choose)
+        self.search_entry.bind("<Return>", self.on_choose)
+        self.search_entry.bind("<Down>", self.on_focus_list)
+
+        # Result count, or the loading message until the catalog is indexed
+        self.status_label = ttk.Label(self, padding="10 0 10 10")
+        self.status_label.pack(fill=tk.X)
+        self.status_label.configure(text=language_manager.translate("loading"))
+
+        self.search_entry.focus()
+        self.apply_direction(language_manager.is_rtl)
+
+    def apply_direction(self, is_rtl):
+        """Lay the picker out for the reading direction, in place
+
+        Args:
+            is_rtl: Whether the current language is right-to-left
+        """
+        leading, trailing = (tk.RIGHT, tk.LEFT) if is_rtl else (tk.LEFT, tk.RIGHT)
+        for widget in (self.search_label, self.search_entry, self.scrollbar, self.listbox):
+            widget.pack_forget()
+        self.search_label.pack(side=leading, padx=5)
+        self.search_entry.pack(side=leading, fill=tk.X, expand=True)
+        self.search_entry.configure(justify=tk.RIGHT if is_rtl else tk.LEFT)
+        self.scrollbar.pack(side=trailing, fill=tk.Y)
+        self.listbox.pack(side=leading, fill=tk.BOTH, expand=True)
+        self.listbox.configure(justify=tk.RIGHT if is_rtl else tk.LEFT)
+        self.status_label.configure(anchor=tk.E if is_rtl else tk.W)
+        if self.catalog is not None:
+            # Descriptions are indexed per language
+            self.catalog = None
+            self.load_catalog()
+
+    def load_catalog(self):
+        """Index the catalog on a worker thread unless it was already indexed"""
+        catalog = event_catalog.cached_catalog()
+        if catalog is not None:
+            self.on_catalog_loaded(catalog)
+        else:
+            self.executor.submit(event_catalog.get_catalog, on_success=self.on_catalog_loaded)
+
+    def on_catalog_loaded(self, catalog):
+        """Show the results of the current search once the catalog is indexed"""
+        if not self.winfo_exists():
+            return
+        self.catalog = catalog
+        self.apply_search()
+
+    def on_search_changed(self, *args):
+        """Search again after every keystroke"""
+        if self.catalog is not None:
+            self.apply_search()
+
+    @instrumentation.ui_handler("ui.event_codes.search")
+    def apply_search(self):
+        """Show the codes matching the search box, first rows at once"""
+        self.results = self.catalog.search(self.search_var.get(), limit=None)
+        if self._fill_after_id:
+            self.after_cancel(self._fill_after_id)
+            self._fill_after_id = None
+        self.listbox.delete(0, tk.END)
+        self._fill(0, FIRST_BATCH)
+        if self.results:
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        self.status_label.configure(text=f"{len(self.results)} / {len(self.catalog)}")
+
+    def _fill(self, start, count):
+        """Insert a batch of result rows and schedule the next one"""
+        self._fill_after_id = None
+        rows = self.results[start:start + count]
+        if rows:
+            self.listbox.insert(tk.END, *(f"{entry.code}  {entry.category_text}  —  {entry.description}"
+                                          for entry in rows))
+        if start + count < len(self.results):
+            self._fill_after_id = self.after_idle(self._fill, start + count, BATCH)
+
+    def on_focus_list(self, event):
+        """Move from the search box into the list with the down key"""
+        if self.results:
+            self.listbox.focus_set()
+
+    def on_choose(self, event=None):
+        """Pick the selected code, or the best match when typing in the search box"""
+        selection = self.listbox.curselection()
+        index = selection[0] if selection else 0
+        if index >= len(self.results):
+            return
+        entry = self.results[index]
+        self.destroy()
+        self.on_select(entry)
+
+    def on_destroy(self, event):
+        """Stop following language changes when the picker is closed
+
+        Args:
+            event: Event data
+        """
+        if event.widget is self:
+            language_manager.remove_listener(self.apply_direction)
@@ -0,0 +1,234 @@
+"""
+Background job executor that keeps database and report work off the Tk event loop
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# How often the result queue is polled while jobs are running / idle
+POLL_MS = 30
+IDLE_POLL_MS = 200
+
+class JobCancelled(Exception):
+    """Raised inside a job that noticed it was cancelled"""
+
+class Job:
+    """Handle of a submitted job
+
+    Jobs submitted with with_job=True receive their handle as first argument
+    and can report progress and check for cancellation with it.
+    """
+
+    def __init__(self, executor, description):
+        """Initialize the job handle
+
+        Args:
+            executor: JobExecutor that runs the job
+            description: Text shown in the status bar while the job runs
+        """
+        self.executor = executor
+        self.description = description
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        """Whether cancel() was called"""
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Cancel the job; callbacks of a cancelled job are never called"""
+        self._cancel_event.set()
+        if self.future:
+            self.future.cancel()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job was cancelled, called from the worker"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def report_progress(self, fraction=None, message=None):
+        """Report progress from the worker thread
+
+        Args:
+            fraction: Completed fraction between 0 and 1, or None if unknown
+            message: Optional progress message
+        """
+        self.executor._results.put(("progress", self, (fraction, message)))
+
+class JobExecutor:
+    """Runs jobs on a thread pool and delivers their results on the Tk thread
+
+    Worker threads never touch Tk. Results, errors and progress go through
+    a queue that the Tk thread drains with root.after(). Database calls are
+    safe on the workers because database.ConnectionManager gives every
+    thread its own SQLite connection, which it closes when the worker
+    exits after shutdown().
+    """
+
+    def __init__(self, root, max_workers=2, status_callback=None, busy_callback=None):
+        """Initialize the executor
+
+        Args:
+            root: Tk widget used to schedule polling
+            max_workers: Number of worker threads
+            status_callback: status_callback(message) for status bar updates
+            busy_callback: busy_callback(busy) when the first job starts or the last one ends
+        """
+        self.root = root
+        self.status_callback = status_callback
+        self.busy_callback = busy_callback
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipes-job")
+        self._results = queue.Queue()
+        self._active = {}
+        self._status_shown = False
+        self._ui_thread = threading.current_thread()
+        self._poll_id = self.root.after(IDLE_POLL_MS, self._poll)
+
+    @property
+    def busy(self):
+        """Whether any job is running or waiting"""
+        return bool(self._active)
+
+    def submit(self, func, *args, on_success=None, on_error=None, on_progress=None,
+               description=None, with_job=False, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread
+
+        Must be called from the Tk thread. Callbacks run on the Tk thread.
+
+        Args:
+            func: Function to run
+            on_success: on_success(result) when func returns
+            on_error: on_error(exception) when func raises, printed if omitted
+            on_progress: on_progress(fraction, message) for Job.report_progress calls
+            description: Text shown in the status bar while the job runs
+            with_job: Pass the Job handle to func as first argument
+
+        Returns:
+            Job handle
+        """
+        job = Job(self, description)
+        self._active[job] = (on_success, on_error, on_progress)
+        if len(self._active) == 1 and self.busy_callback:
+            self.busy_callback(True)
+        if description:
+            self._show_status(description)
+
+        call_args = (job,) + args if with_job else args
+        job.future = self._pool.submit(self._run, job, func, call_args, kwargs)
+        self._reschedule(POLL_MS)
+        return job
+
+    def call_soon(self, func, *args):
+        """Run func(*args) on the Tk thread, safe to call from any thread"""
+        self._results.put(("call", None, (func, args)))
+
+    def ui_callback(self, func):
+        """Wrap func so calls from worker threads are forwarded to the Tk thread"""
+        def callback(*args):
+            if threading.current_thread() is self._ui_thread:
+                func(*args)
+            else:
+                self.call_soon(func, *args)
+        return callback
+
+    def cancel_all(self):
+        """Cancel every running or waiting job"""
+        for job in list(self._active):
+            job.cancel()
+
+    def shutdown(self):
+        """Cancel all jobs and stop the worker threads"""
+        self.cancel_all()
+        if self._poll_id:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, func, args, kwargs):
+        """Worker side of a job"""
+        if job.cancelled:
+            self._results.put(("cancelled", job, None))
+            return
+        try:
+            result = func(*args, **kwargs)
+        except JobCancelled:
+            self._results.put(("cancelled", job, None))
+        except Exception as e:
+            self._results.put(("error", job, e))
+        else:
+            self._results.put(("done", job, result))
+
+    def _reschedule(self, delay):
+        """Poll again after delay milliseconds"""
+        if self._poll_id:
+            self.root.after_cancel(self._poll_id)
+        self._poll_id = self.root.after(delay, self._poll)
+
+    def _poll(self):
+        """Deliver queued results on the Tk thread"""
+        self._poll_id = None
+        while True:
+            try:
+                kind, job, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._dispatch(kind, job, payload)
+            except Exception as e:
+                print(f"Error in job callback: {e}")
+
+        # A future cancelled before it started never reaches _run
+        for job in [job for job in self._active if job.future and job.future.cancelled()]:
+            self._finish(job)
+
+        self._poll_id = self.root.after(POLL_MS if self._active else IDLE_POLL_MS, self._poll)
+
+    def _dispatch(self, kind, job, payload):
+        """Call the callbacks for one queued result"""
+        if kind == "call":
+            func, args = payload
+            func(*args)
+            return
+        if job not in self._active:
+            return
+
+        on_success, on_error, on_progress = self._active[job]
+        if kind == "progress":
+            if job.cancelled:
+                return
+            fraction, message = payload
+            if on_progress:
+                on_progress(fraction, message)
+            if job.description:
+                detail = message or (f"{fraction:.0%}" if fraction is not None else "")
+                self._show_status(f"{job.description} {detail}".strip())
+            return
+
+        self._finish(job)
+        if job.cancelled or kind == "cancelled":
+            return
+        if kind == "done":
+            if on_success:
+                on_success(payload)
+        elif on_error:
+            on_error(payload)
+        else:
+            print(f"Error in background job: {payload}")
+
+    def _show_status(self, message):
+        """Show a job message in the status bar"""
+        if self.status_callback:
+            self._status_shown = True
+            self.status_callback(message)
+
+    def _finish(self, job):
+        """Forget a finished job and update the busy state"""
+        self._active.pop(job, None)
+        if not self._active:
+            if self.busy_callback:
+                self.busy_callback(False)
+            if self._status_shown:
+                # None restores the idle status message
+                self._status_shown = False
+                self.status_callback(None)
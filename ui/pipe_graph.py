@@ -0,0 +1,236 @@
+"""
+Pipe graph widget for the sections screen
+"""
+import tkinter as tk
+from typing import Callable, List, Optional
+
+import pipe_layout
+from instrumentation import instrumentation
+
+# Smallest distance between markers in pixels; closer events share a marker
+MARKER_SPACING = 4
+
+# Label width in pixels and the rows labels are stacked into
+LABEL_WIDTH = 36
+LABEL_ROWS = 2
+
+# Zoom step of one mouse wheel notch, and the deepest zoom as a fraction of the pipe
+ZOOM_STEP = 1.25
+MIN_SPAN = 0.001
+
+# Pixels between the canvas edge and the ends of the pipe
+PADDING = 10
+
+INDICATOR_COLOR = "#00a000"
+
+def _hex(rgb) -> str:
+    return "#%02x%02x%02x" % rgb
+
+class PipeGraph(tk.Canvas):
+    """Section drawn as a pipe with a marker per event and a selection indicator
+
+    The event layout is computed once per section (pipe_layout.layout_for)
+    and markers are clustered to the visible resolution, so a redraw
+    touches at most a marker per MARKER_SPACING pixels however many events
+    the section has. Canvas items are kept and moved instead of being
+    deleted and recreated: selecting an event only moves the indicator.
+    """
+
+    def __init__(self, parent, on_select: Optional[Callable[[int], None]] = None, height: int = 90, **kwargs):
+        """Initialize the pipe graph
+
+        Args:
+            parent: Parent widget
+            on_select: on_select(event_id) when the user clicks a marker
+            height: Canvas height in pixels
+        """
+        super().__init__(parent, height=height, background="white", highlightthickness=0, **kwargs)
+        self.on_select = on_select
+        self.layout = None
+        self.section = None
+        self.selected = None
+        self.start, self.end = 0.0, 1.0
+        self._redraw_scheduled = False
+        self._marker_items: List[int] = []
+        self._label_items: List[int] = []
+
+        self.pipe_item = self.create_rectangle(0, 0, 0, 0, fill="#ebebeb", outline="black")
+        self.upstream_item = self.create_text(0, 0, anchor=tk.NW, font=("TkDefaultFont", 8))
+        self.downstream_item = self.create_text(0, 0, anchor=tk.NE, font=("TkDefaultFont", 8))
+        self.length_item = self.create_text(0, 0, anchor=tk.N, font=("TkDefaultFont", 8))
+        self.indicator_item = self.create_line(0, 0, 0, 0, fill=INDICATOR_COLOR, width=2, state=tk.HIDDEN)
+
+        self.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.bind("<Button-1>", self.on_click)
+        self.bind("<MouseWheel>", self.on_wheel)
+        self.bind("<Shift-MouseWheel>", self.on_shift_wheel)
+        self.bind("<Button-4>", lambda event: self.zoom(ZOOM_STEP, event.x))
+        self.bind("<Button-5>", lambda event: self.zoom(1 / ZOOM_STEP, event.x))
+        self.bind("<Shift-Button-4>", lambda event: self.pan(-0.1))
+        self.bind("<Shift-Button-5>", lambda event: self.pan(0.1))
+
+    # Geometry
+
+    @property
+    def pipe_width(self) -> int:
+        return max(1, self.winfo_width() - 2 * PADDING)
+
+    @property
+    def pipe_top(self) -> int:
+        return self.winfo_height() // 2 - 8
+
+    def _x(self, fraction: float) -> float:
+        """Canvas x of a position along the pipe in the current view"""
+        return PADDING + (fraction - self.start) / (self.end - self.start) * self.pipe_width
+
+    def _fraction(self, x: float) -> float:
+        """Position along the pipe at a canvas x in the current view"""
+        return self.start + (x - PADDING) / self.pipe_width * (self.end - self.start)
+
+    # Content
+
+    def set_section(self, section, events, length: Optional[float] = None):
+        """Show a section, keeping the layout of an unchanged section
+
+        Args:
+            section: Section to draw
+            events: Events of the section
+            length: Meters drawn, the section length or the farthest event by default
+        """
+        if length is None:
+            farthest = max((event.distance for event in events), default=0.0)
+            length = max(section.length or 0.0, farthest) or 1.0
+        self.section = section
+        self.layout = pipe_layout.layout_for(length, events)
+        self.start, self.end = 0.0, 1.0
+        self.selected = None
+        self.itemconfigure(self.indicator_item, state=tk.HIDDEN)
+        self.itemconfigure(self.upstream_item, text=section.upstream_manhole or "")
+        self.itemconfigure(self.downstream_item, text=section.downstream_manhole or "")
+        self.itemconfigure(self.length_item, text=f"{length:.1f} m")
+        self.redraw()
+
+    def select(self, event_id: Optional[int]):
+        """Move the indicator to an event without redrawing the markers
+
+        Args:
+            event_id: ID of the event, None to hide the indicator
+        """
+        self.selected = event_id
+        index = self.layout.index_of(event_id) if self.layout is not None and event_id is not None else None
+        if index is None:
+            self.itemconfigure(self.indicator_item, state=tk.HIDDEN)
+            return
+        fraction = float(self.layout.position[index])
+        if not self.start <= fraction <= self.end:
+            # Scroll the selection into view at the current zoom
+            span = self.end - self.start
+            self.start = min(max(fraction - span / 2, 0.0), 1.0 - span)
+            self.end = self.start + span
+            self.redraw()
+            return
+        self._place_indicator()
+
+    def _place_indicator(self):
+        index = self.layout.index_of(self.selected) if self.selected is not None else None
+        if index is None:
+            self.itemconfigure(self.indicator_item, state=tk.HIDDEN)
+            return
+        fraction = float(self.layout.position[index])
+        if not self.start <= fraction <= self.end:
+            self.itemconfigure(self.indicator_item, state=tk.HIDDEN)
+            return
+        x = self._x(fraction)
+        self.coords(self.indicator_item, x, 2, x, self.winfo_height() - 2)
+        self.itemconfigure(self.indicator_item, state=tk.NORMAL)
+        self.tag_raise(self.indicator_item)
+
+    # Drawing
+
+    def schedule_redraw(self):
+        """Redraw once the pending events are handled, e.g. after a resize"""
+        if not self._redraw_scheduled:
+            self._redraw_scheduled = True
+            self.after_idle(self.redraw)
+
+    def _pooled(self, pool: List[int], count: int, create: Callable[[], int]) -> List[int]:
+        """Make the first count items of a pool visible, creating missing ones, and hide the rest"""
+        while len(pool) < count:
+            pool.append(create())
+        for item in pool[count:]:
+            self.itemconfigure(item, state=tk.HIDDEN)
+        return pool[:count]
+
+    @instrumentation.timed("ui.pipe_graph.redraw")
+    def redraw(self):
+        """Draw the markers of the visible range, reusing the canvas items"""
+        self._redraw_scheduled = False
+        width = self.pipe_width
+        pipe_top = self.pipe_top
+        self.coords(self.pipe_item, PADDING, pipe_top, PADDING + width, pipe_top + 16)
+        self.coords(self.upstream_item, PADDING, pipe_top + 20)
+        self.coords(self.downstream_item, PADDING + width, pipe_top + 20)
+        self.coords(self.length_item, PADDING + width / 2, pipe_top + 20)
+        if self.layout is None:
+            self._pooled(self._marker_items, 0, None)
+            self._pooled(self._label_items, 0, None)
+            return
+
+        markers = self.layout.markers(max(1, width // MARKER_SPACING), self.start, self.end,
+                                      label_slots=max(1, width // LABEL_WIDTH), label_rows=LABEL_ROWS)
+        x = PADDING + (markers.position - self.start) / (self.end - self.start) * width
+        items = self._pooled(self._marker_items, len(markers), lambda: self.create_line(0, 0, 0, 0))
+        for item, marker_x, severity, count in zip(items, x.tolist(), markers.severity.tolist(),
+                                                   markers.count.tolist()):
+            # Clusters reach further above the pipe than single events
+            self.coords(item, marker_x, pipe_top - (10 if count > 1 else 5), marker_x, pipe_top + 21)
+            self.itemconfigure(item, fill=_hex(pipe_layout.severity_color(severity)),
+                               width=3 if count > 1 else 2, state=tk.NORMAL)
+
+        labelled = (markers.row >= 0).nonzero()[0].tolist()
+        items = self._pooled(self._label_items, len(labelled),
+                             lambda: self.create_text(0, 0, anchor=tk.S, font=("TkDefaultFont", 7)))
+        for item, index in zip(items, labelled):
+            self.coords(item, x[index], pipe_top - 10 - 11 * int(markers.row[index]))
+            self.itemconfigure(item, text=self.layout.label(markers, index), state=tk.NORMAL)
+        self._place_indicator()
+
+    # Interaction
+
+    def zoom(self, factor: float, x: Optional[float] = None):
+        """Zoom in (factor > 1) or out around a canvas x, the center by default"""
+        if self.layout is None:
+            return
+        anchor = self._fraction(self.winfo_width() / 2 if x is None else x)
+        span = min(max((self.end - self.start) / factor, MIN_SPAN), 1.0)
+        ratio = (anchor - self.start) / (self.end - self.start)
+        self.start = min(max(anchor - ratio * span, 0.0), 1.0 - span)
+        self.end = self.start + span
+        self.schedule_redraw()
+
+    def pan(self, fraction_of_view: float):
+        """Scroll the view by a fraction of its width"""
+        span = self.end - self.start
+        self.start = min(max(self.start + fraction_of_view * span, 0.0), 1.0 - span)
+        self.end = self.start + span
+        self.schedule_redraw()
+
+    def on_wheel(self, event):
+        self.zoom(ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP, event.x)
+
+    def on_shift_wheel(self, event):
+        self.pan(-0.1 if event.delta > 0 else 0.1)
+
+    @instrumentation.ui_handler("ui.pipe_graph.select")
+    def on_click(self, event):
+        """Select the event nearest to the click, within a marker's width"""
+        if self.layout is None:
+            return
+        tolerance = MARKER_SPACING * 2 / self.pipe_width * (self.end - self.start)
+        index = self.layout.nearest(self._fraction(event.x), tolerance)
+        if index is None:
+            return
+        event_id = int(self.layout.event_id[index])
+        self.select(event_id)
+        if self.on_select and event_id >= 0:
+            self.on_select(event_id)
@@ -3,26 +3,28 @@ Project form for adding or editing projects
 """
 import tkinter as tk
 from tkinter import ttk, messagebox
+import backup
 import database
 from languages import language_manager
 #from reportlab.lib.pagesizes import A4
 #from reportlab.pdfgen import canvas
-from fpdf import FPDF
 import os
 
 class ProjectForm(tk.Toplevel):
     """Form for adding or editing projects"""
     
-    def __init__(self, parent, project=None):
+    def __init__(self, parent, project=None, executor=None):
         """Initialize the project form
         
         Args:
             parent: Parent widget
             project: Project data for editing (None for new project)
+            executor: JobExecutor for saving and printing, defaults to the parent's
         """
         super().__init__(parent)
         self.parent = parent
         self.project = project
+        self.executor = executor or parent.executor
         
         # Set up form
         self.title("Edit Project" if project else "Add Project")
@@ -32,6 +34,8 @@ class ProjectForm(tk.Toplevel):
         
         # Create form fields
         self.setup_ui()
+        language_manager.add_listener(self.apply_direction)
+        self.bind("<Destroy>", self.on_destroy)
         
         # Center window
         self.center_window()
@@ -43,39 +47,71 @@ class ProjectForm(tk.Toplevel):
         main_frame.pack(fill=tk.BOTH, expand=True)
         
         # Project name
-        ttk.Label(main_frame, text=language_manager.translate("project_name")).grid(row=0, column=0, sticky=tk.W, pady=10)
+        name_label = ttk.Label(main_frame)
+        language_manager.bind(name_label, "project_name")
         self.name_entry = ttk.Entry(main_frame, width=30)
-        self.name_entry.grid(row=0, column=1, sticky=tk.W+tk.E, pady=10)
         
         # Project location
-        ttk.Label(main_frame, text=language_manager.translate("location")).grid(row=1, column=0, sticky=tk.W, pady=10)
+        location_label = ttk.Label(main_frame)
+        language_manager.bind(location_label, "location")
         self.location_entry = ttk.Entry(main_frame, width=30)
-        self.location_entry.grid(row=1, column=1, sticky=tk.W+tk.E, pady=10)
+        
+        self.fields = ((name_label, self.name_entry), (location_label, self.location_entry))
         
         # Buttons frame
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=3, column=0, columnspan=2, pady=20)
         
         # Save button
-        ttk.Button(button_frame, text=language_manager.translate("save"), command=self.save_project).pack(side=tk.LEFT, padx=5)
+        self.save_button = ttk.Button(button_frame, command=self.save_project)
+        language_manager.bind(self.save_button, "save")
         
         # Cancel button
-        ttk.Button(button_frame, text=language_manager.translate("cancel"), command=self.destroy).pack(side=tk.LEFT, padx=5)
+        cancel_button = ttk.Button(button_frame, command=self.destroy)
+        language_manager.bind(cancel_button, "cancel")
         
         # Print button
-        ttk.Button(button_frame, text=language_manager.translate("Print"), command=self.on_print).pack(side=tk.LEFT, padx=5)
+        print_button = ttk.Button(button_frame, command=self.on_print)
+        language_manager.bind(print_button, "Print")
+        
+        self.buttons = (self.save_button, cancel_button, print_button)
         
         # If editing existing project, populate fields
         if self.project:
-            self.name_entry.insert(0, self.project["name"])
-            self.location_entry.insert(0, self.project["location"])
+            self.name_entry.insert(0, self.project.name)
+            self.location_entry.insert(0, self.project.location)
             
         # Set focus to name entry
         self.name_entry.focus()
 
-        if language_manager.is_rtl:
-            main_frame.tk.call("tk", "scaling", 1.0)  # Adjust scaling for RTL
-            main_frame.tk.call("set", "rtl", "1")  # Enable RTL
+        self.apply_direction(language_manager.is_rtl)
+        
+    def apply_direction(self, is_rtl):
+        """Lay the form out for the reading direction, in place
+        
+        Args:
+            is_rtl: Whether the current language is right-to-left
+        """
+        label_column, entry_column = (1, 0) if is_rtl else (0, 1)
+        for row, (label, entry) in enumerate(self.fields):
+            label.grid(row=row, column=label_column, sticky=tk.E if is_rtl else tk.W, pady=10)
+            entry.grid(row=row, column=entry_column, sticky=tk.W+tk.E, pady=10)
+            entry.configure(justify=tk.RIGHT if is_rtl else tk.LEFT)
+            
+        side = tk.RIGHT if is_rtl else tk.LEFT
+        for button in self.buttons:
+            button.pack_forget()
+        for button in self.buttons:
+            button.pack(side=side, padx=5)
+            
+    def on_destroy(self, event):
+        """Stop following language changes when the form is closed
+        
+        Args:
+            event: Event data
+        """
+        if event.widget is self:
+            language_manager.remove_listener(self.apply_direction)
         
     def save_project(self):
         """Save the project (add new or update existing)"""
@@ -94,23 +130,49 @@ class ProjectForm(tk.Toplevel):
             self.location_entry.focus()
             return
         
-        try:
-            if self.project:  # Editing existing project
-                success = database.update_project(self.project["id"], name, location)
-                if success:
-                    messagebox.showinfo("Success", "Project updated successfully")
-                    self.destroy()
-                else:
-                    messagebox.showerror("Error", "Failed to update project")
-            else:  # Adding new project
-                project_id = database.add_project(name, location)
-                if project_id:
-                    messagebox.showinfo("Success", "Project added successfully")
-                    self.destroy()
-                else:
-                    messagebox.showerror("Error", "Failed to add project")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        # Save on a worker thread, the form stays open until it finishes
+        self.save_button.state(["disabled"])
+        if self.project:  # Editing existing project
+            self.executor.submit(
+                database.update_project, self.project.id, name, location,
+                on_success=self.on_saved, on_error=self.on_save_error
+            )
+        else:  # Adding new project
+            self.executor.submit(
+                database.add_project, name, location,
+                on_success=self.on_saved, on_error=self.on_save_error
+            )
+            
+    def on_saved(self, result):
+        """Handle the result of a save
+        
+        Args:
+            result: update_project success flag or add_project ID
+        """
+        if not self.winfo_exists():
+            return
+        if result:
+            if self.project:
+                messagebox.showinfo("Success", "Project updated successfully")
+            else:
+                messagebox.showinfo("Success", "Project added successfully")
+            self.destroy()
+        else:
+            self.save_button.state(["!disabled"])
+            if self.project:
+                messagebox.showerror("Error", "Failed to update project")
+            else:
+                messagebox.showerror("Error", "Failed to add project")
+                
+    def on_save_error(self, error):
+        """Handle an exception raised while saving
+        
+        Args:
+            error: The exception
+        """
+        if self.winfo_exists():
+            self.save_button.state(["!disabled"])
+        messagebox.showerror("Error", f"An error occurred: {str(error)}")
     
     def center_window(self):
         """Center the window on screen"""
@@ -130,46 +192,60 @@ class ProjectForm(tk.Toplevel):
     def get_current_project_details(self):
         """Return the current project's details as a dict"""
         if self.project:
-            return {
-                "Name": self.project.get("name", ""),
-                "Date": self.project.get("created_at", ""),
-                "Location": self.project.get("location", ""),
-                "ID": self.project.get("id", "")
-            }
+            # Imported on first print so fpdf stays out of application startup
+            from reports import engine
+            return engine.project_details(self.project)
         return {}
 
-    def print_project(self, project_details):
-        """Generate and open PDF for the given project details using fpdf"""
-        filename = "project_details.pdf"
-        pdf = FPDF()
-        pdf.add_page()
-        try:
-            # Try to use DejaVu font for Unicode/hebrew support if available
-            pdf.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
-            pdf.set_font('DejaVu', '', 16)
-        except Exception:
-            pdf.set_font("Arial", size=16)
-        pdf.cell(0, 10, "Project Details", ln=True)
-        try:
-            pdf.set_font('DejaVu', '', 12)
-        except Exception:
-            pdf.set_font("Arial", size=12)
-        for key, value in project_details.items():
-            pdf.cell(0, 10, f"{key}: {value}", ln=True)
-        pdf.output(filename)
+    def print_project(self, project_details, image=None, project_id=None):
+        """Generate the PDF for the given project details
+        
+        Runs on a worker thread, so it must not touch any widgets.
+        
+        Args:
+            project_details: Key/value pairs to print
+            image: Lazy handle of the project image, read only while rendering
+            project_id: ID of a saved project, prints the full report with
+                its sections, events and screenshots
+        
+        Returns:
+            Path of the written PDF
+        """
+        if project_id is not None:
+            from reports.project_report import render_project_report
+            # The report reads a snapshot, so every part shows the same
+            # moment and edits made meanwhile are never blocked; it is only
+            # copied again when the database changed since the last print
+            with backup.shared_snapshot.use():
+                return render_project_report(project_id).path
+        from reports import engine
+        return engine.render_report(project_details, image=image)
+
+    def open_pdf(self, filename):
+        """Open a generated PDF in the system viewer"""
         try:
             # Use platform-independent way to open PDF
             if os.name == "nt":
                 os.startfile(filename)
             elif os.name == "posix":
                 import subprocess
-                subprocess.run(["xdg-open", filename], check=False)
+                subprocess.Popen(["xdg-open", filename])
             else:
                 messagebox.showinfo("Info", f"PDF saved as {filename}")
         except Exception as e:
-            messagebox.showerror("שגיאה", f"שגיאה ביצירת PDF:\n{e}")
+            self.on_print_error(e)
+
+    def on_print_error(self, error):
+        """Report a failed print"""
+        messagebox.showerror("שגיאה", f"שגיאה ביצירת PDF:\n{error}")
 
     def on_print(self):
         """Handle the print button click"""
         details = self.get_current_project_details()
-        self.print_project(details)
\ No newline at end of file
+        image = database.get_blob(self.project.image_hash) if self.project else None
+        project_id = self.project.id if self.project else None
+        self.executor.submit(
+            self.print_project, details, image, project_id,
+            on_success=self.open_pdf, on_error=self.on_print_error,
+            description="Printing..."
+        )
\ No newline at end of file
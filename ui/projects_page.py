@@ -4,36 +4,67 @@ Projects page for Pipes application
 import tkinter as tk
 from tkinter import ttk, messagebox
 from ui.project_form import ProjectForm
+from ui.virtual_tree import VirtualTreeview
+from ui.jobs import JobExecutor
 import database
 from languages import language_manager
+from instrumentation import instrumentation
+
+# Pause in typing before the search box queries the database
+SEARCH_DELAY_MS = 250
 
 class ProjectsPage(tk.Frame):
     """Projects page showing all projects with options to add, edit, and delete"""
     
-    def __init__(self, parent):
+    def __init__(self, parent, virtual=True, executor=None):
         """Initialize the projects page
         
         Args:
             parent: Parent widget
+            virtual: Page projects into the list lazily instead of loading them all
+            executor: JobExecutor for database work, the page creates one if omitted
         """
         super().__init__(parent)
         self.parent = parent
+        self.virtual = virtual
+        self.executor = executor or JobExecutor(self)
+        self.search_query = ""
+        self._search_after_id = None
+        self._load_job = None
         self.setup_ui()
         self.load_projects()
         
+        # Apply single-row changes instead of reloading the list. Changes
+        # made on worker threads are forwarded to the Tk thread.
+        self._change_listener = self.executor.ui_callback(self.on_project_changed)
+        database.add_change_listener(self._change_listener)
+        language_manager.add_listener(self.apply_direction)
+        self.bind("<Destroy>", self.on_destroy)
+        
     def setup_ui(self):
         """Set up the UI components"""
         # Button frame
-        button_frame = tk.Frame(self)
-        button_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.button_frame = tk.Frame(self)
+        self.button_frame.pack(fill=tk.X, padx=5, pady=5)
         
         # Add project button
-        add_button = ttk.Button(button_frame, text=language_manager.translate("add_project"), command=self.add_project)
-        add_button.pack(side=tk.LEFT, padx=5, pady=5)
+        add_button = ttk.Button(self.button_frame, command=self.add_project)
+        language_manager.bind(add_button, "add_project")
         
         # Refresh button
-        refresh_button = ttk.Button(button_frame, text=language_manager.translate("refresh"), command=self.load_projects)
-        refresh_button.pack(side=tk.LEFT, padx=5, pady=5)
+        refresh_button = ttk.Button(self.button_frame, command=self.load_projects)
+        language_manager.bind(refresh_button, "refresh")
+        
+        # Search box, queried as you type
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self.on_search_changed)
+        search_entry = ttk.Entry(self.button_frame, textvariable=self.search_var, width=30)
+        search_label = ttk.Label(self.button_frame)
+        language_manager.bind(search_label, "search")
+        
+        # Buttons start at the reading edge, the search box sits at the other one
+        self.leading_widgets = (add_button, refresh_button)
+        self.trailing_widgets = (search_entry, search_label)
         
         # Projects treeview
         self.tree_frame = tk.Frame(self)
@@ -49,9 +80,9 @@ class ProjectsPage(tk.Frame):
         
         # Configure column headings
         self.tree.heading("id", text="ID")
-        self.tree.heading("name", text=language_manager.translate("project_name"))
-        self.tree.heading("location", text=language_manager.translate("location"))
-        self.tree.heading("created_at", text=language_manager.translate("created_at"))
+        for column, key in (("name", "project_name"), ("location", "location"), ("created_at", "created_at")):
+            language_manager.bind(self.tree, key, option=f"heading:{column}",
+                                  setter=lambda text, column=column: self.tree.heading(column, text=text))
         
         # Configure column widths
         self.tree.column("id", width=50)
@@ -60,67 +91,212 @@ class ProjectsPage(tk.Frame):
         self.tree.column("created_at", width=150)
         
         # Pack treeview
+        self.scrollbar = scrollbar
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Configure scrollbar
-        scrollbar.config(command=self.tree.yview)
+        if self.virtual:
+            self.virtual_tree = VirtualTreeview(
+                self.tree,
+                scrollbar,
+                fetch_page=self.fetch_projects_page,
+                count_rows=self.count_projects,
+                row_values=self.project_values,
+                row_key=lambda project: (project.created_at, project.id),
+                page_size=database.PAGE_SIZE,
+                executor=self.executor
+            )
+        else:
+            scrollbar.config(command=self.tree.yview)
         
         # Bind events
         self.tree.bind("<Double-1>", self.on_item_double_click)
         self.tree.bind("<ButtonRelease-3>", self.on_right_click)
         
-        if language_manager.is_rtl:
-            self.tree_frame.tk.call("tk", "scaling", 1.0)  # Adjust scaling for RTL
-            self.tree_frame.tk.call("set", "rtl", "1")  # Enable RTL
+        self.apply_direction(language_manager.is_rtl)
+        
+    def apply_direction(self, is_rtl):
+        """Lay the page out for the reading direction, in place
+        
+        Args:
+            is_rtl: Whether the current language is right-to-left
+        """
+        leading, trailing = (tk.RIGHT, tk.LEFT) if is_rtl else (tk.LEFT, tk.RIGHT)
+        for widget in self.leading_widgets + self.trailing_widgets:
+            widget.pack_forget()
+        for widget in self.leading_widgets:
+            widget.pack(side=leading, padx=5, pady=5)
+        for widget in self.trailing_widgets:
+            widget.pack(side=trailing, padx=5, pady=5)
+        
+        # Columns read from the right, the scrollbar moves to the left edge
+        columns = ("id", "name", "location", "created_at")
+        self.tree.configure(displaycolumns=columns[::-1] if is_rtl else columns)
+        self.scrollbar.pack_configure(side=trailing)
+        self.tree.pack_configure(side=leading)
+        
+    def project_values(self, project):
+        """Get the treeview column values of a project
+        
+        Args:
+            project: Project to show
+        """
+        return (
+            project.id,
+            project.name,
+            project.location,
+            project.created_at
+        )
+        
+    def fetch_projects_page(self, **kwargs):
+        """Fetch a page of projects matching the current search"""
+        return database.get_projects_page(query=self.search_query, **kwargs)
+        
+    def count_projects(self):
+        """Count the projects matching the current search"""
+        return database.count_projects(self.search_query)
         
+    def on_search_changed(self, *args):
+        """Debounce typing in the search box
+        
+        Args:
+            args: Variable trace arguments
+        """
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DELAY_MS, self.apply_search)
+        
+    @instrumentation.ui_handler("ui.projects.search")
+    def apply_search(self):
+        """Show the projects matching the search box"""
+        self._search_after_id = None
+        query = self.search_var.get().strip()
+        if query == self.search_query:
+            return
+            
+        self.search_query = query
+        if self.virtual:
+            self.virtual_tree.reload(first=0)
+        else:
+            self.load_projects()
+        
+    @instrumentation.ui_handler("ui.projects.refresh")
     def load_projects(self):
         """Load projects from database and display in treeview"""
+        if self.virtual:
+            # Only the visible window plus a buffer is fetched
+            self.virtual_tree.reload()
+            return
+        
+        # Get all projects, or all matches of the current search, off the Tk thread
+        if self._load_job:
+            self._load_job.cancel()
+        self._load_job = self.executor.submit(self.fetch_all_projects, self.search_query, on_success=self.show_projects)
+        
+    def fetch_all_projects(self, query):
+        """Get all projects matching a search, runs on a worker thread
+        
+        Args:
+            query: Search text, empty for all projects
+        """
+        if query:
+            return database.search_projects(query, limit=-1)
+        return database.get_all_projects()
+        
+    @instrumentation.timed("ui.tree.reload")
+    def show_projects(self, projects):
+        """Replace the treeview contents with the given projects
+        
+        Args:
+            projects: List of projects
+        """
+        self._load_job = None
+        
         # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        # Get all projects
-        projects = database.get_all_projects()
+        self.tree.delete(*self.tree.get_children())
         
         # Add projects to treeview
         for project in projects:
-            self.tree.insert("", tk.END, values=(
-                project["id"],
-                project["name"],
-                project["location"],
-                project["created_at"]
-            ))
+            self.tree.insert("", tk.END, iid=str(project.id), values=self.project_values(project))
+            
+    def on_project_changed(self, action, project_id, project):
+        """Update the affected treeview item after a database change
+        
+        Args:
+            action: One of the database.CHANGE_* actions
+            project_id: ID of the changed project
+            project: Changed project (None for deletes)
+        """
+        if action == database.CHANGE_BULK:
+            self.load_projects()
+            return
+            
+        if self.search_query and action != database.CHANGE_DELETED:
+            # Let the search decide whether the changed project still matches
+            self.load_projects()
+            return
+            
+        if self.virtual:
+            if action == database.CHANGE_DELETED:
+                self.virtual_tree.remove_row(project_id)
+            else:
+                self.virtual_tree.upsert_row(project, added=action == database.CHANGE_ADDED)
+            return
+            
+        iid = str(project_id)
+        if action == database.CHANGE_DELETED:
+            if self.tree.exists(iid):
+                self.tree.delete(iid)
+        elif self.tree.exists(iid):
+            self.tree.item(iid, values=self.project_values(project))
+        elif action == database.CHANGE_ADDED:
+            # New projects are the newest, keep the rows on screen in place
+            top = self.tree.yview()[0]
+            count = len(self.tree.get_children())
+            self.tree.insert("", 0, iid=iid, values=self.project_values(project))
+            if top > 0:
+                self.tree.yview_moveto((top * count + 1) / (count + 1))
+                
+    def on_destroy(self, event):
+        """Stop listening for database changes when the page is destroyed
+        
+        Args:
+            event: Event data
+        """
+        if event.widget is self:
+            database.remove_change_listener(self._change_listener)
+            language_manager.remove_listener(self.apply_direction)
             
     def add_project(self):
         """Open form to add a new project"""
         # Create new project form window
-        form = ProjectForm(self)
+        form = ProjectForm(self, executor=self.executor)
         
-        # Wait for form to close
+        # Wait for form to close, the list is updated by on_project_changed
         self.wait_window(form)
         
-        # Reload projects
-        self.load_projects()
-        
     def edit_project(self, project_id):
         """Open form to edit an existing project
         
         Args:
             project_id: ID of project to edit
         """
-        # Get project details
-        project = database.get_project(project_id)
+        # Get project details, the form opens when they arrive
+        self.executor.submit(database.get_project, project_id, on_success=self.open_edit_form)
         
+    def open_edit_form(self, project):
+        """Open the edit form for a loaded project
+        
+        Args:
+            project: Project, None if it no longer exists
+        """
         if project:
             # Create edit project form window
-            form = ProjectForm(self, project=project)
+            form = ProjectForm(self, project=project, executor=self.executor)
             
-            # Wait for form to close
+            # Wait for form to close, the list is updated by on_project_changed
             self.wait_window(form)
             
-            # Reload projects
-            self.load_projects()
-            
     def delete_project(self, project_id):
         """Delete a project
         
@@ -130,14 +306,24 @@ class ProjectsPage(tk.Frame):
         # Confirm deletion
         if messagebox.askyesno("Delete Project", "Are you sure you want to delete this project?"):
             # Delete project
-            success = database.delete_project(project_id)
-            
-            if success:
-                messagebox.showinfo("Success", "Project deleted successfully")
-                self.load_projects()
-            else:
-                messagebox.showerror("Error", "Failed to delete project")
+            self.executor.submit(
+                database.delete_project, project_id,
+                on_success=self.on_project_deleted,
+                on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            )
+                
+    def on_project_deleted(self, success):
+        """Report the result of a delete
+        
+        Args:
+            success: Whether the project was deleted
+        """
+        if success:
+            messagebox.showinfo("Success", "Project deleted successfully")
+        else:
+            messagebox.showerror("Error", "Failed to delete project")
                 
+    @instrumentation.ui_handler("ui.projects.open")
     def on_item_double_click(self, event):
         """Handle double click on treeview item
         
@@ -153,6 +339,7 @@ class ProjectsPage(tk.Frame):
         # Edit project
         self.edit_project(int(project_id))
         
+    @instrumentation.ui_handler("ui.projects.menu")
     def on_right_click(self, event):
         """Handle right click on treeview item
         
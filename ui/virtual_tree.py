@@ -0,0 +1,269 @@
+"""
+Virtualized Treeview that keeps only a window of rows in the widget
+"""
+import tkinter as tk
+from instrumentation import instrumentation
+
+class VirtualTreeview:
+    """Pages rows into a ttk.Treeview lazily as the user scrolls
+
+    The Treeview only holds the visible rows plus a buffer on both sides.
+    Scrolling inside that window is handled natively by the Treeview;
+    when the view gets close to either edge, the next page is fetched by
+    keyset and rows on the far side are dropped. The scrollbar is driven
+    from the global position, so it reflects the whole table.
+    """
+
+    def __init__(self, tree, scrollbar, fetch_page, count_rows, row_values, row_key,
+                 page_size=100, max_pages=3, executor=None):
+        """Initialize the virtual list
+
+        Args:
+            tree: ttk.Treeview to fill
+            scrollbar: Scrollbar that controls the tree
+            fetch_page: fetch_page(limit, after=None, before=None, offset=0) -> list of rows
+            count_rows: count_rows() -> total number of rows
+            row_values: row_values(row) -> tuple of column values
+            row_key: row_key(row) -> keyset key of the row
+            page_size: Rows fetched per page
+            max_pages: Pages kept in the widget at most
+            executor: JobExecutor for reloads; keyset page fetches while
+                scrolling are index lookups and stay on the Tk thread
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.count_rows = count_rows
+        self.row_values = row_values
+        self.row_key = row_key
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.margin = page_size // 2
+        self.executor = executor
+
+        self.rows = []
+        self.window_start = 0
+        self.first_visible = 0
+        self.total = 0
+        self._extend_scheduled = False
+        self._load_job = None
+
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.scrollbar.configure(command=self._on_scrollbar)
+
+    @property
+    def window_end(self):
+        """Global index just past the last loaded row"""
+        return self.window_start + len(self.rows)
+
+    def reload(self, first=None):
+        """Re-read the row count and the window around a position
+
+        Args:
+            first: Global index of the first row to show (current position by default)
+        """
+        first = self.first_visible if first is None else first
+        self._load_window(first, recount=True)
+
+    def _load_window(self, first, recount=False):
+        """Replace the loaded window with rows around a global index
+
+        Args:
+            first: Global index of the first row to show
+            recount: Re-read the total row count as well
+        """
+        if self._load_job:
+            # A newer position or search supersedes the pending load
+            self._load_job.cancel()
+            self._load_job = None
+        if self.executor:
+            self._load_job = self.executor.submit(
+                self._fetch_window, first, recount, on_success=self._apply_window
+            )
+        else:
+            self._apply_window(self._fetch_window(first, recount))
+
+    def _fetch_window(self, first, recount):
+        """Read the rows around a global index, runs on a worker when an executor is set"""
+        total = self.count_rows() if recount else self.total
+        first = max(0, min(first, total - 1))
+        start = max(0, first - self.page_size)
+        rows = self.fetch_page(limit=min(self.max_rows, self.page_size * 2), offset=start)
+        return total, first, start, rows
+
+    @instrumentation.timed("ui.tree.reload")
+    def _apply_window(self, window):
+        """Show rows read by _fetch_window"""
+        self._load_job = None
+        total, first, start, rows = window
+        self.total = total
+        self.tree.delete(*self.tree.get_children())
+        self.rows = rows
+        self.window_start = start
+        for row in rows:
+            self._insert(tk.END, row)
+        self.first_visible = first
+        self._scroll_to(first)
+
+    def _insert(self, index, row):
+        """Insert a row into the tree, using the first value as item ID"""
+        values = self.row_values(row)
+        self.tree.insert("", index, iid=str(values[0]), values=values)
+
+    def _scroll_to(self, first):
+        """Scroll the tree so the row at a global index is on top"""
+        if self.rows:
+            self.tree.yview_moveto((first - self.window_start) / len(self.rows))
+            self._on_tree_scroll(*self.tree.yview())
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _top_index(self):
+        """Local index of the first visible row"""
+        return int(round(self.tree.yview()[0] * len(self.rows))) if self.rows else 0
+
+    def upsert_row(self, row, added=True):
+        """Insert or update a single row without reloading the window
+
+        Rows keep their place in the list order; the rows on screen and the
+        selection stay where they were.
+
+        Args:
+            row: Row as returned by fetch_page
+            added: The row is new; an updated row that is not loaded is
+                already counted and paged in when scrolled to
+        """
+        iid = str(self.row_values(row)[0])
+        if self.tree.exists(iid):
+            self.rows[self.tree.index(iid)] = row
+            self.tree.item(iid, values=self.row_values(row))
+            return
+        if not added:
+            return
+
+        key = self.row_key(row)
+        index = next((i for i, loaded in enumerate(self.rows) if self.row_key(loaded) < key), len(self.rows))
+        loaded_all_below = self.window_end >= self.total
+        self.total += 1
+
+        if index == 0 and self.window_start > 0:
+            # Sorts above the loaded window
+            self.window_start += 1
+        elif index == len(self.rows) and not loaded_all_below:
+            # Sorts below the loaded window, it is paged in when scrolled to
+            pass
+        else:
+            top = self._top_index()
+            self.rows.insert(index, row)
+            self._insert(index, row)
+            if index < top or (index == top and top > 0):
+                top += 1
+            self._scroll_to(self.window_start + top)
+            return
+        self._on_tree_scroll(*self.tree.yview())
+
+    def remove_row(self, row_id):
+        """Remove a single row without reloading the window
+
+        Args:
+            row_id: Item ID of the row (its first column value)
+        """
+        self.total = max(0, self.total - 1)
+        iid = str(row_id)
+        if not self.tree.exists(iid):
+            # Not loaded; rows above the window shift the offset estimate by
+            # one, which keyset paging tolerates
+            self._on_tree_scroll(*self.tree.yview())
+            return
+
+        top = self._top_index()
+        index = self.tree.index(iid)
+        self.tree.delete(iid)
+        del self.rows[index]
+        if index < top:
+            top -= 1
+        self._scroll_to(self.window_start + top)
+
+    def _on_tree_scroll(self, low, high):
+        """Map the tree's local scroll position onto the scrollbar"""
+        count = len(self.rows)
+        if not count or not self.total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+
+        first_local = float(low) * count
+        last_local = float(high) * count
+        self.first_visible = self.window_start + int(round(first_local))
+        self.scrollbar.set(
+            (self.window_start + first_local) / self.total,
+            min(1.0, (self.window_start + last_local) / self.total)
+        )
+
+        near_end = last_local > count - self.margin and self.window_end < self.total
+        near_start = first_local < self.margin and self.window_start > 0
+        if (near_end or near_start) and not self._extend_scheduled:
+            self._extend_scheduled = True
+            self.tree.after_idle(self._extend)
+
+    def _on_scrollbar(self, *args):
+        """Handle scrollbar drags and clicks"""
+        if args[0] != "moveto":
+            # Unit and page steps stay inside the buffered window
+            self.tree.yview(*args)
+            return
+
+        target = max(0, min(int(float(args[1]) * self.total), self.total - 1))
+        low, high = self.tree.yview()
+        visible = int((high - low) * len(self.rows)) + 1
+        if self.window_start <= target and (target + visible <= self.window_end or self.window_end >= self.total):
+            self._scroll_to(target)
+        else:
+            self._load_window(target)
+
+    def _extend(self):
+        """Fetch the next page in the scroll direction and trim the far side"""
+        self._extend_scheduled = False
+        if not self.rows:
+            return
+
+        low, high = self.tree.yview()
+        count = len(self.rows)
+        top = int(round(low * count))  # Local index of the first visible row
+
+        if high * count > count - self.margin and self.window_end < self.total:
+            rows = self.fetch_page(limit=self.page_size, after=self.row_key(self.rows[-1]))
+            if not rows:
+                # The table shrank underneath us
+                self.total = self.window_end
+                return
+            for row in rows:
+                self._insert(tk.END, row)
+            self.rows.extend(rows)
+
+            overflow = len(self.rows) - self.max_rows
+            if overflow > 0:
+                self.tree.delete(*self.tree.get_children()[:overflow])
+                del self.rows[:overflow]
+                self.window_start += overflow
+                top -= overflow
+
+        elif low * count < self.margin and self.window_start > 0:
+            rows = self.fetch_page(limit=self.page_size, before=self.row_key(self.rows[0]))
+            for index, row in enumerate(rows):
+                self._insert(index, row)
+            self.rows[:0] = rows
+            top += len(rows)
+            if len(rows) < self.page_size:
+                # Reached the top of the list
+                self.window_start = 0
+            else:
+                self.window_start = max(0, self.window_start - len(rows))
+
+            overflow = len(self.rows) - self.max_rows
+            if overflow > 0:
+                self.tree.delete(*self.tree.get_children()[-overflow:])
+                del self.rows[-overflow:]
+        else:
+            return
+
+        self._scroll_to(self.window_start + top)
@@ -0,0 +1,3 @@
+"""
+Video package for Pipes application
+"""
@@ -0,0 +1,336 @@
+"""
+Frame and thumbnail cache for the video player and event snapshots
+
+Selecting an event shows the section video at the event's time. Without a
+cache every click costs a decoder seek and a full-resolution frame, and
+reopening a project decodes every event thumbnail again. FrameCache keeps:
+
+- decoded frames and downscaled thumbnails in one LRU bounded by bytes,
+  keyed by (video path, modification time, timestamp), so a re-encoded
+  video never serves stale frames
+- an open decoder per recent video, which reads forward through short gaps
+  instead of seeking, so stepping through nearby events stays cheap
+- a background thread that prefetches the events around the selected one
+- JPEG thumbnails on disk next to the database, so thumbnails of a
+  reopened project come from disk instead of the decoder
+"""
+import os
+import atexit
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+import database
+from video.frames import SEEK_DISTANCE, open_video
+
+# Memory held by cached frames and thumbnails
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Videos kept open for seeking
+MAX_OPEN_VIDEOS = 4
+
+# Longest side of a thumbnail in pixels
+THUMBNAIL_SIZE = 192
+
+THUMBNAIL_QUALITY = 85
+
+# Events prefetched before and after the selected one
+PREFETCH_RADIUS = 3
+
+# Kinds of cached images
+FRAME = "frame"
+THUMBNAIL = "thumbnail"
+
+def thumbnail_dir(database_file: Optional[str] = None) -> str:
+    """Directory of the on-disk thumbnail store, next to the database file"""
+    database_file = os.path.abspath(database_file or database.active_connection_manager().source_file)
+    name = os.path.splitext(os.path.basename(database_file))[0]
+    return os.path.join(os.path.dirname(database_file), f"{name}-thumbnails")
+
+def _timestamp_key(seconds: float) -> int:
+    """Milliseconds, so float noise in event times does not miss the cache"""
+    return int(round(seconds * 1000))
+
+class _Decoder:
+    """Open capture of one video, remembering where the decoder is"""
+
+    def __init__(self, path: str):
+        import cv2
+
+        self.cv2 = cv2
+        self.capture = open_video(path)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 25.0
+        self.position = 0  # Index of the next frame read() returns, None if unknown
+        self.lock = threading.Lock()
+
+    def read(self, seconds: float) -> Optional[np.ndarray]:
+        """Decode the frame shown at a time, None past the end of the video"""
+        index = max(0, int(round(seconds * self.fps)))
+        with self.lock:
+            if self.position is not None and 0 <= index - self.position < SEEK_DISTANCE:
+                for _ in range(index - self.position):
+                    if not self.capture.grab():
+                        # Where a failed grab leaves the decoder is unknown, seek next time
+                        self.position = None
+                        return None
+            else:
+                self.capture.set(self.cv2.CAP_PROP_POS_FRAMES, index)
+            ok, frame = self.capture.read()
+            self.position = index + 1 if ok else None
+            return frame if ok else None
+
+    def release(self):
+        with self.lock:
+            self.capture.release()
+
+class FrameCache:
+    """LRU cache of decoded frames and thumbnails bounded by their size in bytes
+
+    Safe to use from several threads; the Tk thread reads frames while the
+    prefetch thread fills the cache.
+    """
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES, thumbnail_size: int = THUMBNAIL_SIZE,
+                 store_dir: Optional[str] = None):
+        """Initialize the cache
+
+        Args:
+            max_bytes: Memory held by cached images at most
+            thumbnail_size: Longest side of a thumbnail in pixels
+            store_dir: Thumbnail store, next to the current database by default
+        """
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.store_dir = store_dir
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._decoders = OrderedDict()
+        self._lock = threading.Lock()
+        self._prefetcher = None
+        self._prefetch_generation = 0
+
+    # Memory LRU
+
+    def _get(self, key) -> Optional[np.ndarray]:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def _put(self, key, image: np.ndarray):
+        if image.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.nbytes
+            self._entries[key] = image
+            self.size += image.nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.nbytes
+
+    def clear(self):
+        """Drop the cached images and close the open videos"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            decoders, self._decoders = list(self._decoders.values()), OrderedDict()
+        for decoder in decoders:
+            decoder.release()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Decoding
+
+    def _decoder(self, path: str, mtime_ns: int) -> _Decoder:
+        """Get the open decoder of a video, opening it on first use"""
+        key = (path, mtime_ns)
+        with self._lock:
+            decoder = self._decoders.get(key)
+            if decoder is not None:
+                self._decoders.move_to_end(key)
+                return decoder
+        decoder = _Decoder(path)
+        with self._lock:
+            existing = self._decoders.get(key)
+            if existing is not None:
+                closed, decoder = decoder, existing
+            else:
+                self._decoders[key] = decoder
+                closed = None
+                if len(self._decoders) > MAX_OPEN_VIDEOS:
+                    _, closed = self._decoders.popitem(last=False)
+        if closed is not None:
+            closed.release()
+        return decoder
+
+    def _key(self, path: str, seconds: float, kind: str) -> Tuple[str, int, int, str]:
+        path = os.path.abspath(path)
+        return path, os.stat(path).st_mtime_ns, _timestamp_key(seconds), kind
+
+    def get_frame(self, path: str, seconds: float) -> Optional[np.ndarray]:
+        """Get the full-resolution frame shown at a time
+
+        Args:
+            path: Video file
+            seconds: Time in the video
+
+        Returns:
+            BGR frame, None if the time is past the end of the video
+
+        Raises:
+            OSError: If the video cannot be opened
+        """
+        key = self._key(path, seconds, FRAME)
+        frame = self._get(key)
+        if frame is None:
+            frame = self._decoder(key[0], key[1]).read(key[2] / 1000)
+            if frame is not None:
+                frame.flags.writeable = False  # Shared by every caller
+                self._put(key, frame)
+        return frame
+
+    # Thumbnails
+
+    def _thumbnail_path(self, key) -> str:
+        path, mtime_ns, milliseconds, _ = key
+        name = hashlib.sha1(f"{path}\0{mtime_ns}\0{milliseconds}\0{self.thumbnail_size}".encode()).hexdigest()
+        return os.path.join(self.store_dir or thumbnail_dir(), name[:2], f"{name}.jpg")
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        import cv2
+
+        height, width = frame.shape[:2]
+        scale = self.thumbnail_size / max(height, width)
+        if scale >= 1:
+            return frame
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def _load_thumbnail(self, file_path: str) -> Optional[np.ndarray]:
+        import cv2
+
+        try:
+            with open(file_path, "rb") as thumbnail_file:
+                data = np.frombuffer(thumbnail_file.read(), np.uint8)
+        except OSError:
+            return None
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+    def _store_thumbnail(self, file_path: str, thumbnail: np.ndarray):
+        import cv2
+
+        ok, data = cv2.imencode(".jpg", thumbnail, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+        if not ok:
+            return
+        directory = os.path.dirname(file_path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data.tobytes())
+            os.replace(temp_path, file_path)
+        except OSError as e:
+            print(f"Error storing thumbnail {file_path}: {e}")
+
+    def get_thumbnail(self, path: str, seconds: float) -> Optional[np.ndarray]:
+        """Get a downscaled frame, from memory, the thumbnail store or the video
+
+        Args:
+            path: Video file
+            seconds: Time in the video
+
+        Returns:
+            BGR thumbnail, None if the time is past the end of the video
+        """
+        key = self._key(path, seconds, THUMBNAIL)
+        thumbnail = self._get(key)
+        if thumbnail is not None:
+            return thumbnail
+        file_path = self._thumbnail_path(key)
+        thumbnail = self._load_thumbnail(file_path)
+        if thumbnail is None:
+            frame = self.get_frame(path, seconds)
+            if frame is None:
+                return None
+            thumbnail = self._downscale(frame)
+            self._store_thumbnail(file_path, thumbnail)
+        thumbnail.flags.writeable = False
+        self._put(key, thumbnail)
+        return thumbnail
+
+    # Prefetching
+
+    def prefetch(self, requests: Iterable[Tuple[str, float]], thumbnails: bool = False):
+        """Decode frames in the background
+
+        A new call supersedes the previous one: frames the previous call had
+        not reached yet are skipped, so fast clicking never queues up work.
+
+        Args:
+            requests: (video path, seconds) pairs, most wanted first
+            thumbnails: Prefetch thumbnails instead of full frames
+        """
+        requests = list(requests)
+        with self._lock:
+            self._prefetch_generation += 1
+            generation = self._prefetch_generation
+            if self._prefetcher is None:
+                self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipes-prefetch")
+            prefetcher = self._prefetcher
+        prefetcher.submit(self._run_prefetch, requests, thumbnails, generation)
+
+    def _run_prefetch(self, requests, thumbnails, generation):
+        fetch = self.get_thumbnail if thumbnails else self.get_frame
+        for path, seconds in requests:
+            if generation != self._prefetch_generation:
+                return
+            try:
+                fetch(path, seconds)
+            except Exception as e:
+                print(f"Error prefetching {path} at {seconds:.1f} s: {e}")
+                return
+
+    def prefetch_events(self, video_path: str, events: Sequence, selected: int, radius: int = PREFETCH_RADIUS):
+        """Prefetch the frames of the events around the selected one
+
+        Args:
+            video_path: Video of the events' section
+            events: Events in list order, e.g. from database.get_section_events()
+            selected: Position of the selected event in events
+            radius: Events to prefetch on each side
+        """
+        order = []
+        for offset in range(1, radius + 1):
+            # Alternate after/before, the next event is the likeliest click
+            order.extend((selected + offset, selected - offset))
+        self.prefetch(
+            (video_path, events[position].video_time) for position in order
+            if 0 <= position < len(events) and events[position].video_time is not None
+        )
+
+    def shutdown(self):
+        """Stop prefetching and close the open videos"""
+        with self._lock:
+            self._prefetch_generation += 1
+            prefetcher, self._prefetcher = self._prefetcher, None
+        if prefetcher is not None:
+            prefetcher.shutdown(wait=True)
+        self.clear()
+
+# Singleton instance of FrameCache
+frame_cache = FrameCache()
+atexit.register(frame_cache.shutdown)
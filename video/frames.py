@@ -0,0 +1,158 @@
+"""
+Frame access for inspection videos
+
+OpenCV is imported on first use, so modules that only need the helpers
+here do not pay for it at startup.
+"""
+import os
+import time
+import hashlib
+from dataclasses import dataclass
+from typing import Container, Iterator, Optional, Tuple
+
+# Bytes hashed at each end of a video file by video_fingerprint
+FINGERPRINT_BYTES = 1 << 20
+
+# Seek instead of grabbing when sampled frames are at least this far apart
+# and the decoder has not been timed yet. Grabbing still demuxes and
+# decodes every frame; a seek jumps to the previous keyframe and decodes
+# forward from there, which is cheap for intra-only codecs (MJPEG) and
+# expensive for long GOPs.
+SEEK_DISTANCE = 48
+
+@dataclass
+class VideoInfo:
+    """Basic properties of a video file"""
+    path: str
+    fps: float
+    frame_count: int
+    width: int
+    height: int
+
+    @property
+    def duration(self) -> float:
+        """Length in seconds"""
+        return self.frame_count / self.fps if self.fps else 0.0
+
+def open_video(path: str):
+    """Open a video with OpenCV
+
+    Raises:
+        ImportError: If OpenCV is not installed
+        OSError: If the file cannot be opened
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise OSError(f"Cannot open video: {path}")
+    return capture
+
+def video_info(path: str) -> VideoInfo:
+    """Read the frame rate, frame count and size of a video"""
+    import cv2
+
+    capture = open_video(path)
+    try:
+        return VideoInfo(
+            path,
+            capture.get(cv2.CAP_PROP_FPS) or 0.0,
+            int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+            int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+    finally:
+        capture.release()
+
+def video_fingerprint(path: str) -> str:
+    """Identify a video's content without reading the whole file
+
+    Hashes the size and the first and last FINGERPRINT_BYTES, which is
+    enough to tell inspection recordings apart and survives renames and
+    copies, unlike the path or the mtime.
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    digest.update(str(size).encode())
+    with open(path, "rb") as video_file:
+        digest.update(video_file.read(FINGERPRINT_BYTES))
+        if size > 2 * FINGERPRINT_BYTES:
+            video_file.seek(-FINGERPRINT_BYTES, os.SEEK_END)
+            digest.update(video_file.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+def iter_frames(path: str, step: int = 1, start: int = 0, end: Optional[int] = None,
+                skip: Container[int] = (), seek: Optional[bool] = None) -> Iterator[Tuple[int, float, "numpy.ndarray"]]:
+    """Decode every step-th frame of a video lazily
+
+    Frames in between are never converted to images. With seek=None the
+    first two samples time reading through the gap against seeking over
+    it, and the cheaper way is used for the rest of the video.
+
+    Args:
+        path: Video file
+        step: Distance between sampled frames
+        start: Index of the first sampled frame
+        end: Index to stop before (end of the video by default)
+        skip: Sampled frame indices not to decode, e.g. already processed
+        seek: Always (True) or never (False) seek over the gaps, None to decide by timing
+
+    Yields:
+        (frame index, time in seconds, BGR frame) tuples
+    """
+    import cv2
+
+    step = max(1, int(step))
+    capture = open_video(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        if end is None or (frame_count and end > frame_count):
+            end = frame_count
+        # Seconds per grabbed frame and per seek, measured on the first samples
+        grab_cost = seek_cost = None
+        position = 0  # Index of the next frame the decoder returns
+        index = start
+        while end is None or index < end:
+            if index in skip:
+                index += step
+                continue
+            gap = index - position
+            if gap < 0:
+                use_seek = True
+            elif gap == 0:
+                use_seek = False
+            elif seek is not None:
+                use_seek = seek
+            elif grab_cost is None or seek_cost is None:
+                # Try the untimed way first, reading through short gaps
+                use_seek = grab_cost is not None or (seek_cost is None and gap >= SEEK_DISTANCE)
+            else:
+                use_seek = seek_cost < gap * grab_cost
+
+            began = time.perf_counter()
+            if use_seek:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                position = index
+            else:
+                while position < index:
+                    if not capture.grab():
+                        return
+                    position += 1
+            ok, frame = capture.read()
+            if not ok:
+                return
+            if gap > 0 and seek is None:
+                elapsed = time.perf_counter() - began
+                if use_seek and seek_cost is None:
+                    seek_cost = elapsed
+                elif not use_seek and grab_cost is None:
+                    grab_cost = elapsed / (gap + 1)
+            position += 1
+            yield index, index / fps, frame
+            index += step
+    finally:
+        capture.release()
@@ -0,0 +1,310 @@
+"""
+Ingest of section videos from a field crew's folder tree
+
+Every video under the folder becomes a section: videos directly in a
+first-level subfolder (or deeper) belong to a project named after that
+subfolder, videos at the top to a project named after the folder itself.
+Sections are numbered by the recording start time.
+
+Probing, i.e. fingerprinting a video and reading its duration, size and
+start time, runs in worker processes, a chunk of files per task. Videos
+whose fingerprint is already in the ingested_videos manifest are skipped
+before they are opened, so rerunning an interrupted ingest only probes
+and adds what is missing. A project's rows are written through the
+database layer as soon as all of its files are probed, one transaction
+per batch.
+
+Run from the repository root:
+
+    python -m video.ingest /media/crew-3/2026-10-17 --location Haifa
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import database
+from instrumentation import instrumentation
+from video.frames import video_fingerprint, video_info
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".mpg", ".mpeg", ".m4v", ".wmv", ".mts")
+
+# Files probed per worker task
+FILES_PER_TASK = 8
+
+# Tasks queued per worker; bounds the results held in memory
+MAX_PENDING_PER_WORKER = 2
+
+# Sections written per transaction
+DB_BATCH_SIZE = 200
+
+# Seconds ffprobe may take on one file
+FFPROBE_TIMEOUT = 30
+
+# Recording time in a file name, e.g. CAM1_20261017_134502.mp4
+FILENAME_TIME = re.compile(r"(20\d{2})[-_.]?(\d{2})[-_.]?(\d{2})[-_ T]?(\d{2})[-_.:]?(\d{2})[-_.:]?(\d{2})")
+
+@dataclass(slots=True)
+class VideoProbe:
+    """Metadata of one video file, or why it could not be read"""
+    path: str
+    fingerprint: Optional[str] = None
+    duration: Optional[float] = None  # Seconds
+    width: Optional[int] = None
+    height: Optional[int] = None
+    started_at: Optional[str] = None  # "YYYY-MM-DD HH:MM:SS" local time
+    skipped: bool = False  # Already in the manifest, not opened
+    error: Optional[str] = None
+
+@dataclass
+class IngestResult:
+    """Outcome of an ingest run"""
+    root: str
+    found: int = 0
+    skipped: int = 0  # Already ingested
+    sections: List[int] = field(default_factory=list)
+    failures: List[Tuple[str, str]] = field(default_factory=list)  # (path, reason)
+    seconds: float = 0.0
+
+def find_videos(root: str) -> Iterator[str]:
+    """Yield the video files under a folder in a stable order"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(VIDEO_EXTENSIONS) and not name.startswith("."):
+                yield os.path.join(directory, name)
+
+def project_name(root: str, path: str) -> str:
+    """Project of a video: its first-level subfolder, or the root folder itself"""
+    parts = os.path.relpath(path, root).split(os.sep)
+    return parts[0] if len(parts) > 1 else os.path.basename(os.path.abspath(root))
+
+def _timestamp(value: str) -> Optional[str]:
+    """ISO 8601 time from ffprobe as "YYYY-MM-DD HH:MM:SS" local time"""
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+def _probe_ffprobe(probe: VideoProbe, ffprobe: str) -> bool:
+    """Fill a probe from ffprobe, which also reads the recording time; False if it failed"""
+    try:
+        output = subprocess.run(
+            [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams",
+             "-select_streams", "v:0", probe.path],
+            capture_output=True, timeout=FFPROBE_TIMEOUT, check=True
+        ).stdout
+        data = json.loads(output)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return False
+    streams = data.get("streams") or [{}]
+    fmt = data.get("format") or {}
+    if not streams[0].get("width"):
+        return False
+    probe.width, probe.height = streams[0].get("width"), streams[0].get("height")
+    duration = fmt.get("duration") or streams[0].get("duration")
+    probe.duration = float(duration) if duration else None
+    created = (fmt.get("tags") or {}).get("creation_time") or (streams[0].get("tags") or {}).get("creation_time")
+    probe.started_at = _timestamp(created) if created else None
+    return True
+
+def probe_video(path: str, known: Set[str] = frozenset(), ffprobe: Optional[str] = None) -> VideoProbe:
+    """Read a video's fingerprint, duration, size and start time
+
+    ffprobe is used when available; otherwise OpenCV reads the duration and
+    size. The start time falls back to a time in the file name, then to
+    the file's modification time.
+
+    Args:
+        path: Video file
+        known: Fingerprints already ingested; such a video is not opened
+        ffprobe: Path of the ffprobe executable, None to use OpenCV
+    """
+    probe = VideoProbe(path)
+    try:
+        probe.fingerprint = video_fingerprint(path)
+        if probe.fingerprint in known:
+            probe.skipped = True
+            return probe
+        if not (ffprobe and _probe_ffprobe(probe, ffprobe)):
+            info = video_info(path)
+            probe.duration, probe.width, probe.height = info.duration or None, info.width, info.height
+        if probe.started_at is None:
+            match = FILENAME_TIME.search(os.path.basename(path))
+            try:
+                moment = datetime(*map(int, match.groups())) if match else None
+            except ValueError:
+                moment = None
+            moment = moment or datetime.fromtimestamp(os.path.getmtime(path))
+            probe.started_at = moment.strftime("%Y-%m-%d %H:%M:%S")
+    except (ImportError, OSError) as e:
+        probe.error = str(e)
+    return probe
+
+# Manifest fingerprints and ffprobe path of a worker process
+_known: Set[str] = set()
+_ffprobe: Optional[str] = None
+
+def _init_worker(known: Set[str], ffprobe: Optional[str]):
+    global _known, _ffprobe
+    _known, _ffprobe = known, ffprobe
+
+def _probe_chunk(paths: List[str]) -> List[VideoProbe]:
+    """Worker: probe a chunk of files"""
+    return [probe_video(path, _known, _ffprobe) for path in paths]
+
+def _chunks(items: List[str], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _write_project(project: str, probes: List[VideoProbe], location: str, seen: Set[str], result: IngestResult):
+    """Write the sections of one fully probed project
+
+    Args:
+        project: Project name
+        probes: Probes of all the project's files
+        location: Location of the project if it is new
+        seen: Fingerprints written in this ingest, copies are skipped
+        result: IngestResult to add the sections and failures to
+    """
+    new = []
+    for probe in probes:
+        if probe.error:
+            result.failures.append((probe.path, probe.error))
+        elif probe.skipped or probe.fingerprint in seen:
+            # Copies of one recording in the folder become one section
+            result.skipped += 1
+        else:
+            seen.add(probe.fingerprint)
+            new.append(probe)
+    # Section numbers follow the recording order within the project
+    new.sort(key=lambda probe: (probe.started_at or "", probe.path))
+
+    for done in range(0, len(new), DB_BATCH_SIZE):
+        batch = new[done:done + DB_BATCH_SIZE]
+        written = database.add_ingested_videos(({
+            "project": project,
+            "location": location,
+            "fingerprint": probe.fingerprint,
+            "path": os.path.abspath(probe.path),
+            "started_at": probe.started_at,
+            "duration": probe.duration,
+            "width": probe.width,
+            "height": probe.height,
+        } for probe in batch), chunk_size=DB_BATCH_SIZE)
+        result.sections += [section_id for section_id in written.ids if section_id is not None]
+        result.failures += [(batch[index].path, message) for index, message in written.errors]
+
+@instrumentation.timed("ingest.folder")
+def ingest_folder(root: str, location: Optional[str] = None, workers: Optional[int] = None,
+                  progress: Optional[Callable[[int, int, str], None]] = None) -> IngestResult:
+    """Add a section for every new video under a folder
+
+    Args:
+        root: Folder to scan
+        location: Location of new projects, the folder name by default
+        workers: Probing processes (CPU count by default), 0 probes in this process
+        progress: progress(done, total, phase) after every probed chunk
+            ("probe") and every written project ("write", done counts the
+            files of written projects); may raise to abort, the projects
+            written so far stay ingested
+
+    Returns:
+        IngestResult with the new section IDs and the files that failed
+    """
+    start = time.perf_counter()
+    result = IngestResult(root)
+    location = location or os.path.basename(os.path.abspath(root))
+    paths = list(find_videos(root))
+    result.found = len(paths)
+    known = database.get_ingested_fingerprints()
+    ffprobe = shutil.which("ffprobe")
+
+    # A project's sections are written as soon as all of its files are
+    # probed (section numbers are per project), so an interrupted ingest
+    # keeps the projects it finished
+    unprobed = Counter(project_name(root, path) for path in paths)
+    probed: Dict[str, List[VideoProbe]] = defaultdict(list)
+    seen = set()
+    handled = 0
+
+    def collect(probes: List[VideoProbe]):
+        nonlocal handled
+        for probe in probes:
+            project = project_name(root, probe.path)
+            probed[project].append(probe)
+            unprobed[project] -= 1
+            if unprobed[project] == 0:
+                project_probes = probed.pop(project)
+                _write_project(project, project_probes, location, seen, result)
+                handled += len(project_probes)
+                if progress:
+                    progress(handled, len(paths), "write")
+
+    done = 0
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 0:
+        for path in paths:
+            collect([probe_video(path, known, ffprobe)])
+            done += 1
+            if progress:
+                progress(done, len(paths), "probe")
+    elif paths:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(known, ffprobe)) as pool:
+            pending = set()
+
+            def handle(futures):
+                nonlocal done
+                for future in futures:
+                    probes = future.result()
+                    collect(probes)
+                    done += len(probes)
+                if progress:
+                    progress(done, len(paths), "probe")
+
+            try:
+                for chunk in _chunks(paths, FILES_PER_TASK):
+                    if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        handle(finished)
+                    pending.add(pool.submit(_probe_chunk, chunk))
+                handle(wait(pending).done)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Add a section for every new video under a folder")
+    parser.add_argument("root", help="folder of section videos, one subfolder per project")
+    parser.add_argument("--location", help="location of new projects (default: the folder name)")
+    parser.add_argument("--workers", type=int, help="probing processes (default: CPU count, 0: none)")
+    args = parser.parse_args(argv)
+
+    database.initialize_database()
+    result = ingest_folder(args.root, args.location, args.workers)
+    for path, reason in result.failures:
+        print(f"{path}: {reason}")
+    print(f"{result.found} videos, {len(result.sections)} sections added, {result.skipped} already ingested, "
+          f"{len(result.failures)} failed, {result.seconds:.1f} s")
+    return 1 if result.failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())